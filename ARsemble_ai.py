@@ -1,12 +1,12 @@
 from typing import Optional
-from collections import OrderedDict
+import asyncio
+from collections import OrderedDict, deque
+from collections.abc import Mapping
 import threading
-import logging
 import unicodedata
-import datetime
 import sys
-import contextlib
-import io
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 import random
 import textwrap
 import json
@@ -15,747 +15,167 @@ import re
 import math
 import difflib
 
-from dotenv import load_dotenv
 import os
-import google.genai as genai
 from pathlib import Path
 
-env_path = Path(".env")
-if env_path.exists():
-    try:
-        load_dotenv()
-    except Exception as e:
-        print("Warning: load_dotenv() failed (continuing). Error:",
-              e, file=sys.stderr)
-
-API_KEY = os.getenv("GEMINI_API_KEY")  # only this
+import answer_store
+import catalog_backend
+import catalog_columns
+import catalog_deltas
+import catalog_manager
+import catalog_snapshot
+from text_utils import normalize_text, parse_watts, parse_price
+import response_cache
+import semantic_cache
+import gemini_limiter
+import timing
+import metrics
+import profiler
+import log_config
+import answers
 
+# -------------------------------
+# 🔌 Gemini client (lazy)
+# -------------------------------
+# dotenv, google.genai (~0.8s to import) and genai.Client are only touched on the
+# first LLM-bound request, or from warm_client_in_background() after the server
+# has bound its port, so importing this module stays cheap for workers and the CLI.
 client = None
-if API_KEY:
+_client_ready = False
+_client_lock = threading.Lock()
+
+
+def _load_env_file():
+    env_path = Path(".env")
+    if env_path.exists():
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+        except Exception as e:
+            logger.warning("load_dotenv() failed (continuing): %s", e)
+
+
+def _init_client():
+    _load_env_file()
+    api_key = os.getenv("GEMINI_API_KEY")  # only this
+    # "fake" swaps in the local stand-in from fake_genai.py (load tests / CI, no network)
+    backend = (os.getenv("GEMINI_BACKEND") or "google").strip().lower()
+    if backend == "fake":
+        import fake_genai
+        logger.info("Fake Gemini client initialized (GEMINI_BACKEND=fake)")
+        return fake_genai.Client()
+    if not api_key:
+        logger.warning("GEMINI API key not found in environment (GEMINI_API_KEY); Gemini disabled")
+        return None
     try:
-        client = genai.Client(api_key=API_KEY)
-        print("Gemini client initialized (API key present).", file=sys.stderr)
+        import google.genai as genai
+        c = genai.Client(api_key=api_key)
+        logger.info("Gemini client initialized (API key present)")
+        return c
     except Exception as e:
-        print("Warning: failed to initialize genai client:", e, file=sys.stderr)
-else:
-    print("Warning: GEMINI API key not found in environment (GEMINI_API_KEY). Gemini disabled.", file=sys.stderr)
+        logger.warning("failed to initialize genai client: %s", e)
+        return None
 
-# -------------------------------
-# 📚 Local Component Database (paste your dataset here)
-# -------------------------------
-data = {
-    "gpu": {
-        "integrated graphics": {
-            "name": "Integrated Graphics (from CPU)",
-            "type": "GPU",
-                    "vram": "Shared system memory",
-                    "clock": "Varies by CPU",
-                    "power": "0W (included in CPU power)",
-                    "slot": "None (integrated)",
-                    "price": "₱0 (included with CPU)",
-                    "compatibility": "Works with any compatible motherboard, no additional power required"
-        },
-        "gtx 750 ti": {
-            "name": "NVIDIA GTX 750 Ti",
-            "type": "GPU",
-                    "vram": "2GB GDDR5",
-                    "clock": "~1085 MHz (Boost)",
-                    "power": "~60 Watts",
-                    "slot": "PCIe 3.0 x16",
-                    "price": "₱4,000",
-                    "compatibility": "PCIe x16 slot, 300W PSU recommended"
-        },
-        "rtx 3050": {
-            "name": "Gigabyte RTX 3050 EAGLE OC",
-            "type": "GPU",
-                    "vram": "8GB GDDR6",
-                    "clock": "~1777 MHz (Boost)",
-                    "power": "~130 Watts",
-                    "slot": "PCIe 4.0 x16",
-                    "price": "₱12,000",
-                    "compatibility": "PCIe x16 slot, 550W PSU, 8-pin power connector"
-        },
-        "rtx 3060": {
-            "name": "MSI RTX 3060",
-            "type": "GPU",
-                    "vram": "12GB GDDR6",
-                    "clock": "~1777 MHz (Boost)",
-                    "power": "~170 Watts",
-                    "slot": "PCIe 4.0 x16",
-                    "price": "₱16,000",
-                    "compatibility": "PCIe x16 slot, 550W PSU, 8-pin power connector"
-        },
-        "rtx 4060": {
-            "name": "MSI RTX 4060 GAMING X",
-            "type": "GPU",
-                    "vram": "8GB GDDR6",
-                    "clock": "~2595 MHz (Boost)",
-                    "power": "~115 Watts",
-                    "slot": "PCIe 4.0 x8",
-                    "price": "₱18,000",
-                    "compatibility": "PCIe x16 slot, 550W PSU, 8-pin power connector"
-        }
-    },
-    "cpu": {
-        "amd ryzen 3 3200g": {
-            "name": "AMD Ryzen 3 3200G",
-                    "type": "CPU",
-                    "socket": "AM4",
-                    "cores": "4 Cores / 4 Threads",
-                    "clock": "3.6 GHz / 4.0 GHz Boost",
-                    "tdp": "65W",
-                    "igpu": "Vega 8",
-                    "price": "₱4,500",
-                    "compatibility": "AM4 Motherboards, DDR4 RAM"
-        },
-        "amd ryzen 5 3600": {
-            "name": "AMD Ryzen 5 3600",
-                    "type": "CPU",
-                    "socket": "AM4",
-                    "cores": "6 Cores / 12 Threads",
-                    "clock": "3.6 GHz / 4.2 GHz Boost",
-                    "tdp": "65W",
-                    "igpu": "None",
-                    "price": "₱6,500",
-                    "compatibility": "AM4 Motherboards, DDR4 RAM"
-        },
-        "amd ryzen 5 5600g": {
-            "name": "AMD Ryzen 5 5600G",
-                    "type": "CPU",
-                    "socket": "AM4",
-                    "cores": "6 Cores / 12 Threads",
-                    "clock": "3.9 GHz / 4.4 GHz Boost",
-                    "tdp": "65W",
-                    "igpu": "Vega 7",
-                    "price": "₱8,500",
-                    "compatibility": "AM4 Motherboards, DDR4 RAM"
-        },
-        "amd ryzen 5 5600x": {
-            "name": "AMD Ryzen 5 5600X",
-                    "type": "CPU",
-                    "socket": "AM4",
-                    "cores": "6 Cores / 12 Threads",
-                    "clock": "3.7 GHz / 4.6 GHz Boost",
-                    "tdp": "65W",
-                    "igpu": "None",
-                    "price": "₱9,000",
-                    "compatibility": "AM4 Motherboards, DDR4 RAM"
-        },
-        "amd ryzen 7 5700x": {
-            "name": "AMD Ryzen 7 5700X",
-                    "type": "CPU",
-                    "socket": "AM4",
-                    "cores": "8 Cores / 16 Threads",
-                    "clock": "3.4 GHz / 4.6 GHz Boost",
-                    "tdp": "65W",
-                    "igpu": "None",
-                    "price": "₱12,000",
-                    "compatibility": "AM4 Motherboards, DDR4 RAM"
-        },
-        "amd ryzen 7 5800x": {
-            "name": "AMD Ryzen 7 5800X",
-                    "type": "CPU",
-                    "socket": "AM4",
-                    "cores": "8 Cores / 16 Threads",
-                    "clock": "3.8 GHz / 4.7 GHz Boost",
-                    "tdp": "105W",
-                    "igpu": "None",
-                    "price": "₱14,000",
-                    "compatibility": "AM4 Motherboards, DDR4 RAM"
-        },
-        "amd ryzen 9 5900x": {
-            "name": "AMD Ryzen 9 5900X",
-                    "type": "CPU",
-                    "socket": "AM4",
-                    "cores": "12 Cores / 24 Threads",
-                    "clock": "3.7 GHz / 4.8 GHz Boost",
-                    "tdp": "105W",
-                    "igpu": "None",
-                    "price": "₱18,000",
-                    "compatibility": "AM4 Motherboards, DDR4 RAM"
-        },
-        "amd ryzen 5 7600": {
-            "name": "AMD Ryzen 5 7600",
-                    "type": "CPU",
-                    "socket": "AM5",
-                    "cores": "6 Cores / 12 Threads",
-                    "clock": "3.8 GHz / 5.1 GHz Boost",
-                    "tdp": "65W",
-                    "igpu": "Radeon Graphics",
-                    "price": "₱13,500",
-                    "compatibility": "AM5 Motherboards, DDR5 RAM"
-        },
-        "amd ryzen 7 7700x": {
-            "name": "AMD Ryzen 7 7700X",
-                    "type": "CPU",
-                    "socket": "AM5",
-                    "cores": "8 Cores / 16 Threads",
-                    "clock": "4.5 GHz / 5.4 GHz Boost",
-                    "tdp": "105W",
-                    "igpu": "Radeon Graphics",
-                    "price": "₱18,500",
-                    "compatibility": "AM5 Motherboards, DDR5 RAM"
-        },
-        "amd ryzen 9 7900x": {
-            "name": "AMD Ryzen 9 7900X",
-                    "type": "CPU",
-                    "socket": "AM5",
-                    "cores": "12 Cores / 24 Threads",
-                    "clock": "4.7 GHz / 5.6 GHz Boost",
-                    "tdp": "170W",
-                    "igpu": "Radeon Graphics",
-                    "price": "₱25,000",
-                    "compatibility": "AM5 Motherboards, DDR5 RAM"
-        },
-        "amd ryzen 9 7950x": {
-            "name": "AMD Ryzen 9 7950X",
-                    "type": "CPU",
-                    "socket": "AM5",
-                    "cores": "16 Cores / 32 Threads",
-                    "clock": "4.5 GHz / 5.7 GHz Boost",
-                    "tdp": "170W",
-                    "igpu": "Radeon Graphics",
-                    "price": "₱32,000",
-                    "compatibility": "AM5 Motherboards, DDR5 RAM"
-        },
-        "amd ryzen 5 5600x": {
-            "name": "AMD Ryzen 5 5600X",
-            "type": "CPU",
-            "socket": "AM4",
-            "cores": "6 Cores / 12 Threads",
-            "clock": "3.7 GHz / 4.6 GHz Boost",
-            "tdp": "65W",
-            "igpu": "None",
-            "price": "₱9,000",
-            "compatibility": "AM4 Motherboards, DDR4 RAM"
-        },
-        "intel core i5 13400": {
-            "name": "Intel Core i5 13400",
-            "type": "CPU",
-            "socket": "LGA1700",
-            "cores": "10 Cores / 16 Threads",
-            "clock": "2.5 GHz / 4.6 GHz Boost",
-            "tdp": "65W",
-            "igpu": "UHD Graphics 730",
-            "price": "₱12,000",
-            "compatibility": "LGA1700 Motherboards, DDR4/DDR5"
-        },
-        "intel core i3 13100": {
-            "name": "Intel Core i3 13100",
-                    "type": "CPU",
-                    "socket": "LGA1700",
-                    "cores": "4 Cores / 8 Threads",
-                    "clock": "3.4 GHz / 4.5 GHz Boost",
-                    "tdp": "60W",
-                    "igpu": "UHD Graphics 730",
-                    "price": "₱6,000",
-                    "compatibility": "LGA1700 Motherboards, DDR4/DDR5"
-        },
-        "intel core i3 14100": {
-            "name": "Intel Core i3 14100",
-                    "type": "CPU",
-                    "socket": "LGA1700",
-                    "cores": "4 Cores / 8 Threads",
-                    "clock": "3.5 GHz / 4.7 GHz Boost",
-                    "tdp": "60W",
-                    "igpu": "UHD Graphics 730",
-                    "price": "₱6,500",
-                    "compatibility": "LGA1700 Motherboards, DDR4/DDR5"
-        },
-        "intel core i5 13400": {
-            "name": "Intel Core i5 13400",
-                    "type": "CPU",
-                    "socket": "LGA1700",
-                    "cores": "10 Cores / 16 Threads",
-                    "clock": "2.5 GHz / 4.6 GHz Boost",
-                    "tdp": "65W",
-                    "igpu": "UHD Graphics 730",
-                    "price": "₱12,000",
-                    "compatibility": "LGA1700 Motherboards, DDR4/DDR5"
-        },
-        "intel core i5 14500": {
-            "name": "Intel Core i5 14500",
-                    "type": "CPU",
-                    "socket": "LGA1700",
-                    "cores": "14 Cores / 20 Threads",
-                    "clock": "2.6 GHz / 4.8 GHz Boost",
-                    "tdp": "65W",
-                    "igpu": "UHD Graphics 730",
-                    "price": "₱13,500",
-                    "compatibility": "LGA1700 Motherboards, DDR4/DDR5"
-        },
-        "intel core i5 14600k": {
-            "name": "Intel Core i5 14600K",
-                    "type": "CPU",
-                    "socket": "LGA1700",
-                    "cores": "14 Cores / 20 Threads",
-                    "clock": "3.5 GHz / 5.3 GHz Boost",
-                    "tdp": "125W",
-                    "igpu": "UHD Graphics 770",
-                    "price": "₱16,000",
-                    "compatibility": "LGA1700 Motherboards, DDR4/DDR5"
-        },
-        "intel core i7 13700k": {
-            "name": "Intel Core i7 13700K",
-                    "type": "CPU",
-                    "socket": "LGA1700",
-                    "cores": "16 Cores / 24 Threads",
-                    "clock": "3.4 GHz / 5.4 GHz Boost",
-                    "tdp": "125W",
-                    "igpu": "UHD Graphics 770",
-                    "price": "₱22,000",
-                    "compatibility": "LGA1700 Motherboards, DDR4/DDR5"
-        },
-        "intel core i7 14700k": {
-            "name": "Intel Core i7 14700K",
-                    "type": "CPU",
-                    "socket": "LGA1700",
-                    "cores": "20 Cores / 28 Threads",
-                    "clock": "3.4 GHz / 5.6 GHz Boost",
-                    "tdp": "125W",
-                    "igpu": "UHD Graphics 770",
-                    "price": "₱24,000",
-                    "compatibility": "LGA1700 Motherboards, DDR4/DDR5"
-        },
-        "intel core i9 14900k": {
-            "name": "Intel Core i9 14900K",
-                    "type": "CPU",
-                    "socket": "LGA1700",
-                    "cores": "24 Cores / 32 Threads",
-                    "clock": "3.2 GHz / 6.0 GHz Boost",
-                    "tdp": "125W",
-                    "igpu": "UHD Graphics 770",
-                    "price": "₱32,000",
-                    "compatibility": "LGA1700 Motherboards, DDR4/DDR5"
-        }
-    },
-    "motherboard": {
-        "gigabyte h610m k ddr4": {
-            "name": "GIGABYTE H610M K DDR4",
-                    "type": "Motherboard",
-                    "socket": "LGA1700",
-                    "form_factor": "mATX",
-                    "ram_slots": 2,
-                    "max_ram": "64GB",
-                    "ram_type": "DDR4",
-                    "nvme_slots": 1,
-                    "sata_ports": 4,
-                    "price": "₱4,500",
-                    "compatibility": "LGA1700 CPUs, DDR4 RAM, PCIe 4.0"
-        },
-        "msi pro h610m s ddr4": {
-            "name": "MSI Pro H610M S DDR4",
-                    "type": "Motherboard",
-                    "socket": "LGA1700",
-                    "form_factor": "mATX",
-                    "ram_slots": 2,
-                    "max_ram": "64GB",
-                    "ram_type": "DDR4",
-                    "nvme_slots": 1,
-                    "sata_ports": 4,
-                    "price": "₱4,800",
-                    "compatibility": "LGA1700 CPUs, DDR4 RAM, PCIe 4.0"
-        },
-        "msi b450m-a pro max ii": {
-            "name": "MSI B450M-A PRO MAX II",
-                    "type": "Motherboard",
-                    "socket": "AM4",
-                    "form_factor": "mATX",
-                    "ram_slots": 2,
-                    "max_ram": "64GB",
-                    "ram_type": "DDR4",
-                    "nvme_slots": 1,
-                    "sata_ports": 4,
-                    "price": "₱4,200",
-                    "compatibility": "AM4 CPUs, DDR4 RAM, PCIe 3.0"
-        },
-        "ramsta rs-b450mp": {
-            "name": "RAMSTA RS-B450MP",
-                    "type": "Motherboard",
-                    "socket": "AM4",
-                    "form_factor": "mATX",
-                    "ram_slots": 2,
-                    "max_ram": "64GB",
-                    "ram_type": "DDR4",
-                    "nvme_slots": 1,
-                    "sata_ports": 4,
-                    "price": "₱3,800",
-                    "compatibility": "AM4 CPUs, DDR4 RAM, PCIe 3.0"
-        },
-        "asus tuf gaming b550-plus": {
-            "name": "ASUS TUF GAMING B550-PLUS",
-                    "type": "Motherboard",
-                    "socket": "AM4",
-                    "form_factor": "ATX",
-                    "ram_slots": 4,
-                    "max_ram": "128GB",
-                    "ram_type": "DDR4",
-                    "nvme_slots": 2,
-                    "sata_ports": 6,
-                    "price": "₱7,800",
-                    "compatibility": "AM4 CPUs, DDR4 RAM, PCIe 4.0"
-        },
-        "asus prime b650-plus": {
-            "name": "ASUS PRIME B650-PLUS",
-                    "type": "Motherboard",
-                    "socket": "AM5",
-                    "form_factor": "ATX",
-                    "ram_slots": 4,
-                    "max_ram": "128GB",
-                    "ram_type": "DDR5",
-                    "nvme_slots": 3,
-                    "sata_ports": 4,
-                    "price": "₱9,500",
-                    "compatibility": "AM5 CPUs, DDR5 RAM, PCIe 4.0"
-        },
-        "msi pro x670-p wifi": {
-            "name": "MSI PRO X670-P WIFI",
-                    "type": "Motherboard",
-                    "socket": "AM5",
-                    "form_factor": "ATX",
-                    "ram_slots": 4,
-                    "max_ram": "128GB",
-                    "ram_type": "DDR5",
-                    "nvme_slots": 4,
-                    "sata_ports": 6,
-                    "price": "₱14,000",
-                    "compatibility": "AM5 CPUs, DDR5 RAM, PCIe 5.0"
-        },
-        "msi mpg z790 carbon wifi": {
-            "name": "MSI MPG Z790 CARBON WIFI",
-                    "type": "Motherboard",
-                    "socket": "LGA1700",
-                    "form_factor": "ATX",
-                    "ram_slots": 4,
-                    "max_ram": "128GB",
-                    "ram_type": "DDR5",
-                    "nvme_slots": 5,
-                    "sata_ports": 6,
-                    "price": "₱18,500",
-                    "compatibility": "LGA1700 CPUs, DDR5 RAM, PCIe 5.0"
-        }
-    },
-    "ram": {
-        "kingston fury beast ddr4 8gb": {
-            "name": "Kingston FURY Beast DDR4 8GB",
-                    "type": "RAM",
-                    "capacity": "8GB",
-                    "speed": "3200MHz",
-                    "ram_type": "DDR4",
-                    "price": "₱1,500",
-                    "compatibility": "DDR4 Motherboards (AM4, LGA1700 DDR4)"
-        },
-        "kingston fury beast ddr4 16gb": {
-            "name": "Kingston FURY Beast DDR4 16GB",
-                    "type": "RAM",
-                    "capacity": "16GB",
-                    "speed": "3200MHz",
-                    "ram_type": "DDR4",
-                    "price": "₱3,000",
-                    "compatibility": "DDR4 Motherboards (AM4, LGA1700 DDR4)"
-        },
-        "hkcmemory hu40 ddr4 16gb": {
-            "name": "HKCMEMORY HU40 DDR4 16GB",
-                    "type": "RAM",
-                    "capacity": "16GB",
-                    "speed": "3200MHz",
-                    "ram_type": "DDR4",
-                    "price": "₱2,200",
-                    "compatibility": "DDR4 Motherboards (AM4, LGA1700 DDR4)"
-        },
-        "kingston fury beast ddr4 32gb": {
-            "name": "Kingston FURY Beast DDR4 32GB",
-                    "type": "RAM",
-                    "capacity": "32GB",
-                    "speed": "3200MHz",
-                    "ram_type": "DDR4",
-                    "price": "₱3,800",
-                    "compatibility": "DDR4 Motherboards (AM4, LGA1700 DDR4)"
-        },
-        "kingston fury beast ddr5 8gb": {
-            "name": "Kingston FURY Beast DDR5 8GB",
-                    "type": "RAM",
-                    "capacity": "8GB",
-                    "speed": "4800MHz",
-                    "ram_type": "DDR5",
-                    "price": "₱2,000",
-                    "compatibility": "DDR5 Motherboards (AM5, LGA1700 DDR5)"
-        },
-        "kingston fury beast ddr5 16gb": {
-            "name": "Kingston FURY Beast DDR5 16GB",
-                    "type": "RAM",
-                    "capacity": "16GB",
-                    "speed": "4800MHz",
-                    "ram_type": "DDR5",
-                    "price": "₱3,000",
-                    "compatibility": "DDR5 Motherboards (AM5, LGA1700 DDR5)"
-        },
-        "corsair vengeance ddr5 32gb": {
-            "name": "Corsair Vengeance DDR5 32GB",
-                    "type": "RAM",
-                    "capacity": "32GB",
-                    "speed": "5200MHz",
-                    "ram_type": "DDR5",
-                    "price": "₱5,500",
-                    "compatibility": "DDR5 Motherboards (AM5, LGA1700 DDR5)"
-        }
-    },
-    "storage": {
-        "seagate video 3.5\" hdd 500gb": {
-            "name": "Seagate Video 3.5\" HDD 500GB",
-                    "type": "HDD",
-                    "capacity": "500GB",
-                    "interface": "SATA 6Gb/s",
-                    "price": "₱1,200",
-                    "compatibility": "Any motherboard with SATA port"
-        },
-        "seagate video 3.5\" hdd 1tb": {
-            "name": "Seagate Video 3.5\" HDD 1TB",
-                    "type": "HDD",
-                    "capacity": "1TB",
-                    "interface": "SATA 6Gb/s",
-                    "price": "₱1,800",
-                    "compatibility": "Any motherboard with SATA port"
-        },
-        "ramsta s800 128gb": {
-            "name": "Ramsta S800 128GB SSD",
-                    "type": "SATA SSD",
-                    "capacity": "128GB",
-                    "interface": "SATA 6Gb/s",
-                    "price": "₱800",
-                    "compatibility": "Any motherboard with SATA port"
-        },
-        "ramsta s800 256gb": {
-            "name": "Ramsta S800 256GB SSD",
-                    "type": "SATA SSD",
-                    "capacity": "256GB",
-                    "interface": "SATA 6Gb/s",
-                    "price": "₱1,200",
-                    "compatibility": "Any motherboard with SATA port"
-        },
-        "ramsta s800 512gb": {
-            "name": "Ramsta S800 512GB SSD",
-                    "type": "SATA SSD",
-                    "capacity": "512GB",
-                    "interface": "SATA 6Gb/s",
-                    "price": "₱1,800",
-                    "compatibility": "Any motherboard with SATA port"
-        },
-        "ramsta s800 1tb": {
-            "name": "Ramsta S800 1TB SSD",
-                    "type": "SATA SSD",
-                    "capacity": "1TB",
-                    "interface": "SATA 6Gb/s",
-                    "price": "₱2,800",
-                    "compatibility": "Any motherboard with SATA port"
-        },
-        "ramsta s800 2tb": {
-            "name": "Ramsta S800 2TB SSD",
-                    "type": "SATA SSD",
-                    "capacity": "2TB",
-                    "interface": "SATA 6Gb/s",
-                    "price": "₱4,500",
-                    "compatibility": "Any motherboard with SATA port"
-        },
-        "crucial mx500 500gb": {
-            "name": "Crucial MX500 500GB SSD",
-                    "type": "SATA SSD",
-                    "capacity": "500GB",
-                    "interface": "SATA 6Gb/s",
-                    "price": "₱2,200",
-                    "compatibility": "Any motherboard with SATA port"
-        },
-        "samsung 970 evo plus 250gb": {
-            "name": "Samsung 970 EVO Plus 250GB",
-                    "type": "NVMe SSD",
-                    "capacity": "250GB",
-                    "interface": "PCIe 3.0 x4",
-                    "price": "₱1,800",
-                    "compatibility": "Motherboard with M.2 NVMe slot"
-        },
-        "samsung 970 evo plus 500gb": {
-            "name": "Samsung 970 EVO Plus 500GB",
-                    "type": "NVMe SSD",
-                    "capacity": "500GB",
-                    "interface": "PCIe 3.0 x4",
-                    "price": "₱2,500",
-                    "compatibility": "Motherboard with M.2 NVMe slot"
-        },
-        "samsung 970 evo plus 1tb": {
-            "name": "Samsung 970 EVO Plus 1TB",
-                    "type": "NVMe SSD",
-                    "capacity": "1TB",
-                    "interface": "PCIe 3.0 x4",
-                    "price": "₱4,000",
-                    "compatibility": "Motherboard with M.2 NVMe slot"
-        },
-        "samsung 970 evo plus 2tb": {
-            "name": "Samsung 970 EVO Plus 2TB",
-                    "type": "NVMe SSD",
-                    "capacity": "2TB",
-                    "interface": "PCIe 3.0 x4",
-                    "price": "₱7,000",
-                    "compatibility": "Motherboard with M.2 NVMe slot"
-        }
-    },
-    "psu": {
-        "inplay ak400": {
-            "name": "InPlay AK400",
-                    "type": "PSU",
-                    "wattage": "400W",
-                    "efficiency": "80+",
-                    "price": "₱1,200",
-                    "compatibility": "Basic builds, low-power components"
-        },
-        "inplay gs 550": {
-            "name": "InPlay GS 550",
-                    "type": "PSU",
-                    "wattage": "550W",
-                    "efficiency": "80+ Bronze",
-                    "price": "₱1,800",
-                    "compatibility": "Mid-range builds, single GPU systems"
-        },
-        "corsair cx650": {
-            "name": "Corsair CX650",
-                    "type": "PSU",
-                    "wattage": "650W",
-                    "efficiency": "80+ Bronze",
-                    "price": "₱3,500",
-                    "compatibility": "Gaming builds, most single GPU configurations"
-        },
-        "inplay gs 750": {
-            "name": "InPlay GS 750",
-                    "type": "PSU",
-                    "wattage": "750W",
-                    "efficiency": "80+ Bronze",
-                    "price": "₱2,500",
-                    "compatibility": "High-end builds, powerful GPUs"
-        },
-        "cooler master mwe white 750w": {
-            "name": "Cooler Master MWE White 750W",
-                    "type": "PSU",
-                    "wattage": "750W",
-                    "efficiency": "80+ White",
-                    "price": "₱3,800",
-                    "compatibility": "High-end gaming builds, multiple components"
-        },
-        "corsair rm850x 850w": {
-            "name": "Corsair RM850x 850W",
-                    "type": "PSU",
-                    "wattage": "850W",
-                    "efficiency": "80+ Gold",
-                    "price": "₱6,500",
-                    "compatibility": "Premium builds, high-end GPUs, overclocking"
-        }
-    },
-    "cpu_cooler": {
-        "fantech polar lc240": {
-            "name": "Fantech Polar LC240",
-                    "type": "CPU Cooler",
-                    "cooler_type": "Liquid Cooler",
-                    "size": "240mm",
-                    "socket": "AM4, AM5, LGA1700, LGA1200, LGA1151",
-                    "price": "₱2,800",
-                    "compatibility": "Most modern CPU sockets"
-        },
-        "inplay seaview 240 pro": {
-            "name": "Inplay Seaview 240 Pro",
-                    "type": "CPU Cooler",
-                    "cooler_type": "Liquid Cooler",
-                    "size": "240mm",
-                    "socket": "AM4, AM5, LGA1700, LGA1200",
-                    "price": "₱2,200",
-                    "compatibility": "Modern CPU sockets"
-        },
-        "inplay seaview 360 pro": {
-            "name": "Inplay Seaview 360 Pro",
-                    "type": "CPU Cooler",
-                    "cooler_type": "Liquid Cooler",
-                    "size": "360mm",
-                    "socket": "AM4, AM5, LGA1700, LGA1200",
-                    "price": "₱2,800",
-                    "compatibility": "Modern CPU sockets"
-        },
-        "inplay s20": {
-            "name": "Inplay S20",
-                    "type": "CPU Cooler",
-                    "cooler_type": "Air Cooler",
-                    "size": "120mm",
-                    "socket": "AM4, LGA1700, LGA1200",
-                    "price": "₱600",
-                    "compatibility": "Basic cooling for low to mid-range CPUs"
-        },
-        "inplay s40": {
-            "name": "Inplay S40",
-                    "type": "CPU Cooler",
-                    "cooler_type": "Air Cooler",
-                    "size": "120mm",
-                    "socket": "AM4, AM5, LGA1700, LGA1200",
-                    "price": "₱800",
-                    "compatibility": "Mid-range CPUs, good value cooling"
-        },
-        "cooler master hyper 212 black edition": {
-            "name": "Cooler Master Hyper 212 Black Edition",
-                    "type": "CPU Cooler",
-                    "cooler_type": "Air Cooler",
-                    "size": "120mm",
-                    "socket": "AM4, AM5, LGA1700, LGA1200, LGA1151",
-                    "price": "₱2,000",
-                    "compatibility": "Excellent air cooling for mid to high-end CPUs"
-        },
-        "deepcool ls720 se 360": {
-            "name": "DeepCool LS720 SE 360",
-                    "type": "CPU Cooler",
-                    "cooler_type": "Liquid Cooler",
-                    "size": "360mm",
-                    "socket": "AM4, AM5, LGA1700, LGA1200",
-                    "price": "₱4,500",
-                    "compatibility": "High-performance cooling"
-        },
-        "cooler master masterliquid ml360r rgb": {
-            "name": "Cooler Master MasterLiquid ML360R RGB",
-                    "type": "CPU Cooler",
-                    "cooler_type": "Liquid Cooler",
-                    "size": "360mm",
-                    "socket": "AM4, AM5, LGA1700, LGA2066, LGA1200",
-                    "price": "₱5,500",
-                    "compatibility": "Premium cooling solution, high-end CPUs"
-        }
-    }
-}
 
+def get_client():
+    """Return the Gemini client (None when disabled), creating it on first use."""
+    global client, _client_ready
+    if _client_ready:
+        return client
+    with _client_lock:
+        if not _client_ready:
+            if client is None:
+                client = _init_client()
+            _client_ready = True
+    return client
 
-# -------------------------------
-# 🧰 Utilities
-# -------------------------------
 
+def warm_client_in_background():
+    """Initialize the client on a daemon thread so the first chat doesn't pay for it."""
+    if _client_ready:
+        return None
+    t = threading.Thread(target=get_client, name="gemini-warmup", daemon=True)
+    t.start()
+    return t
 
-def normalize_text(s):
-    """Lowercase & return alphanumeric tokens (keeps numbers like 5600g, i7)."""
-    if not s:
-        return []
-    return re.findall(r'\w+', s.lower())
 
+def reset_client():
+    """Forget the client (e.g. in a freshly forked worker); next get_client() rebuilds it."""
+    global client, _client_ready
+    with _client_lock:
+        client = None
+        _client_ready = False
 
-def parse_watts(value):
-    """Extract integer watt value from strings like '65W', '~115 Watts', '170W'."""
-    if not value:
-        return None
-    s = str(value)
-    m = re.search(r'(\d{2,4})', s.replace(',', ''))
-    return int(m.group(1)) if m else None
+
+# -------------------------------
+# 📚 Local Component Database
+# -------------------------------
+# Source of truth is catalog/components.json, compiled into a binary snapshot
+# (catalog/components.snap) that is mmap'ed on first use, or served from
+# SQLite with ARSEMBLE_CATALOG_BACKEND=sqlite (see catalog_backend). `data`
+# keeps the old nested-dict API: data[cat][key] -> {field: value}, and always
+# resolves to the current (or request-pinned) catalog, so catalog_manager can
+# swap in a new one without a restart.
+data = catalog_snapshot.LazyCatalog(catalog_backend.current_backend)
+# derive the filter columns for a freshly swapped snapshot on the watcher thread
+catalog_manager.on_swap(lambda old, new: catalog_columns.get_columns(new))
+
+
+# With gunicorn's preload_app the master imports this module, builds the shared
+# read-only state once and forks; the workers then share those pages
+# copy-on-write (gunicorn_config.py also gc.freeze()s them so the collector
+# never writes to them). Only per-process state is rebuilt after the fork.
+def preload_shared_state():
+    """Build the catalog and its derived indexes now (in the master, before fork)."""
+    t0 = time.perf_counter()
+    backend = catalog_backend.current_backend().warm()
+    answer_store.get_answer_store()
+    logger.info("Preloaded catalog %s (%d records) in %.0f ms",
+                backend.version, backend.size(), (time.perf_counter() - t0) * 1000)
+    return backend
+
+
+def reinit_after_fork():
+    """Reset per-process state in a freshly forked worker (locks, client, caches)."""
+    global _client_lock, _build_table_lock, _gemini_stats_lock, _gemini_calls, _semantic_cache
+    # a lock another master thread held at fork time would never be released
+    _client_lock = threading.Lock()
+    reset_client()
+    _build_table_lock = threading.Lock()
+    response_cache.reset_after_fork()
+    _gemini_stats_lock = threading.Lock()
+    _gemini_calls = deque(maxlen=_GEMINI_STATS_MAX)
+    _semantic_cache = semantic_cache.SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD)
+    catalog_manager.reinit_after_fork()
+    metrics.reset_after_fork()
+    log_config.reset_after_fork()
+
+
+def metrics_gauges():
+    """(name, help, labels, value) read at /metrics time by the serving process."""
+    snap = catalog_manager.current_snapshot()
+    yield ("arsemble_catalog_info", "Catalog snapshot being served (value is always 1).",
+           {"version": snap.version}, 1)
+    yield ("arsemble_catalog_records", "Component records in the served catalog.", {},
+           snap.record_count)
+    yield ("arsemble_catalog_reloads", "Catalog hot reloads in the serving worker.", {},
+           catalog_manager.stats["reloads"])
+    yield ("arsemble_catalog_deltas_applied", "Price/stock deltas applied in the serving worker.", {},
+           catalog_deltas.stats.get("applied"))
+    shared = response_cache.get_cache().stats()["tiers"].get("shared") or {}
+    yield ("arsemble_response_cache_entries", "Entries in the shared response cache.", {},
+           shared.get("entries"))
+    yield ("arsemble_response_cache_bytes", "Bytes in the shared response cache.", {},
+           shared.get("bytes"))
+    yield ("arsemble_semantic_cache_entries", "Entries in the serving worker's semantic cache.", {},
+           _semantic_cache.stats()["entries"])
+    yield ("arsemble_log_records_dropped", "Log records dropped by the serving worker (queue full).", {},
+           log_config.dropped)
 
 
-def parse_price(value):
-    """Extract integer value from price string '₱1,800' or '₱ 1,800'."""
-    if not value:
-        return None
-    s = str(value)
-    m = re.search(r'(\d[\d,]*)', s)
-    if not m:
-        return None
-    num = int(m.group(1).replace(',', ''))
-    return num
+# -------------------------------
+# 🧰 Utilities
+# -------------------------------
 
 
 def round_up_psu(w):
@@ -953,33 +373,22 @@ def is_education_request(user_input: str) -> bool:
     ])
 
 
-def handle_education_request(user_input: str):
+def handle_education_request(user_input: str, ask: bool = True):
     """
-    Handles conceptual or educational questions.
-    Uses local EDU_EXPLANATIONS first; only calls Gemini when client is available.
+    Handles conceptual or educational questions; returns an answers.Explanation.
+    Uses local EDU_EXPLANATIONS first; only calls Gemini when client is available
+    (and ask is True — the server passes False and routes Gemini itself).
     """
-    print("\n🤖 ARIA — Educational Answer:\n")
-
     # Try local match first (fast, avoids Gemini)
     local = explain_concept(user_input)
     if local:
-        print(local + "\n" + "-" * 60 + "\n")
-        try:
-            add_to_history("assistant", local)
-        except Exception:
-            pass
-        return
+        return answers.Explanation(local, "local", history=local)
 
     # If no local explanation and Gemini client is available, use it.
+    client = get_client() if ask else None
     if client is None:
         # graceful message when no local info + no Gemini
-        print("⚠️ I don't have a local explanation for that and Gemini is not available. Try rephrasing or enable GEMINI_API_KEY.\n")
-        try:
-            add_to_history(
-                "assistant", "No local explanation and Gemini disabled.")
-        except Exception:
-            pass
-        return
+        return answers.Explanation(None, "none", history="No local explanation and Gemini disabled.")
 
     prompt = f"""
 You are ARIA, a PC hardware assistant.
@@ -997,10 +406,11 @@ Rules:
 
     try:
         # Safe call — client must be non-None
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt
-        )
+        with gemini_limiter.get_limiter().slot("interactive"):
+            response = client.models.generate_content(
+                model=GEMINI_MODEL,
+                contents=prompt
+            )
 
         # Extract text robustly
         text = None
@@ -1016,30 +426,14 @@ Rules:
                 text = str(out)
 
         if not text:
-            print("⚠️ No response from Gemini.\n")
-            return
-
+            return answers.Explanation(None, "empty")
         text = text.strip()
-        print(text + "\n" + "-" * 60 + "\n")
-        try:
-            add_to_history("assistant", text)
-        except Exception:
-            pass
+        return answers.Explanation(text, "gemini", history=text)
 
     except Exception as e:
         # On any Gemini error, fallback to a helpful message and local hints
-        print(f"⚠️ Error while calling Gemini for educational question: {e}\n")
-        print("Here's a short local hint instead:\n")
-        fallback = explain_concept(user_input)
-        if fallback:
-            print(fallback + "\n" + "-" * 60 + "\n")
-        else:
-            print("I couldn't generate a full explanation. Try a simpler phrasing (e.g., 'What is PCIe?' or 'Explain DDR5 vs DDR4').\n")
-        try:
-            add_to_history(
-                "assistant", f"Gemini error + fallback for: {user_input}")
-        except Exception:
-            pass
+        return answers.Explanation(explain_concept(user_input), "error", error=e,
+                                   history=f"Gemini error + fallback for: {user_input}")
 
 
 # -------------------------------
@@ -1128,15 +522,8 @@ def parse_budget_from_text(text):
 
 def price_list_for_category(cat):
     """Return list of tuples (key, info, price_int) for a category with numeric prices."""
-    out = []
-    items = data.get(cat, {})
-    for k, info in items.items():
-        p = parse_price(info.get("price"))
-        if p:
-            out.append((k, info, p))
-    # sort ascending price
-    out.sort(key=lambda x: x[2])
-    return out
+    # prebuilt price index (snapshot) / indexed query (sqlite): stable ascending price order
+    return catalog_backend.current_backend().price_sorted(cat)
 
 
 def pick_motherboard_for_cpu(cpu_info, mobo_list):
@@ -1174,12 +561,13 @@ def estimate_psu_requirement(cpu_info, gpu_info):
 
 def handle_psu_request(user_query):
     """
-    Handle PSU / wattage questions. Finds components in query, estimates power, and prints recommendation.
+    Handle PSU / wattage questions. Finds components in query and estimates power;
+    returns an answers.PsuEstimate (or an answers.Message asking for the parts).
     """
     found = extract_components_from_text(user_query)
     if not found:
-        print("\n🤖 ARIA says:\n\nI couldn't find the components you mentioned. Try names like 'RTX 3060' or 'Ryzen 5 5600X'.\n")
-        return
+        return answers.Message(
+            "I couldn't find the components you mentioned. Try names like 'RTX 3060' or 'Ryzen 5 5600X'.")
 
     # prefer CPU + GPU pair if both present
     cpu = None
@@ -1212,18 +600,16 @@ def handle_psu_request(user_query):
             # only one component present
             comp = combined[0] if combined else found[0]
             cat, info, key = comp
-            print(
-                f"\n🤖 ARIA says:\n\nI only found one component ({info.get('name')}). To calculate PSU wattage I need at least a CPU and a GPU (or two parts). Please mention both (e.g., 'GTX 750 Ti and Ryzen 5 5600X').\n")
-            return
+            return answers.Message(
+                f"I only found one component ({info.get('name')}). To calculate PSU wattage I need at least a CPU and a GPU (or two parts). Please mention both (e.g., 'GTX 750 Ti and Ryzen 5 5600X').",
+                parts=[answers.part(cat, key, info)])
 
     # Fallback: if cpu/gpu are still None, pick first two found
     if not cpu or not gpu:
         a = found[0]
         b = found[1] if len(found) > 1 else None
         if not b:
-            print(
-                "\n🤖 ARIA says:\n\nPlease mention two components to estimate PSU wattage.\n")
-            return
+            return answers.Message("Please mention two components to estimate PSU wattage.")
         cpu, gpu = a, b
 
     # Extract infos for estimation
@@ -1236,23 +622,19 @@ def handle_psu_request(user_query):
         b_info if b_cat == "gpu" else a_info
     )
 
-    # Print a helpful explanation
     cpu_name = (a_info.get("name") if a_cat == "cpu" else b_info.get("name"))
     gpu_name = (b_info.get("name") if b_cat == "gpu" else a_info.get("name"))
-
-    print("\n🤖 ARIA — PSU Recommendation:\n")
-    print(f"For {cpu_name} + {gpu_name}:")
-    print(f"• Estimated continuous system draw (approx): {rec_watt} W")
-    print(f"• Recommended PSU size (with headroom): {suggested_size} W")
-    print("\nNotes:")
-    print("• This is a conservative estimate based on TDPs and a base system overhead.")
-    print("• If you plan to overclock, add ~100W extra. If you have many drives or accessories, add 50–100W.")
-    print("• Choose a quality PSU (80+ Bronze or better) and the correct connectors for your GPU.\n")
+    return answers.PsuEstimate(cpu_name, gpu_name, rec_watt, suggested_size, notes=[
+        "This is a conservative estimate based on TDPs and a base system overhead.",
+        "If you plan to overclock, add ~100W extra. If you have many drives or accessories, add 50–100W.",
+        "Choose a quality PSU (80+ Bronze or better) and the correct connectors for your GPU.",
+    ], parts=[answers.part(a_cat, a_key, a_info), answers.part(b_cat, b_key, b_info)])
 
 
 def handle_store_request(user_query: str):
     """
-    Handle user queries about PC stores or locations.
+    Handle user queries about PC stores or locations: an answers.StoreInfo,
+    or None when the query is not about the store.
     """
     store_name = "SMFP Computer"
     store_address = "594 J. Nepomuceno St, Quiapo, Manila, 1001 Metro Manila"
@@ -1266,33 +648,25 @@ def handle_store_request(user_query: str):
     ]
 
     if any(word in q for word in store_triggers):
-        print(f"\n🏬 SMFP COMPUTER — STORE INFORMATION\n")
-        print(f"📍 Name: {store_name}")
-        print(f"📫 Address: {store_address}")
-        print("\n🕓 Store Hours: Usually 10:00 AM – 6:00 PM (verify before visiting).")
-        print("☎️ You can visit or contact the shop directly for part availability.\n")
-        print("\n")
-
-        # (Optional) Add to chat history
-        try:
-            add_to_history(
-                "assistant", f"Shared store info: {store_name}, {store_address}")
-        except Exception:
-            pass
-        return True
+        return answers.StoreInfo(
+            store_name, store_address,
+            "Usually 10:00 AM – 6:00 PM (verify before visiting).",
+            "You can visit or contact the shop directly for part availability.",
+            history=f"Shared store info: {store_name}, {store_address}")
 
-    return False
+    return None
 
 
 def check_compatibility(user_query):
     """
-    Try to answer compatibility questions. Returns True if we printed an answer,
-    False if we couldn't handle (e.g., fewer than 2 components found).
+    Try to answer compatibility questions: an answers.Compatibility with one
+    check per rule (socket, RAM type, GPU slot...), or an answers.Message whose
+    `handled` is False when we couldn't (e.g., fewer than 2 components found).
     """
     found = extract_components_from_text(user_query)
     if not found:
-        print("\n🤖 ARIA says:\n\nI couldn't find the components you mentioned. Try names like 'RTX 3060' or 'Ryzen 5 5600X'.\n")
-        return False
+        return answers.Message(
+            "I couldn't find the components you mentioned. Try names like 'RTX 3060' or 'Ryzen 5 5600X'.")
 
     # Keep unique components (category+key) preserving order
     seen = set()
@@ -1307,11 +681,13 @@ def check_compatibility(user_query):
 
     if len(comps) < 2:
         # Not enough components to check compatibility
-        print("\n🤖 ARIA says:\n\nI need at least two components to check compatibility (for example: 'Will Ryzen 5 5600X work with B550?').\n")
-        return False
+        return answers.Message(
+            "I need at least two components to check compatibility (for example: 'Will Ryzen 5 5600X work with B550?').",
+            parts=[answers.part(c, k, i) for c, i, k in comps])
 
     a_cat, a_info, a_key = comps[0]
     b_cat, b_info, b_key = comps[1]
+    parts = [answers.part(a_cat, a_key, a_info), answers.part(b_cat, b_key, b_info)]
 
     a_name = a_info.get("name", a_key)
     b_name = b_info.get("name", b_key)
@@ -1333,37 +709,36 @@ def check_compatibility(user_query):
             elif "ddr4" in cpu_compat:
                 cpu_ram_req = "ddr4"
 
-        print(f"\n🤖 ARIA — Compatibility Check:\n")
-        print(f"{cpu_info.get('name')}  ↔  {mobo_info.get('name')}")
-        print("-" * 60)
-
+        checks = []
         # socket check
         if cpu_socket and mobo_socket:
             if cpu_socket == mobo_socket:
-                print(f"• Socket: OK — both use {cpu_socket.upper()}.")
+                checks.append(("Socket", "ok", f"OK — both use {cpu_socket.upper()}."))
             else:
-                print(
-                    f"• Socket: NOT COMPATIBLE — CPU uses {cpu_socket.upper()} while motherboard uses {mobo_socket.upper()}.")
+                checks.append(("Socket", "incompatible",
+                               f"NOT COMPATIBLE — CPU uses {cpu_socket.upper()} while motherboard uses {mobo_socket.upper()}."))
         else:
-            print("• Socket: Missing data for one or both components.")
+            checks.append(("Socket", "unknown", "Missing data for one or both components."))
 
         # RAM type check (mobo.ram_type vs cpu.compatibility)
         if mobo_ram:
             if cpu_ram_req:
                 if cpu_ram_req in mobo_ram:
-                    print(
-                        f"• RAM type: OK — motherboard supports {mobo_ram.upper()} and CPU is compatible with {cpu_ram_req.upper()}.")
+                    checks.append(("RAM type", "ok",
+                                   f"OK — motherboard supports {mobo_ram.upper()} and CPU is compatible with {cpu_ram_req.upper()}."))
                 else:
-                    print(
-                        f"• RAM type: POSSIBLE ISSUE — motherboard supports {mobo_ram.upper()} but CPU looks to prefer {cpu_ram_req.upper()}.")
+                    checks.append(("RAM type", "warning",
+                                   f"POSSIBLE ISSUE — motherboard supports {mobo_ram.upper()} but CPU looks to prefer {cpu_ram_req.upper()}."))
             else:
-                print(
-                    f"• RAM type: Motherboard supports {mobo_ram.upper()}. Confirm CPU memory compatibility if needed.")
+                checks.append(("RAM type", "unknown",
+                               f"Motherboard supports {mobo_ram.upper()}. Confirm CPU memory compatibility if needed."))
         else:
-            print("• RAM type: No motherboard RAM-type info available.")
+            checks.append(("RAM type", "unknown", "No motherboard RAM-type info available."))
 
-        print("\nNotes:\n• Check BIOS updates for older CPUs on newer motherboards (some combos require BIOS updates).\n• Confirm physical CPU cooler mounting for the socket.\n")
-        return True
+        return answers.Compatibility(cpu_info.get("name"), mobo_info.get("name"), checks, notes=[
+            "Check BIOS updates for older CPUs on newer motherboards (some combos require BIOS updates).",
+            "Confirm physical CPU cooler mounting for the socket.",
+        ], parts=parts)
 
     # CPU <-> RAM check
     if (a_cat == "cpu" and b_cat == "ram") or (a_cat == "ram" and b_cat == "cpu"):
@@ -1371,82 +746,123 @@ def check_compatibility(user_query):
         ram_info = b_info if b_cat == "ram" else a_info
         cpu_name = cpu_info.get("name")
         ram_type = ram_info.get("ram_type") or ram_info.get("type") or ""
-        print(f"\n🤖 ARIA — Compatibility Check:\n")
-        print(f"{cpu_name}  ↔  {ram_info.get('name')}")
-        print("-" * 60)
         # best-effort: check CPU compatibility field or compatibility text
         cpu_compat = (cpu_info.get("compatibility") or "").lower()
         if ram_type and (ram_type.lower() in cpu_compat or ram_type.lower() in (cpu_info.get("socket") or "")):
-            print(
-                f"• RAM type: Looks compatible (RAM: {ram_type}, CPU compatibility: {cpu_compat}).")
+            check = ("RAM type", "ok", f"Looks compatible (RAM: {ram_type}, CPU compatibility: {cpu_compat}).")
+        elif ram_type:
+            check = ("RAM type", "unknown",
+                     f"Motherboard/CPU compatibility unclear — RAM is {ram_type}. Check motherboard RAM support.")
         else:
-            if ram_type:
-                print(
-                    f"• RAM type: Motherboard/CPU compatibility unclear — RAM is {ram_type}. Check motherboard RAM support.")
-            else:
-                print("• RAM type: No RAM-type info available.")
-        print()
-        return True
+            check = ("RAM type", "unknown", "No RAM-type info available.")
+        return answers.Compatibility(cpu_name, ram_info.get("name"), [check], parts=parts)
 
     # GPU <-> Motherboard check (basic)
     if (a_cat == "gpu" and b_cat == "motherboard") or (a_cat == "motherboard" and b_cat == "gpu"):
         gpu_info = a_info if a_cat == "gpu" else b_info
         mobo_info = b_info if b_cat == "motherboard" else a_info
 
-        print(f"\n🤖 ARIA — Compatibility Check:\n")
-        print(f"{gpu_info.get('name')}  ↔  {mobo_info.get('name')}")
-        print("-" * 60)
-
         # GPU slot check: look for 'slot' on gpu and assume motherboards with any PCIe support are fine
         gpu_slot = (gpu_info.get("slot") or "").lower()
         mobo_nvme = mobo_info.get("nvme_slots")
         mobo_pci_note = mobo_info.get("compatibility", "").lower()
 
+        checks = []
         if gpu_slot:
             # basic check: mention PCIe and slot width if present
-            print(f"• GPU slot: {gpu_slot}.")
+            checks.append(("GPU slot", "info", f"{gpu_slot}."))
             # check motherboard compatibility note for PCIe support
             if "pcie" in mobo_pci_note or mobo_nvme is not None or "pci" in mobo_pci_note:
-                print(
-                    "• Motherboard: Appears to have PCIe support — GPU should fit physically (check full-length slot and BIOS).")
+                checks.append(("Motherboard", "ok",
+                               "Appears to have PCIe support — GPU should fit physically (check full-length slot and BIOS)."))
             else:
-                print(
-                    "• Motherboard: PCIe slot info not explicit — please verify the motherboard has a full-length PCIe x16 slot.")
+                checks.append(("Motherboard", "unknown",
+                               "PCIe slot info not explicit — please verify the motherboard has a full-length PCIe x16 slot."))
         else:
-            print("• GPU slot: No slot info available for GPU. Most modern motherboards have at least one PCIe x16 slot — verify motherboard specs.")
+            checks.append(("GPU slot", "unknown",
+                           "No slot info available for GPU. Most modern motherboards have at least one PCIe x16 slot — verify motherboard specs."))
         # power/connectors note
         if gpu_info.get("power"):
-            print(
-                f"• GPU power: {gpu_info.get('power')} — ensure PSU has required connectors.")
-        print("\nNotes:\n• Confirm card length and clearance for your case and verify PSU connectors and wattage.\n")
-        return True
+            checks.append(("GPU power", "info",
+                           f"{gpu_info.get('power')} — ensure PSU has required connectors."))
+        return answers.Compatibility(gpu_info.get("name"), mobo_info.get("name"), checks, notes=[
+            "Confirm card length and clearance for your case and verify PSU connectors and wattage.",
+        ], parts=parts)
 
     # If both components are the same category (e.g., two CPUs or two GPUs), give a short comparison hint
     if a_cat == b_cat:
-        print(
-            f"\n🤖 ARIA says:\n\nYou mentioned two {a_cat.upper()}s: {a_name} and {b_name}.\nI can compare specs (cores, clocks, price). Try 'compare {a_key} and {b_key}'.\n")
-        return True
+        return answers.Message(
+            f"You mentioned two {a_cat.upper()}s: {a_name} and {b_name}.\nI can compare specs (cores, clocks, price). Try 'compare {a_key} and {b_key}'.",
+            handled=True, parts=parts)
 
-    # Generic fallback: different categories — print their key specs and say manual check may be required
-    print(f"\n🤖 ARIA — Compatibility (best-effort):\n")
-    print(f"{a_name}  ↔  {b_name}")
-    print("-" * 60)
-    # print some key fields for manual inspection
-
-    def short_specs(info):
-        keys = []
-        for k in ("socket", "vram", "cores", "clock", "tdp", "capacity", "ram_type", "wattage"):
-            if k in info:
-                keys.append(f"{k}: {info[k]}")
-        return " • ".join(keys) if keys else "No quick specs available."
-
-    print(f"{a_name}: {short_specs(a_info)}")
-    print(f"{b_name}: {short_specs(b_info)}")
-    print("\nI couldn't identify a direct compatibility rule for these two parts. Check the detailed specs above for socket, RAM type, PCIe slot, and power connectors.\n")
-    return True
+    # Generic fallback: different categories — show their key specs and say manual check may be required
+    return answers.Compatibility(
+        a_name, b_name, specs=[(a_name, short_specs(a_info)), (b_name, short_specs(b_info))],
+        footer="I couldn't identify a direct compatibility rule for these two parts. Check the detailed specs above for socket, RAM type, PCIe slot, and power connectors.",
+        best_effort=True, parts=parts)
+
+
+def short_specs(info):
+    """Quick specs line (socket • vram • cores ...) for parts without a side-by-side view."""
+    keys = []
+    for k in ("socket", "vram", "cores", "clock", "tdp", "capacity", "ram_type", "wattage"):
+        if k in info:
+            keys.append(f"{k}: {info[k]}")
+    return " • ".join(keys) if keys else "No quick specs available."
+
+
+# budget -> build table: (catalog version, budget) -> build (or None). A price
+# delta drops only the entries it can change (see _on_price_delta).
+_build_table_lock = threading.Lock()
+_build_table = OrderedDict()
+_BUILD_TABLE_MAX = 256
+BUILD_SLOTS = {"cpu": "cpu", "gpu": "gpu", "motherboard": "motherboard", "ram": "ram",
+               "storage": "storage", "psu": "psu", "cooler": "cpu_cooler"}
 
 
 def assemble_build_for_budget(budget):
+    """Cached _assemble_build(budget) for the current catalog version."""
+    key = (catalog_backend.current_backend().version, int(budget))
+    with _build_table_lock:
+        if key in _build_table:
+            _build_table.move_to_end(key)
+            return _build_table[key]
+    build = _assemble_build(budget)
+    with _build_table_lock:
+        _build_table[key] = build
+        while len(_build_table) > _BUILD_TABLE_MAX:
+            _build_table.popitem(last=False)
+    return build
+
+
+def build_uses(build, cat, key):
+    return bool(build) and any(
+        build.get(slot) and slot_cat == cat and build[slot][0] == key
+        for slot, slot_cat in BUILD_SLOTS.items())
+
+
+@catalog_deltas.on_delta
+def _on_price_delta(cat, key, old_price, new_price, info):
+    """
+    Drop cached builds and answers that may depend on the changed SKU.
+
+    A valid build totals at most budget * 1.05, so a part that costs more than
+    that before and after the change is never chosen, and it stays above every
+    part that can be; only builds that contain the SKU, or whose budget reaches
+    min(old, new) price, can change.
+    """
+    prices = [p for p in (old_price, new_price) if p]
+    low = min(prices) if prices else None
+    with _build_table_lock:
+        for k in list(_build_table):
+            if build_uses(_build_table[k], cat, key) or (low is not None and low <= k[1] * 1.05):
+                del _build_table[k]
+    # answers are keyed by record hash and would just miss; free them now
+    marker = f":{info.get('name', key)}:"
+    _semantic_cache.invalidate(lambda ids: any(marker in i for i in ids))
+
+
+def _assemble_build(budget):
     """
     Greedy assembly strategy:
     - Allocate portions of budget to categories (CPU, GPU, MB, RAM, Storage, PSU, Cooler)
@@ -1691,6 +1107,11 @@ def handle_build_request(user_query):
 # 🔍 find_component (robust, explained)
 # -------------------------------
 
+# above this many SKUs find_component only fuzzy-scores token candidates
+FUZZY_SCAN_LIMIT = int(os.getenv("ARSEMBLE_FUZZY_SCAN_LIMIT", "5000"))
+
+
+@timing.timed("find")
 def find_component(query):
     """
     Match the user query against components using token overlap + difflib fuzzy matching.
@@ -1718,31 +1139,38 @@ def find_component(query):
        # print(f"[DEBUG] find_component: no significant tokens after filtering.")
         return []
 
+    # small catalogs: fuzzy-score every item (typos like 'rtx3060' still match);
+    # large ones: only items sharing a token with the query (backend token index)
+    backend = catalog_backend.current_backend()
+    if backend.size() <= FUZZY_SCAN_LIMIT:
+        pool = backend.iter_records()
+    else:
+        pool = backend.search(query_tokens_filtered)
+
     candidates = []
-    for category, items in data.items():
-        for key, info in items.items():
-            key_normalized = key.lower()
-            name_normalized = (info.get("name") or "").lower()
-
-            # token overlap score (simple)
-            key_tokens = normalize_text(key_normalized)
-            name_tokens = normalize_text(name_normalized)
-            combined = set(key_tokens + name_tokens)
-            overlap = sum(1 for t in query_tokens_filtered if t in combined)
-            token_score = overlap / max(1, len(set(query_tokens_filtered)))
-
-            # fuzzy ratio fallback
-            key_ratio = difflib.SequenceMatcher(
-                None, q, key_normalized).ratio()
-            name_ratio = difflib.SequenceMatcher(
-                None, q, name_normalized).ratio()
-            fuzzy_score = max(key_ratio, name_ratio)
-
-            # composite score (weights can be tuned)
-            score = (token_score * 0.7) + (fuzzy_score * 0.3)
-
-            if score > 0.18:
-                candidates.append((score, category, info, key))
+    for category, key, info in pool:
+        key_normalized = key.lower()
+        name_normalized = (info.get("name") or "").lower()
+
+        # token overlap score (simple)
+        key_tokens = normalize_text(key_normalized)
+        name_tokens = normalize_text(name_normalized)
+        combined = set(key_tokens + name_tokens)
+        overlap = sum(1 for t in query_tokens_filtered if t in combined)
+        token_score = overlap / max(1, len(set(query_tokens_filtered)))
+
+        # fuzzy ratio fallback
+        key_ratio = difflib.SequenceMatcher(
+            None, q, key_normalized).ratio()
+        name_ratio = difflib.SequenceMatcher(
+            None, q, name_normalized).ratio()
+        fuzzy_score = max(key_ratio, name_ratio)
+
+        # composite score (weights can be tuned)
+        score = (token_score * 0.7) + (fuzzy_score * 0.3)
+
+        if score > 0.18:
+            candidates.append((score, category, info, key))
 
     candidates.sort(key=lambda x: x[0], reverse=True)
     matches = [(cat, inf, k) for _, cat, inf, k in candidates]
@@ -2206,21 +1634,23 @@ def respond_from_local(component_key, info, user_query):
 
 # Compatibility / Comparison Tools
 
+@timing.timed("extract")
 def extract_components_from_text(query):
     q_tokens = normalize_text(query)
     matches = []
-    print(f"Extracting components from query: {query}")  # Debugging line
-    for category, items in data.items():
-        for key, info in items.items():
-            key_tokens = normalize_text(key)
-            name_tokens = normalize_text(info.get("name", ""))
-            combined = set(key_tokens + name_tokens)
-            if not combined:
-                continue
-            overlap = sum(1 for t in q_tokens if t in combined)
-            if overlap > 0:
-                score = overlap / max(1, len(set(q_tokens)))
-                matches.append((score, category, info, key))
+    logger.debug("extracting components from query: %s", query)
+    # only records sharing a token can overlap: take them from the backend's
+    # token index (catalog order) instead of scanning every item
+    for category, key, info in catalog_backend.current_backend().search(q_tokens):
+        key_tokens = normalize_text(key)
+        name_tokens = normalize_text(info.get("name", ""))
+        combined = set(key_tokens + name_tokens)
+        if not combined:
+            continue
+        overlap = sum(1 for t in q_tokens if t in combined)
+        if overlap > 0:
+            score = overlap / max(1, len(set(q_tokens)))
+            matches.append((score, category, info, key))
 
     matches.sort(key=lambda x: x[0], reverse=True)
     return [(c, it, k) for _, c, it, k in matches]
@@ -2229,7 +1659,8 @@ def extract_components_from_text(query):
 def compare_components(user_query):
     """
     Compare two components from local DB. If both are same category (e.g., motherboards),
-    print a side-by-side summary using local fields; do not call Gemini unnecessarily.
+    return an answers.Comparison of the relevant local fields; do not call Gemini unnecessarily.
+    Different categories get an answers.SpecSummary, fewer than two parts an answers.Message.
     """
     found = extract_components_from_text(user_query)
     comps = []
@@ -2237,26 +1668,20 @@ def compare_components(user_query):
         comps.append((cat, info, key))
 
     if len(comps) < 2:
-        print("\n🤖 ARIA says:\n\nPlease mention two components to compare (e.g. 'compare rtx 3060 and rtx 4060').\n")
-        return
+        return answers.Message(
+            "Please mention two components to compare (e.g. 'compare rtx 3060 and rtx 4060').")
 
     a_cat, a_info, a_key = comps[0]
     b_cat, b_info, b_key = comps[1]
+    parts = [answers.part(a_cat, a_key, a_info), answers.part(b_cat, b_key, b_info)]
 
     # If categories differ, provide basic specs and suggest more specific compare
     if a_cat != b_cat:
-        print("\n🤖 ARIA says:\n\nThese are different component types — here's a quick summary of each:\n")
-
-        def short_specs(info):
-            keys = []
-            for k in ("socket", "vram", "cores", "clock", "tdp", "capacity", "ram_type", "wattage"):
-                if k in info:
-                    keys.append(f"{k}: {info[k]}")
-            return " • ".join(keys) if keys else "No quick specs available."
-        print(f"{a_info.get('name')}: {short_specs(a_info)}")
-        print(f"{b_info.get('name')}: {short_specs(b_info)}\n")
-        print("Tip: compare two items of the same category for a detailed side-by-side view (e.g., two motherboards or two CPUs).")
-        return
+        return answers.SpecSummary(
+            "These are different component types — here's a quick summary of each:",
+            [(a_info.get("name"), short_specs(a_info)), (b_info.get("name"), short_specs(b_info))],
+            tip="Tip: compare two items of the same category for a detailed side-by-side view (e.g., two motherboards or two CPUs).",
+            parts=parts)
 
     # For same-category comparisons, choose relevant fields
     fields_map = {
@@ -2300,9 +1725,7 @@ def compare_components(user_query):
                 return info_dict[a]
         return "N/A"
 
-    print("\n🤖 ARIA — Component Comparison:\n")
-    print(f"{a_info.get('name')}  VS  {b_info.get('name')}")
-    print("-" * 60)
+    rows = []
     for pretty_name, aliases in fields_spec:
         a_val = get_alias_value(a_info, aliases)
         b_val = get_alias_value(b_info, aliases)
@@ -2317,8 +1740,8 @@ def compare_components(user_query):
                     b_val = format_php(b_num)
             except:
                 pass
-        print(f"{pretty_name:18} | {str(a_val):35} | {str(b_val)}")
-    print("\n" + "-" * 60 + "\n")
+        rows.append((pretty_name, a_val, b_val))
+    return answers.Comparison(a_info.get("name"), b_info.get("name"), a_cat, rows, parts=parts)
 
 
 # ---------- Intent detection (replace your detect_intent) ----------
@@ -2386,6 +1809,7 @@ def info_matches_pcie(info: dict, version_token: str = None) -> bool:
 # ---------- Recommendation generator by intent ----------
 
 
+@timing.timed("recs")
 def generate_quick_recommendations_intent(q: str, intent: str = None, sub_intent: Optional[str] = None):
     """
     Build and return a list of recommendation dicts.
@@ -2429,7 +1853,7 @@ def generate_quick_recommendations_intent(q: str, intent: str = None, sub_intent
             if not comps:
                 return []
             cat, info, key = comps[0]
-            name = info.get("name", key) if isinstance(info, dict) else key
+            name = info.get("name", key) if isinstance(info, Mapping) else key
             short = ""
             if callable(recommend_for_component):
                 try:
@@ -2641,7 +2065,7 @@ def handle_query(user_query: str, explicit_intent: Optional[str] = None, request
                 recommendations = []
             else:
                 cat, info, key = comps[0]
-                name = info.get("name", key) if isinstance(info, dict) else key
+                name = info.get("name", key) if isinstance(info, Mapping) else key
                 response_text = f"Here's what I found about {name} ({cat})."
                 recommendations = generate_quick_recommendations_intent(
                     q, intent="component")
@@ -2796,11 +2220,8 @@ def recommend_for_component(category, info):
 
 # ------------------- Logging + helpers + idempotent cache -------------------
 
-# Logging (safe: won't double configure if root has handlers)
-logger = logging.getLogger("aria_assistant")
-if not logging.root.handlers:
-    logging.basicConfig(level=logging.INFO,
-                        format="%(asctime)s %(levelname)s: %(message)s")
+# One structured logger for the app, written off the request thread (log_config.py)
+logger = log_config.get_logger()
 
 
 def _safe_call(fn, *args, default=None, **kwargs):
@@ -2819,32 +2240,88 @@ def append_unique_section(sections_list, key, content, seen_keys):
         sections_list.append(content)
 
 
-# Simple thread-safe LRU cache for processed request_id -> response
-_processed_lock = threading.Lock()
-_processed_cache = OrderedDict()
-_PROCESSED_CACHE_MAX = 200  # keep last 200 responses to avoid unbounded memory growth
+# handle_query results live in response_cache: a per-process LRU in front of a
+# SQLite (WAL) table every worker on the host shares, so a retry that lands on
+# the other worker still hits. Entries are keyed by request_id, and by the
+# canonical query for the current catalog state (snapshot version + applied
+# delta log position), so a new catalog or a price change never serves old text.
+
 
+# set when ask_gemini answered from the local fallback after a failure: such a
+# reply is fine for this request (and its retries) but not for the query key
+_gemini_degraded = contextvars.ContextVar("arsemble_gemini_degraded", default=False)
 
-def cache_get(request_id):
-    if not request_id:
+
+def query_cache_key(user_query, explicit_intent=None):
+    """
+    Response-cache key for a query on this catalog version. Price/stock
+    deltas are not part of it: the entry records what its answer was built
+    from (cache_set) and is checked on every read, so a delta only misses
+    the answers that used the changed SKU.
+    """
+    q = " ".join((user_query or "").lower().split())
+    if not q:
         return None
-    with _processed_lock:
-        return _processed_cache.get(request_id)
+    return f"q:{catalog_backend.current_backend().version}:{explicit_intent or ''}:{q}"
 
 
-def cache_set(request_id, value):
-    if not request_id:
-        return
-    with _processed_lock:
-        # move-to-end for LRU semantics
-        if request_id in _processed_cache:
-            _processed_cache.move_to_end(request_id)
-        _processed_cache[request_id] = value
-        # trim if necessary
-        while len(_processed_cache) > _PROCESSED_CACHE_MAX:
-            _processed_cache.popitem(last=False)
+def _record_stamp(cat, key):
+    try:
+        return answer_store.record_hash(data[cat][key])[:12]
+    except KeyError:
+        return None
 
 
+def _answer_deps(records):
+    """
+    What a query answer depends on: {"records": {"cat/key": record hash}} for
+    one built from those records alone, else the delta log position (lists,
+    builds and filters read prices across the whole catalog).
+    """
+    if records is None:
+        return {"mark": catalog_deltas.delta_mark()}
+    return {"records": {f"{cat}/{key}": _record_stamp(cat, key) for cat, key in records}}
+
+
+def _deps_current(deps):
+    if "records" in deps:
+        return all(_record_stamp(*ck.split("/", 1)) == stamp for ck, stamp in deps["records"].items())
+    return deps.get("mark") == catalog_deltas.delta_mark()
+
+
+def cache_get(request_id, query_key=None):
+    cached = _cache_lookup(request_id, query_key)
+    if request_id or query_key:
+        metrics.inc("arsemble_response_cache_lookups_total",
+                    result="miss" if cached is None else "hit")
+    return cached
+
+
+def _cache_lookup(request_id, query_key):
+    cache = response_cache.get_cache()
+    if request_id:
+        cached = cache.get(f"rid:{request_id}")
+        if cached is not None:
+            return cached
+    entry = cache.get(query_key) if query_key else None
+    cached = None
+    if isinstance(entry, dict) and _deps_current(entry.get("deps") or {}):
+        cached = entry.get("result")
+    if cached is not None and request_id:
+        cache.set(f"rid:{request_id}", cached)
+    return cached
+
+
+def cache_set(request_id, value, query_key=None, records=None):
+    """records: the (cat, key) the answer was built from, None for the whole catalog."""
+    cache = response_cache.get_cache()
+    if request_id:
+        cache.set(f"rid:{request_id}", value)
+    if query_key:
+        cache.set(query_key, {"result": value, "deps": _answer_deps(records)})
+
+
+@timing.timed("recommend")
 def generate_quick_recommendations(user_query: str) -> list:
     """
     Create 2-4 UI-friendly, tappable recommendations based on the user's query.
@@ -3075,103 +2552,20 @@ def needs_followup(user_text):
 # ----------------------------
 
 
-# --- Unified logger (configured only once) ---
-logger = logging.getLogger("ARsemble_ai")
-if not logger.handlers:
-    handler = logging.StreamHandler(sys.stderr)
-    formatter = logging.Formatter(
-        "%(asctime)s [%(levelname)s] %(message)s"
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-logger.setLevel(logging.INFO)
-
-
-def ask_gemini(user_query, found_data):
-    """
-    Send user question to Gemini (if available) and return a single cleaned text string.
-    On any failure or when client is missing, return a local fallback string.
-    """
-    try:
-        # Local fallback if no client configured
-        if not client:
-            print("⚠️ Gemini is disabled or API key missing. Using local fallback.")
-            if found_data:
-                out_lines = [
-                    "⚠️ Gemini unavailable — showing local data instead:", "-" * 40]
-                if isinstance(found_data, dict):
-                    for cat, info in found_data.items():
-                        if isinstance(info, dict) and "name" in info:
-                            name = info.get("name")
-                            price = info.get("price", "N/A")
-                            keys = [k for k in (
-                                "socket", "vram", "cores", "clock", "tdp", "capacity", "wattage") if k in info]
-                            specs = " • ".join(
-                                [f"{k}: {info[k]}" for k in keys])
-                            out_lines.append(f"- {name} — {specs} — {price}")
-                        elif isinstance(info, dict):
-                            for subk, subinfo in info.items():
-                                if isinstance(subinfo, dict):
-                                    name = subinfo.get("name", subk)
-                                    price = subinfo.get("price", "N/A")
-                                    keys = [k for k in (
-                                        "socket", "vram", "cores", "clock", "tdp", "capacity", "wattage") if k in subinfo]
-                                    specs = " • ".join(
-                                        [f"{k}: {subinfo[k]}" for k in keys])
-                                    out_lines.append(
-                                        f"- {name} — {specs} — {price}")
-                final_text = "\n".join(out_lines + ["-" * 40])
-                print("\n🤖 ARIA says:\n")
-                print(final_text + "\n")
-                print("-" * 60 + "\n")
-                return final_text
-            else:
-                final_text = "❌ Gemini is unavailable and no local data to show."
-                print(final_text + "\n")
-                return final_text
-
-        # Build prompt & context
-        context = json.dumps(found_data or {}, indent=2, ensure_ascii=False)
-        keywords = [
-            "socket", "price", "tdp", "power", "clock", "speed", "cores",
-            "threads", "igpu", "graphics", "compatibility", "ram type",
-            "form factor", "wattage", "efficiency", "capacity", "interface", "vram"
-        ]
-        matched_keywords = [
-            kw for kw in keywords if kw in (user_query or "").lower()]
-
-        if matched_keywords:
-            focus = ", ".join(matched_keywords)
-            query_mode = (f"The user only wants information about: {focus}.\n"
-                          "Check the provided JSON and extract the exact value(s) for those attributes.\n"
-                          "If a key exists, return only its value(s).\n"
-                          "If a key doesn't exist, respond exactly: \"This information is missing in the local database.\"")
-        else:
-            query_mode = "The user wants full details about the component. Provide full structured specs."
-
-        system_header = (
-            "You are ARIA, a helpful PC component assistant. ONLY use the JSON data provided below. "
-            "Do not invent or guess values. If a requested key is missing, respond exactly: "
-            "\"This information is missing in the local database.\""
-        )
-
-        prompt = f"""{system_header}
-
-Available Data:
-{context}
-
-User Question: {user_query}
+# -------------------------------
+# ✂️ Gemini prompt builder + token accounting
+# -------------------------------
+GEMINI_MODEL = "gemini-2.5-flash"
 
-Instructions:
-{query_mode}
+# Fixed rules sent once per call as the system instruction (not repeated in the
+# user prompt). Built once at import so every request reuses the same object.
+GEMINI_SYSTEM_INSTRUCTION = """You are ARIA, a helpful PC component assistant. ONLY use the JSON data in the prompt. Do not invent or guess values. If a requested key is missing, respond exactly: "This information is missing in the local database."
 
 Rules:
-- Respond ONCE only.
-- Do NOT repeat sentences or duplicate lines.
+- Respond ONCE only. Do NOT repeat sentences or duplicate lines.
 - Do NOT use Markdown syntax (no #, **, ``` etc.).
-- Use short, simple bullet formatting (use '•' or '-' for bullets).
-- If returning full details, use this structure:
-
+- Use short, simple bullet formatting ('•' or '-').
+- Full details format:
 Component Name
 Key Specs:
 • Spec: Value
@@ -3181,150 +2575,639 @@ Compatibility:
 • description
 Summary:
 • short friendly explanation
+- Specific detail(s) format:
+Component Name
+• Requested Detail: Value"""
+
+# query keyword -> catalog fields the answer needs (name is always sent)
+GEMINI_FIELD_KEYWORDS = {
+    "socket": ("socket",),
+    "price": ("price",),
+    "tdp": ("tdp",),
+    "power": ("power", "tdp", "wattage"),
+    "clock": ("clock",),
+    "speed": ("speed", "clock"),
+    "cores": ("cores",),
+    "threads": ("cores",),
+    "igpu": ("igpu",),
+    "graphics": ("igpu", "vram"),
+    "compatibility": ("compatibility", "socket", "ram_type", "slot"),
+    "ram type": ("ram_type",),
+    "form factor": ("form_factor",),
+    "wattage": ("wattage", "power"),
+    "efficiency": ("efficiency",),
+    "capacity": ("capacity",),
+    "interface": ("interface",),
+    "vram": ("vram",),
+}
 
-If returning specific detail(s), return:
+_GEMINI_STATS_MAX = 500  # per-call records kept for gemini_call_stats()
+_gemini_stats_lock = threading.Lock()
+_gemini_calls = deque(maxlen=_GEMINI_STATS_MAX)
+_gemini_config = None
 
-Component Name
-• Requested Detail: Value
 
-End response.
-"""
-        # Attempt call with limited retries (Gemini may be busy)
-        max_attempts = 3
-        backoff = 2
-        last_error = None
+def estimate_tokens(text):
+    """Rough token estimate (~4 chars per token) used when the API gives no usage data."""
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
 
-        for attempt in range(1, max_attempts + 1):
-            try:
-                response = client.models.generate_content(
-                    model="gemini-2.5-flash", contents=prompt)
-
-                # Extract textual content robustly
-                text = None
-                if hasattr(response, "text") and response.text:
-                    text = response.text
-                elif hasattr(response, "output") and getattr(response, "output"):
-                    out = getattr(response, "output")
-                    if isinstance(out, str):
-                        text = out
-                    elif isinstance(out, (list, tuple)) and len(out) > 0:
-                        text = " ".join(map(str, out))
-                    else:
-                        text = str(out)
-
-                if not text or not str(text).strip():
-                    raise ValueError("Empty response from Gemini")
-
-                # Clean and normalize text
-                text = str(text).strip()
-                text = re.sub(r'[`*_]{1,}', '', text)
-                text = re.sub(r'\n{3,}', '\n\n', text)
-                text = re.sub(r'[ \t]{2,}', ' ', text)
-
-                raw_lines = [ln.strip()
-                             for ln in text.splitlines() if ln.strip()]
-
-                normalized = []
-                for ln in raw_lines:
-                    if re.match(r'^[\-\u2022]\s+', ln):
-                        content = re.sub(r'^[\-\u2022]\s+', '', ln)
-                        normalized.append(f"• {content}")
-                    elif ':' in ln and len(ln.split(':', 1)[0].split()) < 6:
-                        parts = ln.split(':', 1)
-                        label = parts[0].strip()
-                        val = parts[1].strip()
-                        normalized.append(f"• {label}: {val}")
-                    else:
-                        normalized.append(ln)
 
-                # Deduplicate adjacent repeated lines
-                deduped = []
-                prev = None
-                for ln in normalized:
-                    if ln == prev:
-                        continue
-                    deduped.append(ln)
-                    prev = ln
+def matched_gemini_keywords(user_query):
+    """Return the GEMINI_FIELD_KEYWORDS keys mentioned in the user's question."""
+    low = (user_query or "").lower()
+    return [kw for kw in GEMINI_FIELD_KEYWORDS if kw in low]
+
+
+def _slim_info(info, fields):
+    """
+    Keep only name + the requested fields of a component record (all fields
+    if none given, or if the record has none of them: the model can still
+    answer from a related one, e.g. a GPU's power for its tdp).
+    """
+    if not fields or all(info.get(f) in (None, "") for f in fields):
+        return {k: v for k, v in info.items() if v not in (None, "")}
+    out = {"name": info.get("name")}
+    for f in fields:
+        if f in info and info[f] not in (None, ""):
+            out[f] = info[f]
+    return out
+
 
-                # Collapse repeated blocks
-                final_lines = []
-                seen_blocks = set()
+def slim_found_data(found_data, fields=None):
+    """
+    Reduce found_data ({cat: info} or {cat: {key: info}}) to the fields the question needs.
+    """
+    if not isinstance(found_data, dict):
+        return {}
+    slim = {}
+    for cat, info in found_data.items():
+        if not isinstance(info, Mapping):
+            continue
+        if "name" in info:
+            slim[cat] = _slim_info(info, fields)
+        else:
+            slim[cat] = {k: _slim_info(v, fields)
+                         for k, v in info.items() if isinstance(v, Mapping)}
+    return slim
+
+
+def build_gemini_prompt(user_query, found_data):
+    """
+    Build the per-request prompt: compact JSON with only the relevant fields,
+    the question and a one-line mode instruction. The fixed rules live in
+    GEMINI_SYSTEM_INSTRUCTION. Returns (prompt, matched_keywords).
+    """
+    matched = matched_gemini_keywords(user_query)
+    fields = []
+    for kw in matched:
+        for f in GEMINI_FIELD_KEYWORDS[kw]:
+            if f not in fields:
+                fields.append(f)
+    context = json.dumps(slim_found_data(found_data, fields),
+                         ensure_ascii=False, separators=(",", ":"))
+    if matched:
+        mode = (f"Return only: {', '.join(matched)} (specific detail format). "
+                "Missing key -> \"This information is missing in the local database.\"")
+    else:
+        mode = "Return full structured specs (full details format)."
+    prompt = f"Data: {context}\nQuestion: {user_query}\nTask: {mode}"
+    return prompt, matched
+
+
+def get_gemini_config():
+    """Return the shared generate_content config carrying the system instruction."""
+    global _gemini_config
+    if _gemini_config is None:
+        _gemini_config = {"system_instruction": GEMINI_SYSTEM_INSTRUCTION}
+    return _gemini_config
+
+
+def record_gemini_call(prompt, response=None, latency_ms=0.0, ok=True, mode="full"):
+    """
+    Record input/output token counts and latency for one generate_content call.
+    Uses response.usage_metadata when present, else estimate_tokens().
+    """
+    usage = getattr(response, "usage_metadata", None)
+    input_tokens = getattr(usage, "prompt_token_count", None)
+    if input_tokens is None:
+        input_tokens = estimate_tokens(GEMINI_SYSTEM_INSTRUCTION) + \
+            estimate_tokens(prompt)
+    output_tokens = getattr(usage, "candidates_token_count", None)
+    if output_tokens is None:
+        output_tokens = estimate_tokens(getattr(response, "text", None) or "")
+    entry = {
+        "ts": time.time(),
+        "mode": mode,
+        "ok": ok,
+        "input_tokens": int(input_tokens or 0),
+        "output_tokens": int(output_tokens or 0),
+        "thought_tokens": int(getattr(usage, "thoughts_token_count", None) or 0),
+        "cached_tokens": int(getattr(usage, "cached_content_token_count", None) or 0),
+        "latency_ms": round(latency_ms, 1),
+    }
+    with _gemini_stats_lock:
+        _gemini_calls.append(entry)
+    timing.add("gemini", latency_ms / 1000)
+    metrics.inc("arsemble_gemini_calls_total", mode=mode, ok="true" if ok else "false")
+    metrics.observe("arsemble_gemini_seconds", latency_ms / 1000, mode=mode)
+    metrics.inc("arsemble_gemini_tokens_total", entry["input_tokens"], kind="input")
+    metrics.inc("arsemble_gemini_tokens_total", entry["output_tokens"], kind="output")
+    logger.info("gemini call: mode=%s ok=%s in=%d out=%d latency_ms=%.1f",
+                mode, ok, entry["input_tokens"], entry["output_tokens"], latency_ms,
+                extra={"gemini": entry})
+    return entry
+
+
+def gemini_call_stats():
+    """Summary of recent Gemini calls: counts, average tokens and latency percentiles."""
+    with _gemini_stats_lock:
+        calls = list(_gemini_calls)
+    if not calls:
+        return {"calls": 0}
+    lat = sorted(c["latency_ms"] for c in calls)
+
+    def pct(p):
+        return lat[min(len(lat) - 1, int(round(p / 100.0 * (len(lat) - 1))))]
+    return {
+        "calls": len(calls),
+        "errors": sum(1 for c in calls if not c["ok"]),
+        "avg_input_tokens": round(sum(c["input_tokens"] for c in calls) / len(calls), 1),
+        "avg_output_tokens": round(sum(c["output_tokens"] for c in calls) / len(calls), 1),
+        "latency_ms_p50": pct(50),
+        "latency_ms_p95": pct(95),
+    }
+
+
+# Paraphrase-tolerant cache for Gemini answers (threshold tunable; 0 disables)
+SEMANTIC_CACHE_THRESHOLD = float(
+    os.getenv("ARSEMBLE_SEMANTIC_CACHE_THRESHOLD", "0.85"))
+_semantic_cache = semantic_cache.SemanticCache(
+    threshold=SEMANTIC_CACHE_THRESHOLD)
+
+# questions per coalesced Gemini call in ask_gemini_many (1 asks one by one)
+GEMINI_BATCH_SIZE = max(1, int(os.getenv("ARSEMBLE_GEMINI_BATCH", "8") or 8))
+GEMINI_BATCH_HEADER = ("Answer each numbered question below on its own, using only its Data. "
+                       "Start each answer with its marker line exactly as given (=== n ===).")
+_BATCH_MARKER = re.compile(r"^\s*=== (\d+) ===\s*$", re.M)
+
+
+def _found_components(found_data):
+    """Yield (cat, info) for every component record in found_data."""
+    if not isinstance(found_data, dict):
+        return
+    for cat, info in found_data.items():
+        if not isinstance(info, Mapping):
+            continue
+        if "name" in info:
+            yield cat, info
+        else:
+            for sub in info.values():
+                if isinstance(sub, Mapping):
+                    yield cat, sub
+
+
+def semantic_cache_key(found_data):
+    """
+    (component_ids, name_tokens) for the semantic cache. IDs embed a record hash
+    so a catalog edit (e.g. new price) never serves a stale answer.
+    """
+    ids, tokens = [], set()
+    for cat, info in _found_components(found_data):
+        name = info.get("name", "")
+        ids.append(f"{cat}:{name}:{answer_store.record_hash(info)[:10]}")
+        tokens.update(normalize_text(name))
+    return sorted(ids), tokens
+
+
+@timing.timed("stored")
+def stored_component_answer(cat, key, info):
+    """Full-spec answer for this exact catalog record from the offline answer store, or None."""
+    try:
+        current = answer_store.prompt_version(
+            GEMINI_MODEL, GEMINI_SYSTEM_INSTRUCTION)
+        return answer_store.get_answer_store().get(cat, key, info, current)
+    except Exception:
+        logger.exception("answer store lookup failed for %s/%s", cat, key)
+        return None
+
+
+def _local_data_lines(found_data):
+    """"- name — specs — price" lines for the component records in found_data."""
+    out_lines = []
+    if isinstance(found_data, dict):
+        for cat, info in found_data.items():
+            if isinstance(info, Mapping) and "name" in info:
+                name = info.get("name")
+                price = info.get("price", "N/A")
+                keys = [k for k in (
+                    "socket", "vram", "cores", "clock", "tdp", "capacity", "wattage") if k in info]
+                specs = " • ".join([f"{k}: {info[k]}" for k in keys])
+                out_lines.append(f"- {name} — {specs} — {price}")
+            elif isinstance(info, Mapping):
+                for subk, subinfo in info.items():
+                    if isinstance(subinfo, Mapping):
+                        name = subinfo.get("name", subk)
+                        price = subinfo.get("price", "N/A")
+                        keys = [k for k in (
+                            "socket", "vram", "cores", "clock", "tdp", "capacity", "wattage") if k in subinfo]
+                        specs = " • ".join(
+                            [f"{k}: {subinfo[k]}" for k in keys])
+                        out_lines.append(
+                            f"- {name} — {specs} — {price}")
+    return out_lines
+
+
+def local_field_lines(info, keywords):
+    """
+    "• field: value" lines for the record fields behind GEMINI_FIELD_KEYWORDS
+    keywords; [] when the record has none of them.
+    """
+    fields = []
+    for kw in keywords:
+        for f in GEMINI_FIELD_KEYWORDS.get(kw, ()):
+            if f not in fields and info.get(f) not in (None, ""):
+                fields.append(f)
+    return [f"• {f.upper() if f in ('tdp', 'vram', 'igpu') else f.replace('_', ' ').capitalize()}: {info[f]}"
+            for f in fields]
+
+
+@timing.timed("gemini_prep")
+def _gemini_prepare(user_query, found_data, fallback):
+    """
+    Everything ask_gemini does before the API call. Returns (answer, None) when
+    no call is needed (client missing, semantic-cache hit), else
+    (None, (client, prompt, mode, cache_ids, cache_tokens)).
+    """
+    # Local fallback if no client configured
+    client = get_client()
+    if not client:
+        _gemini_degraded.set(True)  # not a real answer: keep it out of the response cache
+        if not fallback:
+            return None, None
+        logger.debug("Gemini is disabled or API key missing; using local fallback")
+        if found_data:
+            out_lines = [
+                "⚠️ Gemini unavailable — showing local data instead:", "-" * 40]
+            out_lines += _local_data_lines(found_data)
+            final_text = "\n".join(out_lines + ["-" * 40])
+            logger.debug("gemini fallback answer:\n%s", final_text)
+            return final_text, None
+        final_text = "❌ Gemini is unavailable and no local data to show."
+        return final_text, None
+
+    # Near-duplicate question about the same component(s)? Reuse that answer.
+    cache_ids, cache_tokens = semantic_cache_key(found_data)
+    if SEMANTIC_CACHE_THRESHOLD > 0 and cache_ids:
+        cached, sim = _semantic_cache.get(
+            user_query, cache_ids, cache_tokens)
+        metrics.inc("arsemble_semantic_cache_lookups_total", result="hit" if cached else "miss")
+        if cached:
+            logger.info("semantic cache hit (similarity=%.2f) for q=%s",
+                        sim, (user_query or "")[:120])
+            return cached, None
+
+    # Build prompt & context (only the fields the question needs)
+    prompt, matched_keywords = build_gemini_prompt(user_query, found_data)
+    mode = "fields" if matched_keywords else "full"
+    return None, (client, prompt, mode, cache_ids, cache_tokens)
+
+
+def _gemini_answer_text(response):
+    """The response text cleaned into ARIA's bullet format; ValueError when empty."""
+    return _normalize_answer(_response_text(response))
+
+
+def _response_text(response):
+    # Extract textual content robustly
+    text = None
+    if hasattr(response, "text") and response.text:
+        text = response.text
+    elif hasattr(response, "output") and getattr(response, "output"):
+        out = getattr(response, "output")
+        if isinstance(out, str):
+            text = out
+        elif isinstance(out, (list, tuple)) and len(out) > 0:
+            text = " ".join(map(str, out))
+        else:
+            text = str(out)
+    return text
+
+
+@timing.timed("gemini_parse")
+def _normalize_answer(text):
+    if not text or not str(text).strip():
+        raise ValueError("Empty response from Gemini")
+
+    # Clean and normalize text
+    text = str(text).strip()
+    text = re.sub(r'[`*_]{1,}', '', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = re.sub(r'[ \t]{2,}', ' ', text)
+
+    raw_lines = [ln.strip()
+                 for ln in text.splitlines() if ln.strip()]
+
+    normalized = []
+    for ln in raw_lines:
+        if re.match(r'^[\-\u2022]\s+', ln):
+            content = re.sub(r'^[\-\u2022]\s+', '', ln)
+            normalized.append(f"• {content}")
+        elif ':' in ln and len(ln.split(':', 1)[0].split()) < 6:
+            parts = ln.split(':', 1)
+            label = parts[0].strip()
+            val = parts[1].strip()
+            normalized.append(f"• {label}: {val}")
+        else:
+            normalized.append(ln)
+
+    # Deduplicate adjacent repeated lines
+    deduped = []
+    prev = None
+    for ln in normalized:
+        if ln == prev:
+            continue
+        deduped.append(ln)
+        prev = ln
+
+    # Collapse repeated blocks
+    final_lines = []
+    seen_blocks = set()
+    para = []
+    for ln in deduped + [""]:
+        if ln == "":
+            if para:
+                block = "\n".join(para)
+                if block not in seen_blocks:
+                    final_lines.extend(para)
+                    final_lines.append("")  # paragraph separator
+                    seen_blocks.add(block)
                 para = []
-                for ln in deduped + [""]:
-                    if ln == "":
-                        if para:
-                            block = "\n".join(para)
-                            if block not in seen_blocks:
-                                final_lines.extend(para)
-                                final_lines.append("")  # paragraph separator
-                                seen_blocks.add(block)
-                            para = []
-                    else:
-                        para.append(ln)
+        else:
+            para.append(ln)
 
-                if final_lines and final_lines[-1] == "":
-                    final_lines = final_lines[:-1]
+    if final_lines and final_lines[-1] == "":
+        final_lines = final_lines[:-1]
 
-                # Final assembled text
-                if final_lines:
-                    final_text = "\n".join(final_lines).strip()
-                else:
-                    final_text = text.strip() if text else "No content returned from Gemini."
+    # Final assembled text
+    if final_lines:
+        return "\n".join(final_lines).strip()
+    return text.strip() if text else "No content returned from Gemini."
+
+
+def _gemini_finish(user_query, final_text, cache_ids, cache_tokens):
+    if SEMANTIC_CACHE_THRESHOLD > 0 and cache_ids:
+        _semantic_cache.put(
+            user_query, cache_ids, final_text, cache_tokens)
+
+    logger.debug("gemini answer:\n%s", final_text)
+    return final_text
+
+
+def _gemini_should_retry(e, attempt, max_attempts, backoff):
+    """Transient errors (503 / overload / busy / timeout) are retried after backoff seconds."""
+    err_str = str(e).lower()
+    if any(tok in err_str for tok in ("503", "overload", "busy", "timeout")) and attempt < max_attempts:
+        logger.warning("Gemini server busy (attempt %d/%d), retrying in %ss", attempt, max_attempts, backoff)
+        # pause the other workers too instead of letting them pile on
+        gemini_limiter.get_limiter().penalize(backoff)
+        return True
+    # non-transient or last attempt -> log and break to fallback
+    logger.warning("Gemini error: %s", e)
+    return False
+
+
+def _gemini_failed(found_data, fallback):
+    """Local fallback after Gemini failed (None when fallback=False)."""
+    _gemini_degraded.set(True)
+    metrics.inc("arsemble_gemini_fallbacks_total")
+    if not fallback:
+        return None
+    if found_data:
+        out_lines = [
+            "⚠️ Gemini error, fallback used. Showing local data instead:", "-" * 40]
+        out_lines += _local_data_lines(found_data)
+        fallback_text = "\n".join(out_lines + ["-" * 40])
+        logger.debug("gemini fallback answer:\n%s", fallback_text)
+        return fallback_text
+    return "❌ Gemini failed and no local data available."
+
+
+def _gemini_error(outer_e, fallback):
+    _gemini_degraded.set(True)
+    logger.error("Unexpected error in ask_gemini: %s", outer_e)
+    if not fallback:
+        return None
+    return "⚠️ An unexpected error occurred while fetching component info."
+
+
+def ask_gemini(user_query, found_data, fallback=True, priority="interactive"):
+    """
+    Send user question to Gemini (if available) and return a single cleaned text string.
+    On any failure or when client is missing, return a local fallback string
+    (or None when fallback=False, e.g. for the offline answer-store job).
+    priority selects the limiter lane: "interactive" (/chat) or "batch" (offline jobs).
+    """
+    try:
+        answer, call = _gemini_prepare(user_query, found_data, fallback)
+        if call is None:
+            return answer
+        return _gemini_call(user_query, found_data, call, fallback, priority)
+    except Exception as outer_e:
+        return _gemini_error(outer_e, fallback)
 
-                # Print & return
-                print("\n🤖 ARIA says:\n")
-                print(final_text + "\n")
-                print("-" * 60 + "\n")
-                return final_text
 
+def _gemini_call(user_query, found_data, call, fallback, priority):
+    """The API call of ask_gemini for a _gemini_prepare'd call, with retries and the local fallback."""
+    try:
+        client, prompt, mode, cache_ids, cache_tokens = call
+
+        # Attempt call with limited retries (Gemini may be busy)
+        max_attempts = 3
+        backoff = 2
+        for attempt in range(1, max_attempts + 1):
+            try:
+                # host-wide quota/concurrency slot (raises GeminiBusy instead of queueing forever)
+                tw = time.perf_counter()
+                with gemini_limiter.get_limiter().slot(priority):
+                    t0 = time.perf_counter()
+                    timing.add("gemini_wait", t0 - tw)
+                    try:
+                        response = client.models.generate_content(
+                            model=GEMINI_MODEL, contents=prompt, config=get_gemini_config())
+                    except Exception:
+                        record_gemini_call(
+                            prompt, None, (time.perf_counter() - t0) * 1000, ok=False, mode=mode)
+                        raise
+                record_gemini_call(
+                    prompt, response, (time.perf_counter() - t0) * 1000, mode=mode)
+                return _gemini_finish(user_query, _gemini_answer_text(response),
+                                      cache_ids, cache_tokens)
+            except gemini_limiter.GeminiBusy as e:
+                # over the host-wide quota: degrade to local data right away
+                logger.warning("%s — answering from local data", e)
+                break
             except Exception as e:
-                last_error = e
-                err_str = str(e).lower()
-                if any(tok in err_str for tok in ("503", "overload", "busy", "timeout")) and attempt < max_attempts:
-                    print(
-                        f"⚠️ Gemini server busy (attempt {attempt}/{max_attempts}). Retrying in {backoff}s...")
+                if _gemini_should_retry(e, attempt, max_attempts, backoff):
                     time.sleep(backoff)
                     backoff *= 2
                     continue
-                # non-transient or last attempt -> log and break to fallback
-                print(f"[ARsemble_ai] Gemini error: {e}")
                 break
 
         # If we reach here, Gemini failed — provide local fallback if possible
-        if found_data:
-            out_lines = [
-                "⚠️ Gemini error, fallback used. Showing local data instead:", "-" * 40]
-            if isinstance(found_data, dict):
-                for cat, info in found_data.items():
-                    if isinstance(info, dict) and "name" in info:
-                        name = info.get("name")
-                        price = info.get("price", "N/A")
-                        keys = [k for k in (
-                            "socket", "vram", "cores", "clock", "tdp", "capacity", "wattage") if k in info]
-                        specs = " • ".join([f"{k}: {info[k]}" for k in keys])
-                        out_lines.append(f"- {name} — {specs} — {price}")
-                    elif isinstance(info, dict):
-                        for subk, subinfo in info.items():
-                            if isinstance(subinfo, dict):
-                                name = subinfo.get("name", subk)
-                                price = subinfo.get("price", "N/A")
-                                keys = [k for k in (
-                                    "socket", "vram", "cores", "clock", "tdp", "capacity", "wattage") if k in subinfo]
-                                specs = " • ".join(
-                                    [f"{k}: {subinfo[k]}" for k in keys])
-                                out_lines.append(
-                                    f"- {name} — {specs} — {price}")
-            fallback_text = "\n".join(out_lines + ["-" * 40])
-            print("\n" + fallback_text + "\n")
-            return fallback_text
-        else:
-            fallback_text = "❌ Gemini failed and no local data available."
-            print(fallback_text + "\n")
-            return fallback_text
+        return _gemini_failed(found_data, fallback)
+    except Exception as outer_e:
+        return _gemini_error(outer_e, fallback)
+
 
+async def ask_gemini_async(user_query, found_data, fallback=True, priority="interactive"):
+    """
+    ask_gemini for an event loop (asgi.py): the API call is awaited through
+    client.aio, so a slow answer holds no thread; prompt building and the
+    limiter wait run in the default thread pool.
+    """
+    try:
+        answer, call = await asyncio.to_thread(_gemini_prepare, user_query, found_data, fallback)
+        if call is None:
+            if get_client() is None:
+                _gemini_degraded.set(True)  # set in to_thread's copy of the context, not here
+            return answer
+        client, prompt, mode, cache_ids, cache_tokens = call
+        limiter = gemini_limiter.get_limiter()
+        loop = asyncio.get_running_loop()
+
+        max_attempts = 3
+        backoff = 2
+        for attempt in range(1, max_attempts + 1):
+            try:
+                tw = time.perf_counter()
+                acquiring = asyncio.ensure_future(asyncio.to_thread(limiter.acquire, priority))
+                try:
+                    hid = await asyncio.shield(acquiring)
+                except asyncio.CancelledError:
+                    # the thread goes on to take the slot: hand it back once it has
+                    acquiring.add_done_callback(
+                        lambda f: f.cancelled() or f.exception() is not None
+                        or loop.run_in_executor(None, limiter.release, f.result()))
+                    raise
+                t0 = time.perf_counter()
+                timing.add("gemini_wait", t0 - tw)
+                try:
+                    response = await client.aio.models.generate_content(
+                        model=GEMINI_MODEL, contents=prompt, config=get_gemini_config())
+                except Exception:
+                    record_gemini_call(
+                        prompt, None, (time.perf_counter() - t0) * 1000, ok=False, mode=mode)
+                    raise
+                finally:
+                    limiter.release(hid)
+                record_gemini_call(
+                    prompt, response, (time.perf_counter() - t0) * 1000, mode=mode)
+                return _gemini_finish(user_query, _gemini_answer_text(response),
+                                      cache_ids, cache_tokens)
+            except gemini_limiter.GeminiBusy as e:
+                logger.warning("%s — answering from local data", e)
+                break
+            except Exception as e:
+                if _gemini_should_retry(e, attempt, max_attempts, backoff):
+                    await asyncio.sleep(backoff)
+                    backoff *= 2
+                    continue
+                break
+
+        return _gemini_failed(found_data, fallback)
     except Exception as outer_e:
-        print(f"[ARsemble_ai] Unexpected error in ask_gemini: {outer_e}")
-        return "⚠️ An unexpected error occurred while fetching component info."
+        return _gemini_error(outer_e, fallback)
+
+
+def ask_gemini_many(requests, fallback=True, priority="interactive"):
+    """
+    ask_gemini for a list of (user_query, found_data), in order, with as few
+    calls as possible: cache hits and local fallbacks are answered as usual,
+    the rest go out GEMINI_BATCH_SIZE questions per call in one numbered
+    prompt. When a coalesced call fails, its questions get the local fallback
+    (it already had its try, and asking each again could stall the batch
+    for its retries). A question whose answer cannot be split out of the
+    reply is asked on its own, with the others in the same position, side by
+    side.
+    """
+    replies = [None] * len(requests)
+    pending = []
+    for i, (user_query, found_data) in enumerate(requests):
+        try:
+            answer, call = _gemini_prepare(user_query, found_data, fallback)
+        except Exception as e:
+            replies[i] = _gemini_error(e, fallback)
+            continue
+        if call is None:
+            replies[i] = answer
+        else:
+            pending.append((i, user_query, call))
+    alone = []
+    for start in range(0, len(pending), GEMINI_BATCH_SIZE):
+        group = pending[start:start + GEMINI_BATCH_SIZE]
+        texts = _ask_gemini_group(group, priority) if len(group) > 1 else {}
+        if texts is None:
+            for i, _, _ in group:
+                replies[i] = _gemini_failed(requests[i][1], fallback)
+            continue
+        for i, user_query, call in group:
+            if i in texts:
+                replies[i] = _gemini_finish(user_query, texts[i], call[3], call[4])
+            else:
+                alone.append((i, user_query, call))
+    if alone:
+        # reuse the prepared calls; each runs in a copy of this context, whose
+        # degraded flag is carried back below
+        contexts = [contextvars.copy_context() for _ in alone]
+        with ThreadPoolExecutor(max_workers=min(len(alone), GEMINI_BATCH_SIZE)) as pool:
+            futures = [pool.submit(ctx.run, _gemini_call, user_query, requests[i][1], call,
+                                   fallback, priority)
+                       for ctx, (i, user_query, call) in zip(contexts, alone)]
+        for (i, _, _), future in zip(alone, futures):
+            replies[i] = future.result()
+        if any(ctx.get(_gemini_degraded) for ctx in contexts):
+            _gemini_degraded.set(True)
+    return replies
+
+
+def _ask_gemini_group(group, priority):
+    """
+    One call for [(i, user_query, prepared call)]: {i: answer text} for the
+    answers it got, None when the call failed.
+    """
+    client = group[0][2][0]
+    prompt = GEMINI_BATCH_HEADER + "".join(
+        f"\n\n=== {n} ===\n{call[1]}" for n, (_, _, call) in enumerate(group, 1))
+    try:
+        tw = time.perf_counter()
+        with gemini_limiter.get_limiter().slot(priority):
+            t0 = time.perf_counter()
+            timing.add("gemini_wait", t0 - tw)
+            try:
+                response = client.models.generate_content(
+                    model=GEMINI_MODEL, contents=prompt, config=get_gemini_config())
+            except Exception:
+                record_gemini_call(
+                    prompt, None, (time.perf_counter() - t0) * 1000, ok=False, mode="batch")
+                raise
+        record_gemini_call(prompt, response, (time.perf_counter() - t0) * 1000, mode="batch")
+    except Exception as e:
+        logger.warning("coalesced Gemini call for %d questions failed (%s); answering from local data",
+                       len(group), e)
+        return None
+    text = _response_text(response) or ""
+    parts = _BATCH_MARKER.split(str(text))  # [preamble, n, answer, n, answer, ...]
+    answers = {}
+    for n, part in zip(parts[1::2], parts[2::2]):
+        n = int(n)
+        if 1 <= n <= len(group) and group[n - 1][0] not in answers:
+            try:
+                answers[group[n - 1][0]] = _normalize_answer(part)
+            except ValueError:
+                pass
+    return answers
 
 
 # --- Gemini fallback wrapper ---
@@ -3375,7 +3258,7 @@ def handle_feature_list(user_query: str):
     Handles queries like:
       - Which GPUs use PCIe 4.0?
       - Which motherboards support PCIe 5.0?
-    Prints a short list (up to 6) from local DB.
+    Returns an answers.FeatureList (shown up to 6) from local DB.
     """
     q = (user_query or "").lower()
     cat = None
@@ -3407,19 +3290,149 @@ def handle_feature_list(user_query: str):
                     break
             results.append((name, price, note))
 
+    return answers.FeatureList(cat, version_token, results)
+
+
+FILTER_CATEGORIES = {
+    "cpu": ["cpu", "cpus", "processor", "processors"],
+    "gpu": ["gpu", "gpus", "graphics card", "graphics cards", "video card", "video cards"],
+    "motherboard": ["motherboard", "motherboards", "mobo", "mobos"],
+    "ram": ["ram", "rams", "memory", "memories"],
+    "storage": ["storage", "ssd", "ssds", "nvme", "hdd", "hdds"],
+    "psu": ["psu", "psus", "power supply", "power supplies"],
+    "cpu_cooler": ["cooler", "coolers", "cpu cooler", "cpu coolers"],
+}
+FILTER_SPEC_FIELDS = {
+    "cpu": ("socket", "cores"), "gpu": ("vram", "slot"),
+    "motherboard": ("socket", "ram_type", "form_factor"), "ram": ("capacity", "ram_type", "speed"),
+    "storage": ("capacity", "interface"), "psu": ("wattage", "efficiency"),
+    "cpu_cooler": ("cooler_type", "size"),
+}
+_AMOUNT = r'₱?\s*(\d[\d,]*(?:\.\d+)?)(?![\d.])\s*(k\b)?(?!\s*(?:gb|tb|ghz|mhz|w\b|watts?|cores?|threads?))'
+
+
+def _amount(m):
+    val = float(m.group(1).replace(",", ""))
+    return int(val * 1000) if m.group(2) else int(val)
+
+
+def parse_filter_query(user_query: str):
+    """
+    Turn "GPUs under ₱15k with 8GB+ VRAM" / "AM4 CPUs with 6+ cores" into
+    (category, filters) for the catalog backend's filter(), else None.
+    Needs a category word plus at least one numeric bound (or a socket /
+    RAM type / PCIe constraint together with a list verb).
+    """
+    q = (user_query or "").lower()
+    cat = None
+    for c, words in FILTER_CATEGORIES.items():
+        if any(re.search(r'\b' + re.escape(w) + r'\b', q) for w in words):
+            cat = c
+            break
+    if not cat or any(kw in q for kw in BUILD_KEYWORDS) or re.search(r'\bbuild\b', q):
+        return None
+
+    f = {}
+    m = re.search(r'\bbetween\s+₱?\s*(\d[\d,]*)\s*(k\b)?\s*(?:and|to|-)\s*₱?\s*(\d[\d,]*)\s*(k\b)?', q)
+    if m:
+        lo, hi = (int(m.group(i).replace(",", "")) * (1000 if m.group(i + 1) else 1) for i in (1, 3))
+        f["min_price"], f["max_price"] = min(lo, hi), max(lo, hi)
+    else:
+        m = re.search(r'\b(?:under|below|less than|cheaper than|max(?:imum)?|up to|within)\s+' + _AMOUNT, q)
+        if m:
+            f["max_price"] = _amount(m)
+        m = re.search(r'\b(?:over|above|more than|at least|starting at|min(?:imum)?)\s+' + _AMOUNT, q)
+        if m:
+            f["min_price"] = _amount(m)
+    m = re.search(r'(\d+)\s*gb\s*\+?\s*(?:or more\s+)?(?:of\s+)?(?:vram|gddr\d?)', q)
+    if m and cat == "gpu":
+        f["min_vram"] = int(m.group(1))
+    m = re.search(r'(\d+)\s*\+?\s*(?:or more\s+)?cores?\b', q)
+    if m:
+        f["min_cores"] = int(m.group(1))
+    m = re.search(r'(\d+)\s*\+?\s*(?:or more\s+)?threads?\b', q)
+    if m:
+        f["min_threads"] = int(m.group(1))
+    m = re.search(r'(?<!under )(?<!below )(\d+(?:\.\d+)?)\s*ghz\s*\+?', q)
+    if m:
+        f["min_boost"] = float(m.group(1))
+    m = re.search(r'(\d+)\s*(gb|tb)\s*\+?', q)
+    if m and cat in ("ram", "storage"):
+        f["min_capacity"] = int(m.group(1)) * (1000 if m.group(2) == "tb" else 1)
+    m = re.search(r'(?:under|below|less than|max(?:imum)?)\s+(\d{2,4})\s*(?:w\b|watts?)', q)
+    if m:
+        f["max_watts"] = int(m.group(1))
+    numeric = bool(f)
+
+    m = re.search(r'\b(am4|am5|lga\s*\d{4})\b', q)
+    if m:
+        f["socket"] = m.group(1).replace(" ", "")
+    m = re.search(r'\b(ddr[345])\b', q)
+    if m and cat in ("motherboard", "ram", "cpu"):
+        f["ram_type"] = m.group(1)
+    m = re.search(r'\bpcie\s*([345])(?:\.0)?\b', q)
+    if m:
+        f["pcie"] = m.group(1)
+    if not numeric and not (f and re.search(r'\b(list|show|which|what are|all)\b', q)):
+        return None
+    return cat, f
+
+
+def describe_filters(cat, filters):
+    parts = []
+    if "socket" in filters:
+        parts.append(filters["socket"].upper())
+    if "ram_type" in filters:
+        parts.append(filters["ram_type"].upper())
+    head = " ".join(parts + [cat.upper().replace("_", " ") + "s"])
+    conds = []
+    if "min_price" in filters and "max_price" in filters:
+        conds.append(f"between {format_php(filters['min_price'])} and {format_php(filters['max_price'])}")
+    elif "max_price" in filters:
+        conds.append(f"under {format_php(filters['max_price'])}")
+    elif "min_price" in filters:
+        conds.append(f"over {format_php(filters['min_price'])}")
+    labels = [("min_vram", "{}GB+ VRAM"), ("min_cores", "{}+ cores"), ("min_threads", "{}+ threads"),
+              ("min_boost", "{} GHz+ boost"), ("min_capacity", "{}GB+"), ("max_watts", "≤{}W"),
+              ("pcie", "PCIe {}.0")]
+    conds += [fmt.format(filters[k]) for k, fmt in labels if k in filters]
+    return head + (" — " + ", ".join(conds) if conds else "")
+
+
+@timing.timed("filter")
+def handle_filter_query(user_query: str, limit: int = 10):
+    """
+    Answer attribute filters ("GPUs under ₱15k with 8GB+ VRAM") from the
+    columnar catalog. Returns the listing text, or None if not a filter query.
+    """
+    parsed = parse_filter_query(user_query)
+    if not parsed:
+        return None
+    cat, filters = parsed
+    q = (user_query or "").lower()
+    descending = bool(re.search(r'\b(most expensive|highest|best|fastest|top)\b', q))
+    sort = "boost_ghz" if re.search(r'\bfastest\b', q) else "price"
+    results = catalog_backend.current_backend().filter(
+        cat, sort=sort, descending=descending, **filters)
+    title = describe_filters(cat, filters)
     if not results:
-        print(
-            f"\n🤖 ARIA says:\nNo {cat.upper()} found using {version_token.upper() if version_token else 'PCIe'} in the local database.\n")
-        return
+        return f"No {title} found in the local database."
+    lines = [f"📦 {title} ({len(results)}):", "-" * 60]
+    for key, info, price in results[:limit]:
+        short = [info.get(k) for k in FILTER_SPEC_FIELDS.get(cat, ())]
+        short_spec = " • ".join(str(s) for s in short if s)
+        lines.append(f"- {info.get('name', key)} — {short_spec} — {info.get('price', 'N/A')}")
+    if len(results) > limit:
+        lines.append(f"…and {len(results) - limit} more.")
+    return "\n".join(lines)
+
 
-    print(
-        f"\n🤖 ARIA — {cat.upper()} supporting {(version_token or 'PCIe').upper()}:\n")
-    for name, price, note in results[:6]:
-        line = f"• {name} — {price}"
-        if note:
-            line += f" — {note}"
-        print(line)
-    print("\nTip: tap a recommendation to see details or get PSU estimates for any GPU.\n")
+def _tag_request(**fields):
+    """Tag the current request (intent=, cache=) for its timings, metrics, profile and log lines."""
+    timing.tag(**fields)
+    metrics.label(**fields)
+    profiler.tag(**fields)
+    log_config.bind(**fields)
 
 
 # 3
@@ -3427,14 +3440,150 @@ def handle_query(user_query: str, explicit_intent: Optional[str] = None, request
     """
     Robust handler that guarantees a non-empty 'response' when there are recommendations.
     Returns: {"response": str, "recommendations": [...], "sections": [...]}
-    Uses cache if request_id supplied.
+    Served from response_cache when the request_id or the same query was seen.
+    Cache misses may be profiled (profiler.py, ARSEMBLE_PROFILE_RATE / _SLOW_MS).
     """
-    # return cached if processed
-    cached = cache_get(request_id)
+    # return cached if processed (this request, or the same query on this catalog)
+    with timing.span("cache"):
+        query_key = _safe_call(query_cache_key, user_query, explicit_intent, default=None)
+        cached = cache_get(request_id, query_key)
+    _tag_request(cache="miss" if cached is None else "hit")
+    if cached is not None:
+        metrics.label(intent="cached")
+        logger.info("Returning cached response for request_id=%s", request_id)
+        return cached
+    with profiler.profile(user_query):
+        if request_id:
+            # a duplicate of an in-flight request (double click, client retry, even
+            # on the other worker) waits for the first one instead of recomputing
+            return response_cache.get_cache().singleflight(
+                f"rid:{request_id}", lambda: _answer_query(user_query, explicit_intent, request_id, query_key),
+                store=False)
+        return _answer_query(user_query, explicit_intent, request_id, query_key)
+
+
+def _answer_query(user_query, explicit_intent, request_id, query_key):
+    _gemini_degraded.set(False)
+    steps = answer_steps(user_query, explicit_intent)
+    state, value = advance(steps)
+    while state == "gemini":
+        state, value = advance(steps, ask_gemini(*value))
+    result, ok, records = value
+    # cache and return
+    cache_set(request_id, result, query_key if ok and not _gemini_degraded.get() else None, records)
+    return result
+
+
+async def handle_query_async(user_query: str, explicit_intent: Optional[str] = None,
+                             request_id: Optional[str] = None):
+    """
+    handle_query for an event loop: the same steps and caches, but when
+    answer_steps asks for Gemini the answer is awaited (ask_gemini_async)
+    instead of holding a thread, and the matching/build work around it runs
+    in the default thread pool.
+    Cache misses may be profiled, as in handle_query (profiler.profile_async).
+    """
+    with timing.span("cache"):
+        query_key = await asyncio.to_thread(
+            _safe_call, query_cache_key, user_query, explicit_intent, default=None)
+        cached = await asyncio.to_thread(cache_get, request_id, query_key)
+    _tag_request(cache="miss" if cached is None else "hit")
     if cached is not None:
+        metrics.label(intent="cached")
         logger.info("Returning cached response for request_id=%s", request_id)
         return cached
+    with profiler.profile_async(user_query):
+        if request_id:
+            return await response_cache.get_cache().asingleflight(
+                f"rid:{request_id}",
+                lambda: _answer_query_async(user_query, explicit_intent, request_id, query_key),
+                store=False)
+        return await _answer_query_async(user_query, explicit_intent, request_id, query_key)
+
+
+async def _answer_query_async(user_query, explicit_intent, request_id, query_key):
+    _gemini_degraded.set(False)
+    steps = answer_steps(user_query, explicit_intent)
+    state, value = await asyncio.to_thread(advance, steps)
+    while state == "gemini":
+        reply = await ask_gemini_async(*value)
+        state, value = await asyncio.to_thread(advance, steps, reply)
+    result, ok, records = value
+    await asyncio.to_thread(
+        cache_set, request_id, result, query_key if ok and not _gemini_degraded.get() else None,
+        records)
+    return result
+
+
+def advance(steps, reply=None):
+    """
+    Run answer_steps up to its next Gemini question: ("gemini", (query,
+    found_data)) to be answered with the reply, or ("done", (result, ok, records)).
+    """
+    try:
+        with profiler.step():  # profile_async requests are measured on the step's thread
+            return "gemini", steps.send(reply)
+    except StopIteration as stop:
+        return "done", stop.value
+
+
+COMPATIBILITY_RE = re.compile(r'\b(compatible|compatibility)\b|\b(work|works|fit|fits)\s+with\b')
+COMPARE_RE = re.compile(r'\b(compare|vs|benchmarks)\b')
+PSU_RE = re.compile(r'\b(psu|power supply|wattage|watt)\b')
+STORE_RE = re.compile(r'\b(store|shop|smfp|branch|location)\b|where can i buy')
 
+
+def _model_tokens(text):
+    return [t for t in normalize_text(text) if any(c.isdigit() for c in t)]
+
+
+def local_answer(answer, q):
+    """
+    A handler's answer when the server can use it as is: handled, and about
+    parts the query names (every model-number token of each part's key is in
+    the query). find_component pads a single named part with a near miss
+    ("ryzen 5 5600x" also finds the 3600), which the CLI tolerates but a
+    one-shot /chat reply should not. None otherwise.
+    """
+    if answer is None or not answer.handled:
+        return None
+    q_tokens = set(normalize_text(q))
+    for p in answer.parts:
+        model = _model_tokens(p["key"])
+        if not model or not q_tokens.issuperset(model):
+            return None
+    return answer
+
+
+def local_intent(q, low):
+    """
+    (intent, answer) for a compatibility / compare / PSU question the local
+    handlers fully answer, checked before the generic keywords (which would
+    send "psu for ryzen 5 5600x and rtx 3060" to the component flow).
+    (None, None) otherwise.
+    """
+    if COMPATIBILITY_RE.search(low):
+        return "compatibility", local_answer(_safe_call(check_compatibility, q, default=None), q)
+    if COMPARE_RE.search(low):
+        return "compare", local_answer(_safe_call(compare_components, q, default=None), q)
+    if PSU_RE.search(low):
+        answer = local_answer(_safe_call(handle_psu_request, q, default=None), q)
+        return "psu", answer if getattr(answer, "complete", False) else None
+    return None, None
+
+
+def answer_steps(user_query, explicit_intent=None):
+    """
+    The body of handle_query as a generator, so the same code serves the
+    blocking path (_answer_query) and the event loop (asgi.py, which awaits
+    ask_gemini_async between steps). It yields (query, found_data) where it
+    needs Gemini, expects the answer text back, and returns (result, ok,
+    records): records lists the (cat, key) a component answer was built
+    from, None when the answer may depend on the whole catalog.
+    Only a question the catalog cannot answer is sent (a field the matched
+    record does not have, e.g. "tdp of rtx 3060"); the rest is answered
+    locally.
+    """
     try:
         q = (user_query or "").strip()
         low = q.lower()
@@ -3444,44 +3593,57 @@ def handle_query(user_query: str, explicit_intent: Optional[str] = None, request
         seen_section_keys = set()
         intent = explicit_intent or None
         sub_intent = None
+        local = None  # the local handler's answer (answers.py), when one is used
+        records = None  # the (cat, key) the answer is built from, when it is one part
 
-        # QUICK RULES (prioritized)
-        if re.search(r'^\s*what\s+is\s+pcie\s*\?*$', low) or re.search(r'\bwhat\s+is\s+pcie\b', low):
-            intent = "education"
-            sub_intent = None
-        elif re.search(r'which\s+gpus?.*pcie', low) or re.search(r'which.*pcie\s*4', low):
-            intent = "education"
-            sub_intent = "list_pcie_gpus"
+        with timing.span("intent"):
+            # QUICK RULES (prioritized)
+            if re.search(r'^\s*what\s+is\s+pcie\s*\?*$', low) or re.search(r'\bwhat\s+is\s+pcie\b', low):
+                intent = "education"
+                sub_intent = None
+            elif re.search(r'which\s+gpus?.*pcie', low) or re.search(r'which.*pcie\s*4', low):
+                intent = "education"
+                sub_intent = "list_pcie_gpus"
 
-        # FALLBACK KEYWORD DETECTION IF STILL NONE
+        # attribute filters ("GPUs under ₱15k with 8GB+ VRAM") answered from the columnar view
         if intent is None:
-            if re.search(r'\b(cpu|ryzen|intel core|core i|rtx|gtx)\b', low):
-                intent = "component"
-            elif re.search(r'\b(motherboard|mobo|socket|am4|am5|lga)\b', low):
-                intent = "component"
-            elif re.search(r'\b(psu|power supply|wattage|watt)\b', low):
-                intent = "psu"
-            elif re.search(r'\b(build|recommend a build|budget)\b', low):
-                intent = "build"
-            elif re.search(r'\b(compare|vs|benchmarks)\b', low):
-                intent = "compare"
-            elif re.search(r'\b(pcie)\b', low):
-                intent = "education"
-            else:
-                intent = "component"  # try component first
+            filtered = _safe_call(handle_filter_query, q, default=None)
+            if filtered:
+                intent = "filter"
+                response_text = filtered
+
+        with timing.span("intent"):
+            # FALLBACK KEYWORD DETECTION IF STILL NONE
+            if intent is None:
+                local_kind, local = local_intent(q, low)
+                if local is not None:
+                    intent = local_kind
+                elif re.search(r'\b(cpu|ryzen|intel core|core i|rtx|gtx)\b', low):
+                    intent = "component"
+                elif re.search(r'\b(motherboard|mobo|socket|am4|am5|lga)\b', low):
+                    intent = "component"
+                elif PSU_RE.search(low):
+                    intent = "psu"
+                elif re.search(r'\b(build|recommend a build|budget)\b', low):
+                    intent = "build"
+                elif COMPARE_RE.search(low):
+                    intent = "compare"
+                elif re.search(r'\b(pcie)\b', low):
+                    intent = "education"
+                elif STORE_RE.search(low):
+                    intent = "store"
+                else:
+                    intent = "component"  # try component first
 
+        _tag_request(intent=intent)
         logger.info("handle_query: detected intent=%s sub_intent=%s for q=%s",
                     intent, sub_intent, q[:120])
 
         # INTENT HANDLING (mutually exclusive)
         if intent == "education":
             if sub_intent == "list_pcie_gpus":
-                build_gpu_support_list = globals().get("build_gpu_support_list")
-                gpu_text = _safe_call(
-                    build_gpu_support_list, only_pcie4=True, default=None)
-                if gpu_text:
-                    response_text = f"Which GPUs use PCIe 4.0?\n\n{gpu_text}"
-                else:
+                local = local_answer(_safe_call(handle_feature_list, q, default=None), q)
+                if local is None:
                     response_text = (
                         "Which GPUs use PCIe 4.0?\n\n"
                         "Examples include many modern mid- and high-end GPUs (e.g., RTX 3050/3060/4060 series). "
@@ -3492,6 +3654,9 @@ def handle_query(user_query: str, explicit_intent: Optional[str] = None, request
                 append_unique_section(sections, "tip_recommendations", {
                                       "title": "Tip", "body": "Tap a recommendation to see details or get PSU estimates for any GPU."}, seen_section_keys)
             else:
+                # local explanations only; Gemini is not asked from here
+                local = local_answer(_safe_call(
+                    handle_education_request, q, ask=False, default=None), q)
                 response_text = (
                     "🔎 Understanding PCIe Slots\n\n"
                     "PCI Express (PCIe) connects GPUs, SSDs, and network cards to the motherboard. "
@@ -3509,18 +3674,50 @@ def handle_query(user_query: str, explicit_intent: Optional[str] = None, request
                 recommendations = []
             else:
                 cat, info, key = comps[0]
-                name = info.get("name", key) if isinstance(info, dict) else key
+                records = [(cat, key)]
+                name = info.get("name", key) if isinstance(info, Mapping) else key
                 short = (info.get("short") if isinstance(
-                    info, dict) else "") or ""
+                    info, Mapping) else "") or ""
                 response_text = f"Here's what I found about {name} ({cat})."
+                if isinstance(info, Mapping):
+                    asked = matched_gemini_keywords(q)
+                    if asked:
+                        # field questions: the asked-for fields straight from the record;
+                        # one it does not have goes through ask_gemini + its semantic cache
+                        lines = local_field_lines(info, asked)
+                        if lines:
+                            response_text = "\n".join([f"{name}:"] + lines)
+                        else:
+                            reply = yield (q, {cat: info})
+                            response_text = reply or "\n".join(
+                                [f"{name}:", "• This information is missing in the local database."])
+                    else:
+                        # full-detail questions: precomputed answer, else the catalog record
+                        response_text = (stored_component_answer(cat, key, info)
+                                         or "\n".join([f"Here's what I found about {name} ({cat}):"]
+                                                      + _local_data_lines({cat: info})))
                 recommendations = generate_quick_recommendations_intent(
                     q, intent="component")
 
+        elif intent == "filter":
+            recommendations = generate_quick_recommendations_intent(
+                q, intent="component")
+
         elif intent == "psu":
-            response_text = "🔌 Power supply help — choose a PSU based on TDP and GPU power draw."
+            if local is None:
+                response_text = "🔌 Power supply help — choose a PSU based on TDP and GPU power draw."
             recommendations = generate_quick_recommendations_intent(
                 q, intent="psu")
 
+        elif intent == "compatibility":
+            recommendations = generate_quick_recommendations_intent(
+                q, intent="component")
+
+        elif intent == "store":
+            local = _safe_call(handle_store_request, q, default=None)
+            recommendations = generate_quick_recommendations_intent(
+                q, intent="store")
+
         elif intent == "build":
             parse_budget_from_text = globals().get("parse_budget_from_text")
             budget = _safe_call(parse_budget_from_text, q, default=None)
@@ -3538,7 +3735,8 @@ def handle_query(user_query: str, explicit_intent: Optional[str] = None, request
                 q, intent="build")
 
         elif intent == "compare":
-            response_text = "Comparison tools — pick the parts you want to compare."
+            if local is None:
+                response_text = "Comparison tools — pick the parts you want to compare."
             recommendations = generate_quick_recommendations_intent(
                 q, intent="compare")
 
@@ -3548,6 +3746,9 @@ def handle_query(user_query: str, explicit_intent: Optional[str] = None, request
             recommendations = generate_quick_recommendations_intent(
                 q, intent=intent)
 
+        if local is not None:
+            response_text = answers.render_text(local)
+
         # IMPORTANT: ensure response_text is never empty if we have recommendations
         if (not response_text or response_text.strip() == "") and recommendations:
             # build a short default message based on intent
@@ -3564,19 +3765,18 @@ def handle_query(user_query: str, explicit_intent: Optional[str] = None, request
         # final result object
         result = {"response": response_text,
                   "recommendations": recommendations, "sections": sections}
+        if local is not None:
+            result["answer"] = answers.render_json(local)
 
-        # cache and return
-        cache_set(request_id, result)
         logger.info("handle_query: returning response (intent=%s) with %d recs",
                     intent, len(recommendations))
-        return result
+        return result, True, records
 
     except Exception as e:
         logger.exception("handle_query unexpected error: %s", e)
         result = {"response": "Sorry, something went wrong while processing your query.",
                   "recommendations": [], "sections": []}
-        cache_set(request_id, result)
-        return result
+        return result, False, None
 
 
 # -------------------------------
@@ -3584,8 +3784,23 @@ def handle_query(user_query: str, explicit_intent: Optional[str] = None, request
 # -------------------------------
 
 
+def show_answer(answer):
+    """Print a handler's answer (answers.py) in the CLI and keep it in the history; returns answer.handled."""
+    if answer is None:
+        return False
+    sys.stdout.write(answers.render_cli(answer))
+    if answer.history:
+        try:
+            add_to_history("assistant", answer.history)
+        except Exception:
+            pass
+    return answer.handled
+
+
 def run_cli():
     """Interactive CLI loop used only when running the script directly."""
+    warm_client_in_background()
+    catalog_manager.start_watcher()
     print("🤖 ARIA YOUR ASSISTANT ")
     print("Ask about any PC component or topic!")
     print("""
@@ -3650,19 +3865,19 @@ def run_cli():
 
         # Educational handler
         if is_education_request(user_input):
-            handle_education_request(user_input)
+            show_answer(handle_education_request(user_input))
             continue
 
         # ----- 1) Try component lookup (local-first) -----
         matches = find_component(user_input)
         if matches:
-            print(f"[DEBUG] find_component matches: {[m[2] for m in matches]}")
+            logger.debug("find_component matches: %s", [m[2] for m in matches])
             # if the query looks like a compatibility question and we found components,
             # handle compatibility immediately
             if contains_any(low, comp_triggers):
                 try:
                     if re.search(r'\b(work|works|will)\b.*\bwith\b', low) or contains_any(low, comp_triggers):
-                        handled = check_compatibility(user_input)
+                        handled = show_answer(check_compatibility(user_input))
                     else:
                         handled = False
                     if handled:
@@ -3683,7 +3898,8 @@ def run_cli():
 
                 if not handled:
                     try:
-                        ask_gemini(user_input, {category: info})
+                        answer = ask_gemini(user_input, {category: info})
+                        print("\n🤖 ARIA says:\n\n" + answer + "\n\n" + "-" * 60 + "\n")
                     except Exception as e:
                         name = info.get("name", component_key)
 
@@ -3712,7 +3928,7 @@ def run_cli():
                 print("\n🤖 ARIA — Quick question:\n" + follow + "\n")
                 continue
             try:
-                handle_psu_request(user_input)
+                show_answer(handle_psu_request(user_input))
             except Exception as e:
                 print(f"⚠️ PSU handler error: {e}\n")
             continue
@@ -3722,7 +3938,7 @@ def run_cli():
         if not permissive_found:
             # only treat as education if there are no component-like tokens
             if is_education_request(user_input):
-                handle_education_request(user_input)
+                show_answer(handle_education_request(user_input))
                 continue
 
         # ----- 4) Build / budget requests -----
@@ -3753,7 +3969,7 @@ def run_cli():
                 continue
             # no follow-up needed: do compatibility check (may include PSU calc)
             try:
-                check_compatibility(user_input)
+                show_answer(check_compatibility(user_input))
             except Exception as e:
                 print(f"⚠️ Compatibility check error: {e}\n")
             continue
@@ -3761,7 +3977,7 @@ def run_cli():
         # ----- 6) Compare detection -----
         if any(kw in low for kw in compare_triggers) or contains_any(low, ["compare", "compare to"]):
             try:
-                compare_components(user_input)
+                show_answer(compare_components(user_input))
             except Exception as e:
                 print(f"⚠️ Compare error: {e}\n")
             continue
@@ -3783,7 +3999,7 @@ def run_cli():
             continue
 
         # handle store requests
-        if handle_store_request(user_input):
+        if show_answer(handle_store_request(user_input)):
             continue
 
         # ----- 8) Final fallback: no matches found -----
@@ -0,0 +1,238 @@
+# answer_store.py
+"""
+Offline answer store for "tell me about <component>" questions.
+
+An offline job walks the catalog, asks Gemini once per component using the
+same prompt template as ask_gemini(), and saves the answers to a versioned
+JSON file. On the request path a detail question is then a dict lookup.
+
+Entries are tied to a hash of the component record and to the prompt
+version (model + system instruction), so a rebuild only regenerates the
+components whose catalog record (or the prompt) changed.
+
+Usage:
+    python answer_store.py build [--force] [--limit N] [--delay SECONDS]
+    python answer_store.py status
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import log_config
+
+logger = log_config.get_logger("answer_store")
+
+STORE_FORMAT = 1
+DEFAULT_STORE_PATH = Path(__file__).resolve().parent / \
+    "answers" / "component_answers.json"
+STORE_PATH = Path(os.getenv("ARSEMBLE_ANSWER_STORE", DEFAULT_STORE_PATH))
+
+
+def record_hash(info):
+    """Stable hash of a component record (order-independent)."""
+    blob = json.dumps(dict(info), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def prompt_version(model, system_instruction):
+    """Short id of the prompt template; changing it invalidates every entry."""
+    blob = f"{model}\n{system_instruction}".encode("utf-8")
+    return hashlib.sha1(blob).hexdigest()[:12]
+
+
+def entry_key(cat, key):
+    return f"{cat}/{key}"
+
+
+def detail_question(info, key):
+    """The question the offline job asks for a component (full-details mode)."""
+    return f"Tell me about {info.get('name', key)}"
+
+
+class AnswerStore:
+    """In-memory view of the answer file. Safe to read from many threads."""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = Path(path)
+        self.revision = 0
+        self.prompt_version = None
+        self.generated_at = None
+        self.entries = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """(Re)load the file if it changed on disk. Missing file -> empty store."""
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return self
+        if mtime == self._mtime:
+            return self
+        with self._lock:
+            try:
+                raw = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning("could not read answer store %s: %s", self.path, e)
+                return self
+            if raw.get("format") != STORE_FORMAT:
+                logger.warning("ignoring answer store %s (format %s != %s)",
+                               self.path, raw.get("format"), STORE_FORMAT)
+                return self
+            self.revision = raw.get("revision", 0)
+            self.prompt_version = raw.get("prompt_version")
+            self.generated_at = raw.get("generated_at")
+            self.entries = raw.get("entries", {})
+            self._mtime = mtime
+        return self
+
+    def get(self, cat, key, info, current_prompt_version=None):
+        """Return the stored answer if it matches this record (and prompt), else None."""
+        entry = self.entries.get(entry_key(cat, key))
+        if not entry or entry.get("record_hash") != record_hash(info):
+            return None
+        if current_prompt_version and entry.get("prompt_version") != current_prompt_version:
+            return None
+        return entry.get("answer")
+
+    def is_fresh(self, cat, key, info, current_prompt_version):
+        return self.get(cat, key, info, current_prompt_version) is not None
+
+    def put(self, cat, key, info, answer, current_prompt_version, model):
+        with self._lock:
+            self.entries[entry_key(cat, key)] = {
+                "record_hash": record_hash(info),
+                "prompt_version": current_prompt_version,
+                "model": model,
+                "answer": answer,
+                "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            }
+
+    def prune(self, live_keys):
+        """Drop entries for components no longer in the catalog. Returns count removed."""
+        with self._lock:
+            stale = [k for k in self.entries if k not in live_keys]
+            for k in stale:
+                del self.entries[k]
+        return len(stale)
+
+    def save(self, current_prompt_version):
+        """Write the store atomically (tmp file + rename) and bump the revision."""
+        with self._lock:
+            self.revision += 1
+            self.prompt_version = current_prompt_version
+            self.generated_at = datetime.datetime.now(
+                datetime.timezone.utc).isoformat(timespec="seconds")
+            payload = {
+                "format": STORE_FORMAT,
+                "revision": self.revision,
+                "prompt_version": self.prompt_version,
+                "generated_at": self.generated_at,
+                "entries": self.entries,
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=1,
+                                      sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.path)
+            self._mtime = self.path.stat().st_mtime
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_answer_store():
+    """Process-wide store, reloaded when the file on disk changes."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AnswerStore(STORE_PATH)
+    return _store.load()
+
+
+def build_answer_store(store=None, force=False, limit=None, delay=0.0):
+    """
+    Generate answers for every component whose record (or the prompt) changed.
+    Returns a summary dict: generated / skipped / failed / pruned counts.
+    """
+    import ARsemble_ai as aria
+
+    store = store or AnswerStore(STORE_PATH).load()
+    current = prompt_version(aria.GEMINI_MODEL, aria.GEMINI_SYSTEM_INSTRUCTION)
+    summary = {"generated": 0, "skipped": 0, "failed": 0, "pruned": 0}
+    live = set()
+    t0 = time.perf_counter()
+
+    for cat, items in aria.data.items():
+        for key, info in items.items():
+            live.add(entry_key(cat, key))
+            if not force and store.is_fresh(cat, key, info, current):
+                summary["skipped"] += 1
+                continue
+            if limit is not None and summary["generated"] + summary["failed"] >= limit:
+                continue
+            answer = aria.ask_gemini(detail_question(
+                info, key), {cat: info}, fallback=False, priority="batch")
+            if not answer:
+                summary["failed"] += 1
+                print(f"  ✗ {cat}/{key}", file=sys.stderr)
+                continue
+            store.put(cat, key, info, answer, current, aria.GEMINI_MODEL)
+            summary["generated"] += 1
+            print(f"  ✓ {cat}/{key}", file=sys.stderr)
+            if delay:
+                time.sleep(delay)
+
+    summary["pruned"] = store.prune(live)
+    if summary["generated"] or summary["pruned"] or force:
+        store.save(current)
+    summary["revision"] = store.revision
+    summary["seconds"] = round(time.perf_counter() - t0, 2)
+    return summary
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(
+        description="Offline answer store for component detail questions.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="generate missing/stale answers")
+    b.add_argument("--force", action="store_true",
+                   help="regenerate every entry")
+    b.add_argument("--limit", type=int, default=None,
+                   help="max Gemini calls this run")
+    b.add_argument("--delay", type=float, default=0.0,
+                   help="seconds to wait between Gemini calls")
+    sub.add_parser("status", help="show how many entries are fresh/stale")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        import ARsemble_ai as aria
+        if aria.get_client() is None:
+            sys.exit("Gemini client unavailable (set GEMINI_API_KEY).")
+        print(json.dumps(build_answer_store(force=args.force,
+              limit=args.limit, delay=args.delay), indent=2))
+        return
+
+    import ARsemble_ai as aria
+    store = AnswerStore(STORE_PATH).load()
+    current = prompt_version(aria.GEMINI_MODEL, aria.GEMINI_SYSTEM_INSTRUCTION)
+    total = fresh = 0
+    for cat, items in aria.data.items():
+        for key, info in items.items():
+            total += 1
+            fresh += store.is_fresh(cat, key, info, current)
+    print(json.dumps({"path": str(STORE_PATH), "revision": store.revision,
+                      "prompt_version": current, "entries": len(store.entries),
+                      "catalog_items": total, "fresh": fresh, "stale": total - fresh}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+# answers.py
+"""
+Result objects for the local handlers (compatibility, compare, PSU, feature
+lists, education, store) and the renderers that turn them into output.
+
+A handler computes an answer once and returns it; the caller picks the form:
+
+    answer = ARsemble_ai.check_compatibility("will ryzen 5 7600 work with b650")
+    render_cli(answer)    # the CLI's framed text (what the handlers used to print)
+    render_text(answer)   # plain text for the /chat "response"
+    iter_text(answer)     # the same text line by line, for streaming
+    render_json(answer)   # {"kind": "compatibility", "verdict": ..., "checks": [...]}
+
+Every answer has `handled` (False for "I couldn't find those parts"-style
+replies), `parts` ({"category", "key", "name"} for each component it is
+about) and `history`, the line the CLI keeps in its conversation history
+(None for none).
+"""
+
+SEPARATOR = "-" * 60
+
+
+def part(category, key, info):
+    return {"category": category, "key": key, "name": (info or {}).get("name", key)}
+
+
+class Answer:
+    kind = "answer"
+
+    def __init__(self, handled=True, parts=(), history=None):
+        self.handled = handled
+        self.parts = list(parts)
+        self.history = history
+
+    def fields(self):
+        return {}
+
+    def to_dict(self):
+        return dict({"kind": self.kind, "handled": self.handled, "parts": self.parts}, **self.fields())
+
+    def cli_chunks(self):
+        """What the CLI prints, one print() argument per item."""
+        return list(self.text_lines())
+
+    def text_lines(self):
+        return []
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.fields()!r}>"
+
+
+class Message(Answer):
+    """A short reply: a prompt for missing details, or a hint."""
+    kind = "message"
+
+    def __init__(self, text, handled=False, parts=(), history=None):
+        super().__init__(handled, parts, history)
+        self.text = text
+
+    def fields(self):
+        return {"text": self.text}
+
+    def cli_chunks(self):
+        return [f"\n🤖 ARIA says:\n\n{self.text}\n"]
+
+    def text_lines(self):
+        return [self.text]
+
+
+def _bullets(title, items):
+    return ["", f"{title}:"] + [f"• {item}" for item in items] if items else []
+
+
+class Compatibility(Answer):
+    """
+    checks: (aspect, verdict, message) rows, verdict one of ok / incompatible /
+    warning / unknown / info. specs: (name, quick specs) rows, used when no
+    rule applies (best_effort).
+    """
+    kind = "compatibility"
+
+    def __init__(self, a_name, b_name, checks=(), notes=(), specs=(), footer=None,
+                 best_effort=False, parts=()):
+        super().__init__(True, parts)
+        self.a_name, self.b_name = a_name, b_name
+        self.checks = list(checks)
+        self.notes = list(notes)
+        self.specs = list(specs)
+        self.footer = footer
+        self.best_effort = best_effort
+
+    @property
+    def verdict(self):
+        verdicts = {v for _, v, _ in self.checks if v != "info"}
+        if "incompatible" in verdicts:
+            return "incompatible"
+        if verdicts & {"warning", "unknown"} or not verdicts:
+            return "check"
+        return "compatible"
+
+    def fields(self):
+        return {"a": self.a_name, "b": self.b_name, "verdict": self.verdict,
+                "checks": [{"aspect": a, "verdict": v, "message": m} for a, v, m in self.checks],
+                "specs": [{"name": n, "specs": s} for n, s in self.specs],
+                "notes": self.notes, "footer": self.footer, "best_effort": self.best_effort}
+
+    def cli_chunks(self):
+        title = "Compatibility (best-effort)" if self.best_effort else "Compatibility Check"
+        out = [f"\n🤖 ARIA — {title}:\n", f"{self.a_name}  ↔  {self.b_name}", SEPARATOR]
+        out += [f"• {aspect}: {message}" for aspect, _, message in self.checks]
+        out += [f"{name}: {specs}" for name, specs in self.specs]
+        if self.notes:
+            out.append("\nNotes:\n" + "\n".join(f"• {n}" for n in self.notes) + "\n")
+        if self.footer:
+            out.append(f"\n{self.footer}\n")
+        if not self.notes and not self.footer:
+            out.append("")
+        return out
+
+    def text_lines(self):
+        title = "Compatibility (best-effort)" if self.best_effort else "Compatibility check"
+        out = [f"{title}: {self.a_name} ↔ {self.b_name}"]
+        out += [f"• {aspect}: {message}" for aspect, _, message in self.checks]
+        out += [f"• {name}: {specs}" for name, specs in self.specs]
+        out += _bullets("Notes", self.notes)
+        return out + (["", self.footer] if self.footer else [])
+
+
+class Comparison(Answer):
+    """Side-by-side rows (label, a value, b value) for two parts of one category."""
+    kind = "comparison"
+
+    def __init__(self, a_name, b_name, category, rows, parts=()):
+        super().__init__(True, parts)
+        self.a_name, self.b_name, self.category = a_name, b_name, category
+        self.rows = list(rows)
+
+    def fields(self):
+        return {"a": self.a_name, "b": self.b_name, "category": self.category,
+                "rows": [{"label": label, "a": a, "b": b} for label, a, b in self.rows]}
+
+    def cli_chunks(self):
+        out = ["\n🤖 ARIA — Component Comparison:\n", f"{self.a_name}  VS  {self.b_name}", SEPARATOR]
+        out += [f"{label:18} | {str(a):35} | {str(b)}" for label, a, b in self.rows]
+        return out + ["\n" + SEPARATOR + "\n"]
+
+    def text_lines(self):
+        return ([f"Comparison: {self.a_name} vs {self.b_name}"]
+                + [f"• {label}: {a} | {b}" for label, a, b in self.rows])
+
+
+class SpecSummary(Answer):
+    """Quick specs of parts that cannot be compared side by side (different categories)."""
+    kind = "spec_summary"
+
+    def __init__(self, intro, items, tip=None, parts=()):
+        super().__init__(True, parts)
+        self.intro = intro
+        self.items = list(items)  # (name, quick specs)
+        self.tip = tip
+
+    def fields(self):
+        return {"intro": self.intro, "items": [{"name": n, "specs": s} for n, s in self.items],
+                "tip": self.tip}
+
+    def cli_chunks(self):
+        lines = [f"{name}: {specs}" for name, specs in self.items]
+        if lines:
+            lines[-1] += "\n"
+        return [f"\n🤖 ARIA says:\n\n{self.intro}\n"] + lines + ([self.tip] if self.tip else [])
+
+    def text_lines(self):
+        return ([self.intro] + [f"• {name}: {specs}" for name, specs in self.items]
+                + (["", self.tip] if self.tip else []))
+
+
+class PsuEstimate(Answer):
+    kind = "psu_estimate"
+
+    def __init__(self, cpu_name, gpu_name, draw_watts, psu_watts, notes=(), parts=()):
+        super().__init__(True, parts)
+        self.cpu_name, self.gpu_name = cpu_name, gpu_name
+        self.draw_watts, self.psu_watts = draw_watts, psu_watts
+        self.notes = list(notes)
+
+    @property
+    def complete(self):
+        """True when the estimate is for an actual CPU + GPU pair."""
+        return sorted(p["category"] for p in self.parts) == ["cpu", "gpu"]
+
+    def fields(self):
+        return {"cpu": self.cpu_name, "gpu": self.gpu_name, "draw_watts": self.draw_watts,
+                "psu_watts": self.psu_watts, "notes": self.notes}
+
+    def _estimate_lines(self):
+        return [f"• Estimated continuous system draw (approx): {self.draw_watts} W",
+                f"• Recommended PSU size (with headroom): {self.psu_watts} W"]
+
+    def cli_chunks(self):
+        out = ["\n🤖 ARIA — PSU Recommendation:\n", f"For {self.cpu_name} + {self.gpu_name}:"]
+        out += self._estimate_lines()
+        if self.notes:
+            out += ["\nNotes:"] + [f"• {n}" for n in self.notes]
+            out[-1] += "\n"
+        return out
+
+    def text_lines(self):
+        return ([f"🔌 PSU estimate for {self.cpu_name} + {self.gpu_name}:"] + self._estimate_lines()
+                + _bullets("Notes", self.notes))
+
+
+class FeatureList(Answer):
+    """Parts of a category with a feature (e.g. GPUs with PCIe 4.0): (name, price, note) rows."""
+    kind = "feature_list"
+    TIP = "Tip: tap a recommendation to see details or get PSU estimates for any GPU."
+
+    def __init__(self, category, feature, items, limit=6):
+        super().__init__(bool(items))
+        self.category, self.feature = category, feature
+        self.items = list(items)
+        self.limit = limit
+
+    def fields(self):
+        return {"category": self.category, "feature": self.feature, "total": len(self.items),
+                "items": [{"name": n, "price": p, "note": note}
+                          for n, p, note in self.items[:self.limit]]}
+
+    def _item_lines(self):
+        return [f"• {name} — {price}" + (f" — {note}" if note else "")
+                for name, price, note in self.items[:self.limit]]
+
+    def _missing(self):
+        return (f"No {self.category.upper()} found using "
+                f"{self.feature.upper() if self.feature else 'PCIe'} in the local database.")
+
+    def cli_chunks(self):
+        if not self.items:
+            return [f"\n🤖 ARIA says:\n{self._missing()}\n"]
+        head = f"\n🤖 ARIA — {self.category.upper()} supporting {(self.feature or 'PCIe').upper()}:\n"
+        return [head] + self._item_lines() + [f"\n{self.TIP}\n"]
+
+    def text_lines(self):
+        if not self.items:
+            return [self._missing()]
+        return ([f"{self.category.upper()} supporting {(self.feature or 'PCIe').upper()}:"]
+                + self._item_lines() + ["", self.TIP])
+
+
+class Explanation(Answer):
+    """
+    An educational answer. source: local / gemini, or none (no local text and
+    no Gemini), empty (Gemini said nothing), error (Gemini failed).
+    """
+    kind = "explanation"
+    NO_GEMINI = ("⚠️ I don't have a local explanation for that and Gemini is not available. "
+                 "Try rephrasing or enable GEMINI_API_KEY.")
+    NO_ANSWER = ("I couldn't generate a full explanation. Try a simpler phrasing "
+                 "(e.g., 'What is PCIe?' or 'Explain DDR5 vs DDR4').")
+
+    def __init__(self, text, source, error=None, history=None):
+        super().__init__(bool(text), history=history)
+        self.text, self.source, self.error = text, source, error
+
+    def fields(self):
+        return {"text": self.text, "source": self.source,
+                "error": str(self.error) if self.error else None}
+
+    def cli_chunks(self):
+        out = ["\n🤖 ARIA — Educational Answer:\n"]
+        if self.source == "error":
+            out += [f"⚠️ Error while calling Gemini for educational question: {self.error}\n",
+                    "Here's a short local hint instead:\n"]
+        if self.text:
+            return out + [self.text + "\n" + SEPARATOR + "\n"]
+        if self.source == "none":
+            return out + [self.NO_GEMINI + "\n"]
+        if self.source == "empty":
+            return out + ["⚠️ No response from Gemini.\n"]
+        return out + [self.NO_ANSWER + "\n"]
+
+    def text_lines(self):
+        if self.text:
+            return [self.text]
+        return [self.NO_GEMINI if self.source == "none" else self.NO_ANSWER]
+
+
+class StoreInfo(Answer):
+    kind = "store_info"
+
+    def __init__(self, name, address, hours, contact, history=None):
+        super().__init__(True, history=history)
+        self.name, self.address, self.hours, self.contact = name, address, hours, contact
+
+    def fields(self):
+        return {"name": self.name, "address": self.address, "hours": self.hours,
+                "contact": self.contact}
+
+    def cli_chunks(self):
+        return [f"\n🏬 {self.name.upper()} — STORE INFORMATION\n", f"📍 Name: {self.name}",
+                f"📫 Address: {self.address}", f"\n🕓 Store Hours: {self.hours}",
+                f"☎️ {self.contact}\n", "\n"]
+
+    def text_lines(self):
+        return [f"🏬 {self.name}", f"📍 {self.address}", f"🕓 {self.hours}", f"☎️ {self.contact}"]
+
+
+# --- renderers -------------------------------------------------------------------
+
+def render_cli(answer):
+    return "".join(chunk + "\n" for chunk in answer.cli_chunks())
+
+
+def iter_text(answer):
+    for line in answer.text_lines():
+        yield line + "\n"
+
+
+def render_text(answer):
+    return "".join(iter_text(answer)).strip()
+
+
+def render_json(answer):
+    return answer.to_dict()
@@ -0,0 +1,319 @@
+# asgi.py
+"""
+ASGI entry point: the /chat, /chat/batch, /recommend, /metrics and static
+routes of server.py for an event loop, so a conversation waiting on Gemini
+holds a coroutine instead of a worker thread.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+/chat runs ARsemble_ai.handle_query_async. A question that needs Gemini (a
+field the catalog record lacks; see answer_steps) has its call awaited
+through the client's aio API, and the matching/build work around it (plain
+CPU over the shared catalog) runs in the loop's default thread pool; most
+questions are answered by that work alone. That work is
+a generator paused at the Gemini call, which cannot move to another process;
+process parallelism comes from uvicorn --workers, as with gunicorn.
+Duplicate request ids are deduplicated through the same response cache as
+the Flask app. Admin endpoints stay on server.py.
+
+No framework: the routes are few and fixed, and the raw ASGI interface keeps
+the dependency list at uvicorn.
+
+Environment:
+  ARSEMBLE_ASGI_THREADS   size of the thread pool for the CPU work (default 8)
+  ARSEMBLE_WARM_GEMINI    set to 0 to skip creating the Gemini client at startup
+"""
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import ARsemble_ai
+import catalog_manager
+import chat_api
+import chat_batch
+import log_config
+import metrics
+import response_cache
+import timing
+
+API_PATHS = ("/chat", "/chat/batch", "/recommend")
+STATIC_DIR = (Path(__file__).resolve().parent / "static").resolve()
+MAX_BODY = 1024 * 1024
+THREADS = int(os.getenv("ARSEMBLE_ASGI_THREADS", "8") or 8)
+
+logging.basicConfig(level=logging.INFO)
+logger = log_config.get_logger("asgi")
+
+
+async def read_body(receive):
+    """The request body, or None when it is larger than MAX_BODY."""
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY:
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+async def respond(send, status, body, content_type="application/json", headers=()):
+    if not isinstance(body, bytes):
+        body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", content_type.encode("latin-1")),
+                            (b"content-length", str(len(body)).encode("latin-1")),
+                            (b"access-control-allow-origin", b"*"), *headers]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def header(scope, name):
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def json_payload(receive):
+    """(payload, error status): 413 over MAX_BODY, 400 when it is not JSON."""
+    body = await read_body(receive)
+    if body is None:
+        return None, 413
+    try:
+        return json.loads(body), None
+    except ValueError:
+        return None, 400
+
+
+async def chat(scope, receive, send):
+    """Same contract as server.chat."""
+    payload, error = await json_payload(receive)
+    if error:
+        return await respond(send, error, chat_api.INVALID_JSON)
+    message = chat_api.message_of(payload)
+    if message is None:
+        return await respond(send, 400, chat_api.MISSING_MESSAGE)
+    try:
+        rid = chat_api.request_id_of(header(scope, b"idempotency-key"), payload)
+        log_config.bind(request_id=rid)
+        # the to_thread steps copy this context, so they all see the pinned snapshot
+        with catalog_manager.pinned():
+            raw = await ARsemble_ai.handle_query_async(message, request_id=rid)
+        await respond(send, 200, chat_api.chat_payload(raw))
+    except Exception as e:
+        logger.exception("Unhandled error while calling handle_query")
+        await respond(send, 500, chat_api.internal_error(e))
+
+
+async def chat_batch_route(scope, receive, send):
+    """Same contract as server.chat_batch_endpoint."""
+    payload, error = await json_payload(receive)
+    try:
+        messages = chat_batch.parse_messages(payload)
+    except ValueError as e:
+        return await respond(send, error or 400, {"error": str(e)})
+    metrics.label(intent="batch")
+    if chat_batch.wants_stream(payload, header(scope, b"accept")):
+        return await stream_lines(send, chat_batch.ndjson_lines(messages))
+    try:
+        rid = chat_api.request_id_of(header(scope, b"idempotency-key"), payload)
+        log_config.bind(request_id=rid)
+
+        async def compute():
+            return await asyncio.to_thread(chat_batch.run_batch, messages)
+
+        with catalog_manager.pinned():
+            if rid:
+                body = await response_cache.get_cache().asingleflight(f"batch:{rid}", compute)
+            else:
+                body = await compute()
+        metrics.label(intent="batch")  # the questions set their own intents meanwhile
+        await respond(send, 200, body)
+    except Exception as e:
+        logger.exception("Unhandled error while answering a batch")
+        await respond(send, 500, {"error": str(e)})
+
+
+async def stream_lines(send, lines):
+    """Send a (blocking) iterator of text lines as a chunked NDJSON body."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def produce():
+        try:
+            for line in lines:
+                loop.call_soon_threadsafe(queue.put_nowait, line)
+        except Exception:
+            logger.exception("Unhandled error while streaming a batch")
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    producer = loop.run_in_executor(None, produce)
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/x-ndjson"),
+                            (b"access-control-allow-origin", b"*")]})
+    while (line := await queue.get()) is not None:
+        await send({"type": "http.response.body", "body": line.encode("utf-8"),
+                    "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+    await producer
+
+
+async def recommend(scope, receive, send):
+    """Same contract as server.recommend."""
+    payload, error = await json_payload(receive)
+    message = chat_api.message_of(payload)
+    if error or not message:
+        return await respond(send, error or 400, {"recommendations": []})
+    try:
+        rid = chat_api.request_id_of(header(scope, b"idempotency-key"), payload)
+        log_config.bind(request_id=rid)
+
+        async def compute():
+            return await asyncio.to_thread(
+                lambda: ARsemble_ai.generate_quick_recommendations(message) or [])
+
+        with catalog_manager.pinned():
+            if rid:
+                recs = await response_cache.get_cache().asingleflight(f"rec:{rid}", compute)
+            else:
+                recs = await compute()
+        if not isinstance(recs, list):
+            recs = []
+        await respond(send, 200, {"recommendations": recs})
+    except Exception:
+        logger.exception("Error generating recommendations")
+        await respond(send, 500, {"recommendations": []})
+
+
+async def metrics_route(scope, send):
+    """Same contract as server.metrics_endpoint."""
+    if not metrics.ENABLED:
+        return await respond(send, 404, {"error": "metrics disabled"})
+    if not metrics.authorized(header(scope, b"authorization")):
+        return await respond(send, 401, {"error": "unauthorized"})
+    body = await asyncio.to_thread(lambda: metrics.render(ARsemble_ai.metrics_gauges()))
+    await respond(send, 200, body.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+
+
+async def static_file(send, relative):
+    path = (STATIC_DIR / relative).resolve()
+    if not path.is_relative_to(STATIC_DIR) or not path.is_file():
+        return await respond(send, 404, b"Not Found", "text/plain")
+    body = await asyncio.to_thread(path.read_bytes)
+    content_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    if content_type.startswith("text/") or content_type == "application/javascript":
+        content_type += "; charset=utf-8"
+    await respond(send, 200, body, content_type)
+
+
+async def preflight(scope, send):
+    # what flask_cors answers for the default CORS(app)
+    requested = header(scope, b"access-control-request-headers")
+    headers = [(b"access-control-allow-methods",
+                b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT")]
+    if requested:
+        headers.append((b"access-control-allow-headers", requested.encode("latin-1")))
+    await respond(send, 200, b"", "text/html", headers)
+
+
+def startup():
+    ARsemble_ai.preload_shared_state()
+    if os.environ.get("ARSEMBLE_WARM_GEMINI", "1") != "0":
+        ARsemble_ai.warm_client_in_background()
+    catalog_manager.start_watcher()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            asyncio.get_running_loop().set_default_executor(
+                ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="arsemble-asgi"))
+            try:
+                await asyncio.to_thread(startup)
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+    method, path = scope["method"], scope["path"]
+    if method == "OPTIONS":
+        return await preflight(scope, send)
+    if method == "POST":
+        return await timed_route(scope, receive, send)
+    if method in ("GET", "HEAD") and path == "/":
+        return await static_file(send, "index.html")
+    if method == "GET" and path == "/metrics":
+        return await metrics_route(scope, send)
+    if method in ("GET", "HEAD") and path.startswith("/static/"):
+        return await static_file(send, path[len("/static/"):])
+    await not_found(send, path)
+
+
+async def timed_route(scope, receive, send):
+    """POST routes, with their stage timings (timing.py) in a Server-Timing header."""
+    token = timing.begin()
+    recorder = timing.current()
+    metrics_token = metrics.begin_request()
+    log_token = log_config.begin(path=scope["path"], request_id=header(scope, b"idempotency-key"))
+    started = time.perf_counter()
+    status = []
+
+    async def send_timed(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+            if recorder is not None:
+                message = dict(message, headers=[
+                    *message.get("headers", ()),
+                    (b"server-timing", recorder.header().encode("latin-1")),
+                    (b"timing-allow-origin", b"*")])
+        await send(message)
+
+    try:
+        await post_route(scope, receive, send_timed)
+    finally:
+        if recorder is not None:
+            timing.report(recorder, path=scope["path"], status=status[0] if status else None,
+                          request_id=header(scope, b"idempotency-key"))
+        timing.end(token)
+        log_config.end(log_token)
+        path = scope["path"] if scope["path"] in API_PATHS else "other"
+        metrics.end_request(metrics_token, path, status[0] if status else 500,
+                            time.perf_counter() - started)
+
+
+async def post_route(scope, receive, send):
+    path = scope["path"]
+    if path == "/chat":
+        return await chat(scope, receive, send)
+    if path == "/chat/batch":
+        return await chat_batch_route(scope, receive, send)
+    if path == "/recommend":
+        return await recommend(scope, receive, send)
+    await not_found(send, path)
+
+
+async def not_found(send, path):
+    if path in ("/", "/metrics") + API_PATHS or path.startswith("/static/"):
+        return await respond(send, 405, b"Method Not Allowed", "text/plain")
+    await respond(send, 404, b"Not Found", "text/plain")
@@ -0,0 +1,155 @@
+"""
+Concurrent-conversation capacity: gunicorn + Flask (server.py) vs uvicorn + ASGI (asgi.py).
+
+Both run as they are deployed, with the same number of worker processes
+(gunicorn_config.py: 2 workers x 4 threads; `uvicorn asgi:app --workers 2`).
+Gemini runs on the fake backend with a fixed latency (--latency, default 2 s)
+to stand in for a slow LLM. The response and semantic caches and the rate
+limiter are off, so every request really waits on Gemini.
+
+For each concurrency level C, C clients POST /chat at once, each with a
+question that needs Gemini (a field the catalog record lacks, like a GPU's
+tdp; fields it has are answered locally), and the script reports the wall
+time for the round, the throughput, p50/p95/max latency and how many
+answers came from the fake Gemini. The Flask setup can only
+have workers x threads calls in flight, so its wall time grows by about one
+latency per extra batch of 8; the ASGI app keeps every call in flight.
+
+Usage:
+    python benchmarks/asgi_capacity.py [--levels 8,16,32,64,128] [--latency 2] [--workers 2]
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+QUESTIONS = [
+    "tdp of rtx 3060",
+    "socket of rtx 4060",
+    "efficiency of ryzen 5 5600x",
+    "how many cores does the rtx 3060 have",
+    "interface of rtx 4060",
+    "speed of samsung 970 evo plus 1tb",
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def chat(port, message):
+    req = urllib.request.Request(f"http://127.0.0.1:{port}/chat",
+                                 data=json.dumps({"message": message}).encode("utf-8"),
+                                 headers={"Content-Type": "application/json"})
+    t0 = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=600) as r:
+        body = json.loads(r.read())
+    return r.status, time.perf_counter() - t0, body.get("response", "")
+
+
+def wait_ready(proc, port, timeout=180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=5):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError("server did not come up")
+
+
+def fire(port, concurrency):
+    """concurrency clients at once; (wall seconds, latencies, failures, gemini answers)."""
+    start = threading.Barrier(concurrency)
+
+    def one(i):
+        start.wait()
+        try:
+            return chat(port, QUESTIONS[i % len(QUESTIONS)])
+        except OSError:
+            return None, None, ""
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(concurrency)))
+    wall = time.perf_counter() - t0
+    latencies = sorted(r[1] for r in results if r[0] == 200)
+    gemini = sum("fake Gemini" in r[2] for r in results)
+    return wall, latencies, concurrency - len(latencies), gemini
+
+
+def run_server(name, cmd, env, levels):
+    port = free_port()
+    env = dict(env, PORT=str(port))
+    cmd = [c.replace("{port}", str(port)) for c in cmd]
+    proc = subprocess.Popen(cmd, env=env, cwd=env["ARSEMBLE_BENCH_DIR"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    rows = []
+    try:
+        wait_ready(proc, port)
+        fire(port, 4)  # warm both workers
+        for c in levels:
+            wall, lat, failed, gemini = fire(port, c)
+            p = (lambda q: lat[min(len(lat) - 1, int(q * len(lat)))] if lat else float("nan"))
+            row = {"server": name, "concurrency": c, "wall_s": round(wall, 2),
+                   "rps": round(len(lat) / wall, 1), "p50_s": round(p(0.5), 2),
+                   "p95_s": round(p(0.95), 2), "max_s": round(lat[-1] if lat else float("nan"), 2),
+                   "failed": failed, "gemini": gemini}
+            rows.append(row)
+            print(f"{name:<16} C={c:<4} wall {wall:6.2f} s  {row['rps']:6.1f} req/s  "
+                  f"p50 {row['p50_s']:6.2f}  p95 {row['p95_s']:6.2f}  max {row['max_s']:6.2f} s  "
+                  f"gemini {gemini}/{c}  failed {failed}", flush=True)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Concurrent /chat capacity, Flask vs ASGI.")
+    ap.add_argument("--levels", default="8,16,32,64,128")
+    ap.add_argument("--latency", type=float, default=2.0, help="simulated Gemini latency (s)")
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--json", help="write the results to this file")
+    args = ap.parse_args()
+    levels = [int(x) for x in args.levels.split(",") if x.strip()]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, GEMINI_API_KEY="dummy", GEMINI_BACKEND="fake",
+                   FAKE_GEMINI_LATENCY=f"fixed:{args.latency}", GEMINI_LIMITER="0",
+                   ARSEMBLE_RESPONSE_CACHE="off", ARSEMBLE_SEMANTIC_CACHE_THRESHOLD="0",
+                   ARSEMBLE_CATALOG_WATCH="0", ARSEMBLE_WARM_GEMINI="0",
+                   ARSEMBLE_CATALOG_DELTAS=os.path.join(tmp, "deltas.jsonl"),
+                   ARSEMBLE_BENCH_DIR=tmp)
+        gunicorn = [sys.executable, "-m", "gunicorn", "-c", str(ROOT / "gunicorn_config.py"),
+                    "--pythonpath", str(ROOT), "--workers", str(args.workers), "server:app"]
+        uvicorn = [sys.executable, "-m", "uvicorn", "--app-dir", str(ROOT), "asgi:app",
+                   "--host", "127.0.0.1", "--port", "{port}", "--workers", str(args.workers),
+                   "--log-level", "warning", "--no-access-log"]
+        report = run_server("gunicorn+flask", gunicorn, env, levels)
+        report += run_server("uvicorn+asgi", uvicorn, env, levels)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Snapshot vs. SQLite catalog backend at growing catalog sizes.
+
+For each size a synthetic catalog (benchmarks/synth_catalog.py) is compiled
+into an in-memory snapshot and into a SQLite database in a temp dir. The same
+operations run against both through catalog_backend.pinned(); results are
+checked to be identical before timings are reported.
+
+Usage:
+    python benchmarks/catalog_backends.py [--sizes 1000 10000 100000] [--json out.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("ARSEMBLE_CATALOG_WATCH", "0")
+
+import ARsemble_ai as aria  # noqa: E402
+import catalog_backend  # noqa: E402
+import catalog_snapshot  # noqa: E402
+import catalog_sqlite  # noqa: E402
+from synth_catalog import generate_catalog  # noqa: E402
+
+OPERATIONS = {
+    "find_component": lambda b: [aria.find_component(q) for q in (
+        "ryzen 5 5600x", "rtx 3060 specs", "asus tuf gaming b550-plus", "corsair cx650")],
+    "extract_components": lambda b: [aria.extract_components_from_text(q) for q in (
+        "compare rtx 3060 and rtx 4060", "ryzen 5 5600x with asus tuf gaming b550-plus")],
+    "filter": lambda b: [b.filter(cat, **f) for cat, f in (
+        ("gpu", {"max_price": 15000, "min_vram": 8}),
+        ("cpu", {"socket": "am4", "min_cores": 6}),
+        ("motherboard", {"ram_type": "ddr5", "max_price": 12000}),
+        ("cpu_cooler", {"socket": "lga1700", "max_price": 3000}))],
+    "filter_top10": lambda b: [b.filter("gpu", sort="vram_gb", descending=True, limit=10,
+                                        max_price=30000)],
+    "price_sorted": lambda b: [b.price_sorted(c) for c in ("cpu", "gpu", "psu")],
+    "key_lookup": lambda b: [b.data["cpu"]["amd ryzen 5 5600x"], b.data["gpu"]["rtx 3060"]],
+}
+
+
+def comparable(result):
+    """Strip record dicts down to keys so both backends' output can be compared."""
+    if isinstance(result, list):
+        return [comparable(r) for r in result]
+    if isinstance(result, tuple):
+        return tuple(r if isinstance(r, (str, int, float, type(None))) else None for r in result)
+    return result
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            out = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), out
+
+
+def run_size(skus, repeat, tmpdir):
+    catalog = generate_catalog(skus)
+    t0 = time.perf_counter()
+    snap = catalog_snapshot.Snapshot(catalog_snapshot.compile_snapshot(catalog))
+    snap_build = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    db = catalog_sqlite.build_database(catalog, Path(tmpdir) / f"catalog_{skus}.db")
+    db_build = (time.perf_counter() - t0) * 1000
+    backends = {"snapshot": catalog_backend.SnapshotBackend(snap),
+                "sqlite": catalog_sqlite.SqliteBackend(db)}
+    row = {"skus": snap.record_count, "build_ms": {"snapshot": round(snap_build, 1),
+                                                    "sqlite": round(db_build, 1)},
+           "bytes": {"snapshot": len(snap._buf), "sqlite": db.stat().st_size}, "ops": {}}
+    for op, fn in OPERATIONS.items():
+        res = {}
+        outputs = {}
+        for name, backend in backends.items():
+            with catalog_backend.pinned(backend):
+                timed(lambda: fn(backend), 1)  # warm caches / connections
+                ms, out = timed(lambda: fn(backend), repeat)
+            res[name] = round(ms, 3)
+            outputs[name] = comparable(out)
+        if outputs["snapshot"] != outputs["sqlite"]:
+            raise AssertionError(f"backends disagree on {op} at {skus} SKUs")
+        row["ops"][op] = res
+        print(f"  {op:<20} snapshot {res['snapshot']:>9.2f} ms   sqlite {res['sqlite']:>9.2f} ms")
+    return row
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare catalog backends.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--json", help="write the results to this file")
+    args = ap.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    report = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for skus in args.sizes:
+            print(f"{skus} SKUs", flush=True)
+            row = run_size(skus, args.repeat, tmpdir)
+            print(f"  build: snapshot {row['build_ms']['snapshot']:.0f} ms "
+                  f"({row['bytes']['snapshot'] // 1024} KiB), sqlite {row['build_ms']['sqlite']:.0f} ms "
+                  f"({row['bytes']['sqlite'] // 1024} KiB)")
+            report.append(row)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Vectorized catalog filters vs. the Python-loop equivalent at large sizes.
+
+The real catalog is replicated (with jittered prices, cores and VRAM) up to
+--skus records, compiled into an in-memory snapshot, and each filter query
+runs both through catalog_columns (NumPy masks) and through a loop over
+data[cat].items() that parses fields per row, the way the handlers do.
+
+Usage:
+    python benchmarks/catalog_filters.py [--skus 100000] [--repeat 5] [--json out.json]
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import catalog_columns  # noqa: E402
+import catalog_snapshot  # noqa: E402
+from text_utils import parse_price  # noqa: E402
+
+QUERIES = [
+    ("gpu", {"max_price": 15000, "min_vram": 8}),
+    ("cpu", {"socket": "am4", "min_cores": 6}),
+    ("motherboard", {"ram_type": "ddr5", "max_price": 12000}),
+    ("ram", {"min_capacity": 16, "max_price": 4000}),
+    ("storage", {"min_capacity": 1000, "pcie": "3"}),
+]
+
+
+def scaled_catalog(n, seed=0):
+    """Replicate catalog/components.json to about n records."""
+    base, _ = catalog_snapshot.load_source()
+    rng = random.Random(seed)
+    total = sum(len(v) for v in base.values())
+    reps = max(1, n // total)
+    out = {cat: {} for cat in base}
+    for r in range(reps):
+        for cat, items in base.items():
+            for key, info in items.items():
+                rec = dict(info)
+                p = parse_price(rec.get("price"))
+                if p:
+                    rec["price"] = f"₱{int(p * rng.uniform(0.7, 1.3)):,}"
+                if "cores" in rec:
+                    c = rng.choice([4, 6, 8, 12, 16])
+                    rec["cores"] = f"{c} Cores / {c * 2} Threads"
+                if "vram" in rec and "GB" in rec["vram"]:
+                    rec["vram"] = f"{rng.choice([4, 6, 8, 12, 16])}GB GDDR6"
+                out[cat][f"{key} #{r}"] = rec
+    return out
+
+
+def loop_filter(data, cat, filters):
+    """What a handler would do without columns: parse every row on every query."""
+    out = []
+    for key, info in data[cat].items():
+        cols = catalog_columns
+        price = parse_price(info.get("price"))
+        if ("max_price" in filters or "min_price" in filters) and not price:
+            continue
+        if "max_price" in filters and price > filters["max_price"]:
+            continue
+        if "min_price" in filters and price < filters["min_price"]:
+            continue
+        if "min_vram" in filters and not cols.parse_vram_gb(info) >= filters["min_vram"]:
+            continue
+        if "min_cores" in filters and not cols.parse_cores(info) >= filters["min_cores"]:
+            continue
+        if "min_capacity" in filters and not cols.parse_capacity_gb(info) >= filters["min_capacity"]:
+            continue
+        if "socket" in filters and filters["socket"].upper() not in re.split(
+                r"[\s,/]+", cols.parse_socket(info)):
+            continue
+        if "ram_type" in filters and cols.parse_ram_type(info) != filters["ram_type"].upper():
+            continue
+        if "pcie" in filters and cols.parse_pcie(info) != filters["pcie"]:
+            continue
+        out.append((key, info, price))
+    out.sort(key=lambda x: x[2] if x[2] is not None else float("inf"))
+    return out
+
+
+def best_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, (time.perf_counter() - t0) * 1000)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Columnar vs loop catalog filters.")
+    ap.add_argument("--skus", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    catalog = scaled_catalog(args.skus)
+    t0 = time.perf_counter()
+    snap = catalog_snapshot.Snapshot(catalog_snapshot.compile_snapshot(catalog))
+    compile_ms = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    catalog_columns.get_columns(snap)
+    columns_ms = (time.perf_counter() - t0) * 1000
+
+    report = {"skus": snap.record_count, "numpy": catalog_columns._numpy() is not None,
+              "compile_ms": round(compile_ms, 1), "columns_build_ms": round(columns_ms, 1),
+              "queries": []}
+    print(f"{snap.record_count} SKUs  compile {compile_ms:.0f} ms  columns {columns_ms:.0f} ms  "
+          f"(numpy={'yes' if report['numpy'] else 'no'})")
+    print(f"{'query':<52} {'rows':>6} {'columns ms':>11} {'loop ms':>9} {'speedup':>8}")
+    for cat, filters in QUERIES:
+        col_ms, col = best_ms(lambda: catalog_columns.filter_components(snap, cat, **filters), args.repeat)
+        loop_ms, loop = best_ms(lambda: loop_filter(snap.data, cat, filters), max(1, args.repeat // 2))
+        assert [k for k, _, _ in col] == [k for k, _, _ in loop], f"mismatch for {cat} {filters}"
+        label = f"{cat} {filters}"
+        print(f"{label:<52} {len(col):>6} {col_ms:>11.2f} {loop_ms:>9.1f} {loop_ms / max(col_ms, 1e-6):>7.0f}x")
+        report["queries"].append({"category": cat, "filters": filters, "rows": len(col),
+                                  "columns_ms": round(col_ms, 3), "loop_ms": round(loop_ms, 2)})
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Per-worker catalog memory: bytes per SKU of the decoded records.
+
+For each size a synthetic catalog (benchmarks/synth_catalog.py) is compiled
+into an in-memory snapshot, then every record is materialized (as the
+filter columns and price lists do) while tracemalloc counts the Python
+allocations:
+
+  json      json.loads of the source (the old `data` literal / JSON load)
+  dict      one dict per record, every string decoded separately (what
+            CategoryView memoized before records became compact)
+  interned  dicts whose strings come from the snapshot's string cache
+  compact   CompactRecord: shared field layout + tuple of interned values,
+            including the string cache itself (what workers hold now)
+
+Usage:
+    python benchmarks/catalog_memory.py [--sizes 1000 10000 100000] [--json out.json]
+"""
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import catalog_snapshot  # noqa: E402
+from catalog_snapshot import FLD_FIELDS, REC_FIELDS, decode_value  # noqa: E402
+from synth_catalog import generate_catalog  # noqa: E402
+
+
+def traced(fn):
+    """(result, bytes still allocated by fn's result) under tracemalloc."""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.take_snapshot()
+    result = fn()
+    gc.collect()
+    grown = sum(s.size_diff for s in tracemalloc.take_snapshot().compare_to(base, "filename"))
+    tracemalloc.stop()
+    return result, grown
+
+
+def _decode(snap, sid):
+    return bytes(snap._strb[snap._stro[sid]:snap._stro[sid + 1]]).decode("utf-8")
+
+
+def plain_dicts(snap):
+    """Record dicts with a fresh string object per field (no string cache)."""
+    out = []
+    for rid in range(snap.record_count):
+        _, _, fstart, fcount = snap._recs[rid * REC_FIELDS:(rid + 1) * REC_FIELDS]
+        rec = {}
+        for f in range(fstart, fstart + fcount):
+            name_sid, value_sid, kind = snap._flds[f * FLD_FIELDS:(f + 1) * FLD_FIELDS]
+            rec[_decode(snap, name_sid)] = decode_value(_decode(snap, value_sid), kind)
+        out.append(rec)
+    return out
+
+
+def run_size(skus):
+    catalog = generate_catalog(skus)
+    raw = json.dumps(catalog, ensure_ascii=False).encode("utf-8")
+    buf = catalog_snapshot.compile_snapshot(catalog, raw)
+    del catalog
+    n = catalog_snapshot.Snapshot(buf).record_count
+    row = {"skus": n}
+
+    _, row["json"] = traced(lambda: json.loads(raw))
+    snap = catalog_snapshot.Snapshot(buf)
+    _, row["dict"] = traced(lambda: plain_dicts(snap))
+    snap = catalog_snapshot.Snapshot(buf)
+    _, row["interned"] = traced(lambda: [snap.record(r) for r in range(snap.record_count)])
+    # the string cache is allocated with the Snapshot, so count it too
+    _, row["compact"] = traced(lambda: (lambda s: (s, [s.compact_record(r) for r in range(s.record_count)]))(
+        catalog_snapshot.Snapshot(buf)))
+    for k in ("json", "dict", "interned", "compact"):
+        row[k] = round(row[k] / n)
+    print(f"  bytes/SKU  json {row['json']:>6}  dict {row['dict']:>6}  interned {row['interned']:>6}  "
+          f"compact {row['compact']:>6}  ({row['dict'] / row['compact']:.1f}x smaller than dict)",
+          flush=True)
+    return row
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bytes per SKU of the decoded catalog.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--json", help="write the results to this file")
+    args = ap.parse_args()
+    report = []
+    for skus in args.sizes:
+        print(f"{skus} SKUs", flush=True)
+        report.append(run_size(skus))
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+A kiosk-style price check: N questions as N sequential /chat round trips vs
+one /chat/batch request (in-process, through the Flask test client).
+
+Gemini runs on the fake backend with a fixed latency (--latency, default 1 s),
+the response and semantic caches are off, and the parts list mixes
+Gemini-bound questions (fields the catalog records lack, like a GPU's tdp)
+with local ones (fields they have, builds, lists) plus a few duplicates. Prints
+wall time and Gemini call count for both, and the batch's stats.
+
+Usage:
+    python benchmarks/chat_batch.py [--latency 1] [--repeat 1]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+PARTS = [
+    "tdp of rtx 3060",
+    "tdp of rtx 4060",
+    "socket of rtx 3060",
+    "efficiency of ryzen 5 5600x",
+    "interface of rtx 4060",
+    "speed of samsung 970 evo plus 1tb",
+    "price of rtx 3060",
+    "socket of intel core i5 13400",
+    "recommend a build for 50000",
+    "gpus under 20000",
+    "what is a psu",
+    "TDP of RTX 3060",
+    "price of rtx 3060",
+    "is ryzen 5 5600x compatible with b550",
+]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="N x /chat vs one /chat/batch.")
+    ap.add_argument("--latency", type=float, default=1.0, help="simulated Gemini latency (s)")
+    ap.add_argument("--repeat", type=int, default=1, help="copies of the parts list")
+    args = ap.parse_args()
+    os.environ.update(GEMINI_API_KEY="dummy", GEMINI_BACKEND="fake",
+                      FAKE_GEMINI_LATENCY=f"fixed:{args.latency}", GEMINI_LIMITER="0",
+                      ARSEMBLE_RESPONSE_CACHE="off", ARSEMBLE_SEMANTIC_CACHE_THRESHOLD="0",
+                      ARSEMBLE_CATALOG_WATCH="0")
+
+    import logging
+    logging.disable(logging.CRITICAL)
+    import ARsemble_ai
+    import server
+
+    client = server.app.test_client()
+    messages = PARTS * args.repeat
+    with contextlib.redirect_stdout(io.StringIO()):
+        client.post("/chat", json={"message": "list cpus"})  # warm the catalog
+        ARsemble_ai._gemini_calls.clear()
+        t0 = time.perf_counter()
+        single = [client.post("/chat", json={"message": m}).get_json() for m in messages]
+        single_s = time.perf_counter() - t0
+        single_calls = len(ARsemble_ai._gemini_calls)
+
+        ARsemble_ai._gemini_calls.clear()
+        t0 = time.perf_counter()
+        batch = client.post("/chat/batch", json={"messages": messages}).get_json()
+        batch_s = time.perf_counter() - t0
+        batch_calls = len(ARsemble_ai._gemini_calls)
+
+    same = all(s["response"] == b["response"] and s["recommendations"] == b["recommendations"]
+               for s, b in zip(single, batch["results"]))
+    print(f"{len(messages)} questions")
+    print(f"  /chat x{len(messages):<3}  {single_s:6.2f} s  gemini calls {single_calls}")
+    print(f"  /chat/batch   {batch_s:6.2f} s  gemini calls {batch_calls}  {batch['stats']}")
+    print(f"  same answers: {same}")
+
+
+if __name__ == "__main__":
+    main()
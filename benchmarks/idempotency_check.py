@@ -0,0 +1,147 @@
+"""
+Check that duplicate requests are computed once.
+
+1. In one process: N threads POST the same /chat (and /recommend) request,
+   with the same Idempotency-Key, at the same time through the Flask app.
+2. On the event loop (asgi.py): N concurrent /chat calls into the ASGI app.
+3. Across workers: two processes (as two gunicorn workers would) send the same
+   request id at the same moment, sharing one response-cache database.
+
+Each part counts how often the handler actually ran; it must be exactly once,
+and every duplicate must get the same body. Gemini runs on the fake backend
+with a fixed latency so the duplicates really overlap. Exits 1 on failure.
+
+Usage:
+    python benchmarks/idempotency_check.py [--threads 8]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("GEMINI_BACKEND", "fake")
+os.environ.setdefault("FAKE_GEMINI_LATENCY", "fixed:0.5")
+os.environ.setdefault("GEMINI_LIMITER", "0")
+os.environ.setdefault("ARSEMBLE_CATALOG_WATCH", "0")
+if "ARSEMBLE_RESPONSE_CACHE_DB" not in os.environ:
+    os.environ["ARSEMBLE_RESPONSE_CACHE_DB"] = os.path.join(
+        tempfile.mkdtemp(prefix="arsemble-idem-"), "responses.db")
+
+import logging  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+import ARsemble_ai as aria  # noqa: E402
+import server  # noqa: E402
+
+import asgi  # noqa: E402
+
+calls = {"chat": 0, "recommend": 0, "asgi": 0}
+_calls_lock = threading.Lock()
+
+
+def counted(name, fn):
+    def wrapper(*args, **kwargs):
+        with _calls_lock:
+            calls[name] += 1
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+aria._answer_query = counted("chat", aria._answer_query)
+aria._answer_query_async = counted("asgi", aria._answer_query_async)
+server.generate_quick_recommendations = counted("recommend", server.generate_quick_recommendations)
+
+
+def fire(path, message, rid, threads, at=None):
+    """POST the same request from `threads` threads at once; returns the bodies."""
+    start = threading.Barrier(threads)
+
+    def one(_):
+        client = server.app.test_client()
+        start.wait()
+        if at:
+            time.sleep(max(0.0, at - time.time()))
+        res = client.post(path, json={"message": message}, headers={"Idempotency-Key": rid})
+        return res.status_code, res.get_json()
+
+    with ThreadPoolExecutor(max_workers=threads) as pool, contextlib.redirect_stdout(io.StringIO()):
+        return list(pool.map(one, range(threads)))
+
+
+def fire_asgi(message, rid, n):
+    """n concurrent POST /chat calls into asgi.app; returns the (status, body) pairs."""
+    async def one():
+        sent = []
+        body = json.dumps({"message": message}).encode("utf-8")
+        scope = {"type": "http", "method": "POST", "path": "/chat",
+                 "headers": [(b"idempotency-key", rid.encode("ascii"))]}
+
+        async def receive():
+            return {"type": "http.request", "body": body}
+
+        async def send(msg):
+            sent.append(msg)
+
+        await asgi.app(scope, receive, send)
+        return sent[0]["status"], json.loads(sent[1]["body"])
+
+    async def run():
+        return await asyncio.gather(*(one() for _ in range(n)))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return asyncio.run(run())
+
+
+def check(name, results, ran):
+    ok = ran == 1 and all(r == results[0] for r in results) and results[0][0] == 200
+    print(f"{'ok  ' if ok else 'FAIL'} {name}: {len(results)} duplicates, computed {ran}x")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Duplicate requests must compute once.")
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--worker", help=argparse.SUPPRESS)  # request id (child process mode)
+    ap.add_argument("--at", type=float, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        results = fire("/chat", "tell me about ryzen 5 5600x", args.worker, 4, at=args.at)
+        print(json.dumps({"computed": calls["chat"], "results": results}))
+        return
+
+    ok = check("/chat, one process",
+               fire("/chat", "tell me about rtx 3060", str(uuid.uuid4()), args.threads),
+               calls["chat"])
+    ok &= check("/recommend, one process",
+                fire("/recommend", "tell me about rtx 3060", str(uuid.uuid4()), args.threads),
+                calls["recommend"])
+
+    ok &= check("/chat, asgi", fire_asgi("tell me about rx 6600", str(uuid.uuid4()), args.threads),
+                calls["asgi"])
+
+    rid, at = str(uuid.uuid4()), time.time() + 3  # both children start after their imports
+    procs = [subprocess.Popen([sys.executable, __file__, "--worker", rid, "--at", str(at)],
+                              stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+             for _ in range(2)]
+    outs = [json.loads(p.communicate(timeout=120)[0].strip().splitlines()[-1]) for p in procs]
+    ok &= check("/chat, two workers", [r for o in outs for r in o["results"]],
+                sum(o["computed"] for o in outs))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
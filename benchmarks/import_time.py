@@ -0,0 +1,121 @@
+"""
+Import-time benchmark built on `python -X importtime`.
+
+Runs a fresh interpreter per sample, parses the importtime trace and reports
+the median cumulative import cost of each target module plus its heaviest
+dependencies. With --record the result is appended to a JSON-lines history
+(one line per run, tagged with the git revision / --label), so startup cost
+can be compared release to release with --history.
+
+Usage:
+    python benchmarks/import_time.py                       # ARsemble_ai + server
+    python benchmarks/import_time.py --record --label v1.4
+    python benchmarks/import_time.py --history
+"""
+import argparse
+import datetime
+import json
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HISTORY = ROOT / "benchmarks" / "results" / "import_time.jsonl"
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def sample(module):
+    """
+    One cold import of `module`. Returns {name: cumulative_us} for `module` and
+    the modules imported underneath it (interpreter start-up imports excluded).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []  # (name, cumulative_us, depth) in trace order: children before parents
+    for line in proc.stderr.splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(2)), len(m.group(3))))
+    idx = max(i for i, r in enumerate(rows) if r[0] == module)
+    depth = rows[idx][2]
+    out = {module: rows[idx][1]}
+    i = idx - 1
+    while i >= 0 and rows[i][2] > depth:
+        out.setdefault(rows[i][0], rows[i][1])
+        i -= 1
+    return out
+
+
+def measure(module, runs, top):
+    samples = [sample(module) for _ in range(runs)]
+    total = statistics.median(s[module] for s in samples)
+    names = set().union(*samples)
+    cum = {n: statistics.median(s.get(n, 0) for s in samples) for n in names}
+    heaviest = sorted(((n, c) for n, c in cum.items() if n != module and "." not in n),
+                      key=lambda x: -x[1])[:top]
+    return {"module": module, "total_ms": round(total / 1000, 1),
+            "modules_imported": round(statistics.median(len(s) for s in samples)),
+            "heaviest": [{"module": n, "ms": round(c / 1000, 1)} for n, c in heaviest]}
+
+
+def git_rev():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def show_history():
+    if not HISTORY.exists():
+        print("no history yet (run with --record)")
+        return
+    rows = [json.loads(l) for l in HISTORY.read_text().splitlines() if l.strip()]
+    prev = {}
+    for r in rows:
+        cells = []
+        for res in r["results"]:
+            delta = ""
+            if res["module"] in prev:
+                delta = f" ({res['total_ms'] - prev[res['module']]:+.1f})"
+            cells.append(f"{res['module']}={res['total_ms']}ms{delta}")
+            prev[res["module"]] = res["total_ms"]
+        print(f"{r['date']}  {r.get('label') or r.get('rev') or '-':14}  " + "  ".join(cells))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Track module import (cold start) cost.")
+    ap.add_argument("modules", nargs="*", default=["ARsemble_ai", "server"])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=8)
+    ap.add_argument("--record", action="store_true", help="append to the history file")
+    ap.add_argument("--label", help="release label stored with --record")
+    ap.add_argument("--history", action="store_true", help="print recorded history")
+    args = ap.parse_args()
+
+    if args.history:
+        show_history()
+        return
+
+    results = [measure(m, args.runs, args.top) for m in args.modules]
+    for r in results:
+        print(f"{r['module']}: {r['total_ms']} ms cumulative, {r['modules_imported']} modules")
+        for h in r["heaviest"]:
+            print(f"    {h['module']:28} {h['ms']:8.1f} ms")
+    if args.record:
+        HISTORY.parent.mkdir(parents=True, exist_ok=True)
+        entry = {"date": datetime.datetime.now().isoformat(timespec="seconds"),
+                 "rev": git_rev(), "label": args.label, "python": sys.version.split()[0],
+                 "runs": args.runs, "results": results}
+        with HISTORY.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        print(f"recorded -> {HISTORY.relative_to(ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Open-loop load test for /chat: replays a weighted corpus of query shapes at
+fixed arrival rates and reports throughput and p50/p95/p99 latency per intent.
+
+Requests are sent on a schedule (Poisson or evenly spaced arrivals at
+--rates req/s for --duration s each), whether or not earlier ones have
+finished, the way independent users arrive. Latency is measured from the
+scheduled send time, so time spent waiting for a free client thread counts
+too and a saturated server cannot hide behind a slow client (no coordinated
+omission). A step is "saturated" when the completed rate falls below 90% of
+the offered rate, more than 1% of requests fail, or p99 exceeds --slo-ms.
+
+The corpus mixes specs, price, compare, PSU, build (with budgets) and
+education questions over real catalog parts, drawn with a fixed seed so a
+run is repeatable. --corpus replaces it with a JSON-lines file of
+{"intent": ..., "message": ..., "weight": 1} rows.
+
+Target either a running server (--url; start it with the fake backend,
+GEMINI_BACKEND=fake FAKE_GEMINI_LATENCY=..., to measure the app rather
+than Gemini) or let the script start gunicorn itself for each workers x
+threads setting in --serve, with the fake backend, the response and
+semantic caches off and the rate limiter off, so every request does the
+full work:
+
+    python benchmarks/loadtest.py --url http://127.0.0.1:10000 --rates 5,10,20 --duration 30
+    python benchmarks/loadtest.py --serve 2x4 2x8 4x4 --rates 4,8,16,32,64 --latency lognormal:-0.7,0.5
+    python benchmarks/loadtest.py --serve 2x4 --json loadtest.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SLOTS = {
+    "cpu": ["ryzen 5 5600x", "ryzen 7 5700x", "ryzen 5 7600", "ryzen 9 7900x",
+            "intel core i5 13400", "ryzen 5 5600g"],
+    "gpu": ["rtx 3050", "rtx 3060", "rtx 4060", "gtx 750 ti"],
+    "board": ["asus tuf gaming b550-plus", "asus prime b650-plus", "msi pro h610m s ddr4",
+              "msi b450m-a pro max ii"],
+    "ram": ["kingston fury beast ddr4 16gb", "kingston fury beast ddr5 16gb",
+            "corsair vengeance ddr5 32gb"],
+    "budget": ["20k", "25k", "₱30,000", "35000", "40k", "₱50k", "70k"],
+}
+
+# intent: (weight, templates); {cpu2} / {gpu2} are a different part than {cpu} / {gpu}
+CORPUS = {
+    "specs": (30, ["{cpu} specs", "tell me about the {gpu}", "how many cores does the {cpu} have",
+                   "vram of {gpu}", "{board} specs", "tdp of {cpu}"]),
+    "price": (20, ["price of {gpu}", "how much is the {cpu}", "{ram} price", "how much is {board}"]),
+    "compare": (12, ["compare {gpu} vs {gpu2}", "{cpu} vs {cpu2}", "compare {cpu} and {cpu2}"]),
+    "psu": (10, ["what psu for {cpu} and {gpu}", "psu for {gpu} and {cpu}",
+                 "power supply for {gpu}"]),
+    "build": (18, ["build a pc for {budget}", "recommend a gaming build under {budget}",
+                   "{budget} budget build"]),
+    "education": (10, ["what is pcie", "which gpus use pcie 4.0", "explain ddr4 vs ddr5",
+                       "what is a chipset"]),
+}
+
+
+class Corpus:
+    """Weighted (intent, message) sampler."""
+
+    def __init__(self, rows):
+        self.rows = rows  # (intent, weight, templates)
+        self.cum = []
+        total = 0
+        for _, weight, _ in rows:
+            total += weight
+            self.cum.append(total)
+
+    @classmethod
+    def builtin(cls):
+        return cls([(intent, w, t) for intent, (w, t) in CORPUS.items()])
+
+    @classmethod
+    def load(cls, path):
+        rows = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    rows.append((row.get("intent", "other"), float(row.get("weight", 1)),
+                                 [row["message"]]))
+        return cls(rows)
+
+    def intents(self):
+        return sorted({intent for intent, _, _ in self.rows})
+
+    def sample(self, rng):
+        x = rng.random() * self.cum[-1]
+        intent, _, templates = self.rows[next(i for i, c in enumerate(self.cum) if c > x)]
+        return intent, fill(rng.choice(templates), rng)
+
+
+def fill(template, rng):
+    values = {}
+    for slot, choices in SLOTS.items():
+        first, second = rng.sample(choices, 2)
+        values[slot], values[slot + "2"] = first, second
+    return template.format(**values)
+
+
+def arrivals(rate, duration, rng, kind):
+    """Send offsets (s) for one step: Poisson (exponential gaps) or evenly spaced."""
+    out, t = [], 0.0
+    while True:
+        t += rng.expovariate(rate) if kind == "poisson" else 1.0 / rate
+        if t >= duration:
+            return out
+        out.append(t)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def post_chat(url, message, timeout):
+    """None on success, else a short error label."""
+    req = urllib.request.Request(url, data=json.dumps({"message": message}).encode("utf-8"),
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            body = json.loads(r.read())
+        return None if body.get("response") else "empty"
+    except urllib.error.HTTPError as e:
+        return f"http {e.code}"
+    except (socket.timeout, TimeoutError):
+        return "timeout"
+    except (OSError, ValueError) as e:
+        return type(e).__name__
+
+
+def run_step(url, rate, args, corpus, rng):
+    """Send one step's schedule; returns (results, wall seconds, max client lag)."""
+    plan = [(at,) + corpus.sample(rng) for at in arrivals(rate, args.duration, rng, args.arrivals)]
+    results = []  # (intent, latency s, error)
+    lock = threading.Lock()
+    lag = [0.0]
+
+    def send(scheduled, intent, message):
+        error = post_chat(url, message, args.timeout)
+        latency = time.perf_counter() - scheduled
+        with lock:
+            results.append((intent, latency, error))
+
+    pool = ThreadPoolExecutor(max_workers=args.max_inflight)
+    t0 = time.perf_counter() + 0.05
+    for at, intent, message in plan:
+        delay = t0 + at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            lag[0] = max(lag[0], -delay)
+        pool.submit(send, t0 + at, intent, message)
+    pool.shutdown(wait=True)
+    return results, time.perf_counter() - t0, lag[0]
+
+
+def summarize(results, wall, rate, args):
+    def stats(rows):
+        lat = sorted(r[1] * 1000 for r in rows if r[2] is None)
+        return {"n": len(rows), "ok": len(lat), "errors": len(rows) - len(lat),
+                "p50_ms": round(percentile(lat, 0.50), 1), "p95_ms": round(percentile(lat, 0.95), 1),
+                "p99_ms": round(percentile(lat, 0.99), 1),
+                "max_ms": round(lat[-1], 1) if lat else float("nan")}
+
+    overall = stats(results)
+    errors = {}
+    for _, _, error in results:
+        if error:
+            errors[error] = errors.get(error, 0) + 1
+    step = {"offered_rps": rate, "sent": len(results),
+            "sent_rps": round(len(results) / args.duration, 2), "wall_s": round(wall, 2),
+            "throughput_rps": round(overall["ok"] / wall, 2) if wall else 0.0,
+            "all": overall, "errors": errors,
+            "intents": {intent: stats([r for r in results if r[0] == intent])
+                        for intent in sorted({r[0] for r in results})}}
+    reasons = []
+    if results and step["throughput_rps"] < 0.9 * step["sent_rps"]:
+        reasons.append("throughput < 90% of offered")
+    if results and overall["errors"] > 0.01 * len(results):
+        reasons.append(f"{overall['errors']} errors")
+    if args.slo_ms and overall["p99_ms"] > args.slo_ms:
+        reasons.append(f"p99 > {args.slo_ms:g} ms")
+    step["saturated"] = reasons
+    return step
+
+
+def print_step(step, lag):
+    print(f"\n  offered {step['offered_rps']:g} req/s: sent {step['sent']} ({step['sent_rps']} req/s), "
+          f"completed {step['all']['ok']} in {step['wall_s']} s -> {step['throughput_rps']} req/s"
+          + (f", errors {step['errors']}" if step["errors"] else "")
+          + (f"  (client fell {lag * 1000:.0f} ms behind schedule)" if lag > 0.05 else ""))
+    print(f"    {'intent':<11}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, s in list(step["intents"].items()) + [("ALL", step["all"])]:
+        print(f"    {name:<11}{s['n']:>6}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}"
+              f"{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}")
+    if step["saturated"]:
+        print(f"    SATURATED: {', '.join(step['saturated'])}")
+
+
+def sweep(url, label, args, corpus):
+    print(f"\n== {label}: {url}", flush=True)
+    rng = random.Random(args.seed)
+    warm = ThreadPoolExecutor(max_workers=8)
+    list(warm.map(lambda _: post_chat(url, corpus.sample(rng)[1], args.timeout), range(16)))
+    warm.shutdown()
+
+    steps, sustained = [], None
+    for rate in args.rates:
+        results, wall, lag = run_step(url, rate, args, corpus, rng)
+        step = summarize(results, wall, rate, args)
+        step["target"] = label
+        steps.append(step)
+        print_step(step, lag)
+        if step["saturated"]:
+            if not args.keep_going:
+                break
+        else:
+            sustained = rate
+    first_bad = next((s["offered_rps"] for s in steps if s["saturated"]), None)
+    print(f"\n  {label}: sustained up to {sustained if sustained is not None else '-'} req/s"
+          + (f", saturated at {first_bad:g} req/s" if first_bad is not None else ""), flush=True)
+    return steps
+
+
+# --- a gunicorn server per workers x threads setting --------------------------------
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(proc, port, timeout=180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=5):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError("server did not come up")
+
+
+def serve_and_sweep(setting, args, corpus):
+    workers, threads = (int(x) for x in setting.lower().split("x"))
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, GEMINI_API_KEY="dummy", GEMINI_BACKEND="fake",
+                   FAKE_GEMINI_LATENCY=args.latency, GEMINI_LIMITER="0",
+                   ARSEMBLE_RESPONSE_CACHE="off", ARSEMBLE_SEMANTIC_CACHE_THRESHOLD="0",
+                   ARSEMBLE_CATALOG_WATCH="0", ARSEMBLE_WARM_GEMINI="0",
+                   ARSEMBLE_CATALOG_DELTAS=os.path.join(tmp, "deltas.jsonl"),
+                   ARSEMBLE_LOG_LEVEL="WARNING", PORT=str(port))
+        cmd = [sys.executable, "-m", "gunicorn", "-c", str(ROOT / "gunicorn_config.py"),
+               "--pythonpath", str(ROOT), "--bind", f"127.0.0.1:{port}",
+               "--workers", str(workers), "--threads", str(threads),
+               "--access-logfile", "/dev/null", "server:app"]
+        proc = subprocess.Popen(cmd, env=env, cwd=tmp,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_ready(proc, port)
+            return sweep(f"http://127.0.0.1:{port}/chat", f"gunicorn {workers}x{threads}", args, corpus)
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Open-loop /chat load test with per-intent percentiles.")
+    target = ap.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base URL of a running server (or its /chat URL)")
+    target.add_argument("--serve", nargs="+", metavar="WxT",
+                        help="start gunicorn with W workers x T threads for each setting")
+    ap.add_argument("--rates", default="2,4,8,16,32", help="offered req/s, one step each")
+    ap.add_argument("--duration", type=float, default=20, help="seconds per step")
+    ap.add_argument("--arrivals", choices=("poisson", "uniform"), default="poisson")
+    ap.add_argument("--corpus", help="JSON-lines corpus instead of the built-in one")
+    ap.add_argument("--latency", default="lognormal:-0.7,0.5",
+                    help="FAKE_GEMINI_LATENCY for --serve (default median ~0.5 s)")
+    ap.add_argument("--timeout", type=float, default=60, help="per-request timeout (s)")
+    ap.add_argument("--max-inflight", type=int, default=512, help="client threads")
+    ap.add_argument("--slo-ms", type=float, default=0, help="p99 above this marks a step saturated")
+    ap.add_argument("--keep-going", action="store_true", help="run every rate even after saturation")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", help="write the steps to this file")
+    args = ap.parse_args()
+    args.rates = [float(x) for x in args.rates.split(",") if x.strip()]
+    corpus = Corpus.load(args.corpus) if args.corpus else Corpus.builtin()
+
+    print(f"corpus intents: {', '.join(corpus.intents())}; {args.arrivals} arrivals, "
+          f"{args.duration:g} s per step")
+    if args.url:
+        url = args.url.rstrip("/")
+        url = url if url.endswith("/chat") else url + "/chat"
+        report = sweep(url, "server", args, corpus)
+    else:
+        print(f"fake Gemini latency {args.latency}")
+        report = []
+        for setting in args.serve:
+            report += serve_and_sweep(setting, args, corpus)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Caller-side cost of a log record: a synchronous StreamHandler (the old setup)
+vs the queue + background writer of log_config.py, with N threads logging at
+once. Both write to a temp file standing in for stderr; --sink-us adds a
+delay per write, as when stderr is a pipe to a busy collector or terminal.
+What is measured is how long the logging call blocks the caller.
+
+With a fast sink the two are close (the queue saves the write but adds a
+hand-off, and the writer thread competes for the GIL); with a slow one every
+thread queues behind the handler's lock, which the background writer takes
+off the request path.
+
+Usage:
+    python benchmarks/logging_overhead.py [--threads 8] [--records 2000] [--sink-us 0 200]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+class SlowSink:
+    def __init__(self, f, delay):
+        self.f, self.delay = f, delay
+
+    def write(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        return self.f.write(text)
+
+    def flush(self):
+        self.f.flush()
+
+
+def hammer(logger, threads, records):
+    """Wall time (s) and mean caller-side us per record with `threads` threads logging."""
+    barrier = threading.Barrier(threads + 1)
+    spent = []
+
+    def work():
+        barrier.wait()
+        t0 = time.perf_counter()
+        for i in range(records):
+            logger.info("handle_query: detected intent=%s for q=%s", "build", f"query {i}")
+        spent.append(time.perf_counter() - t0)
+
+    pool = [threading.Thread(target=work) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - t0, sum(spent) / (threads * records) * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Logging cost on the calling threads.")
+    ap.add_argument("--threads", type=int, default=8)
+    ap.add_argument("--records", type=int, default=2000)
+    ap.add_argument("--sink-us", type=float, nargs="+", default=[0, 200],
+                    help="delay per write to the sink (microseconds)")
+    args = ap.parse_args()
+    os.environ.setdefault("ARSEMBLE_LOG_QUEUE", str(args.threads * args.records))
+    import log_config
+
+    print(f"{args.threads} threads x {args.records} records, caller-side us per record")
+    with tempfile.TemporaryFile("w") as f:
+        for delay in args.sink_us:
+            sink = SlowSink(f, delay / 1e6)
+            sync = logging.getLogger(f"bench.sync.{delay}")
+            sync.propagate = False
+            handler = logging.StreamHandler(sink)
+            handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+            sync.addHandler(handler)
+            sync.setLevel(logging.INFO)
+            _, sync_us = hammer(sync, args.threads, args.records)
+
+            sys.stderr, real_stderr = sink, sys.stderr  # the listener's StreamHandler picks it up
+            log_config._handler = None
+            logging.getLogger(log_config.ROOT).handlers.clear()
+            logger = log_config.get_logger("bench")
+            sys.stderr = real_stderr
+            _, queue_us = hammer(logger, args.threads, args.records)
+            t0 = time.perf_counter()
+            log_config._handler.stop()  # drain
+            print(f"  sink {delay:5.0f} us/write: StreamHandler {sync_us:8.1f}   log_config {queue_us:6.1f}"
+                  f"   (writer drained the rest in {time.perf_counter() - t0:.2f} s, "
+                  f"{log_config.dropped} dropped)")
+
+
+if __name__ == "__main__":
+    main()
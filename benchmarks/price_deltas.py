@@ -0,0 +1,131 @@
+"""
+Price-delta apply latency vs. a full catalog rebuild.
+
+For each size a synthetic catalog (benchmarks/synth_catalog.py) is compiled
+into an in-memory snapshot with its price lists, filter columns and a
+budget -> build table warm. Random price/stock deltas are then applied one
+at a time through catalog_deltas.apply_delta, which patches the indexes and
+drops the affected build-table entries. The report has per-delta latency
+(p50 / p95 / max), the share of build-table entries that survived each
+delta, and the cost of the alternative: recompiling the snapshot and its
+columns. At the end the patched indexes are checked against a snapshot
+compiled from the patched catalog.
+
+Usage:
+    python benchmarks/price_deltas.py [--sizes 1000 10000 100000] [--deltas 500]
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("GEMINI_BACKEND", "fake")
+os.environ.setdefault("GEMINI_LIMITER", "0")
+os.environ.setdefault("ARSEMBLE_CATALOG_WATCH", "0")
+
+import ARsemble_ai as aria  # noqa: E402
+import catalog_backend  # noqa: E402
+import catalog_columns  # noqa: E402
+import catalog_deltas  # noqa: E402
+import catalog_manager  # noqa: E402
+import catalog_snapshot  # noqa: E402
+from synth_catalog import generate_catalog  # noqa: E402
+
+BUDGETS = range(20000, 200001, 10000)
+
+
+def compile_all(catalog):
+    snap = catalog_snapshot.Snapshot(catalog_snapshot.compile_snapshot(catalog))
+    catalog_columns.get_columns(snap)
+    backend = catalog_backend._snapshot_backend(snap)
+    for cat in snap.categories:
+        backend.price_sorted(cat)
+    return snap, backend
+
+
+def fill_build_table(snap):
+    with catalog_manager.pinned(snap), contextlib.redirect_stdout(io.StringIO()):
+        for b in BUDGETS:
+            aria.assemble_build_for_budget(b)
+
+
+def run_size(skus, n_deltas, seed):
+    rng = random.Random(seed)
+    catalog = generate_catalog(skus, seed)
+    t0 = time.perf_counter()
+    snap, backend = compile_all(catalog)
+    rebuild_ms = (time.perf_counter() - t0) * 1000
+
+    skus_list = [(cat, key) for cat, items in catalog.items() for key in items]
+    fill_build_table(snap)
+    times, kept = [], []
+    for _ in range(n_deltas):
+        cat, key = rng.choice(skus_list)
+        if rng.random() < 0.1:
+            delta = {"category": cat, "key": key, "stock": rng.choice([0, 5])}
+        else:  # supplier repricing: within 10% of the current price
+            base = aria.parse_price(catalog[cat][key].get("price")) or 1000
+            delta = {"category": cat, "key": key,
+                     "price": max(100, int(base * rng.uniform(0.9, 1.1)) // 10 * 10)}
+        before = len(aria._build_table)
+        with catalog_manager.pinned(snap):
+            res = catalog_deltas.apply_delta(catalog_deltas.parse_delta(delta), backend)
+        times.append(res["apply_ms"])
+        kept.append(len(aria._build_table) / before if before else 1.0)
+        fill_build_table(snap)  # refill what was dropped (not timed)
+        info = catalog[cat][key]
+        catalog[cat][key] = catalog_backend.patch_record(info, delta.get("price"), delta.get("stock"))
+
+    # the patched indexes must match a snapshot compiled from the patched catalog
+    fresh, fresh_backend = compile_all(catalog)
+    for cat in snap.categories:
+        got = [(k, p) for k, _, p in backend.price_sorted(cat)]
+        want = [(k, p) for k, _, p in fresh_backend.price_sorted(cat)]
+        assert got == want, f"price list mismatch in {cat} at {skus} SKUs"
+        got = [(k, p) for k, _, p in backend.filter(cat, max_price=30000)]
+        want = [(k, p) for k, _, p in fresh_backend.filter(cat, max_price=30000)]
+        assert got == want, f"filter mismatch in {cat} at {skus} SKUs"
+
+    times.sort()
+    row = {"skus": snap.record_count, "deltas": n_deltas,
+           "p50_apply_ms": round(statistics.median(times), 3),
+           "p95_apply_ms": times[min(len(times) - 1, int(len(times) * 0.95))],
+           "max_apply_ms": times[-1],
+           "build_entries_kept": round(statistics.fmean(kept), 3),
+           "full_rebuild_ms": round(rebuild_ms, 1)}
+    print(f"  apply p50 {row['p50_apply_ms']:.3f} ms  p95 {row['p95_apply_ms']:.3f} ms  "
+          f"max {row['max_apply_ms']:.3f} ms  | build table kept {row['build_entries_kept']:.0%}"
+          f"  | full rebuild {row['full_rebuild_ms']:.0f} ms", flush=True)
+    return row
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Price-delta apply latency.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--deltas", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="write the results to this file")
+    args = ap.parse_args()
+    logging.disable(logging.CRITICAL)
+    # keep the run away from the real delta log
+    catalog_deltas.DELTA_PATH = Path(os.devnull)
+
+    report = []
+    for skus in args.sizes:
+        print(f"{skus} SKUs", flush=True)
+        report.append(run_size(skus, args.deltas, args.seed))
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Cost of the request profiler (profiler.py) on local /chat work.
+
+Runs a mix of local queries through handle_query (response cache off, no
+Gemini) with profiling off, with the stack sampler on every request (a
+threshold no request reaches, so nothing is written) and with cProfile on
+every request (ARSEMBLE_PROFILE_RATE=1, dumps suppressed). The production
+cost at a sample rate r is about sampler + r x cProfile.
+
+Usage:
+    python benchmarks/profiler_overhead.py [--rounds 20] [--hz 100]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("GEMINI_API_KEY", "")
+os.environ.setdefault("ARSEMBLE_CATALOG_WATCH", "0")
+os.environ["ARSEMBLE_RESPONSE_CACHE"] = "off"
+
+import profiler  # noqa: E402
+
+QUERIES = ["recommend a build for 50000", "gpus under 20000", "tell me about rtx 3060",
+           "is ryzen 5 5600x compatible with b550", "what is a psu", "build for 80000 gaming"]
+
+
+def run(handle_query, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for q in QUERIES:
+            handle_query(q)
+    return (time.perf_counter() - t0) / (rounds * len(QUERIES)) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Overhead of the request profiler.")
+    ap.add_argument("--rounds", type=int, default=20)
+    ap.add_argument("--hz", type=float, default=100)
+    args = ap.parse_args()
+
+    import logging
+    logging.disable(logging.CRITICAL)
+    import ARsemble_ai
+    import catalog_manager
+
+    profiler.HZ = args.hz
+    profiler.MAX_PER_MIN = 0  # measure the profiling, not the disk
+    modes = [("off", 0, 0), (f"sampler {args.hz:g} Hz", 0, 1e9), ("cProfile", 1, 0)]
+    with contextlib.redirect_stdout(io.StringIO()), catalog_manager.pinned():
+        run(ARsemble_ai.handle_query, 2)  # warm indexes
+        results = []
+        for name, rate, slow in modes:
+            profiler.RATE, profiler.SLOW_MS = rate, slow
+            results.append((name, min(run(ARsemble_ai.handle_query, args.rounds) for _ in range(3))))
+    base = results[0][1]
+    print(f"{'mode':<16} {'ms/request':>10} {'overhead':>9}")
+    for name, ms in results:
+        print(f"{name:<16} {ms:10.3f} {(ms / base - 1) * 100:8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Compare Gemini input tokens per request: legacy prompt (indent=2 JSON + inline
+rule block) vs. the slim prompt from build_gemini_prompt() + system instruction.
+
+Usage:
+    python benchmarks/prompt_tokens.py            # estimated tokens (~4 chars/token)
+    python benchmarks/prompt_tokens.py --live     # exact counts via client.models.count_tokens
+    python benchmarks/prompt_tokens.py --json out.json
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ARsemble_ai as aria  # noqa: E402
+
+QUERY_CORPUS = [
+    "tell me about rtx 3060",
+    "what is the price of ryzen 5 5600x",
+    "ryzen 5 5600x tdp?",
+    "how many cores does the ryzen 7 5700x have",
+    "what socket does the b550 use",
+    "rtx 4060 vram",
+    "gtx 750 ti power and price",
+    "specs of the intel core i5 12400f",
+    "what is the ram type of asus prime b450m",
+    "capacity of the samsung 980",
+    "corsair cv550 efficiency",
+    "details of deepcool ls720 se 360",
+]
+
+
+def legacy_prompt(user_query, found_data):
+    """The prompt ask_gemini sent before the slim builder (kept here for comparison)."""
+    context = json.dumps(found_data or {}, indent=2, ensure_ascii=False, default=dict)
+    keywords = [
+        "socket", "price", "tdp", "power", "clock", "speed", "cores",
+        "threads", "igpu", "graphics", "compatibility", "ram type",
+        "form factor", "wattage", "efficiency", "capacity", "interface", "vram"
+    ]
+    matched_keywords = [kw for kw in keywords if kw in (user_query or "").lower()]
+    if matched_keywords:
+        focus = ", ".join(matched_keywords)
+        query_mode = (f"The user only wants information about: {focus}.\n"
+                      "Check the provided JSON and extract the exact value(s) for those attributes.\n"
+                      "If a key exists, return only its value(s).\n"
+                      "If a key doesn't exist, respond exactly: \"This information is missing in the local database.\"")
+    else:
+        query_mode = "The user wants full details about the component. Provide full structured specs."
+    system_header = (
+        "You are ARIA, a helpful PC component assistant. ONLY use the JSON data provided below. "
+        "Do not invent or guess values. If a requested key is missing, respond exactly: "
+        "\"This information is missing in the local database.\""
+    )
+    return f"""{system_header}
+
+Available Data:
+{context}
+
+User Question: {user_query}
+
+Instructions:
+{query_mode}
+
+Rules:
+- Respond ONCE only.
+- Do NOT repeat sentences or duplicate lines.
+- Do NOT use Markdown syntax (no #, **, ``` etc.).
+- Use short, simple bullet formatting (use '•' or '-' for bullets).
+- If returning full details, use this structure:
+
+Component Name
+Key Specs:
+• Spec: Value
+Price:
+• ₱value
+Compatibility:
+• description
+Summary:
+• short friendly explanation
+
+If returning specific detail(s), return:
+
+Component Name
+• Requested Detail: Value
+
+End response.
+"""
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--live", action="store_true",
+                    help="count tokens with the Gemini API instead of estimating")
+    ap.add_argument("--json", help="write the per-query report to this file")
+    args = ap.parse_args()
+
+    client = aria.get_client() if args.live else None
+    if args.live and client is None:
+        sys.exit("--live needs GEMINI_API_KEY (Gemini client unavailable)")
+    count = ((lambda text: client.models.count_tokens(
+        model=aria.GEMINI_MODEL, contents=text).total_tokens)
+        if client is not None else aria.estimate_tokens)
+
+    system_tokens = count(aria.GEMINI_SYSTEM_INSTRUCTION)
+    rows = []
+    for q in QUERY_CORPUS:
+        matches = aria.find_component(q)
+        if not matches:
+            continue
+        cat, info, _key = matches[0]
+        found = {cat: info}
+        before = count(legacy_prompt(q, found))
+        prompt, matched = aria.build_gemini_prompt(q, found)
+        after = count(prompt) + system_tokens
+        rows.append({"query": q, "mode": "fields" if matched else "full",
+                     "before": before, "after": after,
+                     "saved_pct": round(100.0 * (before - after) / before, 1)})
+
+    print(f"{'query':45} {'mode':6} {'before':>7} {'after':>6} {'saved':>7}")
+    for r in rows:
+        print(f"{r['query'][:45]:45} {r['mode']:6} {r['before']:7d} {r['after']:6d} {r['saved_pct']:6.1f}%")
+    tot_b = sum(r["before"] for r in rows)
+    tot_a = sum(r["after"] for r in rows)
+    print("-" * 75)
+    print(f"avg tokens/request: before={tot_b / len(rows):.1f} after={tot_a / len(rows):.1f} "
+          f"({100.0 * (tot_b - tot_a) / tot_b:.1f}% fewer; system instruction = {system_tokens})")
+    if args.json:
+        Path(args.json).write_text(json.dumps(
+            {"counter": "live" if args.live else "estimate",
+             "system_instruction_tokens": system_tokens, "rows": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Scaling benchmark: latency and memory of the core handlers vs. catalog size.
+
+For each size a synthetic catalog (benchmarks/synth_catalog.py, real records
+included) is compiled into an in-memory snapshot and pinned with
+catalog_manager.pinned(), then each function runs over a fixed query set:
+
+  find_component, extract_components_from_text, detect_intent,
+  assemble_build_for_budget, check_compatibility, handle_query
+
+Per function the report has the first (cold) call, p50 / p95 / mean of the
+warm calls and the peak Python allocation of one call (tracemalloc). Slow
+functions are capped by --budget seconds per size, so 100k stays tractable.
+Gemini runs on the fake backend, so no network or quota is used.
+
+The JSON report is meant to be diffed across commits:
+
+    python benchmarks/scaling.py                          # 1k, 10k, 100k
+    python benchmarks/scaling.py --sizes 1000 10000 --out before.json
+    python benchmarks/scaling.py --compare before.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import logging
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("GEMINI_BACKEND", "fake")
+os.environ.setdefault("GEMINI_LIMITER", "0")
+os.environ.setdefault("ARSEMBLE_CATALOG_WATCH", "0")
+os.environ.setdefault("ARSEMBLE_RESPONSE_CACHE", "off")  # measure the handlers, not the cache
+
+import ARsemble_ai as aria  # noqa: E402
+import catalog_manager  # noqa: E402
+import catalog_snapshot  # noqa: E402
+from synth_catalog import generate_catalog  # noqa: E402
+
+DEFAULT_OUT = ROOT / "benchmarks" / "results" / "scaling.json"
+
+WORKLOAD = {
+    "find_component": (aria.find_component, [
+        "ryzen 5 5600x", "rtx 3060 specs", "asus tuf gaming b550-plus",
+        "kingston fury beast ddr5 16gb", "corsair cx650"]),
+    "extract_components_from_text": (aria.extract_components_from_text, [
+        "compare rtx 3060 and rtx 4060", "ryzen 5 5600x with asus tuf gaming b550-plus",
+        "corsair cx650 for rtx 4060"]),
+    "detect_intent": (aria.detect_intent, [
+        "what is pcie", "build a pc for 30k", "compare rtx 3060 vs rtx 4060",
+        "is ryzen 5 5600x compatible with b550", "tell me about rtx 3060"]),
+    "assemble_build_for_budget": (aria.assemble_build_for_budget, [30000, 60000, 120000]),
+    "check_compatibility": (aria.check_compatibility, [
+        "is amd ryzen 5 5600x compatible with asus tuf gaming b550-plus",
+        "will amd ryzen 5 7600 work with asus prime b650-plus"]),
+    "handle_query": (aria.handle_query, [
+        "tell me about rtx 3060", "ryzen 5 5600x tdp", "build a pc for 40k",
+        "GPUs under ₱15k with 8GB+ VRAM", "compare rtx 3060 and rtx 4060"]),
+}
+
+
+def git_rev():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Handlers print their answers; keep them out of the report."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def measure(fn, inputs, budget, max_calls):
+    with quiet():
+        t0 = time.perf_counter()
+        fn(inputs[0])
+        first_ms = (time.perf_counter() - t0) * 1000
+
+        tracemalloc.start()
+        fn(inputs[0])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        times = []
+        deadline = time.perf_counter() + budget
+        while len(times) < max_calls and (len(times) < len(inputs) or time.perf_counter() < deadline):
+            arg = inputs[len(times) % len(inputs)]
+            t0 = time.perf_counter()
+            fn(arg)
+            times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return {"calls": len(times), "first_ms": round(first_ms, 3),
+            "p50_ms": round(statistics.median(times), 3),
+            "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+            "mean_ms": round(statistics.fmean(times), 3),
+            "peak_alloc_kb": round(peak / 1024, 1)}
+
+
+def run_size(skus, seed, budget, max_calls, only):
+    catalog = generate_catalog(skus, seed)
+    raw = json.dumps(catalog, ensure_ascii=False).encode("utf-8")
+    t0 = time.perf_counter()
+    snap = catalog_snapshot.Snapshot(catalog_snapshot.compile_snapshot(catalog, raw))
+    compile_ms = (time.perf_counter() - t0) * 1000
+    del catalog
+    out = {"skus": snap.record_count, "snapshot_bytes": len(snap._buf),
+           "compile_ms": round(compile_ms, 1), "functions": {}}
+    with catalog_manager.pinned(snap):
+        for name, (fn, inputs) in WORKLOAD.items():
+            if only and name not in only:
+                continue
+            res = measure(fn, inputs, budget, max_calls)
+            out["functions"][name] = res
+            print(f"  {name:<30} p50 {res['p50_ms']:>10.2f} ms  p95 {res['p95_ms']:>10.2f} ms  "
+                  f"first {res['first_ms']:>10.2f} ms  peak {res['peak_alloc_kb']:>9.1f} KiB  "
+                  f"({res['calls']} calls)", flush=True)
+    out["rss_peak_mb"] = rss_mb()
+    return out
+
+
+def compare(old_path, new):
+    old = json.loads(Path(old_path).read_text())
+    print(f"\ncompare: {old.get('rev')} -> {new.get('rev')}  (p50 ratio new/old)")
+    for size, res in new["sizes"].items():
+        prev = old.get("sizes", {}).get(size)
+        if not prev:
+            continue
+        for name, r in res["functions"].items():
+            p = prev["functions"].get(name)
+            if p and p["p50_ms"]:
+                print(f"  {size:>7} {name:<30} {p['p50_ms']:>10.2f} -> {r['p50_ms']:>10.2f} ms"
+                      f"  x{r['p50_ms'] / p['p50_ms']:.2f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Latency/memory of handlers vs. catalog size.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--budget", type=float, default=5.0,
+                    help="seconds of warm calls per function and size")
+    ap.add_argument("--max-calls", type=int, default=200)
+    ap.add_argument("--only", nargs="*", help="subset of functions to run")
+    ap.add_argument("--out", default=str(DEFAULT_OUT))
+    ap.add_argument("--compare", help="earlier report to diff against")
+    args = ap.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    report = {"date": datetime.datetime.now().isoformat(timespec="seconds"),
+              "rev": git_rev(), "python": sys.version.split()[0], "seed": args.seed,
+              "sizes": {}}
+    for skus in args.sizes:
+        print(f"{skus} SKUs", flush=True)
+        report["sizes"][str(skus)] = run_size(skus, args.seed, args.budget, args.max_calls, args.only)
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"report -> {out}")
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Measure the semantic answer cache on a labeled paraphrase corpus.
+
+Each pair is (stored query, incoming query, same_answer). Components are
+resolved with find_component() exactly like the request path. Besides the
+easy paraphrases, the set has hard ones (filler words, extra context) and
+near misses that only a qualifier tells apart ("price" vs "price with
+tax"), so the thresholds trade hits for false hits. For every threshold the
+report shows the hit rate on true paraphrases and the false-hit rate on
+pairs that need a different answer, then the lowest threshold with no
+false hits (what ARSEMBLE_SEMANTIC_CACHE_THRESHOLD defaults to).
+
+Usage:
+    python benchmarks/semantic_cache_eval.py [--json out.json]
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ARsemble_ai as aria  # noqa: E402
+import semantic_cache  # noqa: E402
+
+LABELED_PAIRS = [
+    # same answer (paraphrases)
+    ("what's the tdp of 5600x", "5600x tdp?", True),
+    ("what's the tdp of 5600x", "how many watts does the ryzen 5 5600x use", True),
+    ("5600x tdp?", "ryzen 5 5600x power draw", True),
+    ("price of rtx 3060", "how much is the rtx 3060", True),
+    ("rtx 3060 price", "rtx 3060 cost?", True),
+    ("how much is the rtx 4060", "rtx 4060 price in php", True),
+    ("how many cores does the ryzen 7 5700x have", "ryzen 7 5700x cores", True),
+    ("ryzen 7 5700x threads", "how many cores does the 5700x have", True),
+    ("what socket does the b550 use", "asus tuf gaming b550-plus socket", True),
+    ("rtx 4060 vram", "how much vram does the rtx 4060 have", True),
+    ("tell me about rtx 3060", "rtx 3060 specs", True),
+    ("tell me about rtx 3060", "what are the specs of the msi rtx 3060", True),
+    ("ryzen 5 7600 boost clock", "ryzen 5 7600 clock speed", True),
+    ("corsair cx650 wattage", "how many watts is the corsair cx650", True),
+    ("samsung 970 evo plus 1tb capacity", "capacity of samsung 970 evo plus 1tb", True),
+    ("kingston fury beast ddr5 16gb speed", "what speed is the kingston fury beast ddr5 16gb", True),
+    ("rtx 3060 price", "what's the current price of the rtx 3060", True),
+    ("ryzen 5 5600x tdp", "ryzen 5 5600x tdp rating please", True),
+    # same answer, harder (fields the catalog lacks, which go to Gemini)
+    ("tdp of rtx 3060", "hey quick question, what's the rated tdp of the rtx 3060 graphics card?", True),
+    ("tdp of rtx 3060", "rtx 3060 tdp in watts", True),
+    ("tdp of rtx 3060", "how much power does the rtx 3060 pull from the wall", True),
+    ("tdp of rtx 3060", "what is the thermal design power of the rtx 3060", True),
+    ("rtx 3060 price", "rtx 3060 price right now at your store", True),
+    ("rtx 3060 price", "how much would an rtx 3060 set me back", True),
+    ("rtx 3060 price", "rtx 3060 how much pesos", True),
+    ("socket of rtx 3060", "which socket does the rtx 3060 plug into", True),
+    ("cores of rtx 4060", "how many cuda cores does the rtx 4060 have", True),
+    ("efficiency of corsair cx650", "corsair cx650 80 plus efficiency rating", True),
+    ("efficiency of corsair cx650", "is the corsair cx650 bronze or gold efficiency", True),
+    ("ryzen 5 5600x tdp", "ryzen 5 5600x tdp, stock settings", True),
+    ("speed of samsung 970 evo plus 1tb", "samsung 970 evo plus 1tb read speed", True),
+    ("speed of samsung 970 evo plus 1tb", "how fast is the samsung 970 evo plus 1tb", True),
+    # different answer needed (same components, different field/intent)
+    ("5600x tdp?", "5600x price", False),
+    ("rtx 3060 price", "rtx 3060 vram", False),
+    ("ryzen 7 5700x cores", "ryzen 7 5700x socket", False),
+    ("rtx 4060 vram", "rtx 4060 power draw", False),
+    ("tell me about rtx 3060", "rtx 3060 price", False),
+    ("ryzen 5 7600 boost clock", "ryzen 5 7600 tdp", False),
+    ("corsair cx650 wattage", "corsair cx650 efficiency", False),
+    ("what socket does the b550 use", "b550 form factor", False),
+    ("rtx 3060 price", "is rtx 3060 good for 1440p gaming", False),
+    ("5600x tdp?", "is the 5600x compatible with b550", False),
+    ("samsung 970 evo plus 1tb capacity", "samsung 970 evo plus 1tb interface", False),
+    ("intel core i5 13400 igpu", "intel core i5 13400 price", False),
+    ("rtx 3060 price", "rtx 3060 price and vram", False),
+    ("is rtx 3060 good for 1440p gaming", "is rtx 3060 good for video editing", False),
+    # near misses: same components and field, a qualifier changes the answer
+    ("is rtx 3060 good for 1440p gaming", "is rtx 3060 good for 4k gaming", False),
+    ("rtx 3060 power draw at idle", "rtx 3060 power draw under load", False),
+    ("rtx 3060 price", "rtx 3060 price last year", False),
+    ("samsung 970 evo plus 1tb read speed", "samsung 970 evo plus 1tb write speed", False),
+    ("rtx 3060 tdp", "rtx 3060 tdp overclocked", False),
+    ("how many cores does the rtx 4060 have", "how many tensor cores does the rtx 4060 have", False),
+    ("rtx 3060 price", "rtx 3060 price with tax", False),
+    ("ryzen 5 5600x tdp", "ryzen 5 5600x tdp in eco mode", False),
+    ("is rtx 3060 good for video editing", "is rtx 3060 good for streaming", False),
+    ("efficiency of corsair cx650", "corsair cx650 efficiency at 50% load", False),
+    ("rtx 4060 vram", "rtx 4060 vram bandwidth", False),
+]
+
+THRESHOLDS = [0.60, 0.65, 0.70, 0.75, 0.80, 0.85, 0.90, 0.95, 1.0]
+
+
+def resolve(query):
+    matches = aria.find_component(query)
+    if not matches:
+        return None
+    cat, info, _key = matches[0]
+    return aria.semantic_cache_key({cat: info})
+
+
+def evaluate(pairs, thresholds):
+    rows = []
+    for t in thresholds:
+        tp = fn = fp = tn = 0
+        for stored_q, incoming_q, same in pairs:
+            a, b = resolve(stored_q), resolve(incoming_q)
+            cache = semantic_cache.SemanticCache(threshold=t)
+            if a:
+                cache.put(stored_q, a[0], "<answer>", a[1])
+            hit = False
+            if b:
+                hit = cache.get(incoming_q, b[0], b[1])[0] is not None
+            if same:
+                tp += hit
+                fn += not hit
+            else:
+                fp += hit
+                tn += not hit
+        rows.append({"threshold": t,
+                     "hit_rate": round(tp / max(1, tp + fn), 3),
+                     "false_hit_rate": round(fp / max(1, fp + tn), 3),
+                     "tp": tp, "fn": fn, "fp": fp, "tn": tn})
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Semantic cache threshold sweep.")
+    ap.add_argument("--json", help="write the sweep to this file")
+    args = ap.parse_args()
+    rows = evaluate(LABELED_PAIRS, THRESHOLDS)
+    print(f"{'threshold':>9} {'hit_rate':>9} {'false_hit':>10}   tp fn fp tn")
+    for r in rows:
+        print(f"{r['threshold']:9.2f} {r['hit_rate']:9.3f} {r['false_hit_rate']:10.3f}  "
+              f"{r['tp']:3d}{r['fn']:3d}{r['fp']:3d}{r['tn']:3d}")
+    safe = next((r for r in rows if r["fp"] == 0), None)
+    if safe:
+        print(f"lowest threshold with no false hits: {safe['threshold']:.2f} "
+              f"(hit rate {safe['hit_rate']:.3f})")
+    print(f"(current ARSEMBLE_SEMANTIC_CACHE_THRESHOLD = {aria.SEMANTIC_CACHE_THRESHOLD})")
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Synthetic catalog generator for scaling tests.
+
+Produces {category: {key: record}} catalogs of any size across the seven
+categories, using the same field formats as catalog/components.json
+("₱12,000", "~130 Watts", "PCIe 4.0 x16", "6 Cores / 12 Threads", ...), so
+every parser and handler in ARsemble_ai sees realistic input. Output is
+deterministic for a given --seed.
+
+Usage:
+    python benchmarks/synth_catalog.py --skus 10000 --out /tmp/catalog_10k.json
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+
+# share of SKUs per category (roughly a PC parts store)
+MIX = {"cpu": 0.18, "gpu": 0.18, "motherboard": 0.16, "ram": 0.16,
+       "storage": 0.16, "psu": 0.08, "cpu_cooler": 0.08}
+
+SOCKETS = {
+    "AM4": ("AMD", "DDR4", "4.0"), "AM5": ("AMD", "DDR5", "5.0"),
+    "LGA1700": ("Intel", "DDR5", "5.0"), "LGA1200": ("Intel", "DDR4", "4.0"),
+}
+CPU_TIERS = [(4, 8, 6000), (6, 12, 9000), (8, 16, 14000), (12, 24, 22000), (16, 32, 32000)]
+GPU_FAMILIES = [
+    ("NVIDIA", "RTX", ["3050", "3060", "4060", "4060 Ti", "4070", "4070 SUPER", "4080"]),
+    ("AMD", "RX", ["6500 XT", "6600", "7600", "7700 XT", "7800 XT", "7900 GRE"]),
+    ("Intel", "Arc", ["A380", "A580", "A750", "A770"]),
+]
+GPU_BRANDS = ["MSI", "Gigabyte", "ASUS", "Zotac", "Palit", "Sapphire", "PowerColor", "ASRock"]
+GPU_SUFFIX = ["VENTUS 2X", "EAGLE OC", "DUAL", "TUF GAMING", "GAMING X", "PULSE", "FIGHTER", "TWIN EDGE"]
+BOARD_BRANDS = ["ASUS", "MSI", "Gigabyte", "ASRock", "Biostar"]
+BOARD_LINES = ["PRIME", "TUF GAMING", "PRO", "AORUS ELITE", "STEEL LEGEND", "ROG STRIX"]
+CHIPSETS = {"AM4": ["A520", "B450", "B550", "X570"], "AM5": ["A620", "B650", "X670"],
+            "LGA1700": ["H610", "B660", "B760", "Z790"], "LGA1200": ["H510", "B560", "Z590"]}
+RAM_BRANDS = ["Kingston FURY Beast", "Corsair Vengeance", "G.Skill Ripjaws", "TeamGroup T-Force", "HKCMEMORY"]
+SSD_BRANDS = ["Samsung 980", "WD Blue SN580", "Crucial P3", "Kingston NV2", "Ramsta S800", "Lexar NM620"]
+PSU_BRANDS = ["Corsair CX", "Cooler Master MWE", "Seasonic Focus", "InPlay GS", "Gamdias Kratos", "FSP Hydro"]
+COOLER_BRANDS = ["DeepCool AK", "ID-Cooling SE", "Thermalright Peerless", "Cooler Master Hyper",
+                 "DeepCool LS", "Fantech Polar LC"]
+
+
+def php(n):
+    return f"₱{int(round(n, -2)):,}"
+
+
+def _cpu(rng, i):
+    socket = rng.choice(list(SOCKETS))
+    vendor, ram, pcie = SOCKETS[socket]
+    cores, threads, base_price = rng.choice(CPU_TIERS)
+    model = 3000 + i
+    if vendor == "AMD":
+        name = f"AMD Ryzen {min(9, 3 + cores // 4 * 2)} {model}{rng.choice(['', 'X', 'G'])}"
+    else:
+        name = f"Intel Core i{min(9, 3 + cores // 4 * 2)} {model}{rng.choice(['', 'K', 'F'])}"
+    base = round(rng.uniform(2.5, 4.2), 1)
+    return name, {
+        "name": name, "type": "CPU", "socket": socket,
+        "cores": f"{cores} Cores / {threads} Threads",
+        "clock": f"{base} GHz / {round(base + rng.uniform(0.4, 1.6), 1)} GHz Boost",
+        "tdp": f"{rng.choice([35, 65, 105, 125, 170])}W",
+        "igpu": "None" if name.endswith(("F", "X")) else rng.choice(["Radeon Graphics", "UHD 770", "Vega 8"]),
+        "price": php(base_price * rng.uniform(0.7, 1.3)),
+        "compatibility": f"{socket} Motherboards, {ram} RAM",
+    }
+
+
+def _gpu(rng, i):
+    vendor, line, models = rng.choice(GPU_FAMILIES)
+    idx = rng.randrange(len(models))
+    vram = [4, 6, 8, 8, 12, 12, 16][min(idx, 6)]
+    power = 75 + idx * 35 + rng.randrange(0, 30)
+    name = f"{rng.choice(GPU_BRANDS)} {line} {models[idx]} {rng.choice(GPU_SUFFIX)} V{i}"
+    return name, {
+        "name": name, "type": "GPU", "vram": f"{vram}GB GDDR{6 if idx else 5}",
+        "clock": f"~{rng.randrange(1500, 2700)} MHz (Boost)",
+        "power": f"~{power} Watts",
+        "slot": f"PCIe {rng.choice(['3.0', '4.0', '4.0'])} x{rng.choice([8, 16, 16])}",
+        "price": php((8000 + idx * 7000) * rng.uniform(0.8, 1.3)),
+        "compatibility": f"PCIe x16 slot, {max(450, (power * 2 + 150) // 50 * 50)}W PSU, 8-pin power connector",
+    }
+
+
+def _motherboard(rng, i):
+    socket = rng.choice(list(SOCKETS))
+    _, ram, pcie = SOCKETS[socket]
+    if socket == "LGA1700" and rng.random() < 0.4:
+        ram = "DDR4"
+    chipset = rng.choice(CHIPSETS[socket])
+    ff = rng.choice(["mATX", "ATX", "ATX", "Mini-ITX"])
+    name = f"{rng.choice(BOARD_BRANDS)} {rng.choice(BOARD_LINES)} {chipset}M-{i} {ram}"
+    slots = 2 if ff == "Mini-ITX" else rng.choice([2, 4, 4])
+    return name, {
+        "name": name, "type": "Motherboard", "socket": socket, "form_factor": ff,
+        "ram_slots": slots, "max_ram": f"{slots * 32}GB", "ram_type": ram,
+        "nvme_slots": rng.choice([1, 2, 3]), "sata_ports": rng.choice([2, 4, 6]),
+        "price": php(rng.uniform(4000, 20000)),
+        "compatibility": f"{socket} CPUs, {ram} RAM, PCIe {pcie}",
+    }
+
+
+def _ram(rng, i):
+    ram = rng.choice(["DDR4", "DDR5"])
+    cap = rng.choice([8, 16, 16, 32, 64])
+    speed = rng.choice([3200, 3600]) if ram == "DDR4" else rng.choice([4800, 5200, 6000])
+    name = f"{rng.choice(RAM_BRANDS)} {ram} {cap}GB {speed}-{i}"
+    return name, {
+        "name": name, "type": "RAM", "capacity": f"{cap}GB", "speed": f"{speed}MHz",
+        "ram_type": ram, "price": php(cap * (110 if ram == "DDR4" else 160) * rng.uniform(0.8, 1.3)),
+        "compatibility": f"{ram} Motherboards",
+    }
+
+
+def _storage(rng, i):
+    nvme = rng.random() < 0.6
+    cap = rng.choice([256, 500, 1000, 2000, 4000])
+    cap_s = f"{cap // 1000}TB" if cap >= 1000 else f"{cap}GB"
+    if nvme:
+        gen = rng.choice(["3.0", "4.0", "4.0", "5.0"])
+        name = f"{rng.choice(SSD_BRANDS)} {cap_s} NVMe G{i}"
+        return name, {"name": name, "type": "NVMe SSD", "capacity": cap_s,
+                      "interface": f"PCIe {gen} x4", "price": php(cap * 3.5 * rng.uniform(0.8, 1.4)),
+                      "compatibility": "M.2 2280 slot"}
+    hdd = rng.random() < 0.4
+    line = 'Seagate Barracuda 3.5" HDD' if hdd else rng.choice(SSD_BRANDS) + " SATA SSD"
+    name = f"{line} {cap_s} S{i}"
+    return name, {"name": name, "type": "HDD" if hdd else "SATA SSD", "capacity": cap_s,
+                  "interface": "SATA 6Gb/s", "price": php(cap * (1.6 if hdd else 2.8) * rng.uniform(0.8, 1.3)),
+                  "compatibility": "Any motherboard with SATA port"}
+
+
+def _psu(rng, i):
+    watts = rng.choice([450, 550, 650, 750, 850, 1000])
+    eff = rng.choice(["80+", "80+ White", "80+ Bronze", "80+ Gold"])
+    name = f"{rng.choice(PSU_BRANDS)}{watts} P{i}"
+    return name, {"name": name, "type": "PSU", "wattage": f"{watts}W", "efficiency": eff,
+                  "price": php(watts * 4.5 * rng.uniform(0.8, 1.4)),
+                  "compatibility": "Mid-range builds, single GPU systems"}
+
+
+def _cpu_cooler(rng, i):
+    liquid = rng.random() < 0.4
+    size = rng.choice(["240mm", "360mm"]) if liquid else rng.choice(["120mm", "140mm"])
+    name = f"{rng.choice(COOLER_BRANDS)}{size[:3]} C{i}"
+    sockets = ", ".join(rng.sample(["AM4", "AM5", "LGA1700", "LGA1200", "LGA1151"], rng.randint(2, 5)))
+    return name, {"name": name, "type": "CPU Cooler", "cooler_type": "Liquid Cooler" if liquid else "Air Cooler",
+                  "size": size, "socket": sockets, "price": php(rng.uniform(800, 6000)),
+                  "compatibility": "Most modern CPU sockets"}
+
+
+GENERATORS = {"cpu": _cpu, "gpu": _gpu, "motherboard": _motherboard, "ram": _ram,
+              "storage": _storage, "psu": _psu, "cpu_cooler": _cpu_cooler}
+
+
+def generate_catalog(skus, seed=0, include_real=True):
+    """
+    A catalog with about `skus` records. With include_real the records of
+    catalog/components.json are kept (so existing queries still resolve) and
+    topped up with synthetic ones.
+    """
+    rng = random.Random(seed)
+    out = {cat: {} for cat in GENERATORS}
+    if include_real:
+        real = json.loads((Path(__file__).resolve().parent.parent / "catalog" /
+                           "components.json").read_text(encoding="utf-8"))
+        for cat, items in real.items():
+            out.setdefault(cat, {}).update(items)
+    have = sum(len(v) for v in out.values())
+    i = 0
+    for cat, share in MIX.items():
+        target = int(max(0, skus - have) * share)
+        for _ in range(target):
+            name, rec = GENERATORS[cat](rng, i)
+            i += 1
+            out[cat][name.lower()] = rec
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate a synthetic catalog.")
+    ap.add_argument("--skus", type=int, default=10_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--synthetic-only", action="store_true",
+                    help="do not include the real catalog records")
+    ap.add_argument("--out", required=True)
+    args = ap.parse_args()
+    catalog = generate_catalog(args.skus, args.seed, include_real=not args.synthetic_only)
+    Path(args.out).write_text(json.dumps(catalog, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"wrote {sum(len(v) for v in catalog.values())} SKUs to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Cost of the stage timings (timing.py).
+
+Micro: one span / one timed() call, inside a request, outside a request and
+with ARSEMBLE_TIMING=0. Macro: how many spans a real /chat request records,
+so per-request overhead = spans x cost per span.
+
+Usage:
+    python benchmarks/timing_overhead.py [--n 200000]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("GEMINI_API_KEY", "")
+os.environ.setdefault("ARSEMBLE_CATALOG_WATCH", "0")
+os.environ.setdefault("ARSEMBLE_RESPONSE_CACHE", "off")
+
+import timing  # noqa: E402
+
+QUERIES = ["tell me about rtx 3060", "recommend a build for 50000", "gpus under 20000",
+           "is ryzen 5 5600x compatible with b550", "what is a psu"]
+
+
+def per_call_ns(fn, n, setup=None):
+    return min(timeit.repeat(fn, setup=setup or (lambda: None), number=n, repeat=5)) / n * 1e9
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Overhead of timing spans.")
+    ap.add_argument("--n", type=int, default=200000)
+    args = ap.parse_args()
+
+    def empty():
+        return None
+
+    def with_span():
+        with timing.span("x"):
+            pass
+
+    wrapped = timing.timed("x")(empty)
+    base = per_call_ns(empty, args.n)
+    print(f"{'ns per call':<20} {'span':>8} {'timed()':>8}   (over an empty call, {base:.0f} ns)")
+    print(f"{'outside a request':<20} {per_call_ns(with_span, args.n) - base:8.0f} "
+          f"{per_call_ns(wrapped, args.n) - base:8.0f}")
+    token = timing.begin()
+    clear = timing.current().clear
+    in_request = per_call_ns(with_span, args.n, clear) - base
+    print(f"{'inside a request':<20} {in_request:8.0f} "
+          f"{per_call_ns(wrapped, args.n, clear) - base:8.0f}")
+    timing.end(token)
+    timing.ENABLED = False
+    print(f"{'ARSEMBLE_TIMING=0':<20} {per_call_ns(with_span, args.n) - base:8.0f} "
+          f"{0:8.0f}   (timed() returns the function undecorated)")
+    timing.ENABLED = True
+
+    import logging
+    logging.disable(logging.CRITICAL)
+    import ARsemble_ai
+    import catalog_manager
+    counts = []
+    with contextlib.redirect_stdout(io.StringIO()), catalog_manager.pinned():
+        for q in QUERIES:
+            token = timing.begin()
+            ARsemble_ai.handle_query(q)
+            counts.append(len(timing.current()))
+            timing.end(token)
+    print(f"spans per /chat request: {min(counts)}-{max(counts)} "
+          f"-> about {max(counts) * in_request / 1000:.1f} us per request")
+
+
+if __name__ == "__main__":
+    main()
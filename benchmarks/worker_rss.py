@@ -0,0 +1,165 @@
+"""
+Per-worker memory of the gunicorn deployment, with and without preload_app.
+
+Starts `gunicorn -c gunicorn_config.py server:app` once per mode
+(ARSEMBLE_PRELOAD=1 / 0), sends a round of /chat requests so every worker
+touches the catalog, then reads /proc/<pid>/smaps_rollup of the master and
+each worker:
+
+  rss      resident pages, shared ones included
+  pss      proportional share (shared pages split between the processes)
+  private  pages only this process maps (what forking cannot save)
+
+The sum of PSS over master + workers is the real footprint of the service.
+Gemini runs on the fake backend and the catalog watcher is off, so no network
+is used. --skus N serves a synthetic catalog of N SKUs instead of the real
+one (written to a temporary directory). Linux only (/proc).
+
+Usage:
+    python benchmarks/worker_rss.py [--skus 100000] [--workers 2] [--requests 40]
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from synth_catalog import generate_catalog  # noqa: E402
+
+QUERIES = [
+    "recommend a build for 50000",
+    "build me a gaming pc for 35k",
+    "tell me about rtx 3060",
+    "how much is the ryzen 5 5600x",
+    "gpus under 20000",
+    "is ryzen 5 5600x compatible with b550",
+    "list cpus",
+    "what is a psu",
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def children(pid):
+    try:
+        text = Path(f"/proc/{pid}/task/{pid}/children").read_text()
+    except OSError:
+        return []
+    return [int(p) for p in text.split()]
+
+
+def smaps(pid):
+    """{rss, pss, private, shared} in KiB from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        name, value = line.split(":", 1)
+        fields[name] = int(value.split()[0])
+    return {"rss": fields["Rss"], "pss": fields["Pss"],
+            "private": fields["Private_Clean"] + fields["Private_Dirty"],
+            "shared": fields["Shared_Clean"] + fields["Shared_Dirty"]}
+
+
+def chat(port, message):
+    req = urllib.request.Request(f"http://127.0.0.1:{port}/chat",
+                                 data=json.dumps({"message": message}).encode("utf-8"),
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=120) as r:
+        return r.status
+
+
+def wait_ready(proc, port, workers, timeout=180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=5):
+                pass
+            if len(children(proc.pid)) >= workers:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("gunicorn did not come up")
+
+
+def run_mode(preload, args, env):
+    port = free_port()
+    env = dict(env, PORT=str(port), ARSEMBLE_PRELOAD="1" if preload else "0")
+    cmd = [sys.executable, "-m", "gunicorn", "-c", str(ROOT / "gunicorn_config.py"),
+           "--pythonpath", str(ROOT), "--workers", str(args.workers), "server:app"]
+    proc = subprocess.Popen(cmd, env=env, cwd=env["ARSEMBLE_BENCH_DIR"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        t0 = time.perf_counter()
+        wait_ready(proc, port, args.workers)
+        boot_s = time.perf_counter() - t0
+        msgs = [QUERIES[i % len(QUERIES)] for i in range(args.requests)]
+        with ThreadPoolExecutor(max_workers=args.workers * 4) as pool:
+            statuses = list(pool.map(lambda m: chat(port, m), msgs))
+        time.sleep(1)  # let the workers settle
+        workers = [smaps(pid) for pid in children(proc.pid)]
+        master = smaps(proc.pid)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    total_pss = master["pss"] + sum(w["pss"] for w in workers)
+    mode = "preload" if preload else "per-worker"
+    print(f"{mode:<11} boot {boot_s:5.1f} s  ok {statuses.count(200)}/{len(statuses)}  "
+          f"master pss {master['pss'] / 1024:6.1f} MiB  total pss {total_pss / 1024:6.1f} MiB",
+          flush=True)
+    for i, w in enumerate(workers):
+        print(f"  worker {i}  rss {w['rss'] / 1024:6.1f}  pss {w['pss'] / 1024:6.1f}  "
+              f"private {w['private'] / 1024:6.1f}  shared {w['shared'] / 1024:6.1f} MiB", flush=True)
+    return {"mode": mode, "boot_s": round(boot_s, 2), "master": master,
+            "workers": workers, "total_pss_kib": total_pss}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-worker RSS with and without preload_app.")
+    ap.add_argument("--skus", type=int, default=0, help="synthetic catalog size (0: the real catalog)")
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--requests", type=int, default=40)
+    ap.add_argument("--json", help="write the results to this file")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, GEMINI_BACKEND="fake", GEMINI_LIMITER="0",
+                   ARSEMBLE_CATALOG_WATCH="0", ARSEMBLE_WARM_GEMINI="0",
+                   ARSEMBLE_CATALOG_DELTAS=os.path.join(tmp, "deltas.jsonl"),
+                   ARSEMBLE_BENCH_DIR=tmp)
+        if args.skus:
+            source = Path(tmp) / "components.json"
+            source.write_text(json.dumps(generate_catalog(args.skus), ensure_ascii=False),
+                              encoding="utf-8")
+            env.update(ARSEMBLE_CATALOG_SOURCE=str(source),
+                       ARSEMBLE_CATALOG_SNAPSHOT=str(Path(tmp) / "components.snap"))
+        report = [run_mode(preload, args, env) for preload in (False, True)]
+
+    saved = report[0]["total_pss_kib"] - report[1]["total_pss_kib"]
+    private = [sum(w["private"] for w in r["workers"]) / max(1, len(r["workers"])) for r in report]
+    print(f"preload saves {saved / 1024:.1f} MiB in total; private memory per worker "
+          f"{private[0] / 1024:.1f} -> {private[1] / 1024:.1f} MiB")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# catalog_backend.py
+"""
+One catalog interface over two storage backends.
+
+  snapshot  (default) the mmap'ed binary snapshot managed by catalog_manager,
+            with catalog_columns for filters; best up to ~100k SKUs
+  sqlite    catalog_sqlite: FTS5 search + B-tree indexes, for multi-branch
+            inventories that should not live in every worker's memory
+
+Both expose:
+
+  version, data (Mapping: data[cat][key] -> dict), size(),
+  iter_records() -> (cat, key, info) in catalog order,
+  search(tokens) -> records whose key/name share a token, in catalog order,
+  items(cat), price_sorted(cat) -> [(key, info, price)],
+  filter(cat, sort=, descending=, limit=, **filters) -> [(key, info, price)],
+  apply_price(cat, key, price=, stock=) -> (old price, new price, info),
+  warm() -> build every lazy index now (before a gunicorn fork)
+
+Select with ARSEMBLE_CATALOG_BACKEND=snapshot|sqlite.
+"""
+import bisect
+import contextlib
+import contextvars
+import os
+import threading
+
+import catalog_columns
+import catalog_manager
+from text_utils import effective_price
+
+BACKEND = os.getenv("ARSEMBLE_CATALOG_BACKEND", "snapshot").strip().lower()
+_pinned = contextvars.ContextVar("arsemble_catalog_backend", default=None)
+_backend_lock = threading.Lock()
+
+
+def patch_record(info, price=None, stock=None):
+    """A copy of info with a new price ("₱12,000") and/or stock count."""
+    out = dict(info)
+    if price is not None:
+        out["price"] = f"₱{int(price):,}"
+    if stock is not None:
+        out["stock"] = int(stock)
+    return out
+
+
+class SnapshotBackend:
+    """
+    The interface over one immutable catalog_snapshot.Snapshot, plus the
+    price/stock deltas applied to it since it was loaded (see catalog_deltas).
+    Deltas patch the memoized record, the category's price-sorted list
+    (copy-on-write, so readers never see a half-moved entry) and the price
+    column of catalog_columns in place.
+    """
+
+    name = "snapshot"
+    shared = False  # per-process state: each worker applies deltas itself
+
+    def __init__(self, snap):
+        self.snap = snap
+        self.version = snap.version
+        self.data = snap.data
+        self._lock = threading.Lock()
+        self._prices = {}       # rid -> price after deltas (None: not for sale)
+        self._price_lists = {}  # cat -> ([(price, rid)], [(key, info, price)])
+
+    def size(self):
+        return self.snap.record_count
+
+    def iter_records(self):
+        for cat, items in self.data.items():
+            for key, info in items.items():
+                yield cat, key, info
+
+    def search(self, tokens):
+        rids = set()
+        for t in set(tokens):
+            rids.update(self.snap.token_postings(t))
+        return [self.data.record(rid) for rid in sorted(rids)]
+
+    def items(self, cat):
+        return self.data[cat].items() if cat in self.data else []
+
+    @staticmethod
+    def _reposition(order, rows, rid, old, row):
+        """New (order, rows) with rid moved from price old to row's price."""
+        order, rows = list(order), list(rows)
+        if old:
+            i = bisect.bisect_left(order, (old, rid))
+            if i < len(order) and order[i] == (old, rid):
+                del order[i]
+                del rows[i]
+        new = row[2]
+        if new:
+            i = bisect.bisect_left(order, (new, rid))
+            order.insert(i, (new, rid))
+            rows.insert(i, row)
+        return order, rows
+
+    def _price_list(self, cat):
+        lists = self._price_lists.get(cat)
+        if lists is None:
+            with self._lock:
+                lists = self._price_lists.get(cat)
+                if lists is None:
+                    snap, view = self.snap, self.data[cat]
+                    order = [(snap.price(r), r) for r in snap.price_sorted(cat)]
+                    rows = [(snap.record_key(r), view.record_at(r), p) for p, r in order]
+                    span = snap.category_range(cat)
+                    for rid, price in self._prices.items():
+                        if rid in span:
+                            row = (snap.record_key(rid), view.record_at(rid), price)
+                            order, rows = self._reposition(order, rows, rid, snap.price(rid), row)
+                    lists = self._price_lists[cat] = (order, rows)
+        return lists
+
+    def price_sorted(self, cat):
+        if cat not in self.data:
+            return []
+        return list(self._price_list(cat)[1])
+
+    def warm(self):
+        """Materialize every record, price list and filter column (all lazy otherwise)."""
+        catalog_columns.get_columns(self.snap)
+        for cat in self.data:
+            view = self.data[cat]
+            for rid in self.snap.category_range(cat):
+                view.record_at(rid)
+            self._price_list(cat)
+        return self
+
+    def filter(self, cat, sort="price", descending=False, limit=None, **filters):
+        return catalog_columns.filter_components(
+            self.snap, cat, sort=sort, descending=descending, limit=limit, **filters)
+
+    def apply_price(self, cat, key, price=None, stock=None):
+        """
+        Apply one price/stock delta. Returns (old, new, info): the sale price
+        before and after (None when out of stock) and the patched record.
+        """
+        rid = self.snap.find_key(cat, key)
+        if rid is None:
+            raise KeyError(f"{cat}/{key}")
+        view = self.data[cat]
+        # columns first, so a lazily built price column cannot miss this delta
+        cols = catalog_columns.get_columns(self.snap).get(cat)
+        with self._lock:
+            current = view.record_at(rid)
+            info = patch_record(current, price, stock)
+            old, new = effective_price(current), effective_price(info)
+            if info == current:
+                return old, new, current
+            view.patch(rid, info)
+            self._prices[rid] = new
+            lists = self._price_lists.get(cat)
+            if lists is not None:
+                self._price_lists[cat] = self._reposition(*lists, rid, old, (key, info, new))
+            if cols is not None:
+                i = rid - cols.rids[0]
+                cols.numeric["price"][i] = float(new) if new is not None else catalog_columns.NAN
+        return old, new, info
+
+
+def _snapshot_backend(snap=None):
+    snap = snap or catalog_manager.current_snapshot()
+    backend = getattr(snap, "_backend", None)
+    if backend is None:
+        with _backend_lock:
+            backend = getattr(snap, "_backend", None)
+            if backend is None:
+                backend = snap._backend = SnapshotBackend(snap)
+    return backend
+
+
+def current_backend():
+    """Backend for this request: a pinned one, else the configured one."""
+    backend = _pinned.get()
+    if backend is not None:
+        return backend
+    if BACKEND == "sqlite":
+        import catalog_sqlite
+        return catalog_sqlite.get_backend()
+    return _snapshot_backend()
+
+
+@contextlib.contextmanager
+def pinned(backend):
+    """Run a block against a specific backend (benchmarks, offline jobs)."""
+    token = _pinned.set(backend)
+    try:
+        yield backend
+    finally:
+        _pinned.reset(token)
@@ -0,0 +1,254 @@
+# catalog_columns.py
+"""
+Columnar view of the catalog for multi-attribute filters and sorts.
+
+Per category the numeric attributes are NumPy arrays (NaN = missing):
+
+  price, watts, cores, threads, vram_gb, boost_ghz, capacity_gb
+
+and the categorical ones are int32 codes into a per-category vocabulary:
+
+  socket, ram_type, pcie (generation as "3", "4", "5")
+
+A query such as "GPUs under ₱15k with 8GB+ VRAM" becomes one boolean mask
+(price <= 15000) & (vram_gb >= 8) and an argsort, instead of a Python loop
+over data[cat].items().
+
+Columns are derived once per catalog snapshot and cached on it, so a hot
+reload (catalog_manager) naturally gets fresh columns. NumPy is imported
+on the first build, not at import (it would double the app's import
+time); without it the same API runs on plain lists.
+"""
+import math
+import re
+import threading
+
+NUMERIC = ("price", "watts", "cores", "threads", "vram_gb", "boost_ghz", "capacity_gb")
+CATEGORICAL = ("socket", "ram_type", "pcie")
+NAN = float("nan")
+
+_build_lock = threading.Lock()
+_np = False  # not imported yet
+
+
+def _numpy():
+    """NumPy, imported on first use (it costs more import time than the rest of the app); None if missing."""
+    global _np
+    if _np is False:
+        try:
+            import numpy
+        except ImportError:  # optional: fall back to list scans
+            numpy = None
+        _np = numpy
+    return _np
+
+
+# -------------------------------
+# Field parsers (string formats used in catalog/components.json)
+# -------------------------------
+
+def _first_int(pattern, text):
+    m = re.search(pattern, text or "", flags=re.I)
+    return float(m.group(1)) if m else NAN
+
+
+def parse_cores(info):
+    return _first_int(r"(\d+)\s*cores?", info.get("cores"))
+
+
+def parse_threads(info):
+    return _first_int(r"(\d+)\s*threads?", info.get("cores"))
+
+
+def parse_vram_gb(info):
+    return _first_int(r"(\d+)\s*gb", info.get("vram"))
+
+
+def parse_boost_ghz(info):
+    """Highest clock in the 'clock' field, in GHz ('~1777 MHz (Boost)' -> 1.777)."""
+    text = info.get("clock") or ""
+    vals = [float(v) for v in re.findall(r"(\d+(?:\.\d+)?)\s*ghz", text, flags=re.I)]
+    vals += [float(v) / 1000 for v in re.findall(r"(\d+(?:\.\d+)?)\s*mhz", text, flags=re.I)]
+    return max(vals) if vals else NAN
+
+
+def parse_capacity_gb(info):
+    m = re.search(r"(\d+(?:\.\d+)?)\s*(tb|gb)", str(info.get("capacity") or ""), flags=re.I)
+    if not m:
+        return NAN
+    return float(m.group(1)) * (1000 if m.group(2).lower() == "tb" else 1)
+
+
+def parse_socket(info):
+    return (info.get("socket") or "").strip().upper()
+
+
+def parse_ram_type(info):
+    rt = (info.get("ram_type") or "").strip().upper()
+    if rt:
+        return rt
+    m = re.search(r"\bDDR\d\b", info.get("compatibility") or "", flags=re.I)
+    return m.group(0).upper() if m else ""
+
+
+def parse_pcie(info):
+    """Highest PCIe generation mentioned in slot/interface/compatibility."""
+    gens = []
+    for f in ("slot", "interface", "compatibility"):
+        gens += re.findall(r"pcie\s*(\d)(?:\.\d)?", str(info.get(f) or ""), flags=re.I)
+    return max(gens) if gens else ""
+
+
+NUMERIC_PARSERS = {
+    "cores": parse_cores, "threads": parse_threads, "vram_gb": parse_vram_gb,
+    "boost_ghz": parse_boost_ghz, "capacity_gb": parse_capacity_gb,
+}
+CATEGORICAL_PARSERS = {"socket": parse_socket, "ram_type": parse_ram_type, "pcie": parse_pcie}
+
+
+def _label_tokens(label):
+    return {t for t in re.split(r"[\s,/]+", label.upper()) if t}
+
+
+# -------------------------------
+# Columns
+# -------------------------------
+
+class CategoryColumns:
+    """Columns for one category; row i is record rids[i] of the snapshot."""
+
+    def __init__(self, cat, rids, keys, numeric, codes, vocab):
+        self.cat = cat
+        self.rids = rids
+        self.keys = keys
+        self.numeric = numeric    # name -> array/list of float
+        self.codes = codes        # name -> array/list of int
+        self.vocab = vocab        # name -> list of labels (code -> label)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _code_set(self, name, value):
+        """Codes whose label equals value or lists it ('AM4, AM5' matches AM4)."""
+        want = str(value).upper().replace("PCIE", "").replace(".0", "").strip()
+        return [i for i, label in enumerate(self.vocab[name])
+                if label == want or want in _label_tokens(label)]
+
+    def mask(self, min_price=None, max_price=None, max_watts=None, min_cores=None,
+             min_threads=None, min_vram=None, min_boost=None, min_capacity=None,
+             socket=None, ram_type=None, pcie=None):
+        """Row indices matching every given filter (None = not filtered)."""
+        ranges = [("price", min_price, max_price), ("watts", None, max_watts),
+                  ("cores", min_cores, None), ("threads", min_threads, None),
+                  ("vram_gb", min_vram, None), ("boost_ghz", min_boost, None),
+                  ("capacity_gb", min_capacity, None)]
+        cats = [("socket", socket), ("ram_type", ram_type), ("pcie", pcie)]
+        np = _numpy()
+        if np is not None:
+            m = np.ones(len(self), dtype=bool)
+            if min_price is not None or max_price is not None:
+                m &= self.numeric["price"] > 0  # "₱0 (included)" is not a price
+            for name, lo, hi in ranges:
+                col = self.numeric[name]
+                if lo is not None:
+                    m &= col >= lo  # NaN compares False: missing values drop out
+                if hi is not None:
+                    m &= col <= hi
+            for name, value in cats:
+                if value is not None:
+                    m &= np.isin(self.codes[name], self._code_set(name, value))
+            return np.flatnonzero(m)
+        rows = range(len(self))
+        if min_price is not None or max_price is not None:
+            rows = [i for i in rows if self.numeric["price"][i] > 0]
+        for name, lo, hi in ranges:
+            col = self.numeric[name]
+            if lo is not None:
+                rows = [i for i in rows if col[i] >= lo]
+            if hi is not None:
+                rows = [i for i in rows if col[i] <= hi]
+        for name, value in cats:
+            if value is not None:
+                allowed = set(self._code_set(name, value))
+                rows = [i for i in rows if self.codes[name][i] in allowed]
+        return list(rows)
+
+    def order(self, rows, sort="price", descending=False):
+        """Stable sort of rows by a numeric column; missing values go last."""
+        np = _numpy()
+        if np is not None:
+            rows = np.asarray(rows, dtype=np.int64)
+            col = self.numeric[sort][rows]
+            keyed = np.where(np.isnan(col), np.inf, -col if descending else col)
+            return rows[np.argsort(keyed, kind="stable")]
+        col = self.numeric[sort]
+
+        def key(i):
+            v = col[i]
+            return math.inf if v != v else (-v if descending else v)
+        return sorted(rows, key=key)
+
+
+def build_columns(snap):
+    """{cat: CategoryColumns} for a catalog_snapshot.Snapshot."""
+    np = _numpy()
+    out = {}
+    for cat in snap.categories:
+        rids = list(snap.category_range(cat))
+        keys = [snap.record_key(r) for r in rids]
+        view = snap.data[cat]
+        infos = [view.record_at(r) for r in rids]
+        numeric = {
+            "price": [float(p) if p is not None else NAN for p in (snap.price(r) for r in rids)],
+            "watts": [float(w) if w is not None else NAN for w in (snap.watts(r) for r in rids)],
+        }
+        for name, fn in NUMERIC_PARSERS.items():
+            numeric[name] = [fn(info) for info in infos]
+        codes, vocab = {}, {}
+        for name, fn in CATEGORICAL_PARSERS.items():
+            labels, ids, col = [], {}, []
+            for info in infos:
+                label = fn(info)
+                if label not in ids:
+                    ids[label] = len(labels)
+                    labels.append(label)
+                col.append(ids[label])
+            codes[name], vocab[name] = col, labels
+        if np is not None:
+            numeric = {k: np.asarray(v, dtype=np.float64) for k, v in numeric.items()}
+            codes = {k: np.asarray(v, dtype=np.int32) for k, v in codes.items()}
+        out[cat] = CategoryColumns(cat, rids, keys, numeric, codes, vocab)
+    return out
+
+
+def get_columns(snap):
+    """Columns for snap, built once and cached on the (immutable) snapshot."""
+    cols = getattr(snap, "_columns", None)
+    if cols is None:
+        with _build_lock:
+            cols = getattr(snap, "_columns", None)
+            if cols is None:
+                cols = build_columns(snap)
+                snap._columns = cols
+    return cols
+
+
+def filter_components(snap, cat, sort="price", descending=False, limit=None, **filters):
+    """
+    [(key, info, price)] for records of cat matching filters, sorted by a
+    numeric column. Filters are CategoryColumns.mask keyword arguments.
+    """
+    cols = get_columns(snap).get(cat)
+    if cols is None:
+        return []
+    rows = cols.order(cols.mask(**filters), sort=sort, descending=descending)
+    if limit is not None:
+        rows = rows[:limit]
+    view = snap.data[cat]
+    out = []
+    for i in rows:
+        i = int(i)
+        price = cols.numeric["price"][i]
+        out.append((cols.keys[i], view.record_at(cols.rids[i]),
+                    None if price != price else int(price)))
+    return out
@@ -0,0 +1,320 @@
+# catalog_deltas.py
+"""
+Price/stock delta feed.
+
+Most catalog changes are a new price or a SKU going out of stock. Instead of
+rewriting catalog/components.json and recompiling every derived index, such
+changes are appended to catalog/price_deltas.jsonl, one object per line:
+
+  {"category": "gpu", "key": "rtx 3060", "price": 15990}
+  {"category": "cpu", "key": "amd ryzen 5 5600x", "stock": 0}
+
+Each worker tails the log from catalog_manager's watcher thread and applies
+new lines to its live backend (apply_price): the record, the category's
+price-sorted list and the filter price column are patched in place. Then
+on_delta(callback) listeners drop only the cached entries that depend on
+the changed SKU (in ARsemble_ai: the budget -> build table and the semantic
+answer cache). Cached /chat answers about one component are checked against
+that record's hash when read; the rest against delta_mark. Deltas hold absolute values, so replaying a line is harmless;
+a new snapshot replays the whole log before catalog_manager publishes it.
+
+Deltas arrive through the log (drop lines in, or use `apply` below, which
+validates first) or through POST /admin/catalog/deltas. `compact` folds the
+log into the JSON source and starts an empty one.
+
+Usage:
+    python catalog_deltas.py apply deltas.jsonl
+    python catalog_deltas.py compact
+    python catalog_deltas.py status
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import catalog_backend
+import catalog_manager
+import catalog_snapshot
+import log_config
+from catalog_import import CATEGORY_ALIASES
+from text_utils import effective_price, parse_price
+
+logger = log_config.get_logger("catalog_deltas")
+
+DELTA_PATH = Path(os.getenv("ARSEMBLE_CATALOG_DELTAS",
+                            catalog_snapshot.CATALOG_DIR / "price_deltas.jsonl"))
+
+_lock = threading.Lock()  # one applier per process; readers never take it
+_listeners = []
+stats = {"applied": 0, "unchanged": 0, "rejected": 0, "last_apply_ms": 0.0,
+         "max_apply_ms": 0.0, "total_apply_ms": 0.0, "last_error": None}
+
+
+def on_delta(callback):
+    """Register callback(cat, key, old_price, new_price, info) for every sale-price change."""
+    _listeners.append(callback)
+    return callback
+
+
+def parse_delta(obj):
+    """Validate one delta object -> {"category", "key", "price", "stock"}; raises ValueError."""
+    if not isinstance(obj, dict):
+        raise ValueError("expected a JSON object")
+    raw_cat = str(obj.get("category") or obj.get("cat") or "").strip()
+    cat = CATEGORY_ALIASES.get(raw_cat.lower().replace("-", " "))
+    if cat is None:
+        raise ValueError(f"unknown category {raw_cat!r}" if raw_cat else "missing category")
+    key = " ".join(str(obj.get("key") or "").lower().split())
+    if not key:
+        raise ValueError("missing key")
+    price = obj.get("price")
+    if price is not None:
+        price = price if isinstance(price, int) and not isinstance(price, bool) \
+            else parse_price(str(price).split(".")[0])
+        if not price or price <= 0:
+            raise ValueError(f"invalid price {obj.get('price')!r}")
+    stock = obj.get("stock")
+    if stock is not None:
+        if isinstance(stock, bool) or not str(stock).isdigit():
+            raise ValueError(f"invalid stock {stock!r}")
+        stock = int(stock)
+    if price is None and stock is None:
+        raise ValueError("a delta needs a price and/or stock")
+    return {"category": cat, "key": key, "price": price, "stock": stock}
+
+
+def apply_delta(delta, backend=None, notify=True):
+    """
+    Apply one parsed delta to backend (default: the live one) and notify the
+    listeners. Returns a result dict including the apply latency in ms.
+    """
+    backend = backend or catalog_backend.current_backend()
+    cat, key = delta["category"], delta["key"]
+    t0 = time.perf_counter()
+    old, new, info = backend.apply_price(cat, key, delta.get("price"), delta.get("stock"))
+    # a shared store (sqlite) may already hold a delta another worker wrote;
+    # this worker's caches were still built with the logged old price
+    logged = delta.get("old_price")
+    changed = old != new or (backend.shared and logged != new)
+    seen = [p for p in (old, logged) if p]
+    if notify and changed:
+        low = min(seen) if seen else None
+        for cb in list(_listeners):
+            try:
+                cb(cat, key, low, new, info)
+            except Exception as e:
+                logger.exception("delta listener failed: %s", e)
+    ms = (time.perf_counter() - t0) * 1000
+    stats["applied" if changed else "unchanged"] += 1
+    stats["last_apply_ms"] = round(ms, 3)
+    stats["max_apply_ms"] = max(stats["max_apply_ms"], round(ms, 3))
+    stats["total_apply_ms"] += ms
+    return {"category": cat, "key": key, "old_price": old, "new_price": new,
+            "changed": changed, "apply_ms": round(ms, 3)}
+
+
+def _append(lines, path):
+    """
+    Append complete lines with one O_APPEND write (atomic w.r.t. other
+    appenders). Returns (inode, start, end) of the bytes written.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    blob = "".join(lines).encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, blob)
+        end = os.lseek(fd, 0, os.SEEK_CUR)
+        return os.fstat(fd).st_ino, end - len(blob), end
+    finally:
+        os.close(fd)
+
+
+def submit(objs, path=None, backend=None):
+    """
+    Validate deltas, append the valid ones to the log and apply them here.
+    Other workers pick them up from the log. Returns one result (or
+    {"error": ...}) per input, in order.
+    """
+    path = path or DELTA_PATH
+    backend = backend or catalog_backend.current_backend()
+    results, accepted, lines = [], [], []
+    for obj in objs:
+        try:
+            delta = parse_delta(obj)
+            items = backend.data.get(delta["category"])
+            if items is None or delta["key"] not in items:
+                raise ValueError(f"unknown SKU {delta['category']}/{delta['key']}")
+        except ValueError as e:
+            stats["rejected"] += 1
+            results.append({"error": str(e)})
+            continue
+        delta["old_price"] = effective_price(items[delta["key"]])
+        delta["ts"] = round(time.time(), 3)
+        lines.append(json.dumps(delta, ensure_ascii=False) + "\n")
+        accepted.append((len(results), delta))
+        results.append(None)
+    if lines:
+        with _lock:
+            _poll_locked(backend, Path(path))  # catch up first, so the position below is exact
+            seen_ino, seen_offset = getattr(backend, "_delta_pos", (None, 0))
+            ino, start, end = _append(lines, path)
+            for i, delta in accepted:
+                results[i] = apply_delta(delta, backend)
+            if seen_offset == start and seen_ino in (ino, None):  # nobody appended in between
+                backend._delta_pos = (ino, end)
+    return results
+
+
+def poll(backend=None, path=None, notify=True):
+    """Apply log lines this backend has not seen yet. Returns how many were read."""
+    with _lock:
+        return _poll_locked(backend or catalog_backend.current_backend(),
+                            Path(path or DELTA_PATH), notify)
+
+
+def _poll_locked(backend, path, notify=True):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return 0
+    ino, offset = getattr(backend, "_delta_pos", (None, 0))
+    if ino != st.st_ino or st.st_size < offset:  # compacted / replaced: start over
+        offset = 0
+    if st.st_size == offset:
+        backend._delta_pos = (st.st_ino, offset)
+        return 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+        chunk = f.read(st.st_size - offset)
+    end = chunk.rfind(b"\n") + 1  # a line still being written waits for the next poll
+    count = 0
+    for line in chunk[:end].splitlines():
+        if not line.strip():
+            continue
+        count += 1
+        try:
+            obj = json.loads(line)
+            delta = parse_delta(obj)
+            delta["old_price"] = obj.get("old_price")
+            apply_delta(delta, backend, notify=notify)
+        except (ValueError, KeyError) as e:
+            stats["rejected"] += 1
+            stats["last_error"] = f"{path.name}: {e}"
+    backend._delta_pos = (st.st_ino, offset + end)
+    return count
+
+
+def _replay(new):
+    """A new snapshot starts from the source: bring it up to the log before it goes live."""
+    if catalog_backend.BACKEND == "snapshot":
+        poll(catalog_backend._snapshot_backend(new), notify=False)
+
+
+catalog_manager.before_swap(_replay)
+catalog_manager.on_poll(poll)
+
+
+def compact(path=None, source=None):
+    """Fold the log into the JSON source (and snapshot), then start a new log."""
+    path = Path(path or DELTA_PATH)
+    source = Path(source or catalog_snapshot.SOURCE_PATH)
+    if not path.exists():
+        return 0
+    work = path.with_name(path.name + ".compacting")
+    os.replace(path, work)  # new deltas go to a fresh log meanwhile
+    catalog, _ = catalog_snapshot.load_source(source)
+    folded = 0
+    with open(work, encoding="utf-8") as f:
+        for line in f:
+            try:
+                delta = parse_delta(json.loads(line))
+            except ValueError:
+                continue
+            items = catalog.get(delta["category"], {})
+            if delta["key"] in items:
+                items[delta["key"]] = catalog_backend.patch_record(
+                    items[delta["key"]], delta["price"], delta["stock"])
+                folded += 1
+    catalog_snapshot.write_source(catalog, source)
+    if source == catalog_snapshot.SOURCE_PATH:
+        catalog_snapshot.build_snapshot(source, catalog_snapshot.SNAPSHOT_PATH)
+    work.unlink()
+    return folded
+
+
+def delta_mark(backend=None):
+    """How far into the log this backend is ("inode.offset"); stamped on cached answers that read the whole catalog."""
+    backend = backend or catalog_backend.current_backend()
+    ino, offset = getattr(backend, "_delta_pos", (None, 0))
+    return f"{ino or 0}.{offset}"
+
+
+def delta_stats():
+    out = dict(stats, total_apply_ms=round(stats["total_apply_ms"], 1), log=str(DELTA_PATH))
+    try:
+        out["log_bytes"] = DELTA_PATH.stat().st_size
+    except OSError:
+        out["log_bytes"] = 0
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Apply / compact catalog price deltas.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    a = sub.add_parser("apply", help="validate a JSONL file of deltas and append it to the log")
+    a.add_argument("path")
+    a.add_argument("--batch", type=int, default=500)
+    sub.add_parser("compact", help="fold the log into the JSON source")
+    sub.add_parser("status", help="print the log size and this process' counters")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "compact":
+        print(f"folded {compact()} deltas into {catalog_snapshot.SOURCE_PATH}")
+        return
+    if args.cmd == "status":
+        print(json.dumps(delta_stats(), indent=2))
+        return
+
+    poll(notify=False)  # start from the current log state
+    timings, rejected = [], 0
+
+    def flush(batch):
+        nonlocal rejected
+        for (line_no, _), res in zip(batch, submit([obj for _, obj in batch])):
+            if "error" in res:
+                rejected += 1
+                print(f"rejected line {line_no}: {res['error']}", file=sys.stderr)
+            else:
+                timings.append(res["apply_ms"])
+
+    batch = []
+    with open(args.path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                batch.append((line_no, json.loads(line)))
+            except ValueError as e:
+                rejected += 1
+                print(f"rejected line {line_no}: invalid JSON ({e})", file=sys.stderr)
+            if len(batch) >= args.batch:
+                flush(batch)
+                batch = []
+    if batch:
+        flush(batch)
+    report = {"applied": len(timings), "rejected": rejected}
+    if timings:
+        timings.sort()
+        report.update(p50_apply_ms=round(statistics.median(timings), 3),
+                      p95_apply_ms=timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+                      max_apply_ms=timings[-1])
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+# catalog_import.py
+"""
+Streaming bulk import of supplier price lists (CSV or JSONL).
+
+Rows are read one at a time by a generator, normalized into the component
+schema and validated; malformed rows are rejected with their line number
+and never stop the import. Nothing holds the whole input file in memory.
+
+Row format (CSV header / JSONL keys, case-insensitive):
+
+  category   cpu, gpu, motherboard, ram, storage, psu, cpu_cooler
+             (common spellings such as "Graphics Card" or "Power Supply"
+             are accepted)
+  name       display name (required)
+  price      "₱12,000", "12000", "12,000.00" (required, > 0)
+  key        optional lookup key; defaults to the lowercased name
+  type       optional; new records default to the category's type
+  ...        any other column becomes a record field as-is (socket,
+             ram_type, tdp, power, wattage, vram, capacity, ...)
+
+A row for a key already in the catalog updates the fields it carries and
+keeps the rest of the record, so a name/price-only price list does not wipe
+specs or compatibility notes.
+
+Targets:
+
+  sqlite  rows are upserted into catalog/components.db as they stream in;
+          the FTS token index, the price/socket/ram_type B-tree indexes and
+          the compatibility tag table are updated per row, committed every
+          --batch rows. Readers see each committed batch.
+  json    rows are merged into catalog/components.json, which is rewritten
+          atomically once and compiled into the snapshot. The snapshot is
+          immutable by design, so its indexes are rebuilt in one pass; running
+          servers pick the new source up through catalog_manager's watcher.
+
+The default target follows ARSEMBLE_CATALOG_BACKEND.
+
+Usage:
+    python catalog_import.py supplier.csv [--target sqlite|json] [--dry-run]
+    python catalog_import.py feed.jsonl --rejects rejects.jsonl
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import catalog_snapshot
+from text_utils import parse_price, parse_watts
+
+CATEGORY_ALIASES = {
+    "cpu": "cpu", "processor": "cpu",
+    "gpu": "gpu", "graphics card": "gpu", "video card": "gpu",
+    "motherboard": "motherboard", "mobo": "motherboard", "mainboard": "motherboard",
+    "ram": "ram", "memory": "ram",
+    "storage": "storage", "ssd": "storage", "hdd": "storage", "nvme": "storage",
+    "psu": "psu", "power supply": "psu",
+    "cpu_cooler": "cpu_cooler", "cpu cooler": "cpu_cooler", "cooler": "cpu_cooler",
+}
+DEFAULT_TYPES = {"cpu": "CPU", "gpu": "GPU", "motherboard": "Motherboard", "ram": "RAM",
+                 "storage": "Storage", "psu": "PSU", "cpu_cooler": "CPU Cooler"}
+INT_FIELDS = ("ram_slots", "nvme_slots", "sata_ports")  # stored as ints in the source
+MAX_FIELD_LEN = 500
+
+
+class ImportRowError(ValueError):
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+        self.message = message
+
+
+# -------------------------------
+# Readers (generators)
+# -------------------------------
+
+def iter_csv(fh):
+    """Yield (line_no, row) from a CSV file with a header row."""
+    reader = csv.DictReader(fh)
+    if not reader.fieldnames:
+        return
+    for row in reader:
+        if None in row:  # more cells than header columns
+            yield reader.line_num, ImportRowError(reader.line_num, "too many columns")
+            continue
+        yield reader.line_num, row
+
+
+def iter_jsonl(fh):
+    """Yield (line_no, row) from a file with one JSON object per line."""
+    for line_no, line in enumerate(fh, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, ImportRowError(line_no, f"invalid JSON ({e.msg})")
+            continue
+        if not isinstance(row, dict):
+            yield line_no, ImportRowError(line_no, "expected a JSON object")
+            continue
+        yield line_no, row
+
+
+def iter_rows(path, fmt=None):
+    """Open path and stream its rows; the format comes from the suffix unless given."""
+    fmt = fmt or ("jsonl" if Path(path).suffix.lower() in (".jsonl", ".ndjson") else "csv")
+    # utf-8-sig: spreadsheet exports often start with a BOM
+    with open(path, encoding="utf-8-sig", newline="") as fh:
+        yield from (iter_jsonl(fh) if fmt == "jsonl" else iter_csv(fh))
+
+
+# -------------------------------
+# Normalize + validate
+# -------------------------------
+
+def format_price(n):
+    return f"₱{n:,}"
+
+
+def normalize_row(line, row):
+    """
+    One raw row -> (cat, key, info) with only the fields the row carries.
+    Raises ImportRowError for anything that would not load.
+    """
+    fields = {}
+    for k, v in row.items():
+        k = str(k or "").strip().lower().replace(" ", "_")
+        if not k or v is None:
+            continue
+        if isinstance(v, (dict, list)):
+            raise ImportRowError(line, f"{k}: nested values are not supported")
+        v = str(v).strip()
+        if v:
+            if len(v) > MAX_FIELD_LEN:
+                raise ImportRowError(line, f"{k}: value longer than {MAX_FIELD_LEN} characters")
+            fields[k] = v
+
+    raw_cat = fields.pop("category", "")
+    cat = CATEGORY_ALIASES.get(raw_cat.lower().replace("-", " "))
+    if cat is None:
+        raise ImportRowError(line, f"unknown category {raw_cat!r}" if raw_cat else "missing category")
+    name = fields.get("name")
+    if not name:
+        raise ImportRowError(line, "missing name")
+    key = " ".join(fields.pop("key", name).lower().split())
+
+    raw_price = fields.get("price")
+    if not raw_price:
+        raise ImportRowError(line, "missing price")
+    price = parse_price(raw_price.split(".")[0])
+    if not price:
+        raise ImportRowError(line, f"unparseable price {raw_price!r}")
+    fields["price"] = format_price(price)
+
+    for f in catalog_snapshot.WATT_FIELDS:
+        if f in fields:
+            if parse_watts(fields[f]) is None:
+                raise ImportRowError(line, f"{f}: no wattage in {fields[f]!r}")
+            break
+    for f in INT_FIELDS:
+        if f in fields:
+            if not fields[f].isdigit():
+                raise ImportRowError(line, f"{f}: expected a whole number, got {fields[f]!r}")
+            fields[f] = int(fields[f])
+
+    info = {"name": name}
+    info.update(fields)
+    return cat, key, info
+
+
+# -------------------------------
+# Targets
+# -------------------------------
+
+class SqliteSink:
+    """Incremental upserts into the SQLite catalog, committed in batches."""
+
+    def __init__(self, path, batch=1000):
+        import catalog_sqlite
+        self._sqlite = catalog_sqlite
+        self.path = Path(path)
+        if not self.path.exists():
+            catalog_sqlite.build_from_source(out=self.path)
+        self.conn = catalog_sqlite.connect(self.path)
+        self.conn.executescript(catalog_sqlite.SCHEMA)
+        self.batch = batch
+        self._pending = 0
+
+    def exists(self, cat, key):
+        return self.conn.execute("SELECT 1 FROM components WHERE cat=? AND key=?",
+                                 (cat, key)).fetchone() is not None
+
+    def write(self, cat, key, info):
+        self._sqlite.upsert_component(self.conn, cat, key, info)
+        self._pending += 1
+        if self._pending >= self.batch:
+            self.conn.commit()
+            self._pending = 0
+
+    def finish(self):
+        version = self._sqlite.bump_version(self.conn)
+        self.conn.commit()
+        self.conn.execute("ANALYZE")
+        self.conn.close()
+        return version
+
+    def abort(self):
+        self.conn.rollback()
+        self.conn.close()
+
+
+class JsonSink:
+    """Merge into the JSON source, then rewrite it and compile the snapshot once."""
+
+    def __init__(self, source, snapshot):
+        self.source, self.snapshot = Path(source), Path(snapshot)
+        self.catalog, _ = catalog_snapshot.load_source(self.source)
+
+    def exists(self, cat, key):
+        return key in self.catalog.get(cat, {})
+
+    def write(self, cat, key, info):
+        self.catalog.setdefault(cat, {}).setdefault(key, {}).update(info)
+
+    def finish(self):
+        raw = catalog_snapshot.write_source(self.catalog, self.source)
+        catalog_snapshot.build_snapshot(self.source, self.snapshot)
+        return hashlib.sha1(raw).hexdigest()[:12]
+
+    def abort(self):
+        pass
+
+
+class DryRunSink:
+    def __init__(self):
+        self._seen = set()
+
+    def exists(self, cat, key):
+        return (cat, key) in self._seen
+
+    def write(self, cat, key, info):
+        self._seen.add((cat, key))
+
+    def finish(self):
+        return None
+
+    def abort(self):
+        pass
+
+
+# -------------------------------
+# Import loop
+# -------------------------------
+
+def import_rows(rows, sink, on_reject=None, progress_every=0):
+    """
+    Stream (line_no, row) pairs into sink. Rejected rows are passed to
+    on_reject(err, row) and counted; returns a report dict.
+    """
+    report = {"rows": 0, "inserted": 0, "updated": 0, "rejected": 0, "version": None}
+    t0 = time.perf_counter()
+    try:
+        for line, row in rows:
+            report["rows"] += 1
+            try:
+                if isinstance(row, ImportRowError):
+                    raise row
+                cat, key, info = normalize_row(line, row)
+            except ImportRowError as err:
+                report["rejected"] += 1
+                if on_reject:
+                    on_reject(err, None if isinstance(row, ImportRowError) else row)
+                continue
+            if sink.exists(cat, key):
+                report["updated"] += 1
+            else:
+                report["inserted"] += 1
+                info = {"name": info["name"], "type": DEFAULT_TYPES[cat], **info}
+            sink.write(cat, key, info)
+            if progress_every and report["rows"] % progress_every == 0:
+                rate = report["rows"] / max(time.perf_counter() - t0, 1e-9)
+                print(f"  {report['rows']} rows ({rate:,.0f} rows/sec)", file=sys.stderr, flush=True)
+        report["version"] = sink.finish()
+    except BaseException:
+        sink.abort()
+        raise
+    elapsed = time.perf_counter() - t0
+    report["seconds"] = round(elapsed, 3)
+    report["rows_per_sec"] = round(report["rows"] / elapsed, 1) if elapsed else None
+    return report
+
+
+def main(argv=None):
+    import catalog_sqlite
+
+    ap = argparse.ArgumentParser(description="Import a supplier price list into the catalog.")
+    ap.add_argument("path", help="CSV or JSONL file")
+    ap.add_argument("--format", choices=("csv", "jsonl"), help="default: from the file suffix")
+    default_target = "sqlite" if os.getenv("ARSEMBLE_CATALOG_BACKEND", "").strip().lower() == "sqlite" else "json"
+    ap.add_argument("--target", choices=("json", "sqlite"), default=default_target)
+    ap.add_argument("--source", default=str(catalog_snapshot.SOURCE_PATH))
+    ap.add_argument("--snapshot", default=str(catalog_snapshot.SNAPSHOT_PATH))
+    ap.add_argument("--db", default=str(catalog_sqlite.DB_PATH))
+    ap.add_argument("--batch", type=int, default=1000, help="rows per SQLite transaction")
+    ap.add_argument("--dry-run", action="store_true", help="validate only, write nothing")
+    ap.add_argument("--rejects", help="write rejected rows to this JSONL file")
+    ap.add_argument("--max-rejects", type=int, default=None,
+                    help="abort after this many rejected rows (json: nothing is written; "
+                         "sqlite: batches already committed stay)")
+    ap.add_argument("--progress", type=int, default=100_000, help="progress line every N rows (0: off)")
+    args = ap.parse_args(argv)
+
+    if args.dry_run:
+        sink = DryRunSink()
+    elif args.target == "sqlite":
+        sink = SqliteSink(args.db, args.batch)
+    else:
+        sink = JsonSink(args.source, args.snapshot)
+
+    rejects_fh = open(args.rejects, "w", encoding="utf-8") if args.rejects else None
+    shown = [0]
+
+    def on_reject(err, row):
+        if shown[0] < 20:
+            print(f"rejected {err}", file=sys.stderr)
+        elif shown[0] == 20:
+            print("rejected ... (further rejects not shown)", file=sys.stderr)
+        shown[0] += 1
+        if rejects_fh:
+            rejects_fh.write(json.dumps({"line": err.line, "error": err.message, "row": row},
+                                        ensure_ascii=False) + "\n")
+        if args.max_rejects is not None and shown[0] > args.max_rejects:
+            raise SystemExit(f"import aborted after {shown[0]} rejected rows")
+
+    try:
+        report = import_rows(iter_rows(args.path, args.format), sink, on_reject, args.progress)
+    finally:
+        if rejects_fh:
+            rejects_fh.close()
+    report["target"] = "dry-run" if args.dry_run else args.target
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+# catalog_manager.py
+"""
+Hot catalog reload (read-copy-update).
+
+The live catalog is one immutable catalog_snapshot.Snapshot held in a
+module global. A background watcher polls the JSON source; when it changes
+a new snapshot (with all derived indexes) is compiled and mapped off the
+request path, then published with a single reference assignment. Readers
+never take a lock.
+
+A request pins the snapshot it started with (`with pinned(): ...`), so a
+swap in the middle of a request does not mix two catalog versions. The old
+snapshot stays valid until the last reader drops it: the file is replaced
+with os.replace, so its mmap keeps the previous inode alive.
+
+Caches that include `catalog_version()` (or a record hash) in their keys
+invalidate naturally after a swap; `on_swap(callback)` is available for
+caches that need an explicit flush. `before_swap(callback)` can patch a new
+snapshot before anyone sees it, and `on_poll(callback)` runs extra work on
+the watcher thread after each check (catalog_deltas uses both).
+
+Environment:
+  ARSEMBLE_CATALOG_WATCH   set to 0 to disable the watcher
+  ARSEMBLE_CATALOG_POLL    seconds between source checks (default 5)
+"""
+import contextlib
+import contextvars
+import os
+import threading
+import time
+
+import catalog_snapshot
+import log_config
+
+logger = log_config.get_logger("catalog_manager")
+
+_current = None
+_init_lock = threading.Lock()
+_reload_lock = threading.Lock()  # one rebuild at a time; readers never touch it
+_pinned = contextvars.ContextVar("arsemble_catalog_snapshot", default=None)
+_listeners = []
+_prepare_hooks = []
+_poll_hooks = []
+_watcher = None
+_source_stamp = None
+stats = {"reloads": 0, "failures": 0, "last_reload_ms": 0.0, "last_error": None}
+
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _live():
+    global _current, _source_stamp
+    if _current is None:
+        with _init_lock:
+            if _current is None:
+                _source_stamp = _stamp(catalog_snapshot.SOURCE_PATH)
+                _current = catalog_snapshot.open_snapshot()
+    return _current
+
+
+def current_snapshot():
+    """The snapshot pinned to this request/thread, else the live one."""
+    snap = _pinned.get()
+    return snap if snap is not None else _live()
+
+
+def catalog_version():
+    return current_snapshot().version
+
+
+@contextlib.contextmanager
+def pinned(snapshot=None):
+    """
+    Keep one snapshot for the duration of a request. Passing a snapshot pins
+    that one instead (benchmarks, offline jobs over another catalog).
+    """
+    if snapshot is None and _pinned.get() is not None:  # nested: keep the outer pin
+        yield _pinned.get()
+        return
+    token = _pinned.set(snapshot if snapshot is not None else _live())
+    try:
+        yield _pinned.get()
+    finally:
+        _pinned.reset(token)
+
+
+def on_swap(callback):
+    """Register callback(old_snapshot, new_snapshot), called after each swap."""
+    _listeners.append(callback)
+    return callback
+
+
+def before_swap(callback):
+    """Register callback(new_snapshot), run on the reload thread before new is published."""
+    _prepare_hooks.append(callback)
+    return callback
+
+
+def on_poll(callback):
+    """Register callback(), run by the watcher after every source check."""
+    _poll_hooks.append(callback)
+    return callback
+
+
+def reload_now(force=False):
+    """
+    Rebuild and publish a new snapshot if the source changed (or force).
+    Runs on the caller's thread; returns True when a swap happened.
+    """
+    global _current, _source_stamp
+    with _reload_lock:
+        old = _live()
+        stamp = _stamp(catalog_snapshot.SOURCE_PATH)
+        if not force and stamp == _source_stamp:
+            return False
+        t0 = time.perf_counter()
+        try:
+            new = catalog_snapshot.open_snapshot()
+        except (OSError, ValueError) as e:
+            stats["failures"] += 1
+            stats["last_error"] = str(e)
+            logger.warning("catalog reload failed, keeping %s: %s", old.version, e)
+            return False
+        _source_stamp = stamp
+        if new.version == old.version and not force:
+            return False
+        for cb in list(_prepare_hooks):
+            try:
+                cb(new)
+            except Exception as e:
+                logger.exception("catalog prepare hook failed: %s", e)
+        _current = new  # the atomic publish
+        stats["reloads"] += 1
+        stats["last_reload_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        stats["last_error"] = None
+    for cb in list(_listeners):
+        try:
+            cb(old, new)
+        except Exception as e:
+            logger.exception("catalog swap listener failed: %s", e)
+    return True
+
+
+def _run_poll_hooks():
+    for hook in list(_poll_hooks):
+        try:
+            hook()
+        except Exception as e:
+            logger.exception("catalog poll hook failed: %s", e)
+
+
+def _watch(interval):
+    _run_poll_hooks()  # a fresh worker catches up before the first interval
+    while True:
+        time.sleep(interval)
+        try:
+            reload_now()
+        except Exception as e:  # never let the watcher die
+            logger.exception("catalog watcher error: %s", e)
+        _run_poll_hooks()
+
+
+def start_watcher(interval=None):
+    """Start the polling thread once per process (call after fork)."""
+    global _watcher
+    if os.getenv("ARSEMBLE_CATALOG_WATCH", "1") == "0":
+        return None
+    if _watcher is not None and _watcher.is_alive():
+        return _watcher
+    if interval is None:
+        try:
+            interval = float(os.getenv("ARSEMBLE_CATALOG_POLL", "5"))
+        except ValueError:
+            interval = 5.0
+    _live()
+    _watcher = threading.Thread(target=_watch, args=(interval,),
+                                name="catalog-watcher", daemon=True)
+    _watcher.start()
+    return _watcher
+
+
+def reinit_after_fork():
+    """Fresh locks and no watcher in a forked worker; the published snapshot is kept."""
+    global _init_lock, _reload_lock, _watcher
+    _init_lock = threading.Lock()
+    _reload_lock = threading.Lock()
+    _watcher = None
+
+
+def catalog_stats():
+    snap = current_snapshot()
+    return dict(stats, version=snap.version, records=snap.record_count,
+                watching=bool(_watcher and _watcher.is_alive()))
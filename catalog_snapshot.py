@@ -0,0 +1,599 @@
+# catalog_snapshot.py
+"""
+Binary catalog snapshot.
+
+catalog/components.json is the editable source of truth. It is compiled into
+catalog/components.snap, a little-endian file made of fixed-width sections:
+
+  STRO/STRB  string table (u32 offsets + UTF-8 blob); every key, field name
+             and value is stored once
+  CATS       per category: name, first record, record count, price-index
+             slice
+  RECS       per record: category, key, first field, field count
+  FLDS       per field: name, value, kind (0 = str, 1 = int, 2 = float,
+             3 = bool, 4 = null, 5 = JSON-encoded list/object)
+  PRIC/WATT  numeric columns (i32, -1 = missing or out of stock), parsed
+             with the same helpers ARsemble_ai uses
+  PIDX       records with a price, stable-sorted by price within a category
+  KIDX       records sorted by key within a category (binary-search lookup)
+  TOKS/TOKP/TOKR  token -> record postings over key + name tokens
+
+Workers open the file with mmap, so start-up is a header read and the pages
+are shared through the OS page cache. The snapshot is rebuilt automatically
+when the source is newer (content hash differs).
+
+`LazyCatalog` keeps the old nested-dict API (data[cat][key] -> record).
+Records are decoded on first access and memoized as CompactRecord: a
+read-only Mapping holding a field layout shared by every record with the
+same fields and a tuple of values. Each string of the table is decoded
+once per snapshot, so "DDR4", "AM4" or "PCIe 4.0 x16" is one object
+however many records use it. Code that needs a real dict (JSON) calls
+dict(record).
+
+Usage:
+    python catalog_snapshot.py build [--source PATH] [--out PATH]
+    python catalog_snapshot.py info [PATH]
+"""
+import argparse
+import array
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+
+import log_config
+from text_utils import effective_price, normalize_text, parse_watts
+
+logger = log_config.get_logger("catalog_snapshot")
+
+MAGIC = b"ARSNAP01"
+FORMAT_VERSION = 2
+HEADER = struct.Struct("<8sII20sQ4x")        # magic, format, sections, sha1, source size
+SECTION = struct.Struct("<4s4xQQ")            # name, offset, length
+CAT_FIELDS = 5                                # name_sid, rec_start, rec_count, pidx_start, pidx_count
+REC_FIELDS = 4                                # cat_idx, key_sid, field_start, field_count
+FLD_FIELDS = 3                                # name_sid, value_sid, kind
+KIND_STR, KIND_INT, KIND_FLOAT, KIND_BOOL, KIND_NULL, KIND_JSON = range(6)
+WATT_FIELDS = ("wattage", "power", "tdp")
+
+CATALOG_DIR = Path(__file__).resolve().parent / "catalog"
+SOURCE_PATH = Path(os.getenv("ARSEMBLE_CATALOG_SOURCE",
+                             CATALOG_DIR / "components.json"))
+SNAPSHOT_PATH = Path(os.getenv("ARSEMBLE_CATALOG_SNAPSHOT",
+                               CATALOG_DIR / "components.snap"))
+
+
+def _sha1(raw):
+    return hashlib.sha1(raw).digest()
+
+
+def load_source(path=SOURCE_PATH):
+    """Return (catalog dict, raw bytes) from the JSON source."""
+    raw = Path(path).read_bytes()
+    return json.loads(raw.decode("utf-8")), raw
+
+
+def write_source(catalog, path=SOURCE_PATH):
+    """Atomically rewrite the JSON source (same layout as the checked-in file)."""
+    raw = json.dumps(catalog, ensure_ascii=False, indent=4).encode("utf-8")
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(raw)
+    os.replace(tmp, path)
+    return raw
+
+
+# -------------------------------
+# Compile
+# -------------------------------
+
+def encode_value(value):
+    """(text, kind) for a record value; TypeError for a type JSON cannot hold."""
+    if value is None:
+        return "", KIND_NULL
+    if isinstance(value, bool):
+        return ("true" if value else "false"), KIND_BOOL
+    if isinstance(value, int):
+        return str(value), KIND_INT
+    if isinstance(value, float):
+        return repr(value), KIND_FLOAT
+    if isinstance(value, str):
+        return value, KIND_STR
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")), KIND_JSON
+    raise TypeError(f"unsupported catalog value {value!r} ({type(value).__name__})")
+
+
+def decode_value(text, kind):
+    """The record value encode_value stored as (text, kind)."""
+    if kind == KIND_STR:
+        return text
+    if kind == KIND_INT:
+        return int(text)
+    if kind == KIND_FLOAT:
+        return float(text)
+    if kind == KIND_BOOL:
+        return text == "true"
+    if kind == KIND_NULL:
+        return None
+    return json.loads(text)
+
+def compile_snapshot(catalog, source_raw=b""):
+    """Serialize {cat: {key: {field: value}}} into snapshot bytes."""
+    strings, sids = [], {}
+
+    def sid(s):
+        s = str(s)
+        if s not in sids:
+            sids[s] = len(strings)
+            strings.append(s)
+        return sids[s]
+
+    cats, recs, flds, prices, watts = [], [], [], [], []
+    pidx, kidx = [], []
+    postings = {}
+    for cat, items in catalog.items():
+        rec_start = len(recs)
+        for key, info in items.items():
+            rid = len(recs)
+            recs.append((len(cats), sid(key), len(flds), len(info)))
+            for name, value in info.items():
+                try:
+                    text, kind = encode_value(value)
+                except TypeError as e:
+                    raise TypeError(f"{cat}/{key}/{name}: {e}") from None
+                flds.append((sid(name), sid(text), kind))
+            p = effective_price(info)
+            prices.append(p if p is not None else -1)
+            w = None
+            for f in WATT_FIELDS:
+                if f in info:
+                    w = parse_watts(info[f])
+                    break
+            watts.append(w if w is not None else -1)
+            for tok in set(normalize_text(key) + normalize_text(info.get("name", ""))):
+                postings.setdefault(tok, []).append(rid)
+        rec_ids = range(rec_start, len(recs))
+        priced = sorted((r for r in rec_ids if prices[r] > 0), key=lambda r: prices[r])
+        cats.append((sid(cat), rec_start, len(rec_ids), len(pidx), len(priced)))
+        pidx.extend(priced)
+        kidx.extend(sorted(rec_ids, key=lambda r: strings[recs[r][1]]))
+
+    tokens = sorted(postings)
+    tok_sids = [sid(t) for t in tokens]
+    tok_offsets, tok_records = [0], []
+    for t in tokens:
+        tok_records.extend(postings[t])
+        tok_offsets.append(len(tok_records))
+
+    blob = bytearray()
+    str_offsets = [0]
+    for s in strings:
+        blob += s.encode("utf-8")
+        str_offsets.append(len(blob))
+
+    def u32(values):
+        return struct.pack(f"<{len(values)}I", *values)
+
+    def flat(rows):
+        return u32([v for row in rows for v in row])
+
+    sections = [
+        (b"STRO", u32(str_offsets)),
+        (b"STRB", bytes(blob)),
+        (b"CATS", flat(cats)),
+        (b"RECS", flat(recs)),
+        (b"FLDS", flat(flds)),
+        (b"PRIC", struct.pack(f"<{len(prices)}i", *prices)),
+        (b"WATT", struct.pack(f"<{len(watts)}i", *watts)),
+        (b"PIDX", u32(pidx)),
+        (b"KIDX", u32(kidx)),
+        (b"TOKS", u32(tok_sids)),
+        (b"TOKP", u32(tok_offsets)),
+        (b"TOKR", u32(tok_records)),
+    ]
+    offset = HEADER.size + SECTION.size * len(sections)
+    table, body = [], bytearray()
+    for name, payload in sections:
+        pad = (-(offset + len(body))) % 8
+        body += b"\0" * pad
+        table.append(SECTION.pack(name, offset + len(body), len(payload)))
+        body += payload
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(sections),
+                         _sha1(source_raw), len(source_raw))
+    return header + b"".join(table) + bytes(body)
+
+
+def build_snapshot(source=SOURCE_PATH, out=SNAPSHOT_PATH):
+    """Compile source -> out atomically. Returns the output path."""
+    catalog, raw = load_source(source)
+    payload = compile_snapshot(catalog, raw)
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, out)
+    return out
+
+
+# -------------------------------
+# Read
+# -------------------------------
+
+def _ints(buf, code):
+    """Zero-copy int view on little-endian hosts, a swapped copy elsewhere."""
+    if sys.byteorder == "little":
+        return buf.cast(code)
+    arr = array.array(code, bytes(buf))
+    arr.byteswap()
+    return arr
+
+
+class Snapshot:
+    """Read-only view over snapshot bytes (an mmap or, as a fallback, bytes)."""
+
+    def __init__(self, buf, path=None):
+        self._buf = buf
+        self.path = path
+        mv = memoryview(buf)
+        magic, fmt, nsec, sha, size = HEADER.unpack_from(mv, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"not a catalog snapshot (format {fmt}): {path}")
+        self.source_sha1 = sha.hex()
+        self.source_size = size
+        self.version = self.source_sha1[:12]
+        sec = {}
+        for i in range(nsec):
+            name, off, length = SECTION.unpack_from(mv, HEADER.size + i * SECTION.size)
+            sec[name.decode("ascii")] = mv[off:off + length]
+        self._stro = _ints(sec["STRO"], "I")
+        self._strb = sec["STRB"]
+        self._strings = [None] * (len(self._stro) - 1)  # sid -> decoded str (interned)
+        self._shapes = {}                                # field-name sids -> RecordShape
+        self._cats = _ints(sec["CATS"], "I")
+        self._recs = _ints(sec["RECS"], "I")
+        self._flds = _ints(sec["FLDS"], "I")
+        self._price = _ints(sec["PRIC"], "i")
+        self._watts = _ints(sec["WATT"], "i")
+        self._pidx = _ints(sec["PIDX"], "I")
+        self._kidx = _ints(sec["KIDX"], "I")
+        self._toks = _ints(sec["TOKS"], "I")
+        self._tokp = _ints(sec["TOKP"], "I")
+        self._tokr = _ints(sec["TOKR"], "I")
+        self.categories = {}
+        for c in range(len(self._cats) // CAT_FIELDS):
+            self.categories[self.string(self._cats[c * CAT_FIELDS])] = c
+        self.record_count = len(self._recs) // REC_FIELDS
+        self.data = CatalogView(self)
+
+    def string(self, i):
+        s = self._strings[i]
+        if s is None:
+            s = self._strings[i] = bytes(self._strb[self._stro[i]:self._stro[i + 1]]).decode("utf-8")
+        return s
+
+    def _value(self, sid, kind):
+        text = self.string(sid)
+        return text if kind == KIND_STR else decode_value(text, kind)
+
+    def _cat_row(self, cat):
+        c = self.categories[cat]
+        return self._cats[c * CAT_FIELDS:(c + 1) * CAT_FIELDS]
+
+    def category_range(self, cat):
+        _, start, count, _, _ = self._cat_row(cat)
+        return range(start, start + count)
+
+    def record_key(self, rid):
+        return self.string(self._recs[rid * REC_FIELDS + 1])
+
+    def record(self, rid):
+        """Decode record rid into a fresh dict (field order as in the source)."""
+        _, _, fstart, fcount = self._recs[rid * REC_FIELDS:(rid + 1) * REC_FIELDS]
+        out = {}
+        for f in range(fstart, fstart + fcount):
+            name_sid, value_sid, kind = self._flds[f * FLD_FIELDS:(f + 1) * FLD_FIELDS]
+            out[self.string(name_sid)] = self._value(value_sid, kind)
+        return out
+
+    def compact_record(self, rid):
+        """Decode record rid into a CompactRecord sharing strings and layout."""
+        _, _, fstart, fcount = self._recs[rid * REC_FIELDS:(rid + 1) * REC_FIELDS]
+        names, values = [], []
+        for f in range(fstart, fstart + fcount):
+            name_sid, value_sid, kind = self._flds[f * FLD_FIELDS:(f + 1) * FLD_FIELDS]
+            names.append(name_sid)
+            values.append(self._value(value_sid, kind))
+        layout = tuple(names)
+        shape = self._shapes.get(layout)
+        if shape is None:
+            shape = self._shapes.setdefault(
+                layout, RecordShape(tuple(self.string(s) for s in layout)))
+        return CompactRecord(shape, tuple(values))
+
+    def price(self, rid):
+        p = self._price[rid]
+        return None if p < 0 else p
+
+    def watts(self, rid):
+        w = self._watts[rid]
+        return None if w < 0 else w
+
+    def find_key(self, cat, key):
+        """Record id of data[cat][key] via binary search on KIDX, or None."""
+        if cat not in self.categories:
+            return None
+        r = self.category_range(cat)
+        ids = self._kidx[r.start:r.stop]
+        keys = _KeyColumn(self, ids)
+        i = bisect.bisect_left(keys, key)
+        if i < len(ids) and keys[i] == key:
+            return ids[i]
+        return None
+
+    def price_sorted(self, cat):
+        """Record ids with a positive price, ascending (ties in catalog order)."""
+        if cat not in self.categories:
+            return []
+        _, _, _, pstart, pcount = self._cat_row(cat)
+        return list(self._pidx[pstart:pstart + pcount])
+
+    def token_postings(self, token):
+        """Record ids whose key or name contains token, in catalog order."""
+        lo, hi = 0, len(self._toks)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.string(self._toks[mid]) < token:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._toks) and self.string(self._toks[lo]) == token:
+            return self._tokr[self._tokp[lo]:self._tokp[lo + 1]]
+        return ()
+
+    def record_category(self, rid):
+        c = self._recs[rid * REC_FIELDS]
+        return self.string(self._cats[c * CAT_FIELDS])
+
+
+class _KeyColumn:
+    """Sequence adapter so bisect can search keys without decoding them all."""
+
+    def __init__(self, snap, ids):
+        self._snap, self._ids = snap, ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, i):
+        return self._snap.record_key(self._ids[i])
+
+
+class RecordShape:
+    """Field names of a record layout and their positions, shared across records."""
+
+    __slots__ = ("names", "index")
+
+    def __init__(self, names):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+
+
+class CompactRecord(Mapping):
+    """
+    A catalog record as a read-only mapping (~9x smaller than the dict it
+    replaces). Supports everything the handlers use on records: [], get, in,
+    iteration, items(); dict(record) gives a plain copy for JSON.
+    """
+
+    __slots__ = ("_shape", "_values")
+
+    def __init__(self, shape, values):
+        self._shape = shape
+        self._values = values
+
+    def __getitem__(self, name):
+        return self._values[self._shape.index[name]]
+
+    def get(self, name, default=None):
+        i = self._shape.index.get(name)
+        return default if i is None else self._values[i]
+
+    def __contains__(self, name):
+        return name in self._shape.index
+
+    def __iter__(self):
+        return iter(self._shape.names)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return repr(dict(zip(self._shape.names, self._values)))
+
+
+class CategoryView(Mapping):
+    """data[cat] as a read-only mapping; records are built on first use."""
+
+    def __init__(self, snap, cat):
+        self._snap = snap
+        self.name = cat
+        self._range = snap.category_range(cat)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def record_at(self, rid):
+        info = self._cache.get(rid)
+        if info is None:
+            with self._lock:
+                info = self._cache.setdefault(rid, self._snap.compact_record(rid))
+        return info
+
+    def patch(self, rid, info):
+        """Serve info for rid from now on (price deltas; the bytes stay as built)."""
+        self._cache[rid] = info
+
+    def __getitem__(self, key):
+        rid = self._snap.find_key(self.name, key)
+        if rid is None:
+            raise KeyError(key)
+        return self.record_at(rid)
+
+    def __iter__(self):
+        for rid in self._range:
+            yield self._snap.record_key(rid)
+
+    def __len__(self):
+        return len(self._range)
+
+    def __contains__(self, key):
+        return self._snap.find_key(self.name, key) is not None
+
+    def items(self):
+        return [(self._snap.record_key(rid), self.record_at(rid)) for rid in self._range]
+
+    def values(self):
+        return [self.record_at(rid) for rid in self._range]
+
+
+class CatalogView(Mapping):
+    """{cat: CategoryView} in source order."""
+
+    def __init__(self, snap):
+        self._snap = snap
+        self._views = {cat: CategoryView(snap, cat) for cat in snap.categories}
+
+    def __getitem__(self, cat):
+        return self._views[cat]
+
+    def __iter__(self):
+        return iter(self._views)
+
+    def __len__(self):
+        return len(self._views)
+
+    def record(self, rid):
+        """(cat, key, info) for a record id; info is the memoized dict."""
+        cat = self._snap.record_category(rid)
+        return cat, self._snap.record_key(rid), self._views[cat].record_at(rid)
+
+    def price_sorted(self, cat):
+        """[(key, info, price)] with a positive price, cheapest first."""
+        if cat not in self._views:
+            return []
+        view = self._views[cat]
+        return [(self._snap.record_key(r), view.record_at(r), self._snap.price(r))
+                for r in self._snap.price_sorted(cat)]
+
+    def token_postings(self, token):
+        return self._snap.token_postings(token)
+
+
+def _map_file(path):
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _is_current(path, source_raw):
+    try:
+        with open(path, "rb") as f:
+            head = f.read(HEADER.size)
+        magic, fmt, _, sha, _ = HEADER.unpack(head)
+    except (OSError, struct.error):
+        return False
+    return magic == MAGIC and fmt == FORMAT_VERSION and sha == _sha1(source_raw)
+
+
+def open_snapshot(source=SOURCE_PATH, path=SNAPSHOT_PATH):
+    """
+    Map the snapshot, rebuilding it first if the source changed. If the
+    snapshot directory is read-only the compiled bytes are kept in memory.
+    """
+    path = Path(path)
+    try:
+        catalog_raw = Path(source).read_bytes()
+    except OSError:
+        catalog_raw = None  # deployed without the source: trust the snapshot
+    if catalog_raw is not None and not _is_current(path, catalog_raw):
+        try:
+            build_snapshot(source, path)
+        except OSError as e:
+            logger.warning("cannot write catalog snapshot %s (%s); using an in-memory copy", path, e)
+            catalog = json.loads(catalog_raw.decode("utf-8"))
+            return Snapshot(compile_snapshot(catalog, catalog_raw), path=None)
+    return Snapshot(_map_file(path), path=path)
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def get_snapshot():
+    global _snapshot
+    if _snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                _snapshot = open_snapshot()
+    return _snapshot
+
+
+class LazyCatalog(Mapping):
+    """
+    Module-level `data` stand-in: resolves the catalog on every access, so a
+    swapped-in snapshot (see catalog_manager) is picked up without rebinding.
+    `resolve` returns anything with a `.data` mapping and a `.version`.
+    """
+
+    def __init__(self, resolve=None):
+        self._resolve = resolve or get_snapshot
+
+    def _view(self):
+        return self._resolve().data
+
+    def __getitem__(self, cat):
+        return self._view()[cat]
+
+    def __iter__(self):
+        return iter(self._view())
+
+    def __len__(self):
+        return len(self._view())
+
+    def __repr__(self):
+        return f"<LazyCatalog version={self._resolve().version}>"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compile / inspect the catalog snapshot.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="compile the JSON source into a snapshot")
+    b.add_argument("--source", default=str(SOURCE_PATH))
+    b.add_argument("--out", default=str(SNAPSHOT_PATH))
+    i = sub.add_parser("info", help="print snapshot header and sizes")
+    i.add_argument("path", nargs="?", default=str(SNAPSHOT_PATH))
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        out = build_snapshot(args.source, args.out)
+        print(f"wrote {out} ({out.stat().st_size} bytes)")
+        return
+    snap = Snapshot(_map_file(args.path), path=args.path)
+    print(json.dumps({
+        "path": str(args.path),
+        "version": snap.version,
+        "bytes": Path(args.path).stat().st_size,
+        "source_bytes": snap.source_size,
+        "records": snap.record_count,
+        "categories": {c: len(snap.category_range(c)) for c in snap.categories},
+        "tokens": len(snap._toks),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
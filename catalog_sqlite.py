@@ -0,0 +1,445 @@
+# catalog_sqlite.py
+"""
+SQLite catalog backend for very large inventories.
+
+One file (catalog/components.db) holds:
+
+  components      rid, cat, key, name, the full record as JSON, and parsed
+                  columns: price, watts, cores, threads, vram_gb, boost_ghz,
+                  capacity_gb, socket, ram_type, pcie
+                  B-tree indexes: (cat, key) unique, (cat, price),
+                  (cat, socket), (cat, ram_type)
+  component_tags  (kind, value, rid) for multi-valued attributes, e.g. a
+                  cooler listing "AM4, AM5, LGA1700"
+  components_fts  FTS5 over key, name and aliases (external content)
+  meta            version, source hash, build time
+
+Readers share a small per-process connection pool (safe for gunicorn
+threads; connections are never carried across a fork). Rows come back as
+plain dicts, so handlers use the same code as with the mmap snapshot.
+
+Usage:
+    python catalog_sqlite.py build [--source PATH] [--out PATH]
+    python catalog_sqlite.py info [PATH]
+"""
+import argparse
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+
+import catalog_columns
+import catalog_snapshot
+from text_utils import effective_price, parse_watts
+
+DB_PATH = Path(os.getenv("ARSEMBLE_CATALOG_DB",
+                         catalog_snapshot.CATALOG_DIR / "components.db"))
+POOL_SIZE = int(os.getenv("ARSEMBLE_CATALOG_DB_POOL", "8"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT);
+CREATE TABLE IF NOT EXISTS components (
+    rid INTEGER PRIMARY KEY,
+    cat TEXT NOT NULL,
+    key TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    aliases TEXT NOT NULL DEFAULT '',
+    record TEXT NOT NULL,
+    price INTEGER, watts INTEGER, cores REAL, threads REAL, vram_gb REAL,
+    boost_ghz REAL, capacity_gb REAL, socket TEXT, ram_type TEXT, pcie TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS components_cat_key ON components (cat, key);
+CREATE INDEX IF NOT EXISTS components_cat_price ON components (cat, price);
+CREATE INDEX IF NOT EXISTS components_cat_socket ON components (cat, socket);
+CREATE INDEX IF NOT EXISTS components_cat_ram_type ON components (cat, ram_type);
+CREATE TABLE IF NOT EXISTS component_tags (
+    kind TEXT NOT NULL, value TEXT NOT NULL, rid INTEGER NOT NULL,
+    PRIMARY KEY (kind, value, rid)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS components_fts USING fts5(
+    key, name, aliases, content='components', content_rowid='rid',
+    tokenize="unicode61 remove_diacritics 0"
+);
+"""
+
+NUMERIC_COLUMNS = ("cores", "threads", "vram_gb", "boost_ghz", "capacity_gb")
+RANGE_FILTERS = {  # filter kwarg -> (column, operator)
+    "min_price": ("price", ">="), "max_price": ("price", "<="), "max_watts": ("watts", "<="),
+    "min_cores": ("cores", ">="), "min_threads": ("threads", ">="), "min_vram": ("vram_gb", ">="),
+    "min_boost": ("boost_ghz", ">="), "min_capacity": ("capacity_gb", ">="),
+}
+SORT_COLUMNS = {"price", "watts", *NUMERIC_COLUMNS}
+
+
+def _nan_to_none(v):
+    return None if v != v else v
+
+
+def component_row(cat, key, info):
+    """Column values for one record (parsed once, at write time)."""
+    w = None
+    for f in catalog_snapshot.WATT_FIELDS:
+        if f in info:
+            w = parse_watts(info[f])
+            break
+    aliases = info.get("aliases") or ""
+    if isinstance(aliases, (list, tuple)):
+        aliases = " ".join(aliases)
+    row = {"cat": cat, "key": key, "name": info.get("name", ""), "aliases": aliases,
+           "record": json.dumps(dict(info), ensure_ascii=False),
+           "price": effective_price(info), "watts": w}
+    for col in NUMERIC_COLUMNS:
+        row[col] = _nan_to_none(catalog_columns.NUMERIC_PARSERS[col](info))
+    for col, fn in catalog_columns.CATEGORICAL_PARSERS.items():
+        row[col] = fn(info) or None
+    return row
+
+
+def component_tags(row):
+    """(kind, value) pairs for the categorical filters, one per listed value."""
+    for kind in catalog_columns.CATEGORICAL:
+        label = row.get(kind)
+        if label:
+            for tok in catalog_columns._label_tokens(label):
+                yield kind, tok
+
+
+def connect(path, readonly=False):
+    if readonly:
+        conn = sqlite3.connect(f"file:{Path(path)}?mode=ro", uri=True,
+                               check_same_thread=False)
+    else:
+        conn = sqlite3.connect(str(path), check_same_thread=False)
+    conn.execute("PRAGMA cache_size=-16000")
+    return conn
+
+
+def upsert_component(conn, cat, key, info):
+    """
+    Insert one record, or merge info into the stored one (fields info does
+    not carry are kept), and keep the FTS and tag tables in step. Returns rid.
+    """
+    old = conn.execute("SELECT rid, key, name, aliases, record FROM components WHERE cat=? AND key=?",
+                       (cat, key)).fetchone()
+    if old:
+        info = {**json.loads(old[4]), **info}
+    row = component_row(cat, key, info)
+    cols = [c for c in row]
+    if old:
+        rid = old[0]
+        conn.execute("INSERT INTO components_fts(components_fts, rowid, key, name, aliases) "
+                     "VALUES('delete', ?, ?, ?, ?)", old[:4])
+        conn.execute(f"UPDATE components SET {', '.join(c + '=?' for c in cols)} WHERE rid=?",
+                     [row[c] for c in cols] + [rid])
+        conn.execute("DELETE FROM component_tags WHERE rid=?", (rid,))
+    else:
+        cur = conn.execute(f"INSERT INTO components ({', '.join(cols)}) "
+                           f"VALUES ({', '.join('?' * len(cols))})", [row[c] for c in cols])
+        rid = cur.lastrowid
+    conn.execute("INSERT INTO components_fts(rowid, key, name, aliases) VALUES (?, ?, ?, ?)",
+                 (rid, row["key"], row["name"], row["aliases"]))
+    conn.executemany("INSERT OR IGNORE INTO component_tags (kind, value, rid) VALUES (?, ?, ?)",
+                     [(k, v, rid) for k, v in component_tags(row)])
+    return rid
+
+
+def bump_version(conn, source_sha1=None):
+    """Record a new catalog version after a write transaction."""
+    prev = dict(conn.execute("SELECT k, v FROM meta").fetchall())
+    revision = int(prev.get("revision", 0)) + 1
+    seed = f"{prev.get('version', '')}:{revision}:{source_sha1 or ''}"
+    version = (source_sha1 or hashlib.sha1(seed.encode()).hexdigest())[:12]
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+    meta = {"version": version, "revision": str(revision), "updated_at": now}
+    if source_sha1:
+        meta["source_sha1"] = source_sha1
+    conn.executemany("INSERT OR REPLACE INTO meta (k, v) VALUES (?, ?)", meta.items())
+    return version
+
+
+def build_database(catalog, out=DB_PATH, source_sha1=None):
+    """Write catalog {cat: {key: info}} to a fresh database file (atomic rename)."""
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.tmp")
+    if tmp.exists():
+        tmp.unlink()
+    conn = sqlite3.connect(str(tmp))
+    try:
+        conn.executescript(SCHEMA)
+        with conn:
+            for cat, items in catalog.items():
+                for key, info in items.items():
+                    upsert_component(conn, cat, key, info)
+            bump_version(conn, source_sha1)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    # rollback-journal mode (no -wal/-shm sidecars), so a rebuilt file can be
+    # renamed over the old one while readers still hold the old inode
+    os.replace(tmp, out)
+    return out
+
+
+def build_from_source(source=catalog_snapshot.SOURCE_PATH, out=DB_PATH):
+    catalog, raw = catalog_snapshot.load_source(source)
+    return build_database(catalog, out, hashlib.sha1(raw).hexdigest())
+
+
+# -------------------------------
+# Read side
+# -------------------------------
+
+class ConnectionPool:
+    """A few read connections per process, handed out to one thread at a time."""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = Path(path)
+        self.size = size
+        self._reset()
+
+    def _inode(self):
+        try:
+            return os.stat(self.path).st_ino
+        except OSError:
+            return None
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._ino = self._inode()
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connection(self):
+        # forked: never share a parent's connections; rebuilt file: reconnect
+        # (connections in use keep reading the old inode until returned)
+        if self._pid != os.getpid() or self._ino != self._inode():
+            self._reset()
+        idle = self._idle
+        try:
+            conn = idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._created < self.size
+                if grow:
+                    self._created += 1
+            conn = connect(self.path, readonly=True) if grow else idle.get()
+        try:
+            yield conn
+        finally:
+            idle.put(conn)  # back to its own generation, even after a reset
+
+
+def fts_query(tokens):
+    """OR query over quoted tokens (FTS5 syntax characters are neutralized)."""
+    toks = sorted({t for t in tokens if t})
+    return " OR ".join('"' + t.replace('"', '""') + '"' for t in toks)
+
+
+class SqliteCategory(Mapping):
+    def __init__(self, backend, cat):
+        self._b, self.name = backend, cat
+
+    def __getitem__(self, key):
+        row = self._b._one("SELECT record FROM components WHERE cat=? AND key=?", (self.name, key))
+        if row is None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def __iter__(self):
+        return iter([r[0] for r in self._b._all(
+            "SELECT key FROM components WHERE cat=? ORDER BY rid", (self.name,))])
+
+    def __len__(self):
+        return self._b._one("SELECT count(*) FROM components WHERE cat=?", (self.name,))[0]
+
+    def __contains__(self, key):
+        return self._b._one("SELECT 1 FROM components WHERE cat=? AND key=?",
+                            (self.name, key)) is not None
+
+    def items(self):
+        return self._b.items(self.name)
+
+    def values(self):
+        return [info for _, info in self._b.items(self.name)]
+
+
+class SqliteCatalogView(Mapping):
+    def __init__(self, backend):
+        self._b = backend
+
+    def _cats(self):
+        return [r[0] for r in self._b._all(
+            "SELECT cat FROM components GROUP BY cat ORDER BY min(rid)")]
+
+    def __getitem__(self, cat):
+        if self._b._one("SELECT 1 FROM components WHERE cat=? LIMIT 1", (cat,)) is None:
+            raise KeyError(cat)
+        return SqliteCategory(self._b, cat)
+
+    def __iter__(self):
+        return iter(self._cats())
+
+    def __len__(self):
+        return len(self._cats())
+
+
+class SqliteBackend:
+    """catalog_backend interface over catalog/components.db."""
+
+    name = "sqlite"
+    shared = True  # one database file for every worker
+
+    def __init__(self, path=DB_PATH, pool_size=POOL_SIZE):
+        self.path = Path(path)
+        self.pool = ConnectionPool(self.path, pool_size)
+        self.data = SqliteCatalogView(self)
+
+    def _one(self, sql, args=()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, args).fetchone()
+
+    def _all(self, sql, args=()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, args).fetchall()
+
+    @property
+    def version(self):
+        row = self._one("SELECT v FROM meta WHERE k='version'")
+        return row[0] if row else None
+
+    def size(self):
+        return self._one("SELECT count(*) FROM components")[0]
+
+    def iter_records(self):
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT cat, key, record FROM components ORDER BY rid").fetchall()
+        for cat, key, rec in rows:
+            yield cat, key, json.loads(rec)
+
+    def search(self, tokens):
+        """Records whose key, name or aliases contain any token, in catalog order."""
+        q = fts_query(tokens)
+        if not q:
+            return []
+        rows = self._all(
+            "SELECT c.cat, c.key, c.record FROM components_fts f "
+            "JOIN components c ON c.rid = f.rowid WHERE components_fts MATCH ? ORDER BY c.rid", (q,))
+        return [(cat, key, json.loads(rec)) for cat, key, rec in rows]
+
+    def items(self, cat):
+        return [(key, json.loads(rec)) for key, rec in self._all(
+            "SELECT key, record FROM components WHERE cat=? ORDER BY rid", (cat,))]
+
+    def price_sorted(self, cat):
+        return [(key, json.loads(rec), price) for key, rec, price in self._all(
+            "SELECT key, record, price FROM components WHERE cat=? AND price > 0 "
+            "ORDER BY price, rid", (cat,))]
+
+    def warm(self):
+        """Nothing to precompute: pages live in the OS cache, connections are per process."""
+        return self
+
+    def filter(self, cat, sort="price", descending=False, limit=None, **filters):
+        """Same semantics as catalog_columns.filter_components, as indexed SQL."""
+        where, args = ["cat = ?"], [cat]
+        if "min_price" in filters or "max_price" in filters:
+            where.append("price > 0")
+        for name, value in filters.items():
+            if value is None:
+                continue
+            if name in RANGE_FILTERS:
+                col, op = RANGE_FILTERS[name]
+                where.append(f"{col} {op} ?")
+                args.append(value)
+            elif name in catalog_columns.CATEGORICAL:
+                want = str(value).upper().replace("PCIE", "").replace(".0", "").strip()
+                where.append("rid IN (SELECT rid FROM component_tags WHERE kind=? AND value=?)")
+                args += [name, want]
+            else:
+                raise TypeError(f"unknown filter {name!r}")
+        sort = sort if sort in SORT_COLUMNS else "price"
+        sql = (f"SELECT key, record, price FROM components WHERE {' AND '.join(where)} "
+               f"ORDER BY {sort} IS NULL, {sort} {'DESC' if descending else 'ASC'}, rid")
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        return [(key, json.loads(rec), price) for key, rec, price in self._all(sql, args)]
+
+    def apply_price(self, cat, key, price=None, stock=None):
+        """
+        Apply one price/stock delta with an indexed UPDATE. Returns (old, new,
+        info) like SnapshotBackend.apply_price; a delta another process has
+        already written is a no-op here (old == new).
+        """
+        import catalog_backend
+        conn = connect(self.path)
+        try:
+            with conn:
+                row = conn.execute("SELECT rid, record, price FROM components WHERE cat=? AND key=?",
+                                   (cat, key)).fetchone()
+                if row is None:
+                    raise KeyError(f"{cat}/{key}")
+                rid, rec, old = row
+                current = json.loads(rec)
+                info = catalog_backend.patch_record(current, price, stock)
+                if info == current:
+                    return old, old, current
+                new = effective_price(info)
+                conn.execute("UPDATE components SET record=?, price=? WHERE rid=?",
+                             (json.dumps(info, ensure_ascii=False), new, rid))
+        finally:
+            conn.close()
+        return old, new, info
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Process-wide SqliteBackend; builds the database from the JSON source if missing."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if not DB_PATH.exists():
+                    build_from_source(out=DB_PATH)
+                _backend = SqliteBackend(DB_PATH)
+    return _backend
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build / inspect the SQLite catalog.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="(re)build the database from the JSON source")
+    b.add_argument("--source", default=str(catalog_snapshot.SOURCE_PATH))
+    b.add_argument("--out", default=str(DB_PATH))
+    i = sub.add_parser("info", help="print version and row counts")
+    i.add_argument("path", nargs="?", default=str(DB_PATH))
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        out = build_from_source(args.source, args.out)
+        print(f"wrote {out} ({out.stat().st_size} bytes)")
+        return
+    backend = SqliteBackend(args.path, pool_size=1)
+    if not backend.path.exists():
+        sys.exit(f"no database at {backend.path}")
+    meta = dict(backend._all("SELECT k, v FROM meta"))
+    counts = dict(backend._all("SELECT cat, count(*) FROM components GROUP BY cat ORDER BY min(rid)"))
+    print(json.dumps({"path": str(backend.path), **meta, "records": backend.size(),
+                      "categories": counts}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
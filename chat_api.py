@@ -0,0 +1,66 @@
+# chat_api.py
+"""
+Request/response handling shared by the two web entry points: server.py
+(Flask under gunicorn) and asgi.py (uvicorn). Nothing here touches a
+framework; each app passes in the parsed body and header values.
+"""
+import json
+
+INVALID_JSON = {"response": "Invalid JSON body.", "recommendations": []}
+MISSING_MESSAGE = {"response": "Invalid request — expected JSON with key 'message'.",
+                   "recommendations": []}
+
+
+def request_id_of(header_value, payload):
+    """Client request id: Idempotency-Key header, else "request_id" in the body."""
+    rid = header_value
+    if rid is None and isinstance(payload, dict):
+        rid = payload.get("request_id")
+    if not isinstance(rid, str):
+        return None
+    rid = rid.strip()
+    return rid if 0 < len(rid) <= 128 and rid.isprintable() else None
+
+
+def message_of(payload):
+    return payload.get("message") if isinstance(payload, dict) else None
+
+
+def chat_payload(raw):
+    """
+    Normalize what handle_query returned (a dict, a JSON string or plain text)
+    into the /chat body: { "response": "<assistant text>", "recommendations": [...] },
+    plus "answer" (answers.render_json) when a local handler answered
+    """
+    parsed = None
+    if isinstance(raw, str):
+        # try to parse JSON string first
+        try:
+            parsed = json.loads(raw)
+        except Exception:
+            # treat as plain text reply
+            parsed = {"reply": raw, "recommendations": []}
+        if not isinstance(parsed, dict):
+            parsed = {"reply": raw, "recommendations": []}
+    elif isinstance(raw, dict):
+        parsed = raw
+    else:
+        parsed = {"reply": str(raw), "recommendations": []}
+
+    # Ensure fields exist and have safe types (handle_query's dict says "response")
+    reply_text = parsed.get("reply") or parsed.get("response") or ""
+    recommendations = parsed.get("recommendations", [])
+    if not isinstance(recommendations, list):
+        recommendations = []
+    payload = {"response": reply_text, "recommendations": recommendations}
+    if isinstance(parsed.get("answer"), dict):
+        payload["answer"] = parsed["answer"]  # a local handler's structured answer
+    return payload
+
+
+def internal_error(e):
+    if isinstance(e, UnboundLocalError):
+        return {"response": "⚠️ Assistant internal error (UnboundLocalError). Check server logs.",
+                "recommendations": []}
+    return {"response": f"⚠️ Server error while handling message: {e}",
+            "recommendations": []}
@@ -0,0 +1,178 @@
+# chat_batch.py
+"""
+/chat/batch: many questions in one request (store kiosks, bulk quote tools).
+
+  1. Duplicates are folded by their canonical query (query_cache_key), and
+     questions already in the response cache are answered from it.
+  2. The rest run through ARsemble_ai.answer_steps on a bounded thread pool.
+     Local answers (builds, lists, stored answers, fields the catalog
+     record has) finish there.
+  3. Questions that stop at a Gemini call (a field the record lacks, see
+     answer_steps) are coalesced: ask_gemini_many
+     sends them together, GEMINI_BATCH_SIZE per call, and the steps resume
+     on the pool with their answers.
+
+Every question sees the catalog snapshot the batch started on. iter_batch
+yields results as they complete (the NDJSON stream); run_batch returns them
+in request order.
+
+Environment:
+  ARSEMBLE_BATCH_MAX       questions per batch (default 50)
+  ARSEMBLE_BATCH_THREADS   pool shared by all batches in a process (default 4)
+"""
+import contextvars
+import json
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import ARsemble_ai
+import catalog_manager
+import chat_api
+
+MAX_ITEMS = int(os.getenv("ARSEMBLE_BATCH_MAX", "50") or 50)
+THREADS = int(os.getenv("ARSEMBLE_BATCH_THREADS", "4") or 4)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process-wide pool (created on first use, so never in the preload master)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="chat-batch")
+    return _pool
+
+
+def parse_messages(payload):
+    """
+    The messages of a batch body: {"messages": [...]} or a bare list, each
+    item a string or {"message": "..."}. ValueError when it is not one.
+    """
+    items = payload.get("messages") if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not items:
+        raise ValueError("expected JSON with a non-empty list under 'messages'")
+    if len(items) > MAX_ITEMS:
+        raise ValueError(f"at most {MAX_ITEMS} messages per batch")
+    messages = []
+    for item in items:
+        message = chat_api.message_of(item) if isinstance(item, dict) else item
+        if not isinstance(message, str):
+            raise ValueError("each message must be a string or {'message': '...'}")
+        messages.append(message)
+    return messages
+
+
+def wants_stream(payload, accept):
+    return ((isinstance(payload, dict) and payload.get("stream") is True)
+            or "application/x-ndjson" in (accept or ""))
+
+
+def _submit(pool, snapshot, fn, *args):
+    """Run fn on the pool in a copy of this context (stage timings), on snapshot."""
+    return pool.submit(contextvars.copy_context().run, _pinned_call, snapshot, fn, *args)
+
+
+def _pinned_call(snapshot, fn, *args):
+    with catalog_manager.pinned(snapshot):
+        return fn(*args)
+
+
+def _finish(steps, reply):
+    """Resume steps with reply; any later Gemini question is asked directly."""
+    state, value = ARsemble_ai.advance(steps, reply)
+    while state == "gemini":
+        state, value = ARsemble_ai.advance(steps, ARsemble_ai.ask_gemini(*value))
+    return value
+
+
+def iter_batch(messages, stats=None):
+    """
+    Yield (indexes, payload) as each distinct question is answered, where
+    payload is the /chat body and indexes are the positions in messages it
+    answers. stats (a dict) is filled with the counts: messages, distinct,
+    cached, local, gemini.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(messages=len(messages), distinct=0, cached=0, local=0, gemini=0)
+    snapshot = catalog_manager.current_snapshot()
+    pool = get_pool()
+
+    groups = {}  # key -> [indexes], in first-seen order
+    with catalog_manager.pinned(snapshot):
+        keys = []
+        for message in messages:
+            qkey = ARsemble_ai._safe_call(
+                ARsemble_ai.query_cache_key, message, None, default=None)
+            keys.append(qkey)
+            groups.setdefault(qkey or "m:" + message.strip().lower(), []).append(len(keys) - 1)
+    stats["distinct"] = len(groups)
+
+    running = {}
+    for indexes in groups.values():
+        message, qkey = messages[indexes[0]], keys[indexes[0]]
+        cached = ARsemble_ai.cache_get(None, qkey) if qkey else None
+        if cached is not None:
+            stats["cached"] += 1
+            yield indexes, chat_api.chat_payload(cached)
+            continue
+        steps = ARsemble_ai.answer_steps(message)
+        future = _submit(pool, snapshot, ARsemble_ai.advance, steps)
+        running[future] = (indexes, steps)
+
+    # local answers stream out as they finish; Gemini-bound ones wait for one coalesced round
+    asking = []
+    while running:
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            indexes, steps = running.pop(future)
+            qkey = keys[indexes[0]]
+            state, value = future.result()
+            if state == "gemini":
+                asking.append((indexes, steps, value))
+                continue
+            stats["local"] += 1
+            result, ok, records = value
+            ARsemble_ai.cache_set(None, result, qkey if ok else None, records)
+            yield indexes, chat_api.chat_payload(result)
+    if not asking:
+        return
+
+    stats["gemini"] = len(asking)
+    ARsemble_ai._gemini_degraded.set(False)
+    with catalog_manager.pinned(snapshot):
+        replies = ARsemble_ai.ask_gemini_many([req for _, _, req in asking])
+    degraded = ARsemble_ai._gemini_degraded.get()
+    for (indexes, steps, _), reply in zip(asking, replies):
+        running[_submit(pool, snapshot, _finish, steps, reply)] = indexes
+    while running:
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            indexes = running.pop(future)
+            qkey = keys[indexes[0]]
+            result, ok, records = future.result()
+            ARsemble_ai.cache_set(None, result, qkey if ok and not degraded else None, records)
+            yield indexes, chat_api.chat_payload(result)
+
+
+def run_batch(messages):
+    """
+    {"results": [{"message", "response", "recommendations"}, ...], "stats": {...}}
+    with one result per message, in request order.
+    """
+    results = [None] * len(messages)
+    stats = {}
+    for indexes, payload in iter_batch(messages, stats):
+        for i in indexes:
+            results[i] = dict(payload, message=messages[i])
+    return {"results": results, "stats": stats}
+
+
+def ndjson_lines(messages):
+    """One JSON line per message, {"index": i, "message", ...payload}, in completion order."""
+    for indexes, payload in iter_batch(messages):
+        for i in indexes:
+            yield json.dumps(dict(payload, index=i, message=messages[i]), ensure_ascii=False) + "\n"
@@ -0,0 +1,280 @@
+# fake_genai.py
+"""
+Local stand-in for the parts of the google.genai client used by ARsemble_ai
+(client.models.generate_content / generate_content_stream / count_tokens and
+client.aio.models.generate_content). No network, no quota.
+
+Select it with GEMINI_BACKEND=fake. Behaviour is configured with env vars
+(or keyword arguments to Client):
+
+  FAKE_GEMINI_LATENCY      latency distribution in seconds, one of
+                           "fixed:0.8", "uniform:0.2,1.5", "normal:0.8,0.2",
+                           "lognormal:-0.3,0.5" (mu, sigma of ln seconds),
+                           "exp:0.7" (mean). Default "fixed:0".
+  FAKE_GEMINI_ERROR_RATE   probability a call fails (default 0)
+  FAKE_GEMINI_ERRORS       comma list of failure kinds to draw from:
+                           503, overload, busy, timeout, invalid (default "503,overload,timeout")
+  FAKE_GEMINI_EMPTY_RATE   probability of an empty response (default 0)
+  FAKE_GEMINI_TIMEOUT      seconds a "timeout" failure blocks before raising (default 5)
+  FAKE_GEMINI_STREAM_CHUNK words per streamed chunk (default 8)
+  FAKE_GEMINI_SEED         seed; the same prompt sequence replays the same outcomes
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+
+ERROR_MESSAGES = {
+    "503": "503 UNAVAILABLE. {'error': {'code': 503, 'message': 'The service is currently unavailable.', 'status': 'UNAVAILABLE'}}",
+    "overload": "503 UNAVAILABLE. {'error': {'code': 503, 'message': 'The model is overloaded. Please try again later.', 'status': 'UNAVAILABLE'}}",
+    "busy": "429 RESOURCE_EXHAUSTED. Server busy, quota exceeded for this minute.",
+    "timeout": "504 DEADLINE_EXCEEDED. Request timeout while waiting for the model.",
+    "invalid": "400 INVALID_ARGUMENT. Request contains an invalid argument.",
+}
+
+
+class FakeGeminiError(Exception):
+    """Raised for simulated API failures; str(e) matches the real error strings."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        super().__init__(ERROR_MESSAGES.get(kind, kind))
+
+
+def parse_latency(spec):
+    """Turn "dist:a,b" into a function rng -> seconds (never negative)."""
+    spec = (spec or "fixed:0").strip().lower()
+    name, _, args = spec.partition(":")
+    vals = [float(x) for x in args.split(",") if x.strip()] if args else []
+    if name == "fixed":
+        v = vals[0] if vals else 0.0
+        return lambda rng: max(0.0, v)
+    if name == "uniform":
+        lo, hi = (vals + [0.0, 0.0])[:2]
+        return lambda rng: max(0.0, rng.uniform(lo, hi))
+    if name == "normal":
+        mu, sigma = (vals + [0.0, 0.0])[:2]
+        return lambda rng: max(0.0, rng.gauss(mu, sigma))
+    if name == "lognormal":
+        mu, sigma = (vals + [0.0, 0.0])[:2]
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    if name in ("exp", "expovariate"):
+        mean = vals[0] if vals else 0.0
+        return lambda rng: rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+    raise ValueError(f"unknown latency distribution: {spec!r}")
+
+
+def _estimate_tokens(text):
+    return max(1, (len(text or "") + 3) // 4)
+
+
+def _contents_text(contents):
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, (list, tuple)):
+        return "\n".join(_contents_text(c) for c in contents)
+    return str(contents)
+
+
+_MARKER = re.compile(r"^=== (\d+) ===$", re.M)
+
+
+def fake_answer(prompt):
+    """Plausible ARIA-style answer built from the JSON embedded in the prompt."""
+    parts = _MARKER.split(prompt)
+    if len(parts) > 1:  # numbered questions (ARsemble_ai.ask_gemini_many): answer each
+        return "\n".join(f"=== {n} ===\n{fake_answer(block)}"
+                         for n, block in zip(parts[1::2], parts[2::2]))
+    m = re.search(r"Data:\s*(\{.*\})\s*\n", prompt, flags=re.S)
+    comps = []
+    if m:
+        try:
+            found = json.loads(m.group(1))
+            for info in found.values():
+                if isinstance(info, dict) and "name" in info:
+                    comps.append(info)
+                elif isinstance(info, dict):
+                    comps.extend(v for v in info.values()
+                                 if isinstance(v, dict))
+        except ValueError:
+            pass
+    if not comps:
+        return ("ARIA (fake)\n• Summary: This is a simulated Gemini answer for "
+                "load and latency testing.")
+    lines = []
+    for info in comps:
+        lines.append(info.get("name", "Component"))
+        lines.append("Key Specs:")
+        for k, v in info.items():
+            if k not in ("name", "price", "compatibility"):
+                lines.append(f"• {k}: {v}")
+        if "price" in info:
+            lines += ["Price:", f"• {info['price']}"]
+        if "compatibility" in info:
+            lines += ["Compatibility:", f"• {info['compatibility']}"]
+        lines += ["Summary:", "• Simulated answer (fake Gemini backend)."]
+    return "\n".join(lines)
+
+
+class UsageMetadata:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.thoughts_token_count = 0
+        self.cached_content_token_count = 0
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class FakeResponse:
+    def __init__(self, text, prompt_tokens):
+        self.text = text
+        self.usage_metadata = UsageMetadata(
+            prompt_tokens, _estimate_tokens(text) if text else 0)
+
+
+class CountTokensResponse:
+    def __init__(self, total_tokens):
+        self.total_tokens = total_tokens
+
+
+class _Models:
+    def __init__(self, owner):
+        self._c = owner
+
+    def generate_content(self, model=None, contents=None, config=None):
+        prompt = self._c._prompt(contents, config)
+        rng = self._c._rng_for(prompt)
+        outcome = self._c._draw(rng)
+        time.sleep(outcome["latency"])
+        return self._c._finish(outcome, prompt)
+
+    def generate_content_stream(self, model=None, contents=None, config=None):
+        prompt = self._c._prompt(contents, config)
+        rng = self._c._rng_for(prompt)
+        outcome = self._c._draw(rng)
+        return self._c._stream(outcome, prompt)
+
+    def count_tokens(self, model=None, contents=None, config=None):
+        return CountTokensResponse(_estimate_tokens(_contents_text(contents)))
+
+
+class _AsyncModels:
+    def __init__(self, owner):
+        self._c = owner
+
+    async def generate_content(self, model=None, contents=None, config=None):
+        prompt = self._c._prompt(contents, config)
+        rng = self._c._rng_for(prompt)
+        outcome = self._c._draw(rng)
+        await asyncio.sleep(outcome["latency"])
+        return self._c._finish(outcome, prompt)
+
+
+class _Aio:
+    def __init__(self, owner):
+        self.models = _AsyncModels(owner)
+
+
+class Client:
+    """Drop-in for google.genai.Client in tests, benchmarks and CI."""
+
+    def __init__(self, api_key=None, latency=None, error_rate=None, errors=None,
+                 empty_rate=None, timeout=None, stream_chunk=None, seed=None):
+        env = os.environ.get
+        self.latency_spec = latency or env("FAKE_GEMINI_LATENCY", "fixed:0")
+        self._latency = parse_latency(self.latency_spec)
+        self.error_rate = float(error_rate if error_rate is not None
+                                else env("FAKE_GEMINI_ERROR_RATE", "0"))
+        kinds = errors or env("FAKE_GEMINI_ERRORS", "503,overload,timeout")
+        self.error_kinds = [k.strip() for k in (kinds.split(",") if isinstance(kinds, str) else kinds)
+                            if k.strip()]
+        self.empty_rate = float(empty_rate if empty_rate is not None
+                                else env("FAKE_GEMINI_EMPTY_RATE", "0"))
+        self.timeout = float(timeout if timeout is not None
+                             else env("FAKE_GEMINI_TIMEOUT", "5"))
+        self.stream_chunk = int(stream_chunk or env(
+            "FAKE_GEMINI_STREAM_CHUNK", "8"))
+        self.seed = str(seed if seed is not None else env(
+            "FAKE_GEMINI_SEED", "0"))
+        self.models = _Models(self)
+        self.aio = _Aio(self)
+        self._lock = threading.Lock()
+        self._seen = {}
+        self.stats = {"calls": 0, "errors": 0, "empty": 0, "ok": 0}
+
+    # --- internals -----------------------------------------------------
+
+    def _prompt(self, contents, config):
+        text = _contents_text(contents)
+        sys_inst = None
+        if isinstance(config, dict):
+            sys_inst = config.get("system_instruction")
+        elif config is not None:
+            sys_inst = getattr(config, "system_instruction", None)
+        return (str(sys_inst) + "\n" + text) if sys_inst else text
+
+    def _rng_for(self, prompt):
+        """Per-call RNG derived from seed + prompt + repeat count, independent of thread order."""
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            n = self._seen.get(digest, 0)
+            self._seen[digest] = n + 1
+            self.stats["calls"] += 1
+        return random.Random(f"{self.seed}:{digest}:{n}")
+
+    def _draw(self, rng):
+        latency = self._latency(rng)
+        if self.error_kinds and rng.random() < self.error_rate:
+            kind = rng.choice(self.error_kinds)
+            if kind == "timeout":
+                latency = max(latency, self.timeout)
+            return {"latency": latency, "error": kind}
+        return {"latency": latency, "error": None, "empty": rng.random() < self.empty_rate}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _finish(self, outcome, prompt):
+        if outcome["error"]:
+            self._count("errors")
+            raise FakeGeminiError(outcome["error"])
+        prompt_tokens = _estimate_tokens(prompt)
+        if outcome["empty"]:
+            self._count("empty")
+            return FakeResponse("", prompt_tokens)
+        self._count("ok")
+        return FakeResponse(fake_answer(prompt), prompt_tokens)
+
+    def _stream(self, outcome, prompt):
+        prompt_tokens = _estimate_tokens(prompt)
+        if outcome["error"] and outcome["error"] != "overload":
+            time.sleep(outcome["latency"])
+            self._count("errors")
+            raise FakeGeminiError(outcome["error"])
+        if outcome.get("empty"):
+            time.sleep(outcome["latency"])
+            self._count("empty")
+            yield FakeResponse("", prompt_tokens)
+            return
+        words = fake_answer(prompt).split(" ")
+        chunks = [" ".join(words[i:i + self.stream_chunk])
+                  for i in range(0, len(words), self.stream_chunk)]
+        # first chunk carries most of the latency, the rest trickle in
+        first = outcome["latency"] * 0.6
+        per_chunk = (outcome["latency"] - first) / max(1, len(chunks))
+        time.sleep(first)
+        for i, chunk in enumerate(chunks):
+            if outcome["error"] and i == math.ceil(len(chunks) / 2):
+                # overloads can also cut a stream off midway
+                self._count("errors")
+                raise FakeGeminiError(outcome["error"])
+            text = chunk if i == len(chunks) - 1 else chunk + " "
+            yield FakeResponse(text, prompt_tokens)
+            time.sleep(per_chunk)
+        self._count("ok")
@@ -0,0 +1,250 @@
+# gemini_limiter.py
+"""
+Host-wide Gemini limiter shared by every gunicorn worker (and offline jobs).
+
+A token bucket (requests per minute) plus a cap on concurrent calls, kept
+in a small JSON state file guarded by fcntl.flock, so all processes on the
+host draw from the same quota. Two lanes:
+
+  interactive  /chat traffic; waits at most GEMINI_LIMITER_MAX_WAIT seconds
+  batch        answer-store / pre-warm jobs; only uses tokens above the
+               interactive reserve and never while an interactive call waits
+
+When a slot cannot be had in time GeminiBusy is raised and the caller
+answers from local data instead of queueing indefinitely.
+
+Environment:
+  GEMINI_RPM                  bucket refill rate, requests/minute (default 10)
+  GEMINI_BURST                bucket capacity (default = GEMINI_RPM)
+  GEMINI_MAX_CONCURRENT       concurrent calls host-wide (default 4)
+  GEMINI_BATCH_RESERVE        fraction of the bucket kept for interactive (default 0.5)
+  GEMINI_LIMITER_MAX_WAIT     interactive max queueing, seconds (default 2)
+  GEMINI_LIMITER_BATCH_WAIT   batch max queueing, seconds (default 120)
+  GEMINI_LIMITER_DIR          where the state file lives (default: system temp dir)
+  GEMINI_LIMITER              set to 0 to disable
+"""
+import contextlib
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: fall back to a per-process limiter
+    fcntl = None
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+STALE_HOLDER_SECONDS = 300  # a call never legitimately holds a slot this long
+
+
+class GeminiBusy(Exception):
+    """No Gemini slot within the lane's max wait; answer locally instead."""
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return float(default)
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class GeminiLimiter:
+    def __init__(self, rpm=None, burst=None, max_concurrent=None, batch_reserve=None,
+                 max_wait=None, batch_wait=None, state_dir=None, enabled=None):
+        self.rpm = rpm if rpm is not None else _env_float("GEMINI_RPM", 10)
+        self.burst = burst if burst is not None else _env_float(
+            "GEMINI_BURST", self.rpm)
+        self.max_concurrent = int(max_concurrent if max_concurrent is not None
+                                  else _env_float("GEMINI_MAX_CONCURRENT", 4))
+        self.batch_reserve = batch_reserve if batch_reserve is not None else _env_float(
+            "GEMINI_BATCH_RESERVE", 0.5)
+        self.max_wait = {
+            INTERACTIVE: max_wait if max_wait is not None else _env_float("GEMINI_LIMITER_MAX_WAIT", 2),
+            BATCH: batch_wait if batch_wait is not None else _env_float("GEMINI_LIMITER_BATCH_WAIT", 120),
+        }
+        self.enabled = enabled if enabled is not None else os.getenv(
+            "GEMINI_LIMITER", "1") != "0"
+        state_dir = state_dir or os.getenv("GEMINI_LIMITER_DIR") or os.path.join(
+            tempfile.gettempdir(), "arsemble-gemini-limiter")
+        os.makedirs(state_dir, exist_ok=True)
+        self.state_path = os.path.join(state_dir, "state.json")
+        self._thread_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._local_state = None  # used when fcntl is unavailable
+        self._metrics_lock = threading.Lock()
+        self.metrics = {lane: {"acquired": 0, "rejected": 0, "wait_ms_total": 0.0,
+                               "wait_ms_max": 0.0} for lane in (INTERACTIVE, BATCH)}
+
+    # --- shared state ----------------------------------------------------
+
+    def _fresh_state(self):
+        return {"tokens": self.burst, "updated": time.time(), "holders": {}, "waiters": {},
+                "penalty_until": 0.0}
+
+    @contextlib.contextmanager
+    def _locked_state(self):
+        """Read-modify-write the shared state under an exclusive lock."""
+        with self._thread_lock:
+            if fcntl is None:
+                if self._local_state is None:
+                    self._local_state = self._fresh_state()
+                yield self._local_state
+                return
+            fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o666)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                raw = b""
+                while True:
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        break
+                    raw += chunk
+                try:
+                    state = json.loads(raw) if raw else self._fresh_state()
+                except ValueError:
+                    state = self._fresh_state()
+                yield state
+                data = json.dumps(state).encode("utf-8")
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, data)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+    def _refill(self, st, now):
+        elapsed = max(0.0, now - st.get("updated", now))
+        st["tokens"] = min(self.burst, st.get(
+            "tokens", self.burst) + elapsed * self.rpm / 60.0)
+        st["updated"] = now
+        for table in ("holders", "waiters"):
+            entries = st.setdefault(table, {})
+            for hid in [h for h, e in entries.items()
+                        if now - e["since"] > STALE_HOLDER_SECONDS or not _pid_alive(e["pid"])]:
+                del entries[hid]
+
+    def _can_take(self, st, lane, now):
+        if now < st.get("penalty_until", 0.0):
+            return False
+        in_flight = len(st["holders"])
+        if lane == INTERACTIVE:
+            return st["tokens"] >= 1.0 and in_flight < self.max_concurrent
+        waiting_interactive = any(w["lane"] == INTERACTIVE for w in st["waiters"].values())
+        reserve = self.burst * self.batch_reserve
+        return (not waiting_interactive and st["tokens"] >= 1.0 + reserve
+                and in_flight < max(1, self.max_concurrent - 1))
+
+    # --- public API ------------------------------------------------------
+
+    def acquire(self, lane=INTERACTIVE, max_wait=None):
+        """Take one request token + one concurrency slot; returns a holder id. Raises GeminiBusy."""
+        if not self.enabled:
+            return None
+        lane = lane if lane in self.max_wait else INTERACTIVE
+        max_wait = self.max_wait[lane] if max_wait is None else max_wait
+        hid = f"{os.getpid()}:{next(self._ids)}"
+        start = time.time()
+        deadline = start + max_wait
+        registered = False
+        try:
+            while True:
+                now = time.time()
+                with self._locked_state() as st:
+                    self._refill(st, now)
+                    if self._can_take(st, lane, now):
+                        st["tokens"] -= 1.0
+                        st["holders"][hid] = {"pid": os.getpid(), "since": now, "lane": lane}
+                        st["waiters"].pop(hid, None)
+                        registered = False
+                        self._observe(lane, (now - start) * 1000, ok=True)
+                        return hid
+                    if not registered:
+                        st["waiters"][hid] = {"pid": os.getpid(), "since": now, "lane": lane}
+                        registered = True
+                    need = max(0.0, 1.0 - st["tokens"]) * 60.0 / max(self.rpm, 1e-6)
+                    need = max(need, st.get("penalty_until", 0.0) - now)
+                if now >= deadline:
+                    self._observe(lane, (now - start) * 1000, ok=False)
+                    raise GeminiBusy(
+                        f"Gemini limiter: no {lane} slot within {max_wait:.1f}s")
+                time.sleep(min(max(need, 0.02), 0.25, max(0.0, deadline - now) + 0.001))
+        finally:
+            if registered:
+                with self._locked_state() as st:
+                    st["waiters"].pop(hid, None)
+
+    def release(self, hid):
+        if hid is None:
+            return
+        with self._locked_state() as st:
+            st["holders"].pop(hid, None)
+
+    @contextlib.contextmanager
+    def slot(self, lane=INTERACTIVE, max_wait=None):
+        hid = self.acquire(lane, max_wait)
+        try:
+            yield
+        finally:
+            self.release(hid)
+
+    def penalize(self, seconds=2.0):
+        """Upstream said 'overloaded': drain the bucket and pause every worker briefly."""
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._locked_state() as st:
+            self._refill(st, now)
+            st["tokens"] = 0.0
+            st["penalty_until"] = max(st.get("penalty_until", 0.0), now + seconds)
+
+    def _observe(self, lane, wait_ms, ok):
+        with self._metrics_lock:
+            m = self.metrics[lane]
+            m["acquired" if ok else "rejected"] += 1
+            m["wait_ms_total"] += wait_ms
+            m["wait_ms_max"] = max(m["wait_ms_max"], wait_ms)
+
+    def stats(self):
+        """Per-process queueing metrics plus a snapshot of the shared bucket."""
+        with self._metrics_lock:
+            lanes = {}
+            for lane, m in self.metrics.items():
+                n = m["acquired"] + m["rejected"]
+                lanes[lane] = dict(m, wait_ms_avg=round(m["wait_ms_total"] / n, 1) if n else 0.0)
+        out = {"enabled": self.enabled, "rpm": self.rpm, "burst": self.burst,
+               "max_concurrent": self.max_concurrent, "lanes": lanes}
+        if self.enabled:
+            with self._locked_state() as st:
+                self._refill(st, time.time())
+                out.update(tokens=round(st["tokens"], 2), in_flight=len(st["holders"]),
+                           waiting=len(st["waiters"]))
+        return out
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = GeminiLimiter()
+    return _limiter
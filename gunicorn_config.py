@@ -1,3 +1,4 @@
+import gc
 import os
 
 # Use Render's PORT environment variable, default to 10000
@@ -16,3 +17,38 @@ loglevel = "info"
 
 # Prevent early timeouts
 keepalive = 5
+
+# Load the app (catalog + derived indexes) once in the master and fork the
+# workers from it, so they share those pages copy-on-write instead of each
+# building its own copy. ARSEMBLE_PRELOAD=0 goes back to per-worker imports.
+preload_app = os.environ.get("ARSEMBLE_PRELOAD", "1") != "0"
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before the first fork.
+    if not server.cfg.preload_app:
+        return
+    import ARsemble_ai
+    ARsemble_ai.preload_shared_state()
+    # Move everything built so far out of the collector's reach: a GC pass in
+    # a worker would otherwise write to every object header and un-share it.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Only per-process state is rebuilt; the shared catalog stays as forked.
+    if server.cfg.preload_app:
+        import ARsemble_ai
+        ARsemble_ai.reinit_after_fork()
+
+
+def post_worker_init(worker):
+    # Create the Gemini client off the request path once the worker is up
+    # (ARsemble_ai defers google.genai until first use to keep boot fast).
+    if os.environ.get("ARSEMBLE_WARM_GEMINI", "1") != "0":
+        import ARsemble_ai
+        ARsemble_ai.warm_client_in_background()
+    # Each worker polls catalog/components.json and hot-swaps the snapshot
+    # (threads do not survive fork, so this has to run per worker).
+    import catalog_manager
+    catalog_manager.start_watcher()
@@ -0,0 +1,185 @@
+# log_config.py
+"""
+One logger tree for the app ("arsemble", "arsemble.server", ...), written by a
+background thread so a request never waits on the stream.
+
+Records go onto a bounded in-memory queue (QueueHandler) and a QueueListener
+thread formats and writes them to stderr. When the queue is full the record
+is dropped and counted instead of blocking the request thread. The listener
+is restarted in a forked worker (threads do not survive fork) and drained at
+exit.
+
+The default format is one JSON object per line with stable keys:
+
+    {"ts": "...", "level": "INFO", "logger": "arsemble", "msg": "...",
+     "request_id": null, "intent": "build", "cache": "miss", "latency_ms": null}
+
+request_id / intent / cache / latency_ms are null when unknown. They come
+from the request's log context (begin() in the web entry point, bind() from
+anywhere inside the request, copied to to_thread/pool work like the timing
+recorder). A record's extra={"fields": {...}} is merged into the top level.
+Any other extra is added under its own key.
+
+Environment:
+  ARSEMBLE_LOG_LEVEL    DEBUG / INFO / WARNING ... (default INFO; DEBUG adds per-request detail)
+  ARSEMBLE_LOG_FORMAT   json (default) or text
+  ARSEMBLE_LOG_QUEUE    records buffered before dropping (default 10000)
+"""
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+ROOT = "arsemble"
+LEVEL = os.getenv("ARSEMBLE_LOG_LEVEL", "INFO").upper()
+FORMAT = os.getenv("ARSEMBLE_LOG_FORMAT", "json").lower()
+try:
+    QUEUE_SIZE = int(os.getenv("ARSEMBLE_LOG_QUEUE", "10000"))
+except ValueError:
+    QUEUE_SIZE = 10000
+
+STABLE = ("request_id", "intent", "cache", "latency_ms")
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "ctx", "fields"}
+
+_context = contextvars.ContextVar("arsemble_log_context", default=None)
+_lock = threading.Lock()
+_handler = None
+dropped = 0
+
+
+def get_logger(name=None):
+    """The app logger, or its child "arsemble.<name>"; configures the tree on first use."""
+    setup()
+    return logging.getLogger(f"{ROOT}.{name}" if name else ROOT)
+
+
+# --- request context -------------------------------------------------------------
+
+def begin(**fields):
+    """Open a log context for this request; returns the token for end()."""
+    return _context.set(dict(fields))
+
+
+def bind(**fields):
+    """Add fields (request_id, intent, cache=hit, ...) to the current request's records."""
+    current = _context.get()
+    if current is not None:
+        current.update(fields)
+
+
+def end(token):
+    if token is not None:
+        _context.reset(token)
+
+
+# --- formatting (listener thread) ---------------------------------------------------
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        record.message = record.getMessage()
+        out = {"ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc)
+               .isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+               "level": record.levelname, "logger": record.name, "msg": record.message}
+        out.update(dict.fromkeys(STABLE))
+        out.update(getattr(record, "ctx", None) or {})
+        out.update(getattr(record, "fields", None) or {})
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                out[key] = value
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        rid = (getattr(record, "ctx", None) or {}).get("request_id")
+        return f"{line} [rid={rid}]" if rid else line
+
+
+# --- queue ----------------------------------------------------------------------------
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Bounded, fork-aware QueueHandler that leaves formatting to the listener."""
+
+    def __init__(self):
+        super().__init__(queue.Queue(QUEUE_SIZE))
+        self.pid = None
+        self.listener = None
+        self.start()
+
+    def start(self):
+        target = logging.StreamHandler(sys.stderr)
+        target.setFormatter(TextFormatter() if FORMAT == "text" else JsonFormatter())
+        self.listener = logging.handlers.QueueListener(self.queue, target, respect_handler_level=False)
+        self.listener.start()
+        self.pid = os.getpid()
+
+    def restart(self):
+        """In a forked child: fresh queue (the parent's may hold a held lock) and listener."""
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.start()
+
+    def prepare(self, record):
+        # only what must be captured on the calling thread: the message, the
+        # traceback text and the request context (this handler is the record's
+        # only consumer, so it is updated in place rather than copied)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        ctx = _context.get()
+        if ctx:
+            record.ctx = dict(ctx)
+        return record
+
+    def enqueue(self, record):
+        global dropped
+        if self.pid != os.getpid():
+            with _lock:
+                if self.pid != os.getpid():
+                    self.restart()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped += 1
+
+    def stop(self):
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()  # drains what is queued
+            self.listener = None
+
+
+def setup():
+    """Configure the "arsemble" logger tree once per process (idempotent)."""
+    global _handler
+    if _handler is not None:
+        return
+    with _lock:
+        if _handler is not None:
+            return
+        root = logging.getLogger(ROOT)
+        root.setLevel(getattr(logging, LEVEL, logging.INFO))
+        root.propagate = False  # the root logger (basicConfig, gunicorn) would write it again
+        _handler = _QueueHandler()
+        root.addHandler(_handler)
+        atexit.register(_handler.stop)
+
+
+def reset_after_fork():
+    """Restart the writer thread in a freshly forked worker."""
+    global _lock
+    _lock = threading.Lock()
+    if _handler is not None and _handler.pid != os.getpid():
+        _handler.restart()
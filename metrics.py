@@ -0,0 +1,290 @@
+# metrics.py
+"""
+Prometheus-style metrics, merged across the gunicorn (or uvicorn) workers.
+
+Each process counts in memory (one uncontended lock per update) and a daemon
+thread writes its totals every ARSEMBLE_METRICS_FLUSH seconds to its own
+file, <dir>/<master pid>-<pid>.json, with an atomic replace. A scrape (GET
+/metrics on any worker) sums the files of every process under the same
+master, its own live values included, so no process ever waits on another.
+A worker that exits leaves its file behind and its counts stay in the sums
+(counters never go down); files of masters that are gone are removed.
+
+    metrics.inc("arsemble_gemini_calls_total", mode="fields", ok="true")
+    metrics.observe("arsemble_request_seconds", 0.42, path="/chat", intent="build")
+
+A request's labels can be filled in by code that runs deep inside it
+(begin_request() / label(intent=...) / end_request()), the same way timing.py
+collects its tags. Gauges (catalog version and size, cache occupancy) are read
+at scrape time from the process that serves it.
+
+Environment:
+  ARSEMBLE_METRICS          set to 0 to disable (no counting, /metrics is 404)
+  ARSEMBLE_METRICS_DIR      per-process files (default: <tmp>/arsemble-metrics)
+  ARSEMBLE_METRICS_FLUSH    seconds between writes (default 5)
+  ARSEMBLE_METRICS_TOKEN    when set, /metrics needs "Authorization: Bearer <token>"
+"""
+import contextvars
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ENABLED = os.getenv("ARSEMBLE_METRICS", "1") != "0"
+DIR = Path(os.getenv("ARSEMBLE_METRICS_DIR") or Path(tempfile.gettempdir()) / "arsemble-metrics")
+try:
+    FLUSH_SECONDS = float(os.getenv("ARSEMBLE_METRICS_FLUSH", "5"))
+except ValueError:
+    FLUSH_SECONDS = 5.0
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# name -> (type, help)
+METRICS = {
+    "arsemble_requests_total": ("counter", "HTTP API requests by path, intent and status."),
+    "arsemble_request_seconds": ("histogram", "HTTP API request latency by path and intent."),
+    "arsemble_response_cache_lookups_total": ("counter", "Response cache lookups by result."),
+    "arsemble_semantic_cache_lookups_total": ("counter", "Semantic (Gemini answer) cache lookups by result."),
+    "arsemble_gemini_calls_total": ("counter", "Gemini generate_content calls by prompt mode and outcome."),
+    "arsemble_gemini_seconds": ("histogram", "Gemini call latency by prompt mode."),
+    "arsemble_gemini_tokens_total": ("counter", "Gemini tokens by kind (input/output)."),
+    "arsemble_gemini_fallbacks_total": ("counter", "Answers served from local data after Gemini failed."),
+}
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_request = contextvars.ContextVar("arsemble_metrics_request", default=None)
+_flusher_pid = None
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, value=1, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    _ensure_flusher()
+
+
+def observe(name, seconds, **labels):
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    i = 0
+    while i < len(BUCKETS) and seconds > BUCKETS[i]:
+        i += 1
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(BUCKETS) + 3)  # buckets, +Inf, sum, count
+        h[i] += 1
+        h[-2] += seconds
+        h[-1] += 1
+    _ensure_flusher()
+
+
+# --- per-request labels --------------------------------------------------------
+
+def begin_request():
+    """Start collecting labels for this request; returns the token for end_request()."""
+    return _request.set({}) if ENABLED else None
+
+
+def label(**labels):
+    """Set labels (intent=...) on the current request's metrics, from anywhere inside it."""
+    current = _request.get() if ENABLED else None
+    if current is not None:
+        current.update(labels)
+
+
+def end_request(token, path, status, seconds, **labels):
+    if token is None:
+        return
+    current = dict(_request.get() or {}, **labels)
+    _request.reset(token)
+    intent = current.get("intent") or "none"
+    inc("arsemble_requests_total", path=path, intent=intent, status=status)
+    observe("arsemble_request_seconds", seconds, path=path, intent=intent)
+
+
+# --- per-process files --------------------------------------------------------
+
+def _group():
+    return os.getppid()
+
+
+def _path(pid=None):
+    return DIR / f"{_group()}-{pid or os.getpid()}.json"
+
+
+def _snapshot():
+    with _lock:
+        return {"counters": [[n, list(lbl), v] for (n, lbl), v in _counters.items()],
+                "histograms": [[n, list(lbl), list(h)] for (n, lbl), h in _histograms.items()]}
+
+
+def flush():
+    """Write this process's totals to its file (atomic replace)."""
+    if not ENABLED:
+        return
+    try:
+        DIR.mkdir(parents=True, exist_ok=True)
+        path = _path()
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(_snapshot(), separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        flush()
+
+
+def _ensure_flusher():
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+
+
+def reset_after_fork():
+    """A forked worker starts from zero (the master's counts are not its own)."""
+    global _lock, _counters, _histograms, _flusher_pid
+    _lock = threading.Lock()
+    _counters = {}
+    _histograms = {}
+    _flusher_pid = None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OverflowError):
+        return True
+    return True
+
+
+def collect():
+    """Merged (counters, histograms) over every process of this master."""
+    counters, histograms = {}, {}
+
+    def merge(data):
+        for name, lbl, value in data.get("counters", ()):
+            key = (name, tuple(tuple(p) for p in lbl))
+            counters[key] = counters.get(key, 0) + value
+        for name, lbl, h in data.get("histograms", ()):
+            key = (name, tuple(tuple(p) for p in lbl))
+            acc = histograms.get(key)
+            histograms[key] = list(h) if acc is None else [a + b for a, b in zip(acc, h)]
+
+    merge(_snapshot())
+    me = _path().name
+    try:
+        files = list(DIR.glob("*.json"))
+    except OSError:
+        files = []
+    for path in files:
+        group, _, _ = path.stem.partition("-")
+        if path.name == me:
+            continue
+        if group != str(_group()):
+            if group.isdigit() and not _pid_alive(int(group)):
+                path.unlink(missing_ok=True)  # left over from an earlier run
+            continue
+        try:
+            merge(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return counters, histograms
+
+
+# --- exposition -----------------------------------------------------------------
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(v):
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    return repr(v) if isinstance(v, float) else str(v)
+
+
+def render(gauges=()):
+    """
+    Prometheus text format (0.0.4) for the merged metrics plus gauges, an
+    iterable of (name, help, labels dict, value) read by the caller.
+    """
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        series = counters if kind == "counter" else histograms
+        rows = sorted((lbl, v) for (n, lbl), v in series.items() if n == name)
+        if not rows:
+            continue
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for lbl, v in rows:
+            if kind == "counter":
+                lines.append(f"{name}{_labels(lbl)} {_number(v)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), v[:-2]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(float(bound))
+                lines.append(f"{name}_bucket{_labels(lbl, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(lbl)} {_number(round(v[-2], 6))}")
+            lines.append(f"{name}_count{_labels(lbl)} {v[-1]}")
+
+    hits = {}
+    for (name, lbl), v in counters.items():
+        if name.endswith("_cache_lookups_total"):
+            result = dict(lbl).get("result")
+            acc = hits.setdefault(name[:-len("_lookups_total")], [0, 0])
+            acc[0] += v if result == "hit" else 0
+            acc[1] += v
+    for prefix, (hit, total) in sorted(hits.items()):
+        lines += [f"# HELP {prefix}_hit_ratio Hits over lookups since start (all workers).",
+                  f"# TYPE {prefix}_hit_ratio gauge",
+                  f"{prefix}_hit_ratio {_number(round(hit / total, 4)) if total else 0}"]
+
+    seen = set()
+    for name, help_text, lbl, value in gauges:
+        if value is None:
+            continue
+        if name not in seen:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            seen.add(name)
+        lines.append(f"{name}{_labels(sorted(lbl.items()))} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def authorized(header_value):
+    """True when no ARSEMBLE_METRICS_TOKEN is set, or header_value is "Bearer <token>"."""
+    token = os.getenv("ARSEMBLE_METRICS_TOKEN", "")
+    if not token:
+        return True
+    return hmac.compare_digest(header_value or "", f"Bearer {token}")
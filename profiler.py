@@ -0,0 +1,481 @@
+# profiler.py
+"""
+Opt-in request profiles, written as .prof files (pstats format).
+
+Two triggers, both off by default:
+
+  ARSEMBLE_PROFILE_RATE=0.01   cProfile one request in a hundred, whatever
+                               its duration (exact call counts, but 2-3x
+                               slower while it runs, so keep the rate low)
+  ARSEMBLE_PROFILE_SLOW_MS=800 sample every request's stack from a background
+                               thread (ARSEMBLE_PROFILE_HZ times a second) and
+                               keep the samples only when it took longer than
+                               the threshold
+
+The sampler never touches the request's thread: a request registers its
+thread id on entry and removes it on exit, and the sampler reads
+sys._current_frames() while anything is registered (it sleeps otherwise).
+Sampled time is turned into a pstats table (own time for the leaf frame,
+cumulative time for every frame on the stack), so both kinds load in pstats,
+snakeviz or the CLI below. On the event loop (asgi.py) profile_async()
+follows the request into its to_thread steps instead of measuring the loop
+thread, which serves every other request too.
+
+Files are named <time>-<pid>-<kind>-<intent>-<query hash>-<ms>ms.prof under
+ARSEMBLE_PROFILE_DIR; only the newest ARSEMBLE_PROFILE_KEEP are kept and at
+most ARSEMBLE_PROFILE_MAX_PER_MIN are written per minute per process, so a
+slow backend cannot fill the disk. The query text itself is never written.
+
+    python profiler.py list
+    python profiler.py top --intent build --sort cumulative --limit 30
+
+Environment:
+  ARSEMBLE_PROFILE_RATE          fraction of requests run under cProfile (default 0)
+  ARSEMBLE_PROFILE_SLOW_MS       keep sampled profiles of requests slower than this (default 0 = off)
+  ARSEMBLE_PROFILE_HZ            stack samples per second (default 100)
+  ARSEMBLE_PROFILE_DIR           where dumps go (default: <tmp>/arsemble-profiles)
+  ARSEMBLE_PROFILE_KEEP          newest dumps kept (default 200)
+  ARSEMBLE_PROFILE_MAX_PER_MIN   dumps per minute per process (default 6)
+"""
+import abc
+import argparse
+import contextvars
+import cProfile
+import hashlib
+import marshal
+import os
+import pstats
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import log_config
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return float(default)
+
+
+RATE = _env_float("ARSEMBLE_PROFILE_RATE", 0)
+SLOW_MS = _env_float("ARSEMBLE_PROFILE_SLOW_MS", 0)
+HZ = max(1.0, _env_float("ARSEMBLE_PROFILE_HZ", 100))
+DIR = Path(os.getenv("ARSEMBLE_PROFILE_DIR") or Path(tempfile.gettempdir()) / "arsemble-profiles")
+KEEP = int(_env_float("ARSEMBLE_PROFILE_KEEP", 200))
+MAX_PER_MIN = int(_env_float("ARSEMBLE_PROFILE_MAX_PER_MIN", 6))
+MAX_DEPTH = 128
+
+logger = log_config.get_logger("profiler")
+_current = contextvars.ContextVar("arsemble_profile", default=None)
+
+_lock = threading.Lock()
+_active = {}  # thread id -> _Sampled
+_wake = threading.Event()
+_sampler_pid = None
+_written = []  # monotonic times of this process's recent dumps
+
+
+def enabled():
+    return RATE > 0 or SLOW_MS > 0
+
+
+def query_hash(query):
+    """Short stable tag for a query (case and spacing folded), so dumps of one question group together."""
+    folded = " ".join((query or "").lower().split())
+    return hashlib.sha1(folded.encode("utf-8")).hexdigest()[:10]
+
+
+# --- the two kinds of profile --------------------------------------------------
+
+class _Profile(abc.ABC):
+    kind = ""
+
+    def __init__(self, query):
+        self.query = query
+        self.tags = {}
+        self.follow = False  # profile_async: started per step, not per request
+        self.t0 = time.perf_counter()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.t0) * 1000
+
+    def keep(self, ms):
+        return True
+
+    @abc.abstractmethod
+    def start(self):
+        """Start measuring the calling thread."""
+
+    @abc.abstractmethod
+    def stop(self):
+        """Stop measuring the calling thread."""
+
+    @abc.abstractmethod
+    def stats(self):
+        """pstats table: {(file, line, func): (calls, calls, own s, cumulative s, callers)}."""
+
+
+class _CProfiled(_Profile):
+    kind = "cprofile"
+
+    def __init__(self, query):
+        super().__init__(query)
+        self.prof = cProfile.Profile()
+
+    def start(self):
+        self.prof.enable()  # ValueError when another profiler owns the thread (3.12+)
+
+    def stop(self):
+        self.prof.disable()
+
+    def stats(self):
+        self.prof.create_stats()
+        return self.prof.stats
+
+
+class _Sampled(_Profile):
+    kind = "sampled"
+
+    def __init__(self, query):
+        super().__init__(query)
+        self.samples = Counter()  # stack of code objects (root first) -> seconds
+
+    def start(self):
+        self.base = sys._getframe(2)  # the frame that opened profile(); stacks stop there
+        self.tid = threading.get_ident()
+        with _lock:
+            _active[self.tid] = self
+        _wake.set()
+        _ensure_sampler()
+
+    def stop(self):
+        with _lock:
+            _active.pop(self.tid, None)
+
+    def keep(self, ms):
+        return ms >= SLOW_MS and bool(self.samples)
+
+    def add(self, frame, seconds):
+        stack = []
+        while frame is not None and len(stack) < MAX_DEPTH:
+            stack.append(frame.f_code)
+            if frame is self.base:
+                break
+            frame = frame.f_back
+        stack.reverse()
+        self.samples[tuple(stack)] += seconds
+
+    def stats(self):
+        """pstats table: {func: (calls, calls, own s, cumulative s, {caller: (...)})}."""
+        table = {}
+        for stack, seconds in list(self.samples.items()):
+            funcs = [(c.co_filename, c.co_firstlineno, c.co_name) for c in stack]
+            seen = set()
+            for i, func in enumerate(funcs):
+                cc, nc, tt, ct, callers = table.get(func) or (0, 0, 0.0, 0.0, {})
+                if i == len(funcs) - 1:
+                    tt += seconds
+                if func not in seen:  # recursion: count the time once per sample
+                    ct += seconds
+                    cc, nc = cc + 1, nc + 1
+                    seen.add(func)
+                if i:
+                    c = callers.get(funcs[i - 1], (0, 0, 0.0, 0.0))
+                    callers[funcs[i - 1]] = (c[0] + 1, c[1] + 1,
+                                             c[2] + (seconds if i == len(funcs) - 1 else 0.0),
+                                             c[3] + seconds)
+                table[func] = (cc, nc, tt, ct, callers)
+        return table
+
+
+def _sample_loop():
+    last = time.perf_counter()
+    interval = 1.0 / HZ
+    while True:
+        with _lock:
+            active = list(_active.values())
+        if not active:
+            _wake.wait()
+            _wake.clear()
+            last = time.perf_counter()
+            continue
+        now = time.perf_counter()
+        elapsed, last = now - last, now
+        frames = sys._current_frames()
+        for profile in active:
+            frame = frames.get(profile.tid)
+            if frame is not None:
+                profile.add(frame, elapsed)
+        del frames
+        time.sleep(interval)
+
+
+def _ensure_sampler():
+    global _sampler_pid
+    if _sampler_pid == os.getpid():
+        return
+    with _lock:
+        if _sampler_pid == os.getpid():
+            return
+        _sampler_pid = os.getpid()
+    threading.Thread(target=_sample_loop, name="profile-sampler", daemon=True).start()
+
+
+# --- request hook --------------------------------------------------------------
+
+class _Null:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _Null()
+
+
+class _Request:
+    __slots__ = ("profile", "token")
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def __enter__(self):
+        try:
+            self.profile.start()
+        except ValueError:
+            self.profile = None
+            return self
+        self.token = _current.set(self.profile)
+        return self
+
+    def __exit__(self, *exc):
+        profile = self.profile
+        if profile is None:
+            return False
+        profile.stop()
+        _current.reset(self.token)
+        ms = profile.elapsed_ms()
+        if profile.keep(ms):
+            _dump(profile, ms)
+        return False
+
+
+class _AsyncRequest:
+    __slots__ = ("profile", "token")
+
+    def __init__(self, profile):
+        self.profile = profile
+        profile.follow = True
+
+    def __enter__(self):
+        self.token = _current.set(self.profile)  # to_thread copies it into each step
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self.token)
+        ms = self.profile.elapsed_ms()
+        if self.profile.keep(ms):
+            _dump(self.profile, ms)
+        return False
+
+
+class _Step:
+    __slots__ = ("profile", "started")
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def __enter__(self):
+        try:
+            self.profile.start()
+            self.started = True
+        except ValueError:
+            self.started = False
+        return self
+
+    def __exit__(self, *exc):
+        if self.started:
+            self.profile.stop()
+        return False
+
+
+def _pick(query):
+    if RATE > 0 and random.random() < RATE:
+        return _CProfiled(query)
+    if SLOW_MS > 0:
+        return _Sampled(query)
+    return None
+
+
+def profile(query):
+    """
+    Context manager around one request's work. Picks cProfile (sampled at
+    ARSEMBLE_PROFILE_RATE), the stack sampler (ARSEMBLE_PROFILE_SLOW_MS) or
+    nothing; a no-op when neither is set.
+    """
+    picked = _pick(query)
+    return _Request(picked) if picked is not None else _NULL
+
+
+def profile_async(query):
+    """
+    profile() for a request served on an event loop (asgi.py), whose work
+    runs in to_thread steps: nothing is measured on the loop thread (it runs
+    every other request too); each step() measures the thread it runs on.
+    The dump covers the whole request, as with profile().
+    """
+    picked = _pick(query)
+    return _AsyncRequest(picked) if picked is not None else _NULL
+
+
+def step():
+    """Around one to_thread step of a profile_async request: measure this thread while it runs."""
+    current = _current.get() if (RATE > 0 or SLOW_MS > 0) else None
+    if current is None or not current.follow:
+        return _NULL
+    return _Step(current)
+
+
+def tag(**fields):
+    """Attach fields (intent=...) to the profile of the current request, if any."""
+    current = _current.get() if (RATE > 0 or SLOW_MS > 0) else None
+    if current is not None:
+        current.tags.update(fields)
+
+
+# --- dumps ---------------------------------------------------------------------
+
+_NAME = re.compile(r"^(?P<time>\d{8}-\d{6})-(?P<pid>\d+)-(?P<kind>[a-z]+)-(?P<intent>[\w.]+)"
+                   r"-(?P<hash>[0-9a-f]+)-(?P<ms>\d+)ms\.prof$")
+
+
+def _slug(value):
+    return re.sub(r"[^\w.]+", "_", str(value or "none"))[:32] or "none"
+
+
+def _allowed():
+    now = time.monotonic()
+    with _lock:
+        _written[:] = [t for t in _written if now - t < 60]
+        if len(_written) >= MAX_PER_MIN:
+            return False
+        _written.append(now)
+    return True
+
+
+def _dump(profile, ms):
+    if not _allowed():
+        return None
+    name = (f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{profile.kind}-"
+            f"{_slug(profile.tags.get('intent'))}-{query_hash(profile.query)}-{int(ms)}ms.prof")
+    try:
+        DIR.mkdir(parents=True, exist_ok=True)
+        path = DIR / name
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            marshal.dump(profile.stats(), f)
+        os.replace(tmp, path)  # readers never see a partial dump
+        _rotate()
+    except (OSError, ValueError) as e:
+        logger.warning("profile dump failed: %s", e)
+        return None
+    logger.info("profile written %s", path)
+    return path
+
+
+def _rotate():
+    files = dumps()
+    for path in files[:-KEEP] if KEEP > 0 else ():
+        path.unlink(missing_ok=True)
+
+
+def dumps(directory=None):
+    """Profile files in the directory, oldest first."""
+    try:
+        files = [p for p in Path(directory or DIR).glob("*.prof") if _NAME.match(p.name)]
+    except OSError:
+        return []
+    return sorted(files, key=lambda p: p.name)
+
+
+def describe(path):
+    """{time, pid, kind, intent, hash, ms} from a dump's file name."""
+    m = _NAME.match(Path(path).name)
+    if not m:
+        return None
+    info = m.groupdict()
+    info["ms"] = int(info["ms"])
+    return info
+
+
+# --- CLI -----------------------------------------------------------------------
+
+def _select(args):
+    files = []
+    for path in dumps(args.dir):
+        info = describe(path)
+        if args.intent and info["intent"] != args.intent:
+            continue
+        if args.kind and info["kind"] != args.kind:
+            continue
+        if args.query and info["hash"] != query_hash(args.query):
+            continue
+        files.append(path)
+    return files[-args.last:] if args.last else files
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="List request profiles or aggregate their hot functions.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for name, help_text in (("list", "one line per dump, oldest first"),
+                            ("top", "hot functions summed over the selected dumps")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--dir", default=None, help=f"dump directory (default {DIR})")
+        p.add_argument("--intent", help="only dumps of this intent")
+        p.add_argument("--kind", choices=("cprofile", "sampled"))
+        p.add_argument("--query", help="only dumps of this query (matched by its hash)")
+        p.add_argument("--last", type=int, default=0, help="only the newest N dumps")
+    top = sub.choices["top"]
+    top.add_argument("--sort", default="tottime", choices=("tottime", "cumulative", "calls"))
+    top.add_argument("--limit", type=int, default=25)
+    top.add_argument("--callers", help="also print the callers of functions matching this")
+    args = ap.parse_args(argv)
+
+    files = _select(args)
+    if not files:
+        print(f"no profiles in {args.dir or DIR}", file=sys.stderr)
+        return 1
+    if args.cmd == "list":
+        for path in files:
+            info = describe(path)
+            print(f"{info['time']}  {info['kind']:<8} {info['intent']:<12} {info['hash']} "
+                  f"{info['ms']:>7} ms  pid {info['pid']}")
+        return 0
+
+    stats = pstats.Stats(str(files[0]))
+    for path in files[1:]:
+        try:
+            stats.add(str(path))
+        except (OSError, ValueError, EOFError, TypeError):
+            continue
+    kinds = Counter(describe(p)["kind"] for p in files)
+    print(f"{len(files)} profiles ({', '.join(f'{n} {k}' for k, n in sorted(kinds.items()))}); "
+          "sampled dumps count samples as calls")
+    stats.strip_dirs().sort_stats(args.sort).print_stats(args.limit)
+    if args.callers:
+        stats.print_callers(args.callers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,492 @@
+# response_cache.py
+"""
+Two-tier cache for handle_query results, shared by the gunicorn workers.
+
+  memory  per-process LRU bounded by bytes; no I/O on a hit
+  shared  one SQLite file in WAL mode on the host, read and written by every
+          worker, so a retry that lands on another worker still hits
+
+get() tries memory, then shared (a shared hit is copied into memory); set()
+writes both tiers. singleflight(key, fn) runs fn once for concurrent callers
+of the same key: duplicates in this process wait on the first caller, and
+duplicates in other workers wait on a lease row in the shared tier until the
+result appears there. asingleflight(key, make) is the same for an event loop
+(asgi.py). Values are stored as JSON text, so every hit returns a
+fresh object and the size used for eviction is the encoded length. Entries
+expire after a TTL; when a tier is over its byte budget the least recently
+used entries go first.
+
+Keys are opaque strings. ARsemble_ai uses two kinds:
+
+  rid:<request_id>                                retries / double submits
+  q:<catalog version>:<intent>:<canonical query>  the same question again
+
+A q: value also records the catalog records (or the delta log position) its
+answer was built from, and ARsemble_ai.cache_get checks them on every read.
+
+Environment:
+  ARSEMBLE_RESPONSE_CACHE            shared (default) | memory | off
+  ARSEMBLE_RESPONSE_CACHE_DB         shared database (default: <tmp>/arsemble-response-cache/responses.db)
+  ARSEMBLE_RESPONSE_CACHE_TTL        seconds (default 600)
+  ARSEMBLE_RESPONSE_CACHE_MB         memory tier budget per process (default 8)
+  ARSEMBLE_RESPONSE_CACHE_SHARED_MB  shared tier budget (default 64)
+  ARSEMBLE_RESPONSE_CACHE_WAIT       seconds a duplicate waits for the first one (default 60)
+
+Usage:
+    python response_cache.py stats
+    python response_cache.py clear
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import log_config
+
+logger = log_config.get_logger("response_cache")
+
+MODE = os.getenv("ARSEMBLE_RESPONSE_CACHE", "shared").strip().lower()
+DB_PATH = Path(os.getenv("ARSEMBLE_RESPONSE_CACHE_DB") or Path(
+    tempfile.gettempdir()) / "arsemble-response-cache" / "responses.db")
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return float(default)
+
+
+TTL = _env_float("ARSEMBLE_RESPONSE_CACHE_TTL", 600)
+MEMORY_BYTES = int(_env_float("ARSEMBLE_RESPONSE_CACHE_MB", 8) * 1024 * 1024)
+SHARED_BYTES = int(_env_float("ARSEMBLE_RESPONSE_CACHE_SHARED_MB", 64) * 1024 * 1024)
+WAIT = _env_float("ARSEMBLE_RESPONSE_CACHE_WAIT", 60)
+
+
+def _counters():
+    return {"hits": 0, "misses": 0, "sets": 0, "expired": 0, "evicted": 0}
+
+
+class MemoryTier:
+    """Thread-safe LRU of key -> (json text, size, expires), bounded by total bytes."""
+
+    name = "memory"
+
+    def __init__(self, max_bytes=MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.counters = _counters()
+
+    def get(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            if entry[2] <= now:
+                self._drop(key)
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[0]
+
+    def set(self, key, blob, size, expires):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (blob, size, expires)
+            self._bytes += size
+            self.counters["sets"] += 1
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.counters["evicted"] += 1
+
+    def _drop(self, key):
+        self._bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, entries=len(self._entries), bytes=self._bytes,
+                        max_bytes=self.max_bytes)
+
+
+class SqliteTier:
+    """
+    Host-wide tier: a WAL-mode SQLite table every worker reads and writes.
+    Each thread keeps its own connection (reopened after a fork). Errors
+    (a locked or read-only database) count as misses, never as failures.
+    """
+
+    name = "shared"
+    EVICT_EVERY = 64   # sets between byte-budget checks
+    TOUCH_AFTER = 30   # seconds before a hit refreshes the LRU timestamp
+
+    def __init__(self, path=DB_PATH, max_bytes=SHARED_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sets = 0
+        self._tokens = itertools.count()
+        self.counters = dict(_counters(), errors=0)
+        with self._conn() as conn:  # fail early if the file cannot be created
+            conn.execute("SELECT 1")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=2, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS responses ("
+                         "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                         "expires REAL NOT NULL, used REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses(used)")
+            conn.execute("CREATE TABLE IF NOT EXISTS leases ("
+                         "key TEXT PRIMARY KEY, token TEXT NOT NULL, expires REAL NOT NULL)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, key, now):
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, expires, used FROM responses WHERE key=?",
+                               (key,)).fetchone()
+            if row is not None and row[1] <= now:
+                conn.execute("DELETE FROM responses WHERE key=?", (key,))
+                self._count("expired")
+                row = None
+            elif row is not None and now - row[2] > self.TOUCH_AFTER:
+                conn.execute("UPDATE responses SET used=? WHERE key=?", (now, key))
+        except sqlite3.Error:
+            self._count("errors")
+            row = None
+        self._count("hits" if row is not None else "misses")
+        return row[0] if row is not None else None
+
+    def peek(self, key, now):
+        """Like get() but without counters or LRU updates (for waiters polling)."""
+        try:
+            row = self._conn().execute("SELECT value FROM responses WHERE key=? AND expires > ?",
+                                       (key, now)).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def claim(self, key, ttl):
+        """
+        Take the lease on key for ttl seconds. Returns a token, or None while
+        another live lease holds it. On errors the caller just goes ahead ("").
+        """
+        now = time.time()
+        token = f"{os.getpid()}-{next(self._tokens)}"
+        try:
+            taken = self._conn().execute(
+                "INSERT INTO leases VALUES (?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                "token=excluded.token, expires=excluded.expires WHERE leases.expires <= ?",
+                (key, token, now + ttl, now)).rowcount
+        except sqlite3.Error:
+            self._count("errors")
+            return ""
+        return token if taken else None
+
+    def release(self, key, token):
+        if not token:
+            return
+        try:
+            self._conn().execute("DELETE FROM leases WHERE key=? AND token=?", (key, token))
+        except sqlite3.Error:
+            self._count("errors")
+
+    def set(self, key, blob, size, expires):
+        if size > self.max_bytes:
+            return
+        try:
+            conn = self._conn()
+            conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                         (key, blob, size, expires, time.time()))
+            with self._lock:
+                self.counters["sets"] += 1
+                self._sets += 1
+                evict = self._sets % self.EVICT_EVERY == 0
+            if evict:
+                self._evict(conn)
+        except sqlite3.Error:
+            self._count("errors")
+
+    def _evict(self, conn):
+        now = time.time()
+        expired = conn.execute("DELETE FROM responses WHERE expires <= ?", (now,)).rowcount
+        conn.execute("DELETE FROM leases WHERE expires <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY used").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key=?", (key,))
+            total -= size
+            evicted += 1
+        with self._lock:
+            self.counters["expired"] += max(0, expired)
+            self.counters["evicted"] += evicted
+
+    def clear(self):
+        try:
+            self._conn().execute("DELETE FROM responses")
+        except sqlite3.Error:
+            self._count("errors")
+
+    def stats(self):
+        with self._lock:
+            out = dict(self.counters, path=str(self.path), max_bytes=self.max_bytes)
+        try:
+            out["entries"], out["bytes"] = self._conn().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        except sqlite3.Error:
+            out["entries"] = out["bytes"] = None
+        return out
+
+
+class _Flight:
+    __slots__ = ("done", "value")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+
+
+class ResponseCache:
+    """The tiers in lookup order, plus overall hit-rate and dedupe counters."""
+
+    def __init__(self, tiers, ttl=TTL, wait=WAIT):
+        self.tiers = list(tiers)
+        self.ttl = ttl
+        self.wait = wait
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._aflights = {}
+        self.lookups = 0
+        self.hits = 0
+        self.deduped = {"local": 0, "shared": 0}
+
+    def get(self, key):
+        if not key or not self.tiers:
+            return None
+        now = time.time()
+        blob = None
+        for i, tier in enumerate(self.tiers):
+            blob = tier.get(key, now)
+            if blob is not None:
+                # promote into the faster tiers (the entry keeps a fresh TTL there)
+                size = len(blob.encode("utf-8"))
+                for upper in self.tiers[:i]:
+                    upper.set(key, blob, size, now + self.ttl)
+                break
+        with self._lock:
+            self.lookups += 1
+            self.hits += blob is not None
+        return json.loads(blob) if blob is not None else None
+
+    def set(self, key, value, ttl=None):
+        if not key or not self.tiers:
+            return
+        blob = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        size = len(blob.encode("utf-8"))
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        for tier in self.tiers:
+            tier.set(key, blob, size, expires)
+
+    def singleflight(self, key, fn, store=True):
+        """
+        The cached value for key, else fn() computed once for every concurrent
+        caller of key (stored under key unless store=False, when fn caches it
+        itself). A duplicate that waits longer than self.wait computes too.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.deduped["local"] += 1
+        if not leader:
+            if flight.done.wait(self.wait):
+                cached = self.get(key)
+                if cached is None:
+                    cached = flight.value
+                if cached is not None:
+                    return cached
+            return fn()  # timed out, or the first caller failed
+        try:
+            flight.value = self._lead(key, fn, store)
+            return flight.value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _shared(self):
+        return next((t for t in self.tiers if isinstance(t, SqliteTier)), None)
+
+    def _lead(self, key, fn, store):
+        shared = self._shared()
+        token = shared.claim(key, self.wait) if shared is not None else ""
+        if token is None:
+            # another worker is computing it: its result lands in the shared tier
+            with self._lock:
+                self.deduped["shared"] += 1
+            deadline = time.monotonic() + self.wait
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                if shared.peek(key, time.time()) is not None:
+                    cached = self.get(key)  # also copies it into memory
+                    if cached is not None:
+                        return cached
+        try:
+            value = fn()
+            if store:
+                self.set(key, value)
+            return value
+        finally:
+            if shared is not None:
+                shared.release(key, token)
+
+    async def asingleflight(self, key, make, store=True):
+        """
+        singleflight for an event loop: make is a coroutine function. The
+        duplicates in this process await the first caller's future; cache and
+        lease I/O runs in the default thread pool.
+        """
+        cached = await asyncio.to_thread(self.get, key)
+        if cached is not None:
+            return cached
+        flight = self._aflights.get(key)  # only touched from the loop thread
+        if flight is not None:
+            with self._lock:
+                self.deduped["local"] += 1
+            try:
+                await asyncio.wait_for(asyncio.shield(flight), self.wait)
+            except asyncio.TimeoutError:
+                return await make()
+            cached = await asyncio.to_thread(self.get, key)
+            if cached is None:
+                cached = flight.result()
+            return cached if cached is not None else await make()
+        flight = self._aflights[key] = asyncio.get_running_loop().create_future()
+        value = None
+        try:
+            value = await self._alead(key, make, store)
+            return value
+        finally:
+            self._aflights.pop(key, None)
+            flight.set_result(value)
+
+    async def _alead(self, key, make, store):
+        shared = self._shared()
+        token = await asyncio.to_thread(shared.claim, key, self.wait) if shared is not None else ""
+        if token is None:
+            with self._lock:
+                self.deduped["shared"] += 1
+            deadline = time.monotonic() + self.wait
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                if await asyncio.to_thread(shared.peek, key, time.time()) is not None:
+                    cached = await asyncio.to_thread(self.get, key)
+                    if cached is not None:
+                        return cached
+        try:
+            value = await make()
+            if store:
+                await asyncio.to_thread(self.set, key, value)
+            return value
+        finally:
+            if shared is not None:
+                await asyncio.to_thread(shared.release, key, token)
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups, hits = self.lookups, self.hits
+            deduped = dict(self.deduped)
+        return {"lookups": lookups, "hits": hits,
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "deduped": deduped, "ttl": self.ttl,
+                "tiers": {t.name: t.stats() for t in self.tiers}}
+
+
+def make_cache(mode=MODE):
+    """Build the tiers for mode (shared | memory | off); shared falls back to memory."""
+    if mode == "off":
+        return ResponseCache([])
+    tiers = [MemoryTier()]
+    if mode == "shared":
+        try:
+            tiers.append(SqliteTier())
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("shared response cache unavailable (%s); using memory only", e)
+    return ResponseCache(tiers)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide ResponseCache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = make_cache()
+    return _cache
+
+
+def reset_after_fork():
+    """Drop the inherited cache object (and its locks); the worker builds its own."""
+    global _cache, _cache_lock
+    _cache_lock = threading.Lock()
+    _cache = None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Inspect or clear the shared response cache.")
+    ap.add_argument("cmd", choices=["stats", "clear"])
+    args = ap.parse_args(argv)
+    tier = SqliteTier()
+    if args.cmd == "clear":
+        tier.clear()
+    print(json.dumps(tier.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
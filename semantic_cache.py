@@ -0,0 +1,196 @@
+# semantic_cache.py
+"""
+Near-duplicate answer cache for Gemini-bound questions.
+
+Queries are normalized (lowercase, component-name tokens removed, field
+synonyms folded: "watts"/"tdp"/"power draw" -> power, "how much"/"cost" ->
+price, ...) and fingerprinted with a 64-bit SimHash. A stored answer is
+served when the resolved component IDs and the asked fields match exactly
+and the fingerprint similarity (1 - hamming/64) reaches the threshold, so
+"what's the tdp of 5600x", "5600x tdp?" and "how many watts does the ryzen
+5 5600x use" share one Gemini call. The words left over decide the rest:
+"price with tax" or "tdp overclocked" is a different question from "price"
+or "tdp".
+
+The threshold and false-hit rate can be measured with
+benchmarks/semantic_cache_eval.py; the default (0.85) is the lowest
+threshold with no false hits on its labeled pairs.
+"""
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+FINGERPRINT_BITS = 64
+
+# multi-word phrases folded before tokenizing
+PHRASES = [
+    (r"\bhow much\b(?!\s+(?:vram|memory|ram|power|storage|space|capacity|watts?)\b)", " price "),
+    (r"\bpower (?:draw|consumption|usage)\b", " power "),
+    (r"\bthermal design power\b", " power "),
+    (r"\bboost clock\b|\bclock speed\b", " clock "),
+    (r"\bram type\b|\bmemory type\b", " ramtype "),
+    (r"\bform factor\b", " formfactor "),
+    (r"\btell me about\b|\bwhat are the specs\b", " details "),
+    (r"\bworks? with\b|\bfit with\b", " compat "),
+]
+
+# token -> canonical feature
+SYNONYMS = {
+    "tdp": "power", "watt": "power", "watts": "power", "wattage": "power",
+    "power": "power", "consume": "power", "draw": "power",
+    "price": "price", "cost": "price", "costs": "price", "php": "price",
+    "peso": "price", "pesos": "price", "₱": "price", "expensive": "price",
+    "cores": "cores", "core": "cores", "threads": "cores", "thread": "cores",
+    "clock": "clock", "ghz": "clock", "mhz": "clock", "boost": "clock",
+    "speed": "clock", "frequency": "clock", "fast": "clock",
+    "vram": "vram", "socket": "socket", "igpu": "igpu",
+    "specs": "details", "spec": "details", "details": "details",
+    "detail": "details", "information": "details", "info": "details",
+    "compatible": "compat", "compatibility": "compat",
+    "capacity": "capacity", "interface": "interface", "efficiency": "efficiency",
+}
+CANONICAL = set(SYNONYMS.values()) | {"ramtype", "formfactor"}
+
+STOPWORDS = {
+    "what", "whats", "s", "is", "are", "the", "of", "does", "do", "did", "how",
+    "many", "use", "uses", "used", "a", "an", "me", "please", "can", "you",
+    "tell", "about", "give", "show", "i", "it", "its", "this", "that", "for",
+    "to", "in", "on", "and", "much", "have", "has", "need", "needs", "my",
+    "get", "which", "would", "will", "be", "there",
+    # conversational filler
+    "hey", "hi", "hello", "quick", "question", "just", "exactly", "right", "now",
+    "current", "currently", "your", "rated", "rating", "card",
+}
+
+
+def normalize_query(query, component_tokens=()):
+    """Return the feature list for a query (canonical fields + leftover words)."""
+    q = unicodedata.normalize("NFKC", query or "").lower()
+    q = q.replace("₱", " ₱ ")
+    for pat, rep in PHRASES:
+        q = re.sub(pat, rep, q)
+    drop = set(component_tokens)
+    feats = []
+    for tok in re.findall(r"[\w₱]+", q):
+        if tok in drop or tok in STOPWORDS or tok.isdigit():
+            continue
+        tok = SYNONYMS.get(tok, tok)
+        feats.append(tok)
+    return feats
+
+
+def _hash64(token):
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(features):
+    """64-bit SimHash over the features (fields are matched exactly by the cache, not weighted here)."""
+    if not features:
+        return 0
+    acc = [0] * FINGERPRINT_BITS
+    for f in features:
+        h = _hash64(f)
+        for i in range(FINGERPRINT_BITS):
+            acc[i] += 1 if (h >> i) & 1 else -1
+    out = 0
+    for i, v in enumerate(acc):
+        if v > 0:
+            out |= 1 << i
+    return out
+
+
+def similarity(fp_a, fp_b):
+    return 1.0 - bin(fp_a ^ fp_b).count("1") / FINGERPRINT_BITS
+
+
+class SemanticCache:
+    """
+    Thread-safe near-duplicate cache. Entries are bucketed by the exact tuple of
+    resolved component IDs; inside a bucket the best SimHash match wins.
+    """
+
+    def __init__(self, threshold=0.85, max_entries=2000, ttl=6 * 3600, max_per_bucket=16):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_per_bucket = max_per_bucket
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # ids -> list[[fp, answer, ts, query, fields]]
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(query, component_tokens=()):
+        return simhash(normalize_query(query, component_tokens))
+
+    @staticmethod
+    def _key(query, component_tokens):
+        """(fingerprint, asked fields): only a question about the same fields can match."""
+        feats = normalize_query(query, component_tokens)
+        return simhash(feats), frozenset(f for f in feats if f in CANONICAL)
+
+    def get(self, query, component_ids, component_tokens=()):
+        """Return (answer, similarity) for the best match above threshold, else (None, best)."""
+        ids = tuple(component_ids)
+        fp, fields = self._key(query, component_tokens)
+        now = time.time()
+        best, best_sim = None, 0.0
+        with self._lock:
+            bucket = self._buckets.get(ids)
+            if bucket:
+                self._buckets.move_to_end(ids)
+                for entry in bucket:
+                    if entry[4] != fields or (self.ttl and now - entry[2] > self.ttl):
+                        continue
+                    sim = similarity(fp, entry[0])
+                    if sim > best_sim:
+                        best, best_sim = entry, sim
+            if best is not None and best_sim >= self.threshold:
+                self.hits += 1
+                return best[1], best_sim
+            self.misses += 1
+        return None, best_sim
+
+    def put(self, query, component_ids, answer, component_tokens=()):
+        ids = tuple(component_ids)
+        fp, fields = self._key(query, component_tokens)
+        with self._lock:
+            bucket = self._buckets.setdefault(ids, [])
+            self._buckets.move_to_end(ids)
+            for entry in bucket:
+                if entry[0] == fp and entry[4] == fields:
+                    entry[1], entry[2], entry[3] = answer, time.time(), query
+                    return
+            bucket.append([fp, answer, time.time(), query, fields])
+            self._size += 1
+            if len(bucket) > self.max_per_bucket:
+                bucket.pop(0)
+                self._size -= 1
+            while self._size > self.max_entries and self._buckets:
+                _, old = self._buckets.popitem(last=False)
+                self._size -= len(old)
+
+    def invalidate(self, predicate):
+        """Drop buckets whose component-ID tuple satisfies predicate(ids). Returns count."""
+        with self._lock:
+            doomed = [ids for ids in self._buckets if predicate(ids)]
+            for ids in doomed:
+                self._size -= len(self._buckets.pop(ids))
+        return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": self._size, "buckets": len(self._buckets),
+                    "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                    "threshold": self.threshold}
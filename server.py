@@ -1,17 +1,78 @@
 # server.py
 from ARsemble_ai import handle_query, generate_quick_recommendations
-from flask import Flask, request, jsonify, send_from_directory
+import ARsemble_ai
+import catalog_deltas
+import chat_api
+import chat_batch
+import catalog_manager
+import log_config
+import metrics
+import response_cache
+import timing
+from flask import Flask, Response, g, request, jsonify, send_from_directory
 from flask_cors import CORS
-import json
+import hmac
 import logging
 import os
+import time
 
 app = Flask(__name__, static_folder="static", static_url_path="/static")
 CORS(app)
 
-# configure basic logging
+# basic logging for werkzeug/flask; the app's own records go through log_config
 logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger("ARsemble-server")
+logger = log_config.get_logger("server")
+
+
+API_PATHS = ("/chat", "/chat/batch", "/recommend", "/admin/catalog/deltas")
+
+
+@app.before_request
+def start_timing():
+    # stage timings (see timing.py) and request metrics for the API calls, not static files
+    if request.method == "POST":
+        g.timing_token = timing.begin()
+        g.metrics_token = metrics.begin_request()
+        g.log_token = log_config.begin(
+            path=request.path, request_id=request_id_of(request.get_json(force=True, silent=True)))
+        g.started = time.perf_counter()
+
+
+@app.after_request
+def server_timing(response):
+    recorder = timing.current() if g.get("timing_token") else None
+    if recorder is not None:
+        response.headers["Server-Timing"] = recorder.header()
+        response.headers["Timing-Allow-Origin"] = "*"
+        timing.report(recorder, path=request.path, status=response.status_code,
+                      request_id=request_id_of(request.get_json(force=True, silent=True)))
+    end_metrics(response.status_code)
+    return response
+
+
+@app.teardown_request
+def end_timing(exc):
+    timing.end(g.pop("timing_token", None))
+    log_config.end(g.pop("log_token", None))
+    end_metrics(500)  # no-op unless after_request was skipped
+
+
+def end_metrics(status):
+    token = g.pop("metrics_token", None)
+    if token is not None:
+        path = request.path if request.path in API_PATHS else "other"
+        metrics.end_request(token, path, status, time.perf_counter() - g.started)
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus text format, summed over all workers (see metrics.py)."""
+    if not metrics.ENABLED:
+        return jsonify({"error": "metrics disabled"}), 404
+    if not metrics.authorized(request.headers.get("Authorization")):
+        return jsonify({"error": "unauthorized"}), 401
+    body = metrics.render(ARsemble_ai.metrics_gauges())
+    return Response(body, content_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.route("/")
@@ -20,67 +81,71 @@ def index():
     return send_from_directory("static", "index.html")
 
 
+def request_id_of(payload):
+    return chat_api.request_id_of(request.headers.get("Idempotency-Key"), payload)
+
+
 @app.route("/chat", methods=["POST"])
 def chat():
     """
-    Expects JSON body: { "message": "<user message>" }
-    Calls ARsemble_ai.handle_query(...) which returns a JSON string (or plain text).
-    Normalizes into structured JSON:
+    Expects JSON body: { "message": "<user message>", "request_id": "<optional id>" }
+    (or the id in an Idempotency-Key header). A retry with the same id gets the
+    first answer back, and waits for it while the first is still running.
+    Calls ARsemble_ai.handle_query(...) and normalizes its result into:
       { "response": "<assistant text>", "recommendations": [...] }
     """
     try:
         payload = request.get_json(force=True)
     except Exception as e:
         logger.exception("Invalid JSON body received")
-        return jsonify({"response": "Invalid JSON body.", "recommendations": []}), 400
+        return jsonify(chat_api.INVALID_JSON), 400
 
-    message = payload.get("message") if isinstance(payload, dict) else None
+    message = chat_api.message_of(payload)
     if message is None:
-        return jsonify(
-            {"response": "Invalid request — expected JSON with key 'message'.",
-                "recommendations": []}
-        ), 400
+        return jsonify(chat_api.MISSING_MESSAGE), 400
 
     try:
-        # handle_query returns a JSON string or plain text
-        raw = handle_query(message)
-        parsed = None
-        if isinstance(raw, str):
-            # try to parse JSON string first
-            try:
-                parsed = json.loads(raw)
-            except Exception:
-                # treat as plain text reply
-                parsed = {"reply": raw, "recommendations": []}
-        elif isinstance(raw, dict):
-            parsed = raw
-        else:
-            parsed = {"reply": str(raw), "recommendations": []}
-
-        # Ensure fields exist and have safe types
-        reply_text = parsed.get("reply", "")
-        recommendations = parsed.get("recommendations", [])
-        if not isinstance(recommendations, list):
-            recommendations = []
-
-        return jsonify({"response": reply_text, "recommendations": recommendations})
-    except UnboundLocalError as ule:
-        # Specific helpful message for the UnboundLocalError you saw earlier
-        logger.exception("UnboundLocalError inside handle_query")
-        return jsonify(
-            {
-                "response": "⚠️ Assistant internal error (UnboundLocalError). Check server logs.",
-                "recommendations": [],
-            }
-        ), 500
+        # the whole request sees one catalog snapshot even if a reload lands meanwhile
+        with catalog_manager.pinned():
+            raw = handle_query(message, request_id=request_id_of(payload))
+        return jsonify(chat_api.chat_payload(raw))
     except Exception as e:
         logger.exception("Unhandled error while calling handle_query")
-        return jsonify(
-            {
-                "response": f"⚠️ Server error while handling message: {e}",
-                "recommendations": [],
-            }
-        ), 500
+        return jsonify(chat_api.internal_error(e)), 500
+
+
+@app.route("/chat/batch", methods=["POST"])
+def chat_batch_endpoint():
+    """
+    Many questions in one round trip (kiosk, bulk quotes):
+      { "messages": ["...", ...], "stream": false, "request_id": "<optional id>" }
+    Returns {"results": [{"message", "response", "recommendations"}, ...], "stats": {...}}
+    in request order; with "stream": true (or Accept: application/x-ndjson) one
+    NDJSON line per message, {"index": i, ...}, as each is answered. The
+    request id dedupes the non-streamed form.
+    """
+    payload = request.get_json(force=True, silent=True)
+    try:
+        messages = chat_batch.parse_messages(payload)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    metrics.label(intent="batch")
+    if chat_batch.wants_stream(payload, request.headers.get("Accept")):
+        return Response(chat_batch.ndjson_lines(messages), mimetype="application/x-ndjson")
+    try:
+        rid = request_id_of(payload)
+        with catalog_manager.pinned():
+            if rid:
+                body = response_cache.get_cache().singleflight(
+                    f"batch:{rid}", lambda: chat_batch.run_batch(messages))
+            else:
+                body = chat_batch.run_batch(messages)
+        metrics.label(intent="batch")  # the questions set their own intents meanwhile
+        return jsonify(body)
+    except Exception as e:
+        logger.exception("Unhandled error while answering a batch")
+        return jsonify({"error": str(e)}), 500
 
 
 # Optional endpoint to fetch quick recommendations for a message directly
@@ -88,19 +153,25 @@ def chat():
 def recommend():
     """
     Returns only recommendations (useful if you want to fetch them separately).
-    Body: { "message": "<user message>" }
+    Body: { "message": "<user message>", "request_id": "<optional id>" }
     """
     try:
         payload = request.get_json(force=True)
     except Exception:
         return jsonify({"recommendations": []}), 400
 
-    message = payload.get("message") if isinstance(payload, dict) else None
+    message = chat_api.message_of(payload)
     if not message:
         return jsonify({"recommendations": []}), 400
 
     try:
-        recs = generate_quick_recommendations(message) or []
+        rid = request_id_of(payload)
+        with catalog_manager.pinned():
+            if rid:
+                recs = response_cache.get_cache().singleflight(
+                    f"rec:{rid}", lambda: generate_quick_recommendations(message) or [])
+            else:
+                recs = generate_quick_recommendations(message) or []
         if not isinstance(recs, list):
             recs = []
         return jsonify({"recommendations": recs})
@@ -109,6 +180,38 @@ def recommend():
         return jsonify({"recommendations": []}), 500
 
 
+# Price/stock deltas (see catalog_deltas). Disabled unless ARSEMBLE_ADMIN_TOKEN is set.
+@app.route("/admin/catalog/deltas", methods=["POST"])
+def catalog_deltas_endpoint():
+    """
+    Body: {"deltas": [{"category": "gpu", "key": "rtx 3060", "price": 15990}, ...]}
+    (a single delta object or a bare list also works). Header: X-Admin-Token.
+    Returns per-delta results with old/new price and apply latency.
+    """
+    token = os.environ.get("ARSEMBLE_ADMIN_TOKEN", "")
+    if not token:
+        return jsonify({"error": "admin API disabled"}), 404
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), token):
+        return jsonify({"error": "forbidden"}), 403
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get("deltas", [payload])
+    if not isinstance(payload, list) or not payload:
+        return jsonify({"error": "expected a delta object or a list of deltas"}), 400
+    try:
+        with catalog_manager.pinned():
+            results = catalog_deltas.submit(payload)
+    except Exception as e:
+        logger.exception("Error applying catalog deltas")
+        return jsonify({"error": str(e)}), 500
+    status = 200 if all("error" not in r for r in results) else 207
+    return jsonify({"results": results, "stats": catalog_deltas.delta_stats()}), status
+
+
 if __name__ == "__main__":
+    # warm the (lazily created) Gemini client while the dev server starts
+    from ARsemble_ai import warm_client_in_background
+    warm_client_in_background()
+    catalog_manager.start_watcher()
     # Use debug=False for production-like behavior; change to True when debugging locally.
     app.run(host="0.0.0.0", port=5000, debug=False)
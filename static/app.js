@@ -105,14 +105,35 @@
     });
   }
 
+  // one id per user message; retries reuse it so the server answers only once
+  function newRequestId() {
+    if (window.crypto && typeof window.crypto.randomUUID === "function") {
+      return window.crypto.randomUUID();
+    }
+    return Date.now().toString(36) + "-" + Math.random().toString(36).slice(2, 12);
+  }
+
+  const MAX_RETRIES = 2;
+
   // backend caller: returns parsed JSON or { reply: text }
   async function callBackend(q) {
-    const body = { message: q };
-    const res = await fetch(API_ENDPOINT, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(body),
-    });
+    const requestId = newRequestId();
+    const body = { message: q, request_id: requestId };
+    let res;
+    for (let attempt = 0; ; attempt++) {
+      try {
+        res = await fetch(API_ENDPOINT, {
+          method: "POST",
+          headers: { "Content-Type": "application/json", "Idempotency-Key": requestId },
+          body: JSON.stringify(body),
+        });
+        if (res.status < 500 || attempt >= MAX_RETRIES) break;
+      } catch (err) {
+        // network error: retry with the same id, the server dedupes it
+        if (attempt >= MAX_RETRIES) throw err;
+      }
+      await new Promise((resolve) => setTimeout(resolve, 500 * (attempt + 1)));
+    }
 
     // read as text then try parse (server may return JSON string)
     const text = await res.text();
@@ -0,0 +1,38 @@
+# text_utils.py
+"""Parsing helpers shared by ARsemble_ai and the catalog snapshot builder."""
+import re
+
+
+def normalize_text(s):
+    """Lowercase & return alphanumeric tokens (keeps numbers like 5600g, i7)."""
+    if not s:
+        return []
+    return re.findall(r'\w+', s.lower())
+
+
+def parse_watts(value):
+    """Extract integer watt value from strings like '65W', '~115 Watts', '170W'."""
+    if not value:
+        return None
+    s = str(value)
+    m = re.search(r'(\d{2,4})', s.replace(',', ''))
+    return int(m.group(1)) if m else None
+
+
+def parse_price(value):
+    """Extract integer value from price string '₱1,800' or '₱ 1,800'."""
+    if not value:
+        return None
+    s = str(value)
+    m = re.search(r'(\d[\d,]*)', s)
+    if not m:
+        return None
+    num = int(m.group(1).replace(',', ''))
+    return num
+
+
+def effective_price(info):
+    """Price a record sells at: parse_price(info["price"]), or None when its stock is 0."""
+    if info.get("stock") in (0, "0"):
+        return None
+    return parse_price(info.get("price"))
@@ -0,0 +1,153 @@
+# timing.py
+"""
+Per-request stage timings, reported as a Server-Timing header and a log line.
+
+    with timing.span("intent"):        # around a stage
+        ...
+    @timing.timed("find")              # around a whole function
+    def find_component(query): ...
+    timing.add("gemini", seconds)      # a duration measured elsewhere
+
+A web entry point opens a recorder per request (begin()/end()); spans append
+(name, seconds) to it, measured with time.perf_counter. A stage may run
+several times in one request (a Gemini retry, two recommendation calls); the
+header gives the sum and the count per name. Spans are inclusive, so nested
+stages overlap their parents, and stages run in parallel (a /chat/batch) add
+up to more than the wall time. Work on other threads is counted when it runs
+in a copy of the request's context (asyncio.to_thread, copy_context().run).
+
+Outside a request (CLI, offline jobs) a span is one contextvar lookup.
+ARSEMBLE_TIMING=0 turns it off entirely: span() hands back a shared no-op
+and timed() returns the function undecorated.
+"""
+import contextvars
+import functools
+import os
+import time
+
+import log_config
+
+ENABLED = os.getenv("ARSEMBLE_TIMING", "1") != "0"
+
+logger = log_config.get_logger("timing")
+_recorder = contextvars.ContextVar("arsemble_timing", default=None)
+
+
+class Recorder(list):
+    """(name, seconds) for one request, plus tags such as the intent."""
+
+    def __init__(self):
+        super().__init__()
+        self.start = time.perf_counter()
+        self.tags = {}
+
+    def totals(self):
+        """{name: (ms, count)} in first-seen order."""
+        out = {}
+        for name, seconds in list(self):
+            ms, count = out.get(name, (0.0, 0))
+            out[name] = (ms + seconds * 1000, count + 1)
+        return out
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def header(self):
+        parts = [f"{name};dur={ms:.2f}" + (f';desc="x{count}"' if count > 1 else "")
+                 for name, (ms, count) in self.totals().items()]
+        parts.append(f"total;dur={self.elapsed_ms():.2f}")
+        return ", ".join(parts)
+
+    def fields(self):
+        return dict(self.tags, latency_ms=round(self.elapsed_ms(), 2),
+                    spans={name: round(ms, 2) for name, (ms, _) in self.totals().items()})
+
+
+class _Null:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _Null()
+
+
+class _Span:
+    __slots__ = ("name", "recorder", "t0")
+
+    def __init__(self, name, recorder):
+        self.name = name
+        self.recorder = recorder
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.append((self.name, time.perf_counter() - self.t0))
+        return False
+
+
+def span(name):
+    if not ENABLED:
+        return _NULL
+    recorder = _recorder.get()
+    return _NULL if recorder is None else _Span(name, recorder)
+
+
+def timed(name):
+    """Decorator: time every call of the function as stage `name`."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            recorder = _recorder.get()
+            if recorder is None:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                recorder.append((name, time.perf_counter() - t0))
+        return wrapper
+    return decorate
+
+
+def add(name, seconds):
+    recorder = _recorder.get() if ENABLED else None
+    if recorder is not None:
+        recorder.append((name, seconds))
+
+
+def tag(**fields):
+    """Attach fields (intent, cache=hit, ...) to the request's log line."""
+    recorder = _recorder.get() if ENABLED else None
+    if recorder is not None:
+        recorder.tags.update(fields)
+
+
+def begin():
+    """Open a recorder for this request; returns the token for end() (None when off)."""
+    return _recorder.set(Recorder()) if ENABLED else None
+
+
+def current():
+    return _recorder.get()
+
+
+def end(token):
+    if token is not None:
+        _recorder.reset(token)
+
+
+def report(recorder, **fields):
+    """Log the request's timings (the header as the message, the fields as JSON keys)."""
+    data = dict(recorder.fields(), **fields)
+    logger.info("timing %s", recorder.header(), extra={"fields": data})
+    return data